@@ -0,0 +1,450 @@
+"""Named, cached read-only queries against Corral.
+
+The heavy joins (ParcelCommodityInventory rollups, the transactions view,
+the AuditLog replay) used to be pasted into each script and re-run against
+sql24 on every invocation. They live here once, as named parameterized
+queries, and run_query() answers them from a local Parquet cache whenever
+the tables they read have not changed.
+
+Cache key = hash of (connection URL, query SQL, parameters, table
+fingerprint). The fingerprint is COUNT_BIG(*) + CHECKSUM_AGG(BINARY_CHECKSUM(*))
+over each table the query reads (every joined table, not just the driving
+one) - a single scan per table, far cheaper than the join itself - and is
+remembered for FINGERPRINT_TTL seconds so a burst of queries in one session
+checks each table once. Append-only tables (_APPEND_ONLY, i.e. AuditLog) are
+fingerprinted by their MAX(id) instead: one index seek, where a checksum of
+the whole log would cost more than the 25-APN query it guards. Within a process the
+frames are also kept in memory.
+
+Results are pulled CHUNK_ROWS rows at a time. Each chunk is cast to the
+query's declared dtypes (Int32 ids, Arrow strings, Float64 quantities) and
+gets its APN columns canonicalized (utils.canonical_apn_series) before it is
+appended to the Parquet file, so a full-history pull never holds an
+object-dtype copy of the whole result. Columns declared "category" are
+stored as strings and become categoricals when the file is read back.
+
+Read-only: every query is a SELECT. Cache files go under CORRAL_CACHE_DIR
+(default data/corral_cache/, git-ignored).
+
+Usage
+-----
+    from corral_queries import run_query
+    pci = run_query("pci_banked_rollup", database="Corral_2026")
+    qty = run_query("pci_replay", {"asof": "2020-12-31 23:59:59",
+                                   "apns": apns, "commodity_ids": [5, 14]})
+    run_query("transactions_view", refresh=True)     # bypass the cache
+    for chunk in iter_query("transactions_view"):    # typed chunks, no cache
+        ...
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from db_corral import _REPO_ROOT, get_engine
+
+CACHE_DIR = Path(os.environ.get("CORRAL_CACHE_DIR", _REPO_ROOT / "data" / "corral_cache"))
+FINGERPRINT_TTL = 300  # seconds a table fingerprint is trusted within a process
+CHUNK_ROWS = 50_000    # rows per read_sql chunk
+
+_TABLE_RE = re.compile(r"^(dbo\.)?[A-Za-z_][A-Za-z0-9_]*$")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# QUERY REGISTRY
+# ─────────────────────────────────────────────────────────────────────────────
+# Each entry: sql, the base tables whose changes invalidate its cache, the
+# parameters bound as expanding IN-lists, the column dtypes, and the APN
+# columns to canonicalize ({raw column: canonical column}). Undeclared columns
+# keep what the driver returns. To add a query: add an entry here.
+
+_ID  = "Int32"
+_STR = "string[pyarrow]"
+_CAT = "category"
+_QTY = "Float64"
+_DT  = "datetime64[ns]"
+
+QUERIES: dict[str, dict] = {
+    "parcel_numbers": {
+        "sql": """
+            SELECT ParcelNumber
+            FROM dbo.Parcel
+            WHERE ParcelNumber IS NOT NULL
+        """,
+        "tables": ["dbo.Parcel"],
+        "dtypes": {"ParcelNumber": _STR},
+    },
+
+    # Banked inventory per (ParcelNumber, Commodity).
+    "pci_banked_rollup": {
+        "sql": """
+            SELECT p.ParcelNumber AS apn_raw,
+                   c.CommodityName AS commodity,
+                   SUM(pci.BankedQuantity) AS pci_banked,
+                   SUM(ISNULL(pci.RemainingBankedQuantityAdjustment, 0)) AS pci_adj,
+                   MAX(pci.LastUpdateDate) AS pci_last,
+                   MIN(pci.BankedDate) AS pci_banked_date,
+                   COUNT(*) AS pci_rows
+            FROM ParcelCommodityInventory pci
+            JOIN Parcel p ON pci.ParcelID = p.ParcelID
+            JOIN LandCapabilityType lct ON pci.LandCapabilityTypeID = lct.LandCapabilityTypeID
+            JOIN Commodity c ON lct.CommodityID = c.CommodityID
+            WHERE pci.BankedQuantity IS NOT NULL
+            GROUP BY p.ParcelNumber, c.CommodityName
+        """,
+        "tables": ["ParcelCommodityInventory", "Parcel", "LandCapabilityType", "Commodity"],
+        "dtypes": {"apn_raw": _STR, "commodity": _CAT, "pci_banked": _QTY,
+                   "pci_adj": _QTY, "pci_last": _DT, "pci_banked_date": _DT,
+                   "pci_rows": _ID},
+        "apn": {"apn_raw": "apn"},
+    },
+
+    # Transaction sums per (ParcelNumber, Commodity); receiving is +, sending
+    # is -. vTransactedAndBankedCommodities already encodes the sign on Quantity.
+    "tx_rollup": {
+        "sql": """
+            SELECT p.ParcelNumber AS apn_raw,
+                   c.CommodityName AS commodity,
+                   SUM(CASE WHEN v.Quantity > 0 THEN v.Quantity ELSE 0 END) AS tx_received,
+                   SUM(CASE WHEN v.Quantity < 0 THEN v.Quantity ELSE 0 END) AS tx_sent,
+                   COUNT(*) AS tx_rows,
+                   MAX(v.LastUpdateDate) AS tx_last
+            FROM vTransactedAndBankedCommodities v
+            JOIN Parcel p ON v.ParcelID = p.ParcelID
+            JOIN Commodity c ON v.CommodityID = c.CommodityID
+            WHERE v.ParcelAction <> 'Banked'
+            GROUP BY p.ParcelNumber, c.CommodityName
+        """,
+        "tables": ["TdrTransaction", "TdrTransactionTransfer", "TdrTransactionAllocation",
+                   "ParcelCommodityInventory", "LandCapabilityType", "Parcel",
+                   "Commodity"],
+        "dtypes": {"apn_raw": _STR, "commodity": _CAT, "tx_received": _QTY,
+                   "tx_sent": _QTY, "tx_rows": _ID, "tx_last": _DT},
+        "apn": {"apn_raw": "apn"},
+    },
+
+    # TdrTransaction* + ResidentialAllocation + Parcel + Commodity, shaped like
+    # Transactions_Allocations_Details.xlsx.
+    "transactions_view": {
+        "sql": """
+            SELECT
+                tt.LeadAgencyAbbreviation + '-' + tt.TransactionTypeAbbreviation + '-'
+                  + CAST(tt.TdrTransactionID AS varchar(20))           AS TransactionID,
+                tt.ProjectNumber                                       AS ProjectNumber,
+                tt.TransactionTypeAbbreviation                         AS TransactionTypeAbbrev,
+                tty.TransactionTypeName                                AS TransactionType,
+                p.ParcelNumber                                         AS APN,
+                j.ResidentialAllocationAbbreviation                    AS Jurisdiction,
+                c.CommodityDisplayName                                 AS DevelopmentRight,
+                c.CommodityShortName                                   AS DevelopmentRightShort,
+                ra.AllocationSequence                                  AS AllocationSequence,
+                ra.IssuanceYear                                        AS AllocationYear,
+                COALESCE(ttt.ReceivingQuantity, tta.AllocatedQuantity) AS Quantity,
+                ac.AccelaID                                            AS AccelaRecordID,
+                tt.ApprovalDate                                        AS TRPAStatusDate,
+                ts.TransactionStateName                                AS TRPAStatus,
+                pp.PermitNumber                                        AS LocalJurisdictionProjectNumber,
+                pps.ParcelPermitStatusName                             AS LocalStatus,
+                pp.LastUpdatedDate                                     AS LocalStatusDate,
+                tt.Comments                                            AS Notes,
+                tt.TdrTransactionID                                    AS TdrTransactionID
+            FROM dbo.TdrTransaction tt
+            LEFT JOIN dbo.TransactionType tty           ON tty.TransactionTypeID = tt.TransactionTypeID
+            LEFT JOIN dbo.TransactionState ts           ON ts.TransactionStateID = tt.TransactionStateID
+            LEFT JOIN dbo.TdrTransactionTransfer   ttt  ON ttt.TdrTransactionID  = tt.TdrTransactionID
+            LEFT JOIN dbo.TdrTransactionAllocation tta  ON tta.TdrTransactionID  = tt.TdrTransactionID
+            LEFT JOIN dbo.ResidentialAllocation    ra   ON ra.TdrTransactionID   = tt.TdrTransactionID
+            LEFT JOIN dbo.Parcel p                      ON p.ParcelID = COALESCE(ttt.ReceivingParcelID, tta.ReceivingParcelID)
+            LEFT JOIN dbo.Jurisdiction j                ON j.JurisdictionID = p.JurisdictionID
+            LEFT JOIN dbo.Commodity c                   ON c.CommodityID = tt.CommodityID
+            LEFT JOIN dbo.AccelaCAPRecord ac            ON ac.AccelaCAPRecordID = tt.AccelaCAPRecordID
+            LEFT JOIN dbo.ParcelPermit pp               ON pp.ParcelID = p.ParcelID AND pp.JurisdictionID = p.JurisdictionID
+            LEFT JOIN dbo.ParcelPermitStatus pps        ON pps.ParcelPermitStatusID = pp.ParcelPermitStatusID
+        """,
+        "tables": ["dbo.TdrTransaction", "dbo.TransactionType", "dbo.TransactionState",
+                   "dbo.TdrTransactionTransfer", "dbo.TdrTransactionAllocation",
+                   "dbo.ResidentialAllocation", "dbo.Parcel", "dbo.Jurisdiction",
+                   "dbo.Commodity", "dbo.AccelaCAPRecord", "dbo.ParcelPermit",
+                   "dbo.ParcelPermitStatus"],
+        "dtypes": {"TransactionID": _STR, "ProjectNumber": _STR,
+                   "TransactionTypeAbbrev": _CAT, "TransactionType": _CAT,
+                   "APN": _STR, "Jurisdiction": _CAT, "DevelopmentRight": _CAT,
+                   "DevelopmentRightShort": _CAT, "AllocationSequence": _ID,
+                   "AllocationYear": _ID, "Quantity": _QTY, "AccelaRecordID": _STR,
+                   "TRPAStatusDate": _DT, "TRPAStatus": _CAT,
+                   "LocalJurisdictionProjectNumber": _STR, "LocalStatus": _CAT,
+                   "LocalStatusDate": _DT, "Notes": _STR, "TdrTransactionID": _ID},
+    },
+
+    # Per-APN count of ParcelCommodityInventory rows for the given commodities.
+    "pci_coverage": {
+        "sql": """
+            SELECT p.ParcelNumber, COUNT(pci.ParcelCommodityInventoryID) AS pci_rows
+            FROM dbo.Parcel p
+            LEFT JOIN dbo.ParcelCommodityInventory pci ON pci.ParcelID = p.ParcelID
+            LEFT JOIN dbo.LandCapabilityType lct ON pci.LandCapabilityTypeID = lct.LandCapabilityTypeID
+                 AND lct.CommodityID IN :commodity_ids
+            WHERE p.ParcelNumber IN :apns
+            GROUP BY p.ParcelNumber
+        """,
+        "tables": ["dbo.Parcel", "dbo.ParcelCommodityInventory", "dbo.LandCapabilityType"],
+        "expanding": ["commodity_ids", "apns"],
+        "dtypes": {"ParcelNumber": _STR, "pci_rows": _ID},
+    },
+
+    # VerifiedPhysicalInventoryQuantity per APN as of :asof, replayed from
+    # AuditLog (latest change on or before :asof, else the current value).
+    "pci_replay": {
+        "sql": """
+            WITH changes AS (
+                SELECT al.RecordID AS PCIID,
+                       al.NewValue,
+                       al.AuditLogDate,
+                       ROW_NUMBER() OVER (PARTITION BY al.RecordID
+                                          ORDER BY al.AuditLogDate DESC) AS rn
+                FROM dbo.AuditLog al
+                WHERE al.TableName = 'ParcelCommodityInventory'
+                  AND al.ColumnName = 'VerifiedPhysicalInventoryQuantity'
+                  AND al.AuditLogDate <= :asof
+            ),
+            latest AS (SELECT PCIID, NewValue FROM changes WHERE rn = 1)
+            SELECT p.ParcelNumber AS APN,
+                   SUM(TRY_CAST(COALESCE(ly.NewValue,
+                                         CAST(pci.VerifiedPhysicalInventoryQuantity AS varchar))
+                                AS int)) AS Qty
+            FROM dbo.ParcelCommodityInventory pci
+            JOIN dbo.Parcel p               ON pci.ParcelID = p.ParcelID
+            JOIN dbo.LandCapabilityType lct ON pci.LandCapabilityTypeID = lct.LandCapabilityTypeID
+            LEFT JOIN latest ly             ON ly.PCIID = pci.ParcelCommodityInventoryID
+            WHERE lct.CommodityID IN :commodity_ids
+              AND p.ParcelNumber IN :apns
+            GROUP BY p.ParcelNumber
+        """,
+        "tables": ["dbo.AuditLog", "dbo.ParcelCommodityInventory", "dbo.Parcel",
+                   "dbo.LandCapabilityType"],
+        "expanding": ["commodity_ids", "apns"],
+        "dtypes": {"APN": _STR, "Qty": _ID},
+    },
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# FINGERPRINTS + CACHE
+# ─────────────────────────────────────────────────────────────────────────────
+# Tables that are only ever appended to -> their increasing id column
+_APPEND_ONLY = {"auditlog": "AuditLogID"}
+
+_FINGERPRINTS: dict[tuple[str, str], tuple[float, str]] = {}
+_FRAMES: dict[str, pd.DataFrame] = {}
+_LOCK = threading.Lock()
+
+
+def _table_fingerprint(conn, table: str) -> str:
+    if not _TABLE_RE.match(table):
+        raise ValueError(f"not a plain table name: {table!r}")
+    id_col = _APPEND_ONLY.get(table.lower().removeprefix("dbo."))
+    if conn.dialect.name == "sqlite":
+        sql = f"SELECT COUNT(*), TOTAL(rowid) FROM {table}"
+    elif id_col:
+        sql = f"SELECT MAX({id_col}) FROM {table}"
+    else:
+        sql = f"SELECT COUNT_BIG(*), CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM {table}"
+    return "/".join(str(v) for v in conn.execute(text(sql)).fetchone())
+
+
+def fingerprint(conn, tables: list[str], fresh: bool = False) -> str:
+    """Combined fingerprint of *tables*, reusing any computed in the last
+    FINGERPRINT_TTL seconds on the same connection URL (unless *fresh*)."""
+    url = str(conn.engine.url)
+    now = time.monotonic()
+    parts = []
+    for table in tables:
+        key = (url, table.lower().removeprefix("dbo."))
+        with _LOCK:
+            hit = _FINGERPRINTS.get(key)
+        if fresh or hit is None or now - hit[0] > FINGERPRINT_TTL:
+            hit = (now, _table_fingerprint(conn, table))
+            with _LOCK:
+                _FINGERPRINTS[key] = hit
+        parts.append(f"{key[1]}={hit[1]}")
+    return ";".join(parts)
+
+
+def _cache_key(url: str, sql: str, params: dict, fp: str) -> str:
+    norm = {k: sorted(v, key=str) if isinstance(v, (list, tuple, set)) else v
+            for k, v in params.items()}
+    blob = json.dumps([url, " ".join(sql.split()), norm, fp], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:20]
+
+
+def _canonical_apn_series():
+    # The ETL's APN rules are the single source; imported on first use only.
+    etl = str(_REPO_ROOT / "parcel_development_history_etl")
+    if etl not in sys.path:
+        sys.path.insert(0, etl)
+    from utils import canonical_apn_series
+    return canonical_apn_series
+
+
+def _typed(chunk: pd.DataFrame, q: dict) -> pd.DataFrame:
+    """One chunk cast to the query's dtypes, APN columns canonicalized.
+    "category" columns stay strings here (categories differ per chunk)."""
+    if q.get("apn"):
+        canon = _canonical_apn_series()
+        for raw, out in q["apn"].items():
+            chunk[out] = canon(chunk[raw])
+    dtypes = {**q.get("dtypes", {}), **{out: _STR for out in q.get("apn", {}).values()}}
+    for col, dtype in dtypes.items():
+        if col not in chunk.columns:
+            continue
+        if dtype == _CAT:
+            dtype = _STR
+        if dtype in (_ID, _QTY):
+            chunk[col] = pd.to_numeric(chunk[col].astype(object), errors="coerce")
+        elif dtype == _DT:
+            chunk[col] = pd.to_datetime(chunk[col], errors="coerce")
+        chunk[col] = chunk[col].astype(dtype)
+    return chunk
+
+
+def _finish(df: pd.DataFrame, q: dict) -> pd.DataFrame:
+    """Turn the declared "category" columns into categoricals."""
+    for col, dtype in q.get("dtypes", {}).items():
+        if dtype == _CAT and col in df.columns:
+            df[col] = df[col].astype(_CAT)
+    return df
+
+
+def _statement(q: dict, params: dict):
+    stmt = text(q["sql"])
+    expanding = q.get("expanding", [])
+    if expanding:
+        stmt = stmt.bindparams(*(bindparam(p, expanding=True) for p in expanding))
+        params.update({p: list(params[p]) for p in expanding})
+    return stmt
+
+
+def _chunks(conn, q: dict, params: dict, chunksize: int):
+    stmt = _statement(q, params)
+    for chunk in pd.read_sql(stmt, conn, params=params, chunksize=chunksize):
+        yield _typed(chunk, q)
+
+
+def _read_cache(path: Path, q: dict) -> pd.DataFrame | None:
+    if not path.exists():
+        return None
+    try:
+        return _finish(pd.read_parquet(path), q)
+    except Exception:
+        return None
+
+
+def _stream_to_parquet(chunks, path: Path) -> int:
+    """Append typed chunks to *path* one at a time. Later chunks are cast to
+    the first chunk's schema. Returns the chunks written, or -1 (and leaves
+    no file) on failure."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tmp = path.with_suffix(".tmp")
+    writer = None
+    n = 0
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema)
+            elif table.schema != writer.schema:
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+            n += 1
+        if writer is None:
+            return 0
+        writer.close()
+        writer = None
+        tmp.replace(path)
+        return n
+    except Exception as e:                      # unwritable dir, schema drift
+        print(f"  (corral cache not written: {e})")
+        return -1
+    finally:
+        if writer is not None:
+            writer.close()
+        tmp.unlink(missing_ok=True)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ENTRYPOINTS
+# ─────────────────────────────────────────────────────────────────────────────
+def iter_query(name: str, params: dict | None = None, database: str | None = None,
+               chunksize: int = CHUNK_ROWS):
+    """Yield the named query's rows as typed DataFrame chunks (live, uncached).
+    "category" columns arrive as strings."""
+    q = QUERIES[name]
+    with get_engine(database).connect() as conn:
+        yield from _chunks(conn, q, dict(params or {}), chunksize)
+
+
+def run_query(name: str, params: dict | None = None, database: str | None = None,
+              refresh: bool = False, cache: bool = True) -> pd.DataFrame:
+    """Run the named query and return its rows as a typed DataFrame.
+
+    *params* binds the query's :parameters (lists for the expanding ones).
+    Results are served from memory / Parquet when the query's tables are
+    unchanged; *refresh* forces a live run, *cache=False* skips the cache
+    entirely. Returns a copy the caller may modify.
+    """
+    q = QUERIES[name]
+    params = dict(params or {})
+    engine = get_engine(database)
+    with engine.connect() as conn:
+        if cache:
+            fp = fingerprint(conn, q["tables"], fresh=refresh)
+            key = _cache_key(str(engine.url), q["sql"], params, fp)
+            path = CACHE_DIR / f"{name}_{key}.parquet"
+            if not refresh:
+                with _LOCK:
+                    df = _FRAMES.get(key)
+                if df is None:
+                    df = _read_cache(path, q)
+                if df is not None:
+                    with _LOCK:
+                        _FRAMES[key] = df
+                    return df.copy()
+
+        # Live pull: chunks go straight to Parquet, then one compact read.
+        # Without a usable cache the typed chunks are concatenated instead
+        # (re-running the query if a half-written stream was lost).
+        df = None
+        if cache and _stream_to_parquet(_chunks(conn, q, params, CHUNK_ROWS), path) > 0:
+            df = _read_cache(path, q)
+        if df is None:
+            parts = list(_chunks(conn, q, dict(params), CHUNK_ROWS))
+            df = _finish(pd.concat(parts, ignore_index=True), q)
+
+    if cache:
+        with _LOCK:
+            _FRAMES[key] = df
+    return df.copy()
+
+
+def clear_cache() -> int:
+    """Forget in-memory results and fingerprints and delete the Parquet files.
+    Returns the number of files removed."""
+    with _LOCK:
+        _FRAMES.clear()
+        _FINGERPRINTS.clear()
+    n = 0
+    for f in CACHE_DIR.glob("*.parquet"):
+        f.unlink(missing_ok=True)
+        n += 1
+    return n
@@ -1,24 +1,40 @@
 """Read-only SQLAlchemy engine for the Corral SQL Server database.
 
 Windows Authentication; no INSERT/UPDATE/DELETE paths are exposed.
+
+One pooled engine is kept per connection URL for the life of the process, so
+every script, notebook cell and corral_queries.run_query() call in a session
+reuses the same warm connections to sql24.
+
+Set CORRAL_URL (environment or .env) to any SQLAlchemy URL to point the whole
+layer somewhere else - e.g. ``sqlite:///erd/corral_sample.db`` for running
+offline without sql24. A SQLite stand-in is attached to itself as ``dbo`` so
+``dbo.Parcel`` and ``Parcel`` both resolve, and gains an ISNULL() function.
 """
 from __future__ import annotations
 
 import os
+import threading
 import urllib.parse
 from pathlib import Path
 
 from dotenv import load_dotenv
-from sqlalchemy import MetaData, create_engine
+from sqlalchemy import MetaData, create_engine, event
 from sqlalchemy.engine import Engine
 
 _REPO_ROOT = Path(__file__).resolve().parent.parent
 load_dotenv(_REPO_ROOT / ".env")
 
+_ENGINES: dict[str, Engine] = {}
+_LOCK = threading.Lock()
+
 
-def _build_url() -> str:
+def _build_url(database: str | None = None) -> str:
+    override = os.environ.get("CORRAL_URL")
+    if override:
+        return override
     server = os.environ.get("CORRAL_SERVER", "sql24")
-    database = os.environ.get("CORRAL_DATABASE", "Corral")
+    database = database or os.environ.get("CORRAL_DATABASE", "Corral")
     odbc = (
         f"DRIVER={{ODBC Driver 17 for SQL Server}};"
         f"SERVER={server};"
@@ -29,12 +45,44 @@ def _build_url() -> str:
     return "mssql+pyodbc:///?odbc_connect=" + urllib.parse.quote_plus(odbc)
 
 
-def get_engine() -> Engine:
-    return create_engine(
-        _build_url(),
-        isolation_level="AUTOCOMMIT",
-        pool_pre_ping=True,
-    ).execution_options(readonly=True)
+def _create(url: str) -> Engine:
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            isolation_level="AUTOCOMMIT",
+            pool_pre_ping=True,
+            pool_size=5,
+            max_overflow=5,
+            pool_recycle=1800,
+        )
+
+    engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    path = engine.url.database
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_compat(dbapi_conn, _record):
+        dbapi_conn.create_function("ISNULL", 2, lambda a, b: b if a is None else a)
+        if path and path != ":memory:":
+            dbapi_conn.execute("ATTACH DATABASE ? AS dbo", (path,))
+
+    return engine
+
+
+def get_engine(database: str | None = None) -> Engine:
+    """The shared read-only engine for *database* (default CORRAL_DATABASE)."""
+    url = _build_url(database)
+    with _LOCK:
+        if url not in _ENGINES:
+            _ENGINES[url] = _create(url)
+        return _ENGINES[url].execution_options(readonly=True)
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection (end of a long notebook session)."""
+    with _LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
 
 
 def reflect_metadata(engine: Engine | None = None) -> MetaData:
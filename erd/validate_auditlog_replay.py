@@ -10,11 +10,10 @@ import sys
 from pathlib import Path
 
 import pandas as pd
-from sqlalchemy import text
 
 ERD = Path(__file__).resolve().parent
 sys.path.insert(0, str(ERD))
-from db_corral import get_engine  # noqa: E402
+from corral_queries import run_query  # noqa: E402
 
 REPO = ERD.parent
 CSV = REPO / "data" / "raw_data" / "ExistingResidential_2012_2025_unstacked.csv"
@@ -23,35 +22,6 @@ COMMODITY_IDS = [5, 14]  # SFRUU + MFRUU
 SAMPLE_SIZE = 25
 
 
-REPLAY_SQL = text("""
-WITH changes AS (
-    SELECT al.RecordID AS PCIID,
-           al.NewValue,
-           al.AuditLogDate,
-           ROW_NUMBER() OVER (PARTITION BY al.RecordID
-                              ORDER BY al.AuditLogDate DESC) AS rn
-    FROM dbo.AuditLog al
-    WHERE al.TableName = 'ParcelCommodityInventory'
-      AND al.ColumnName = 'VerifiedPhysicalInventoryQuantity'
-      AND al.AuditLogDate <= :asof
-),
-latest AS (
-    SELECT PCIID, NewValue FROM changes WHERE rn = 1
-)
-SELECT p.ParcelNumber AS APN,
-       SUM(TRY_CAST(COALESCE(ly.NewValue,
-                             CAST(pci.VerifiedPhysicalInventoryQuantity AS varchar))
-                    AS int)) AS Qty
-FROM dbo.ParcelCommodityInventory pci
-JOIN dbo.Parcel p               ON pci.ParcelID = p.ParcelID
-JOIN dbo.LandCapabilityType lct ON pci.LandCapabilityTypeID = lct.LandCapabilityTypeID
-LEFT JOIN latest ly             ON ly.PCIID = pci.ParcelCommodityInventoryID
-WHERE lct.CommodityID IN :commodity_ids
-  AND p.ParcelNumber IN :apns
-GROUP BY p.ParcelNumber
-""").bindparams()
-
-
 def select_sample(df: pd.DataFrame, corral_apns: set[str]) -> pd.DataFrame:
     df = df.copy()
     for c in ["2020 Final", "2023 Final"]:
@@ -65,14 +35,7 @@ def select_sample(df: pd.DataFrame, corral_apns: set[str]) -> pd.DataFrame:
 
 
 def main() -> None:
-    engine = get_engine()
-
-    with engine.connect() as conn:
-        apns_in_corral = {
-            r[0] for r in conn.execute(
-                text("SELECT ParcelNumber FROM dbo.Parcel WHERE ParcelNumber IS NOT NULL")
-            )
-        }
+    apns_in_corral = set(run_query("parcel_numbers")["ParcelNumber"])
 
     csv = pd.read_csv(CSV, dtype=str)
     csv["APN"] = csv["APN"].astype(str).str.strip()
@@ -81,102 +44,36 @@ def main() -> None:
     print(f"Sampled {len(apns)} APNs: first 5 = {apns[:5]}")
 
     # Diagnostic: which sampled APNs even have SFRUU/MFRUU PCI rows?
-    apn_coverage = {}
-    with engine.connect() as conn:
-        sql_cov = """
-            SELECT p.ParcelNumber, COUNT(pci.ParcelCommodityInventoryID) AS pci_rows
-            FROM dbo.Parcel p
-            LEFT JOIN dbo.ParcelCommodityInventory pci ON pci.ParcelID = p.ParcelID
-            LEFT JOIN dbo.LandCapabilityType lct ON pci.LandCapabilityTypeID = lct.LandCapabilityTypeID
-                 AND lct.CommodityID IN ({cids})
-            WHERE p.ParcelNumber IN ({ph})
-            GROUP BY p.ParcelNumber
-        """.format(
-            cids=",".join(str(x) for x in COMMODITY_IDS),
-            ph=",".join(f":a{i}" for i in range(len(apns))),
-        )
-        for r in conn.execute(text(sql_cov), {f"a{i}": a for i, a in enumerate(apns)}):
-            apn_coverage[r[0]] = int(r[1] or 0)
+    cov = run_query("pci_coverage", {"commodity_ids": COMMODITY_IDS, "apns": apns})
+    apn_coverage = {a: int(n) if pd.notna(n) else 0
+                    for a, n in zip(cov["ParcelNumber"], cov["pci_rows"])}
     tracked = sum(1 for v in apn_coverage.values() if v > 0)
     print(f"Corral PCI coverage for SFRUU/MFRUU: {tracked}/{len(apns)} sampled APNs have at least one row.")
 
     results = []
-    with engine.connect() as conn:
-        for yr in YEARS:
-            asof = f"{yr}-12-31 23:59:59"
-            stmt = text("""
-                WITH changes AS (
-                    SELECT al.RecordID AS PCIID,
-                           al.NewValue,
-                           al.AuditLogDate,
-                           ROW_NUMBER() OVER (PARTITION BY al.RecordID
-                                              ORDER BY al.AuditLogDate DESC) AS rn
-                    FROM dbo.AuditLog al
-                    WHERE al.TableName = 'ParcelCommodityInventory'
-                      AND al.ColumnName = 'VerifiedPhysicalInventoryQuantity'
-                      AND al.AuditLogDate <= :asof
-                ),
-                latest AS (SELECT PCIID, NewValue FROM changes WHERE rn = 1)
-                SELECT p.ParcelNumber AS APN,
-                       SUM(TRY_CAST(COALESCE(ly.NewValue,
-                                             CAST(pci.VerifiedPhysicalInventoryQuantity AS varchar))
-                                    AS int)) AS Qty
-                FROM dbo.ParcelCommodityInventory pci
-                JOIN dbo.Parcel p               ON pci.ParcelID = p.ParcelID
-                JOIN dbo.LandCapabilityType lct ON pci.LandCapabilityTypeID = lct.LandCapabilityTypeID
-                LEFT JOIN latest ly             ON ly.PCIID = pci.ParcelCommodityInventoryID
-                WHERE lct.CommodityID IN (5, 14)
-                  AND p.ParcelNumber IN :apns
-                GROUP BY p.ParcelNumber
-            """).bindparams()
-            stmt = stmt.bindparams()  # placeholder
-            sql = """
-                WITH changes AS (
-                    SELECT al.RecordID AS PCIID,
-                           al.NewValue,
-                           al.AuditLogDate,
-                           ROW_NUMBER() OVER (PARTITION BY al.RecordID
-                                              ORDER BY al.AuditLogDate DESC) AS rn
-                    FROM dbo.AuditLog al
-                    WHERE al.TableName = 'ParcelCommodityInventory'
-                      AND al.ColumnName = 'VerifiedPhysicalInventoryQuantity'
-                      AND al.AuditLogDate <= :asof
-                ),
-                latest AS (SELECT PCIID, NewValue FROM changes WHERE rn = 1)
-                SELECT p.ParcelNumber AS APN,
-                       SUM(TRY_CAST(COALESCE(ly.NewValue,
-                                             CAST(pci.VerifiedPhysicalInventoryQuantity AS varchar))
-                                    AS int)) AS Qty
-                FROM dbo.ParcelCommodityInventory pci
-                JOIN dbo.Parcel p               ON pci.ParcelID = p.ParcelID
-                JOIN dbo.LandCapabilityType lct ON pci.LandCapabilityTypeID = lct.LandCapabilityTypeID
-                LEFT JOIN latest ly             ON ly.PCIID = pci.ParcelCommodityInventoryID
-                WHERE lct.CommodityID IN ({cids})
-                  AND p.ParcelNumber IN ({apn_ph})
-                GROUP BY p.ParcelNumber
-            """.format(
-                cids=",".join(str(x) for x in COMMODITY_IDS),
-                apn_ph=",".join(f":a{i}" for i in range(len(apns))),
+    for yr in YEARS:
+        asof = f"{yr}-12-31 23:59:59"
+        qty = run_query("pci_replay", {"asof": asof, "commodity_ids": COMMODITY_IDS,
+                                       "apns": apns})
+        corral_by_apn = {a: int(q) if pd.notna(q) else 0
+                         for a, q in zip(qty["APN"], qty["Qty"])}
+
+        col = f"{yr} Final"
+        for _, row in sample.iterrows():
+            apn = row["APN"]
+            csv_v = pd.to_numeric(row[col], errors="coerce")
+            csv_v = int(csv_v) if pd.notna(csv_v) else 0
+            corral_v = corral_by_apn.get(apn, 0)
+            results.append(
+                {
+                    "apn": apn,
+                    "year": yr,
+                    "csv_value": csv_v,
+                    "corral_value": corral_v,
+                    "match": csv_v == corral_v,
+                    "delta": corral_v - csv_v,
+                }
             )
-            params = {"asof": asof, **{f"a{i}": a for i, a in enumerate(apns)}}
-            corral_by_apn = {r[0]: int(r[1] or 0) for r in conn.execute(text(sql), params)}
-
-            col = f"{yr} Final"
-            for _, row in sample.iterrows():
-                apn = row["APN"]
-                csv_v = pd.to_numeric(row[col], errors="coerce")
-                csv_v = int(csv_v) if pd.notna(csv_v) else 0
-                corral_v = corral_by_apn.get(apn, 0)
-                results.append(
-                    {
-                        "apn": apn,
-                        "year": yr,
-                        "csv_value": csv_v,
-                        "corral_value": corral_v,
-                        "match": csv_v == corral_v,
-                        "delta": corral_v - csv_v,
-                    }
-                )
 
     # Summary
     total = len(results)
@@ -12,63 +12,23 @@ import sys
 from pathlib import Path
 
 import pandas as pd
-from sqlalchemy import text
 
 ERD = Path(__file__).resolve().parent
 sys.path.insert(0, str(ERD))
-from db_corral import get_engine  # noqa: E402
+from corral_queries import run_query  # noqa: E402
 
 REPO = ERD.parent
 XLSX = REPO / "data" / "raw_data" / "Transactions_Allocations_Details.xlsx"
 
 
-VIEW_SQL = """
-SELECT
-    tt.LeadAgencyAbbreviation + '-' + tt.TransactionTypeAbbreviation + '-'
-      + CAST(tt.TdrTransactionID AS varchar(20))           AS TransactionID,
-    tt.ProjectNumber                                       AS ProjectNumber,
-    tt.TransactionTypeAbbreviation                         AS TransactionTypeAbbrev,
-    tty.TransactionTypeName                                AS TransactionType,
-    p.ParcelNumber                                         AS APN,
-    j.ResidentialAllocationAbbreviation                    AS Jurisdiction,
-    c.CommodityDisplayName                                 AS DevelopmentRight,
-    c.CommodityShortName                                   AS DevelopmentRightShort,
-    ra.AllocationSequence                                  AS AllocationSequence,
-    ra.IssuanceYear                                        AS AllocationYear,
-    COALESCE(ttt.ReceivingQuantity, tta.AllocatedQuantity) AS Quantity,
-    ac.AccelaID                                            AS AccelaRecordID,
-    tt.ApprovalDate                                        AS TRPAStatusDate,
-    ts.TransactionStateName                                AS TRPAStatus,
-    pp.PermitNumber                                        AS LocalJurisdictionProjectNumber,
-    pps.ParcelPermitStatusName                             AS LocalStatus,
-    pp.LastUpdatedDate                                     AS LocalStatusDate,
-    tt.Comments                                            AS Notes,
-    tt.TdrTransactionID                                    AS TdrTransactionID
-FROM dbo.TdrTransaction tt
-LEFT JOIN dbo.TransactionType tty           ON tty.TransactionTypeID = tt.TransactionTypeID
-LEFT JOIN dbo.TransactionState ts           ON ts.TransactionStateID = tt.TransactionStateID
-LEFT JOIN dbo.TdrTransactionTransfer   ttt  ON ttt.TdrTransactionID  = tt.TdrTransactionID
-LEFT JOIN dbo.TdrTransactionAllocation tta  ON tta.TdrTransactionID  = tt.TdrTransactionID
-LEFT JOIN dbo.ResidentialAllocation    ra   ON ra.TdrTransactionID   = tt.TdrTransactionID
-LEFT JOIN dbo.Parcel p                      ON p.ParcelID = COALESCE(ttt.ReceivingParcelID, tta.ReceivingParcelID)
-LEFT JOIN dbo.Jurisdiction j                ON j.JurisdictionID = p.JurisdictionID
-LEFT JOIN dbo.Commodity c                   ON c.CommodityID = tt.CommodityID
-LEFT JOIN dbo.AccelaCAPRecord ac            ON ac.AccelaCAPRecordID = tt.AccelaCAPRecordID
-LEFT JOIN dbo.ParcelPermit pp               ON pp.ParcelID = p.ParcelID AND pp.JurisdictionID = p.JurisdictionID
-LEFT JOIN dbo.ParcelPermitStatus pps        ON pps.ParcelPermitStatusID = pp.ParcelPermitStatusID
-"""
-
-
 def norm(x) -> str:
-    if x is None or (isinstance(x, float) and pd.isna(x)):
+    if x is None or x is pd.NA or (isinstance(x, float) and pd.isna(x)):
         return ""
     return re.sub(r"\s+", " ", str(x)).strip().lower()
 
 
 def main() -> None:
-    engine = get_engine()
-    with engine.connect() as conn:
-        corral = pd.read_sql(text(VIEW_SQL), conn)
+    corral = run_query("transactions_view")
     print(f"Corral view rows: {len(corral)}")
     print(f"  distinct TransactionID: {corral['TransactionID'].nunique(dropna=True)}")
 
@@ -118,7 +78,7 @@ def main() -> None:
     col_results = []
     for xlsx_col, db_col in pairs:
         xv = j[xlsx_col].map(norm)
-        dv = j[db_col].map(norm) if db_col in j.columns else pd.Series([""]*len(j))
+        dv = j[db_col].astype(object).map(norm) if db_col in j.columns else pd.Series([""]*len(j))
         either_present = (xv != "") | (dv != "")
         both_equal = xv == dv
         considered = int(either_present.sum())
@@ -142,7 +102,8 @@ def main() -> None:
     for xlsx_col, db_col in pairs:
         if db_col not in j.columns:
             continue
-        bad = j[(j[xlsx_col].map(norm) != j[db_col].map(norm)) & ((j[xlsx_col].map(norm) != "") | (j[db_col].map(norm) != ""))]
+        dv = j[db_col].astype(object).map(norm)
+        bad = j[(j[xlsx_col].map(norm) != dv) & ((j[xlsx_col].map(norm) != "") | (dv != ""))]
         samples[xlsx_col] = bad[["TransactionID", xlsx_col, db_col]].head(3).to_dict("records")
 
     out = {
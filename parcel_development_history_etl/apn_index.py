@@ -0,0 +1,238 @@
+"""
+Shared integer encoding for APNs and (APN, Year) keys.
+
+Every step used to key dicts and sets on (str(apn).strip(), int(year))
+tuples, re-stripping and re-hashing the same strings.  APNS interns each
+APN string once to a dense int32 code; (APN, Year) keys are then packed into
+a single int64 and joins become integer operations.
+
+  APNS.encode(apns)       → int32 codes (new APNs are interned)
+  APNS.lookup(apns)       → int32 codes, -1 for APNs never interned
+  APNS.decode(codes)      → APN strings
+  APNS.variant(apns)      → code of each APN's El Dorado 2-digit / 3-digit twin
+                            (080-155-11 ↔ 080-155-011), -1 when there is none
+  pack(codes, years)      → int64 keys;  unpack(keys) → (codes, years)
+
+ApnYearTable is a read-only {(APN, Year): value} Mapping over a sorted
+int64 key array and a value array — about 16 bytes per entry instead of a
+few hundred for a dict of string tuples.  It still answers
+table[(apn, year)] / table.get(...) for existing callers; bulk callers use
+get_many() and add().
+
+Usage
+-----
+    csv_lookup = ApnYearTable.from_frame(df_csv, "APN", "Year", "Units_CSV")
+    vals, found = csv_lookup.get_many(fc["APN"], fc["Year"])
+"""
+import sys
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils import apn_forms
+
+_YEAR_BITS = 16
+_YEAR_MASK = (1 << _YEAR_BITS) - 1
+
+
+# ── APN interning ─────────────────────────────────────────────────────────────
+
+class ApnIndex:
+    """Append-only APN string ↔ int32 code table.  Safe to share across threads."""
+
+    def __init__(self):
+        self._codes: dict[str, int] = {}
+        self._apns: list[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._apns)
+
+    def _intern(self, apn: str) -> int:
+        code = self._codes.get(apn)
+        if code is None:
+            code = len(self._apns)
+            self._codes[apn] = code
+            self._apns.append(apn)
+        return code
+
+    @staticmethod
+    def _uniques(apns) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (position into uniques, stripped unique APNs).  Strings are stripped
+        once per distinct value; missing / blank → position -1.
+        """
+        pos, raw = pd.factorize(np.asarray(apns, dtype=object), use_na_sentinel=True)
+        stripped = [str(a).strip() for a in raw]
+        pos2, uniq = pd.factorize(np.asarray(stripped + [""], dtype=object))
+        remap = np.where(np.asarray(uniq, dtype=object)[pos2[:-1]] == "", -1, pos2[:-1]) \
+            if len(raw) else np.empty(0, dtype=np.int64)
+        pos = np.where(pos >= 0, remap[pos] if len(raw) else -1, -1)
+        return pos, np.asarray(uniq, dtype=object)
+
+    def encode(self, apns) -> np.ndarray:
+        """int32 code per APN, interning unseen ones.  Missing / blank → -1."""
+        pos, uniq = self._uniques(apns)
+        with self._lock:
+            codes = np.fromiter((self._intern(a) if a else -1 for a in uniq),
+                                dtype=np.int32, count=len(uniq))
+        return np.where(pos >= 0, codes[pos] if len(uniq) else -1, -1).astype(np.int32)
+
+    def lookup(self, apns) -> np.ndarray:
+        """int32 code per APN without interning.  Unknown / missing → -1."""
+        pos, uniq = self._uniques(apns)
+        codes = np.fromiter((self._codes.get(a, -1) for a in uniq),
+                            dtype=np.int32, count=len(uniq))
+        return np.where(pos >= 0, codes[pos] if len(uniq) else -1, -1).astype(np.int32)
+
+    def code(self, apn) -> int:
+        """Code of one APN without interning (-1 if unknown)."""
+        if isinstance(apn, str):
+            return self._codes.get(apn.strip(), -1)
+        return int(self.lookup([apn])[0])
+
+    def decode(self, codes) -> np.ndarray:
+        """APN strings for *codes* (None for -1)."""
+        table = np.asarray(self._apns + [None], dtype=object)
+        codes = np.asarray(codes, dtype=np.int64)
+        return table[np.where(codes >= 0, codes, len(self._apns))]
+
+    def variant(self, apns, pad: bool = True, depad: bool = True) -> np.ndarray:
+        """
+        int32 code of each APN's El Dorado twin, without interning: the
+        3-digit form of a 2-digit APN (*pad*) and the 2-digit form of a
+        3-digit one (*depad*).  -1 when there is no twin form or the twin
+        was never interned.
+        """
+        s     = pd.Series(np.asarray(apns, dtype=object), dtype=object).str.strip()
+        forms = apn_forms(s, ["el_pad", "el_depad", "is_el_2d", "is_el_3d"])
+        twin  = pd.Series(None, index=s.index, dtype=object)
+        if pad:
+            twin = twin.mask(forms["is_el_2d"], forms["el_pad"])
+        if depad:
+            twin = twin.mask(forms["is_el_3d"], forms["el_depad"])
+        return self.lookup(twin)
+
+
+APNS = ApnIndex()
+
+
+# ── (APN, Year) keys ──────────────────────────────────────────────────────────
+
+def pack(codes, years) -> np.ndarray:
+    """int64 key per (APN code, year); -1 where the code is -1."""
+    codes = np.asarray(codes, dtype=np.int64)
+    years = np.asarray(years, dtype=np.int64)
+    return np.where(codes >= 0, (codes << _YEAR_BITS) | (years & _YEAR_MASK), -1)
+
+
+def unpack(keys) -> tuple[np.ndarray, np.ndarray]:
+    keys = np.asarray(keys, dtype=np.int64)
+    return (keys >> _YEAR_BITS).astype(np.int32), (keys & _YEAR_MASK).astype(np.int64)
+
+
+def keys_for(apns, years, intern: bool = False) -> np.ndarray:
+    """Packed keys for parallel APN / year sequences."""
+    codes = APNS.encode(apns) if intern else APNS.lookup(apns)
+    return pack(codes, years)
+
+
+class ApnYearTable(Mapping):
+    """
+    Read-only {(APN, Year): value} over sorted packed keys.
+    Duplicate keys keep the last value, as a dict comprehension would.
+    """
+
+    def __init__(self, keys: np.ndarray, values: np.ndarray):
+        keys   = np.asarray(keys, dtype=np.int64)
+        values = np.asarray(values)
+        ok     = keys >= 0
+        keys, values = keys[ok], values[ok]
+        # Stable sort on reversed input → first occurrence is the last written
+        order  = np.argsort(keys[::-1], kind="stable")
+        keys   = keys[::-1][order]
+        values = values[::-1][order]
+        first  = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        self.packed   = keys[first]
+        self.data = values[first]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, apn_col: str, year_col: str,
+                   value_col: str) -> "ApnYearTable":
+        return cls(keys_for(df[apn_col], df[year_col], intern=True),
+                   df[value_col].to_numpy())
+
+    @classmethod
+    def empty(cls) -> "ApnYearTable":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    def to_frame(self, apn_col: str = "APN", year_col: str = "Year",
+                 value_col: str = "Units") -> pd.DataFrame:
+        codes, years = unpack(self.packed)
+        return pd.DataFrame({apn_col: APNS.decode(codes), year_col: years,
+                             value_col: self.data})
+
+    # -- bulk access -----------------------------------------------------------
+    def _find(self, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        pos = np.searchsorted(self.packed, keys)
+        pos = np.minimum(pos, max(len(self.packed) - 1, 0))
+        found = (keys >= 0) & (len(self.packed) > 0)
+        if len(self.packed):
+            found &= self.packed[pos] == keys
+        return pos, found
+
+    def get_many(self, apns, years, default=0) -> tuple[np.ndarray, np.ndarray]:
+        """(values, found) for parallel APN / year sequences."""
+        return self.get_keys(keys_for(apns, years), default)
+
+    def get_keys(self, keys, default=0) -> tuple[np.ndarray, np.ndarray]:
+        """(values, found) for packed keys."""
+        keys = np.asarray(keys, dtype=np.int64)
+        pos, found = self._find(keys)
+        dtype = np.result_type(self.data.dtype, np.asarray(default).dtype) \
+            if self.data.dtype != object else object
+        out = np.full(len(keys), default, dtype=dtype)
+        if len(self.packed):
+            out[found] = self.data[pos[found]]
+        return out, found
+
+    def add(self, apns, years, values) -> "ApnYearTable":
+        """
+        New table with *values* summed onto the existing value of each
+        (APN, Year) — keys not yet present start from 0.
+        """
+        keys = keys_for(apns, years, intern=True)
+        vals = pd.Series(np.asarray(values)).groupby(keys).sum()
+        add_keys = vals.index.to_numpy(dtype=np.int64)
+        cur, found = self.get_keys(add_keys)
+        merged = cur + vals.to_numpy()
+        keep = ~np.isin(self.packed, add_keys)
+        return ApnYearTable(np.concatenate([self.packed[keep], add_keys]),
+                            np.concatenate([self.data[keep], merged]))
+
+    # -- Mapping protocol ------------------------------------------------------
+    def __getitem__(self, key):
+        apn, year = key
+        code = APNS.code(apn)
+        k    = (code << _YEAR_BITS) | (int(year) & _YEAR_MASK)
+        pos  = int(np.searchsorted(self.packed, k))
+        if code < 0 or pos == len(self.packed) or self.packed[pos] != k:
+            raise KeyError(key)
+        v = self.data[pos]
+        return v.item() if isinstance(v, np.generic) else v
+
+    def __iter__(self):
+        codes, years = unpack(self.packed)
+        return zip(APNS.decode(codes).tolist(), years.tolist())
+
+    def __len__(self) -> int:
+        return len(self.packed)
+
+    def __repr__(self) -> str:
+        return f"ApnYearTable({len(self)} entries)"
@@ -0,0 +1,173 @@
+"""
+Step checkpoints for the ETL orchestrator.
+
+Every step in main.py is described by a fingerprint of its inputs — content
+hashes of the files it reads, the config constants it depends on, and the
+output token of each upstream step.  When a step finishes, its fingerprint
+and an output token are recorded in CHECKPOINT_DIR/manifest.json, and any
+in-memory results downstream steps need (df_csv, csv_lookup) are persisted
+as Parquet alongside it.
+
+On the next run a step whose fingerprint matches the manifest is skipped and
+its persisted outputs are loaded instead.
+
+Output tokens
+-------------
+Steps whose result is a DataFrame (s02, s03) use a content hash of that
+frame as their token, so a re-run that produces identical output does not
+invalidate anything downstream.  Steps that write columns into OUTPUT_FC
+(s01, s01c, s04, s04b, s05) get a fresh token on every run — hashing the
+feature class would cost as much as re-running the step.
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import config
+from apn_index import ApnYearTable
+from config import CHECKPOINT_DIR
+from utils import get_logger
+
+log = get_logger("checkpoints")
+
+_MANIFEST = "manifest.json"
+
+
+# ── Digests ───────────────────────────────────────────────────────────────────
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's contents, or 'missing' if it does not exist."""
+    p = Path(path)
+    if not p.exists():
+        return "missing"
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Order-independent content hash of a DataFrame (columns + row values)."""
+    h = hashlib.sha256(json.dumps(sorted(map(str, df.columns))).encode())
+    if len(df):
+        rows = pd.util.hash_pandas_object(df[sorted(df.columns)], index=False)
+        h.update(rows.sort_values().to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def wide_csv_key_digest(csv_path: str, year_prefix: str) -> str:
+    """
+    Hash of the (APN, year column) pairs with a non-zero value in a wide
+    APN x CY<year> CSV.  Values themselves are ignored, so editing a number
+    without adding or zeroing a parcel-year leaves the digest unchanged.
+    """
+    if not Path(csv_path).exists():
+        return "missing"
+    df = pd.read_csv(csv_path, dtype=str)
+    if "APN" not in df.columns:
+        df = df.rename(columns={df.columns[0]: "APN"})
+    year_cols = [c for c in df.columns if c.upper().startswith(year_prefix.upper())]
+    long = df.melt(id_vars="APN", value_vars=year_cols, var_name="Year", value_name="Value")
+    long = long[pd.to_numeric(long["Value"], errors="coerce").fillna(0) > 0]
+    long["APN"] = long["APN"].astype(str).str.strip()
+    return frame_digest(long[["APN", "Year"]])
+
+
+def config_digest(names: list[str]) -> dict:
+    """{name: repr(value)} for the named config constants."""
+    return {n: repr(getattr(config, n)) for n in names}
+
+
+# ── Manifest ──────────────────────────────────────────────────────────────────
+
+class Checkpoints:
+    """
+    Manifest of completed steps plus persisted step outputs.
+
+    force : step names to run regardless of fingerprint ("all" forces every step).
+    """
+
+    def __init__(self, root: str = CHECKPOINT_DIR, force: list[str] = None):
+        self.root  = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.force = set(force or [])
+        self._lock = threading.Lock()   # steps commit from scheduler worker threads
+        path = self.root / _MANIFEST
+        self.manifest: dict = json.loads(path.read_text()) if path.exists() else {}
+
+    def fingerprint(self, files: list[str] = (), config_names: list[str] = (),
+                    upstream: list[str] = (), extra: dict = None) -> str:
+        """Combine input digests into a single step fingerprint."""
+        parts = {
+            "files"   : {f: file_digest(f) for f in files},
+            "config"  : config_digest(list(config_names)),
+            "upstream": {s: self.token(s) for s in upstream},
+            "extra"   : extra or {},
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def token(self, step: str) -> str | None:
+        """Output token of the last completed run of *step* (None if never run)."""
+        return self.manifest.get(step, {}).get("token")
+
+    def fresh(self, step: str, fp: str, outputs: list[str] = ()) -> bool:
+        """
+        True if *step* completed with fingerprint *fp* and every persisted
+        output it needs is still on disk.
+        """
+        if "all" in self.force or step in self.force:
+            return False
+        entry = self.manifest.get(step)
+        if not entry or entry.get("fingerprint") != fp:
+            return False
+        if not all(self._frame_path(n).exists() for n in outputs):
+            return False
+        log.info("%s: inputs unchanged since %s — using checkpoint",
+                 step, entry.get("completed", "?"))
+        return True
+
+    def commit(self, step: str, fp: str, token: str = None) -> None:
+        """Record *step* as complete.  Without *token* a fresh one is issued."""
+        with self._lock:
+            self.manifest[step] = {
+                "fingerprint": fp,
+                "token"      : token or uuid.uuid4().hex,
+                "completed"  : time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            tmp = self.root / (_MANIFEST + ".tmp")
+            tmp.write_text(json.dumps(self.manifest, indent=2))
+            tmp.replace(self.root / _MANIFEST)
+
+    # -- persisted outputs ---------------------------------------------------
+    def _frame_path(self, name: str) -> Path:
+        return self.root / f"{name}.parquet"
+
+    def save_frame(self, name: str, df: pd.DataFrame) -> str:
+        """Persist *df* and return its content digest (usable as a token)."""
+        df.reset_index(drop=True).to_parquet(self._frame_path(name), index=False)
+        return frame_digest(df)
+
+    def load_frame(self, name: str) -> pd.DataFrame:
+        return pd.read_parquet(self._frame_path(name))
+
+
+# ── csv_lookup <-> DataFrame ──────────────────────────────────────────────────
+
+def lookup_to_frame(lookup: ApnYearTable) -> pd.DataFrame:
+    """(APN, Year) → units table → DataFrame[APN, Year, Units]."""
+    df = lookup.to_frame("APN", "Year", "Units")
+    return df.astype({"Year": "int64"})
+
+
+def frame_to_lookup(df: pd.DataFrame) -> ApnYearTable:
+    """Inverse of lookup_to_frame."""
+    return ApnYearTable.from_frame(df.astype({"Units": "int64"}), "APN", "Year", "Units")
@@ -9,6 +9,60 @@ SOURCE_FC  = GDB + r"\Parcel_History_Attributed"   # original — never edited
 WORKING_FC = GDB + r"\Parcel_History_Working"       # cleaned copy — preprocess output
 OUTPUT_FC  = GDB + r"\Parcel_Development_History"   # ETL output (main.py)
 
+# ── Feature store backend ─────────────────────────────────────────────────────
+# "arcpy" reads/writes the GDB above through arcpy.da.  "local" reads/writes a
+# GeoParquet snapshot (one file per dataset, WKB geometry) under
+# LOCAL_STORE_DIR so the pipeline can run without ArcGIS.  Build the snapshot
+# on the ArcGIS workstation with `python feature_store.py --snapshot`.
+# The FEATURE_STORE_BACKEND environment variable overrides this per run.
+FEATURE_STORE_BACKEND = "arcpy"
+LOCAL_STORE_DIR       = r"C:\GIS\ParcelHistory_local"
+
+# ── Step checkpoints ──────────────────────────────────────────────────────────
+# main.py records a fingerprint of each step's inputs here, plus the outputs
+# downstream steps need (df_csv, csv_lookup).  A re-run skips every step whose
+# inputs are unchanged.  Delete the folder (or pass --force) to rebuild.
+CHECKPOINT_DIR = r"C:\GIS\ParcelHistory_checkpoints"
+
+# Worker threads for scheduler.py.  Steps that run arcpy geoprocessing still
+# take turns on a single lock; this only bounds the pandas / I/O work that
+# overlaps them.
+SCHEDULER_WORKERS = 4
+
+# ── Service layer cache ───────────────────────────────────────────────────────
+# service_cache.py keeps one GeoParquet copy of each REST layer here and only
+# re-downloads it when the layer changes.  Set SERVICE_CACHE_OFFLINE=1 in the
+# environment to run from the cached copies without contacting the server.
+SERVICE_CACHE_DIR = r"C:\GIS\ParcelHistory_service_cache"
+
+# Default spatial reference geometry is requested in (NAD83 / UTM zone 10N).
+# Layers joined in memory against OUTPUT_FC request OUTPUT_FC's own SR
+# instead (service_cache.out_sr_for); this is the fallback when the store
+# cannot report it.
+SERVICE_CACHE_OUT_SR = 26910
+
+# ── REST client ───────────────────────────────────────────────────────────────
+# rest_client.py fetches ArcGIS layer pages on REST_WORKERS threads and retries
+# failed requests REST_RETRIES times (backoff doubles from REST_BACKOFF_SECONDS).
+# REST_CLIENT_MODE=record / replay in the environment saves / serves every
+# response under REST_FIXTURE_DIR, so runs and benchmarks can go offline.
+REST_WORKERS         = 6
+REST_RETRIES         = 4
+REST_BACKOFF_SECONDS = 1.0
+REST_FIXTURE_DIR     = r"C:\GIS\ParcelHistory_rest_fixtures"
+
+# ── Geometry catalog ──────────────────────────────────────────────────────────
+# geometry_catalog.py reads OUTPUT_FC / SOURCE_FC geometry once and keeps WKB,
+# area, bbox and an inside point per row here, reused until the OID set
+# changes.  `python geometry_catalog.py --rebuild` forces a fresh scan.
+GEOMETRY_CATALOG_DIR = r"C:\GIS\ParcelHistory_geometry_catalog"
+
+# ── Unit matrix ───────────────────────────────────────────────────────────────
+# unit_matrix.py saves the APN x Year Residential_Units / TAU / CFA arrays of
+# OUTPUT_FC here after each S4 / S4b write; S6, validation.py and the
+# inventory script memory-map them instead of re-reading the feature class.
+UNIT_MATRIX_DIR = r"C:\GIS\ParcelHistory_unit_matrix"
+
 # QA output directory — CSVs are written here in addition to the GDB
 QA_DATA_DIR = (
     r"C:\Users\mbindl\Documents\GitHub\Reporting"
@@ -277,6 +331,9 @@ LTINFO_BANKED_TABLE           = STAGING_GDB + r"\LTInfo_BankedRights"         #
 LTINFO_TRANSACTED_BANKED_TABLE = STAGING_GDB + r"\LTInfo_TransactedAndBanked" # -> layer 8
 LTINFO_REFRESH_LOG_TABLE      = STAGING_GDB + r"\LTInfo_RefreshLog"
 
+# Rows per InsertCursor chunk while a streamed LT Info response is written.
+LTINFO_INSERT_CHUNK = 5000
+
 # ── AllParcels MapServer (geometry fetch for missing parcels) ─────────────────
 ALLPARCELS_URL = "https://maps.trpa.org/server/rest/services/AllParcels/MapServer"
 # Layer 3 = current (all-years combined) parcel layer — used as geometry fallback in s03
@@ -346,3 +403,14 @@ LTINFO_DEV_RIGHTS = ""  # LTinfo API / Dev Rights endpoint
 
 # Flag Table GDB path — written by validation.py, read-only for everything else
 QA_FLAG_TABLE = GDB + r"\QA_Flag_Table"
+
+# Incremental validation state — per-APN digests, service evidence and the raw
+# flags of the last validation.py run.  The next run re-checks only APNs whose
+# units, genealogy or evidence changed; `validation.py --full` ignores it.
+VALIDATION_STATE_DIR = r"C:\GIS\ParcelHistory_validation_state"
+
+# evidence_cache.py keeps each validation service's answer per APN here and
+# re-queries an APN once its answer is older than EVIDENCE_CACHE_TTL_DAYS.
+# Batched queries run on REST_WORKERS threads shared by all services.
+EVIDENCE_CACHE_DIR      = r"C:\GIS\ParcelHistory_evidence_cache"
+EVIDENCE_CACHE_TTL_DAYS = 7
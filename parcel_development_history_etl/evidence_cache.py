@@ -0,0 +1,91 @@
+"""
+Per-APN cache of validation evidence service records.
+
+validation.py asks the impervious, permit, BMP and VHR services about every
+APN in OUTPUT_FC, and most APNs have no record at all.  EvidenceCache keeps,
+per service URL, one Parquet file under EVIDENCE_CACHE_DIR with
+
+  APN       parcel the service was asked about
+  ATTRS     the record's attributes as JSON, or null when the service had none
+  FETCHED   epoch seconds of the query
+
+so a run only queries APNs whose entry is missing or older than
+EVIDENCE_CACHE_TTL_DAYS.  "No record" answers are cached as well; a failed
+query is not, and is retried next run.
+
+Usage
+-----
+    cache = EvidenceCache(BMP_CERT_SVC)
+    hits, todo = cache.split(apns)          # {APN: attrs | None}, [APN]
+    cache.update(todo, fetched)             # fetched = {APN: attrs}
+    cache.save()
+"""
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import EVIDENCE_CACHE_DIR, EVIDENCE_CACHE_TTL_DAYS
+from utils import get_logger
+
+log = get_logger("evidence_cache")
+
+
+class EvidenceCache:
+    """Cached {APN: attributes} answers of one evidence service."""
+
+    def __init__(self, url: str, folder: str = EVIDENCE_CACHE_DIR,
+                 ttl_days: float = EVIDENCE_CACHE_TTL_DAYS):
+        key = hashlib.sha1(url.encode()).hexdigest()[:16]
+        self.path    = Path(folder) / f"{key}.parquet"
+        self.ttl     = ttl_days * 86400
+        self.entries: dict[str, tuple] = {}     # APN → (ATTRS json | None, FETCHED)
+        self.dirty   = False
+        if self.path.exists():
+            try:
+                df = pd.read_parquet(self.path)
+                self.entries = {a: (None if pd.isna(j) else j, float(t))
+                                for a, j, t in zip(df["APN"], df["ATTRS"], df["FETCHED"])}
+            except (OSError, ValueError) as exc:
+                log.warning("Evidence cache %s is unreadable (%s) — starting empty",
+                            self.path.name, exc)
+
+    def split(self, apns, refresh: bool = False) -> tuple[dict, list]:
+        """({APN: attrs or None} still fresh, [APNs to query])."""
+        cutoff = time.time() - self.ttl
+        hits, todo = {}, []
+        for apn in apns:
+            entry = None if refresh else self.entries.get(apn)
+            if entry is not None and entry[1] >= cutoff:
+                hits[apn] = json.loads(entry[0]) if entry[0] is not None else None
+            else:
+                todo.append(apn)
+        return hits, todo
+
+    def update(self, asked: list, fetched: dict) -> None:
+        """Record the answer for every APN in *asked* (absent from *fetched* = no record)."""
+        now = time.time()
+        for apn in asked:
+            attrs = fetched.get(apn)
+            self.entries[apn] = (json.dumps(attrs, default=str) if attrs is not None
+                                 else None, now)
+        self.dirty = self.dirty or bool(asked)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        df = pd.DataFrame([(a, j, t) for a, (j, t) in self.entries.items()],
+                          columns=["APN", "ATTRS", "FETCHED"])
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            df.to_parquet(tmp, index=False)
+            tmp.replace(self.path)
+            self.dirty = False
+        except OSError as exc:
+            log.warning("Could not save evidence cache %s: %s", self.path, exc)
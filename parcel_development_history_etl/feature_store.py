@@ -0,0 +1,797 @@
+"""
+Feature-store backends for the Development History ETL.
+
+Steps read and write OUTPUT_FC, SOURCE_FC and the QA tables through a
+FeatureStore instead of opening arcpy.da cursors themselves.  Reads come back
+as one DataFrame per call and writes go in as one DataFrame per call, so a
+step never does per-row round-trips of its own.
+
+Backends
+--------
+ArcpyFeatureStore  file GDB / SDE through arcpy.da (ArcGIS Pro, Windows)
+LocalFeatureStore  one GeoParquet file per dataset under LOCAL_STORE_DIR,
+                   geometry stored as WKB (runs anywhere pandas + pyarrow do)
+
+FEATURE_STORE_BACKEND in config.py picks the backend; the environment
+variable of the same name overrides it for a single run.  get_store()
+returns the shared instance.
+
+Dataset paths
+-------------
+Callers always pass the config path (OUTPUT_FC, SOURCE_FC, QA_*).  The local
+backend maps the last path component to <LOCAL_STORE_DIR>/<name>.parquet, so
+steps never branch on backend.
+
+Field tokens
+------------
+OID@        object id
+SHAPE@WKB   geometry as WKB bytes
+SHAPE@XY    centroid as an (x, y) tuple (label point if the centroid
+            falls outside the polygon)
+SHAPE@AREA  planar area in the dataset's linear units
+
+Filters
+-------
+``where`` is a dict of {field: value}.  A list / set / tuple value means IN,
+None means IS NULL, anything else means equality.  Both backends evaluate the
+same dict, so there is no SQL dialect to keep in sync.
+
+Key-set reads
+-------------
+read_by_keys(path, fields, key, keys) fetches the rows whose *key* is in an
+arbitrarily large key set in one request — no OR-chained SQL, no batches.
+The keys are held once as a hash set; the local backend filters with it in
+one vectorised pass, the arcpy backend sends a single IN list when the set
+is small and otherwise streams one SearchCursor through the set.
+
+Partial updates
+---------------
+A KEEP cell in an update frame leaves that field of that row as it is.  This
+lets one update() carry columns that cover different row sets (see
+write_batch.py) without writing NULLs where a column has nothing to say.
+
+Local snapshot
+--------------
+  python feature_store.py --snapshot
+
+copies SOURCE_FC (and OUTPUT_FC if it exists) from the GDB into
+LOCAL_STORE_DIR.  Run it once on the ArcGIS workstation, then point
+FEATURE_STORE_BACKEND at "local" on any other machine.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import FEATURE_STORE_BACKEND, LOCAL_STORE_DIR
+from utils  import get_logger
+
+log = get_logger("feature_store")
+
+OID   = "OID@"
+WKB   = "SHAPE@WKB"
+XY    = "SHAPE@XY"
+AREA  = "SHAPE@AREA"
+GEOMETRY_TOKENS = {WKB, XY, AREA}
+
+
+class _Keep:
+    """Update-frame cell meaning "leave the stored value alone"."""
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "KEEP"
+
+    def __reduce__(self):
+        return "KEEP"
+
+
+KEEP = _Keep()
+
+
+def _keep_mask(values: np.ndarray) -> np.ndarray:
+    """True where *values* holds KEEP (only object arrays can)."""
+    if values.dtype != object:
+        return np.zeros(len(values), dtype=bool)
+    return np.fromiter((v is KEEP for v in values), dtype=bool, count=len(values))
+
+
+def _dataset_name(path: str) -> str:
+    """Last component of a GDB path, e.g. ...\\ParcelHistory.gdb\\Foo → Foo."""
+    return str(path).replace("/", "\\").rstrip("\\").split("\\")[-1]
+
+
+def _norm_key(v):
+    """Normalise one key value so cursor rows and DataFrame rows compare equal."""
+    if v is None:
+        return None
+    if isinstance(v, str):
+        return v.strip()
+    if isinstance(v, (float, np.floating)):
+        if np.isnan(v):
+            return None
+        if float(v).is_integer():
+            return int(v)
+    if isinstance(v, np.integer):
+        return int(v)
+    return v
+
+
+def _frame_keys(frame: pd.DataFrame, key: list[str]) -> list[tuple]:
+    """Normalised key tuples for every row of *frame*."""
+    cols = [frame[k].tolist() for k in key]
+    return [tuple(_norm_key(v) for v in vals) for vals in zip(*cols)]
+
+
+def _key_set(keys) -> set:
+    """Normalised, non-null key values as a hash set."""
+    return {k for k in map(_norm_key, keys) if k is not None}
+
+
+def _clean(v):
+    """NaN / NaT → None for cursor writes."""
+    if v is None or v is pd.NaT:
+        return None
+    if isinstance(v, (float, np.floating)) and np.isnan(v):
+        return None
+    if isinstance(v, np.integer):
+        return int(v)
+    if isinstance(v, np.floating):
+        return float(v)
+    return v
+
+
+def _native_rows(frame: pd.DataFrame):
+    """
+    Rows of *frame* as tuples of plain Python values, NaN / NaT / NA → None.
+    Converted column by column in bulk rather than checking every cell.
+    """
+    cols = []
+    for c in frame.columns:
+        s    = frame[c]
+        vals = s.astype(object).to_numpy(copy=True)
+        vals[s.isna().to_numpy()] = None
+        cols.append(vals.tolist())
+    return zip(*cols)
+
+
+# pandas dtype kind → NumPyArrayToTable dtype (TEXT handled per column)
+_KIND_TO_NP = {"i": "<i4", "u": "<i4", "f": "<f8", "b": "<i2", "M": "<M8[us]"}
+_INT32 = np.iinfo(np.int32)
+
+
+def _structured(df: pd.DataFrame, lengths: dict) -> np.ndarray | None:
+    """
+    *df* as a NumPy structured array for NumPyArrayToTable, or None when a
+    column can't be represented (nulls, int64 beyond LONG range).
+    """
+    if df.isna().to_numpy().any():
+        return None
+    dtypes, cols = [], []
+    for c in df.columns:
+        s = df[c]
+        if c in lengths:
+            dtypes.append((c, f"<U{lengths[c]}"))
+            cols.append(s.astype(str).str.slice(0, lengths[c]).to_numpy(dtype=f"<U{lengths[c]}"))
+            continue
+        np_type = _KIND_TO_NP.get(s.dtype.kind)
+        if np_type is None:
+            return None
+        if s.dtype.kind in "iu" and len(s) and (s.min() < _INT32.min or s.max() > _INT32.max):
+            return None
+        dtypes.append((c, np_type))
+        cols.append(s.to_numpy().astype(np_type))
+    arr = np.empty(len(df), dtype=dtypes)
+    for (c, _), vals in zip(dtypes, cols):
+        arr[c] = vals
+    return arr
+
+
+# arcpy is not thread-safe: geoprocessing tools and da cursors must never run
+# on two threads at once.  The arcpy backend and scheduler.py's exclusive
+# nodes share this lock (re-entrant, so an exclusive node can use the store).
+ARCPY_LOCK = threading.RLock()
+
+
+def _locked(method):
+    """Serialise a store call on the store-wide lock (see FeatureStore._lock)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class FeatureStore:
+    """Backend-neutral interface used by every ETL step."""
+
+    name = "base"
+    # Steps may run on worker threads (scheduler.py).  Neither arcpy cursors
+    # nor the local backend's cached frames are safe to touch concurrently,
+    # so every public call takes this lock for its duration.
+    _lock = threading.RLock()
+
+    def exists(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def fields(self, path: str) -> dict[str, str]:
+        """Return {field_name: arcpy field type} for *path*."""
+        raise NotImplementedError
+
+    def add_field(self, path: str, name: str, ftype: str,
+                  length: int = None) -> None:
+        raise NotImplementedError
+
+    def count(self, path: str, where: dict = None) -> int:
+        raise NotImplementedError
+
+    def modified(self, path: str) -> float | None:
+        """When *path* was last written (epoch seconds), or None if unknown."""
+        return None
+
+    def read(self, path: str, fields: list[str],
+             where: dict = None) -> pd.DataFrame:
+        """Read *fields* (tokens allowed) into a DataFrame, one column each."""
+        raise NotImplementedError
+
+    def read_by_keys(self, path: str, fields: list[str], key: str, keys,
+                     where: dict = None) -> pd.DataFrame:
+        """
+        Read *fields* for the rows whose *key* value is in *keys*, in one
+        request however many keys there are.  Keys match after the usual
+        normalisation (strings stripped, integral floats as ints).
+        """
+        raise NotImplementedError
+
+    def update(self, path: str, frame: pd.DataFrame, key: list[str],
+               fill: dict = None, where: dict = None) -> int:
+        """
+        Write the non-key columns of *frame* onto rows of *path* matched on
+        *key*.  Rows with no match in *frame* get *fill* (a {field: value}
+        dict) when given, otherwise they are left unchanged; KEEP cells leave
+        just that field unchanged.  Returns the number of rows written.
+        """
+        raise NotImplementedError
+
+    def insert(self, path: str, frame: pd.DataFrame) -> int:
+        raise NotImplementedError
+
+    def delete(self, path: str, oids) -> int:
+        """Delete rows whose OID is in *oids*.  Returns rows removed."""
+        raise NotImplementedError
+
+    def create_like(self, path: str, template: str) -> None:
+        """Drop *path* and recreate it empty with *template*'s schema + SR."""
+        raise NotImplementedError
+
+    def drop(self, path: str) -> None:
+        raise NotImplementedError
+
+    def meters_per_unit(self, path: str) -> float:
+        raise NotImplementedError
+
+    def wkid(self, path: str) -> int | None:
+        """Factory code of *path*'s spatial reference, or None if unknown."""
+        raise NotImplementedError
+
+    def write_table(self, df: pd.DataFrame, path: str,
+                    text_lengths: dict = None) -> int:
+        """Drop and recreate a stand-alone table holding *df*."""
+        raise NotImplementedError
+
+    # Shared helper so both backends report the same way
+    def _split(self, frame: pd.DataFrame, key: list[str]) -> tuple[list, dict]:
+        vals = [c for c in frame.columns if c not in key]
+        keys = _frame_keys(frame, key)
+        rows = frame[vals].itertuples(index=False, name=None)
+        return vals, dict(zip(keys, rows))
+
+
+# ── arcpy backend ─────────────────────────────────────────────────────────────
+
+class ArcpyFeatureStore(FeatureStore):
+    """File GDB / SDE backend.  Each call is exactly one cursor pass."""
+
+    name  = "arcpy"
+    _lock = ARCPY_LOCK
+
+    def __init__(self):
+        import arcpy
+        self.arcpy = arcpy
+
+    @staticmethod
+    def _literal(field: str, v) -> str:
+        """SQL literal for *v*: quotes doubled, numbers must be integral."""
+        if isinstance(v, str):
+            return "'{}'".format(v.replace("'", "''"))
+        if float(v) != int(v):
+            raise ValueError(f"non-integral value {v!r} for {field}")
+        return str(int(v))
+
+    @classmethod
+    def _sql(cls, where: dict | None) -> str | None:
+        if not where:
+            return None
+        parts = []
+        for field, value in where.items():
+            if value is None:
+                parts.append(f"{field} IS NULL")
+            elif isinstance(value, (list, tuple, set, frozenset, np.ndarray, pd.Series)):
+                vals = list(value)
+                if not vals:
+                    return "1 = 0"
+                lits = ", ".join(cls._literal(field, v) for v in vals)
+                parts.append(f"{field} IN ({lits})")
+            else:
+                parts.append(f"{field} = {cls._literal(field, value)}")
+        return " AND ".join(parts)
+
+    @_locked
+    def exists(self, path: str) -> bool:
+        return bool(self.arcpy.Exists(path))
+
+    @_locked
+    def fields(self, path: str) -> dict[str, str]:
+        return {f.name: f.type for f in self.arcpy.ListFields(path)}
+
+    @_locked
+    def add_field(self, path: str, name: str, ftype: str,
+                  length: int = None) -> None:
+        if length:
+            self.arcpy.management.AddField(path, name, ftype, field_length=length)
+        else:
+            self.arcpy.management.AddField(path, name, ftype)
+
+    @_locked
+    def count(self, path: str, where: dict = None) -> int:
+        if not where:
+            return int(self.arcpy.management.GetCount(path).getOutput(0))
+        with self.arcpy.da.SearchCursor(path, ["OID@"], self._sql(where)) as cur:
+            return sum(1 for _ in cur)
+
+    @_locked
+    def read(self, path: str, fields: list[str],
+             where: dict = None) -> pd.DataFrame:
+        with self.arcpy.da.SearchCursor(
+                path, fields, self._sql(where)) as cur:
+            rows = list(cur)
+        return pd.DataFrame.from_records(rows, columns=fields)
+
+    # Above this many keys one filtered scan beats an IN (...) list the
+    # database has to parse and probe key by key.
+    IN_LIST_MAX = 1000
+
+    @_locked
+    def read_by_keys(self, path: str, fields: list[str], key: str, keys,
+                     where: dict = None) -> pd.DataFrame:
+        wanted = _key_set(keys)
+        if not wanted:
+            return pd.DataFrame(columns=fields)
+        if len(wanted) <= self.IN_LIST_MAX:
+            # SQL needs the OID field's real name, not the OID@ token
+            field = self.arcpy.Describe(path).OIDFieldName if key == OID else key
+            return self.read(path, fields, {**(where or {}), field: list(wanted)})
+        cols = fields if key in fields else fields + [key]
+        ki   = cols.index(key)
+        with self.arcpy.da.SearchCursor(path, cols, self._sql(where)) as cur:
+            rows = [r for r in cur if _norm_key(r[ki]) in wanted]
+        return pd.DataFrame.from_records(rows, columns=cols)[fields]
+
+    @_locked
+    def update(self, path: str, frame: pd.DataFrame, key: list[str],
+               fill: dict = None, where: dict = None) -> int:
+        vals, lookup = self._split(frame, key)
+        if fill:
+            vals = vals + [f for f in fill if f not in vals]
+        fill_row = tuple((fill or {}).get(f) for f in vals)
+        nk = len(key)
+        n = 0
+        with self.arcpy.da.UpdateCursor(path, key + vals, self._sql(where)) as cur:
+            for row in cur:
+                k = tuple(_norm_key(v) for v in row[:nk])
+                new = lookup.get(k)
+                if new is None:
+                    if not fill:
+                        continue
+                    new = fill_row
+                else:
+                    new = tuple(new) + fill_row[len(new):]
+                cur.updateRow(list(row[:nk]) +
+                              [old if v is KEEP else _clean(v)
+                               for old, v in zip(row[nk:], new)])
+                n += 1
+        return n
+
+    @_locked
+    def insert(self, path: str, frame: pd.DataFrame) -> int:
+        fields = list(frame.columns)
+        n = 0
+        with self.arcpy.da.InsertCursor(path, fields) as cur:
+            for row in _native_rows(frame):
+                cur.insertRow(row)
+                n += 1
+        return n
+
+    @_locked
+    def delete(self, path: str, oids) -> int:
+        oids = set(int(o) for o in oids)
+        if not oids:
+            return 0
+        n = 0
+        with self.arcpy.da.UpdateCursor(path, ["OID@"]) as cur:
+            for (oid,) in cur:
+                if oid in oids:
+                    cur.deleteRow()
+                    n += 1
+        return n
+
+    @_locked
+    def create_like(self, path: str, template: str) -> None:
+        # `template` only copies field schema — the spatial reference must be
+        # passed explicitly or the new FC gets SR=Unknown and InsertCursor
+        # silently drops geometry from sources whose SR differs.
+        self.drop(path)
+        desc = self.arcpy.Describe(template)
+        self.arcpy.management.CreateFeatureclass(
+            out_path          = os.path.dirname(path),
+            out_name          = _dataset_name(path),
+            geometry_type     = desc.shapeType.upper(),
+            template          = template,
+            spatial_reference = desc.spatialReference,
+        )
+
+    @_locked
+    def drop(self, path: str) -> None:
+        if self.arcpy.Exists(path):
+            self.arcpy.management.Delete(path)
+
+    @_locked
+    def meters_per_unit(self, path: str) -> float:
+        return float(self.arcpy.Describe(path).spatialReference.metersPerUnit)
+
+    @_locked
+    def wkid(self, path: str) -> int | None:
+        return int(self.arcpy.Describe(path).spatialReference.factoryCode) or None
+
+    @_locked
+    def write_table(self, df: pd.DataFrame, path: str,
+                    text_lengths: dict = None) -> int:
+        from utils import _DTYPE_MAP, _safe_field_name
+        text_lengths = text_lengths or {}
+        self.drop(path)
+
+        # Rename columns to safe GDB names
+        df = df.rename(columns={c: _safe_field_name(c) for c in df.columns})
+        text_lengths = {_safe_field_name(k): v for k, v in text_lengths.items()}
+
+        schema, lengths = [], {}
+        for col in df.columns:
+            ftype, _ = _DTYPE_MAP.get(df[col].dtype.kind, ("TEXT", 255))
+            if ftype == "TEXT":
+                non_null = df[col].dropna().astype(str)
+                max_len  = int(non_null.str.len().max()) if len(non_null) else 50
+                lengths[col] = min(text_lengths.get(col, max(max_len * 2, 50)), 8000)
+            schema.append((col, ftype))
+
+        # Null-free frames load in one call; anything else needs a cursor,
+        # since a structured array has no way to carry NULL.
+        arr = _structured(df, lengths)
+        if arr is not None:
+            self.arcpy.da.NumPyArrayToTable(arr, path)
+            return len(arr)
+
+        self.arcpy.management.CreateTable(os.path.dirname(path), _dataset_name(path))
+        for col, ftype in schema:
+            self.add_field(path, col, ftype, lengths.get(col))
+        return self.insert(path, df)
+
+
+# ── Local GeoParquet backend ──────────────────────────────────────────────────
+
+# pandas dtype kind → arcpy field type (for fields())
+_KIND_TO_FTYPE = {"i": "Integer", "u": "Integer", "f": "Double", "b": "SmallInteger",
+                  "M": "Date", "O": "String", "U": "String", "S": "String"}
+# arcpy AddField type → empty column dtype
+_FTYPE_TO_DTYPE = {"LONG": "Int64", "SHORT": "Int64", "DOUBLE": "float64",
+                   "FLOAT": "float64", "TEXT": "object", "DATE": "datetime64[ns]"}
+
+_OID_COL   = "OBJECTID"
+_SHAPE_COL = "SHAPE"
+
+
+class LocalFeatureStore(FeatureStore):
+    """
+    One GeoParquet file per dataset.  Frames are cached in memory after the
+    first read and written back once per mutating call.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_STORE_DIR):
+        self.root   = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._cache: dict[str, pd.DataFrame] = {}
+        self._meta:  dict[str, dict] = {}
+
+    # -- file I/O ------------------------------------------------------------
+    def _file(self, path: str) -> Path:
+        return self.root / f"{_dataset_name(path)}.parquet"
+
+    def _load(self, path: str) -> pd.DataFrame:
+        name = _dataset_name(path)
+        if name not in self._cache:
+            f = self._file(path)
+            if not f.exists():
+                raise FileNotFoundError(f"Local feature store has no dataset {name}: {f}")
+            import pyarrow.parquet as pq
+            table = pq.read_table(f)
+            meta  = table.schema.metadata or {}
+            self._meta[name]  = json.loads(meta.get(b"pdh", b"{}"))
+            self._cache[name] = table.to_pandas()
+        return self._cache[name]
+
+    def _save(self, path: str, df: pd.DataFrame, meta: dict = None) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        name = _dataset_name(path)
+        if meta is not None:
+            self._meta[name] = meta
+        meta = self._meta.get(name, {})
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        md = dict(table.schema.metadata or {})
+        md[b"pdh"] = json.dumps(meta).encode()
+        if _SHAPE_COL in df.columns:
+            md[b"geo"] = json.dumps({
+                "version": "1.0.0", "primary_column": _SHAPE_COL,
+                "columns": {_SHAPE_COL: {"encoding": "WKB", "geometry_types": []}},
+            }).encode()
+        pq.write_table(table.replace_schema_metadata(md), self._file(path))
+        self._cache[name] = df
+
+    def _mask(self, df: pd.DataFrame, where: dict | None) -> pd.Series:
+        mask = pd.Series(True, index=df.index)
+        for field, value in (where or {}).items():
+            col = df[field]
+            if value is None:
+                mask &= col.isna()
+            elif isinstance(value, (list, tuple, set, frozenset, np.ndarray, pd.Series)):
+                mask &= col.isin(list(value))
+            else:
+                mask &= col == value
+        return mask
+
+    # -- interface -----------------------------------------------------------
+    @_locked
+    def exists(self, path: str) -> bool:
+        return _dataset_name(path) in self._cache or self._file(path).exists()
+
+    @_locked
+    def fields(self, path: str) -> dict[str, str]:
+        df = self._load(path)
+        out = {}
+        for c in df.columns:
+            if c == _OID_COL:
+                out[c] = "OID"
+            elif c == _SHAPE_COL:
+                out[c] = "Geometry"
+            else:
+                out[c] = _KIND_TO_FTYPE.get(df[c].dtype.kind, "String")
+        return out
+
+    @_locked
+    def add_field(self, path: str, name: str, ftype: str,
+                  length: int = None) -> None:
+        df = self._load(path)
+        if name not in df.columns:
+            df[name] = pd.Series(index=df.index, dtype=_FTYPE_TO_DTYPE.get(ftype, "object"))
+            self._save(path, df)
+
+    @_locked
+    def count(self, path: str, where: dict = None) -> int:
+        df = self._load(path)
+        return int(self._mask(df, where).sum()) if where else len(df)
+
+    @_locked
+    def modified(self, path: str) -> float | None:
+        f = self._file(path)
+        return f.stat().st_mtime if f.exists() else None
+
+    @_locked
+    def read(self, path: str, fields: list[str],
+             where: dict = None) -> pd.DataFrame:
+        df = self._load(path)
+        if where:
+            df = df[self._mask(df, where)]
+        return self._project(df, fields)
+
+    @_locked
+    def read_by_keys(self, path: str, fields: list[str], key: str, keys,
+                     where: dict = None) -> pd.DataFrame:
+        df   = self._load(path)
+        col  = df[_OID_COL if key == OID else key]
+        if col.dtype == object or pd.api.types.is_string_dtype(col):
+            col = col.str.strip()
+        mask = col.isin(_key_set(keys))
+        if where:
+            mask &= self._mask(df, where)
+        return self._project(df[mask], fields)
+
+    @staticmethod
+    def _project(df: pd.DataFrame, fields: list[str]) -> pd.DataFrame:
+        """Columns / geometry tokens of *df* as a read() result."""
+        out = pd.DataFrame(index=df.index)
+        geoms = None
+        for f in fields:
+            if f == OID:
+                out[f] = df[_OID_COL]
+            elif f == WKB:
+                out[f] = df[_SHAPE_COL]
+            elif f in (XY, AREA):
+                if geoms is None:
+                    import shapely
+                    geoms = shapely.from_wkb(df[_SHAPE_COL].to_numpy())
+                if f == AREA:
+                    out[f] = shapely.area(geoms)
+                else:
+                    # Same rule as arcpy's SHAPE@XY: true centroid when it
+                    # falls inside the polygon, otherwise a label point.
+                    pts = shapely.centroid(geoms)
+                    off = ~shapely.within(pts, geoms) & ~shapely.is_missing(geoms)
+                    pts[off] = shapely.point_on_surface(geoms[off])
+                    out[f] = list(zip(shapely.get_x(pts), shapely.get_y(pts)))
+            else:
+                out[f] = df[f]
+        return out.reset_index(drop=True)
+
+    @_locked
+    def update(self, path: str, frame: pd.DataFrame, key: list[str],
+               fill: dict = None, where: dict = None) -> int:
+        df   = self._load(path)
+        cols = [_OID_COL if k == OID else k for k in key]
+        vals = [c for c in frame.columns if c not in key]
+        scope = self._mask(df, where)
+
+        upd = frame.rename(columns={OID: _OID_COL}).copy()
+        for c in cols:
+            upd[c] = [_norm_key(v) for v in upd[c]]
+        upd = upd.drop_duplicates(subset=cols, keep="last")
+
+        target = df.loc[scope, cols].copy()
+        for c in cols:
+            target[c] = [_norm_key(v) for v in target[c]]
+        target["_row"] = target.index
+        hit = target.merge(upd, on=cols, how="inner").set_index("_row")
+
+        for c in vals:
+            v    = hit[c].to_numpy()
+            keep = _keep_mask(v)
+            new  = pd.Series(v[~keep], index=hit.index[~keep])
+            if keep.any():
+                new = new.infer_objects()
+            if c not in df.columns:
+                df[c] = pd.Series(index=df.index, dtype=new.dtype)
+            df.loc[new.index, c] = new.to_numpy()
+        n = len(hit)
+        if fill:
+            miss = target.index.difference(hit.index)
+            for c, v in fill.items():
+                if c not in df.columns:
+                    df[c] = pd.Series(index=df.index, dtype="object")
+                df.loc[miss, c] = v
+            n += len(miss)
+        self._save(path, df)
+        return n
+
+    @_locked
+    def insert(self, path: str, frame: pd.DataFrame) -> int:
+        df  = self._load(path)
+        new = frame.rename(columns={WKB: _SHAPE_COL}).copy()
+        start = int(df[_OID_COL].max()) + 1 if len(df) else 1
+        new[_OID_COL] = np.arange(start, start + len(new), dtype="int64")
+        df = pd.concat([df, new[[c for c in new.columns if c in df.columns]]],
+                       ignore_index=True)
+        self._save(path, df)
+        return len(new)
+
+    @_locked
+    def delete(self, path: str, oids) -> int:
+        df   = self._load(path)
+        drop = df[_OID_COL].isin(list(oids))
+        self._save(path, df[~drop].reset_index(drop=True))
+        return int(drop.sum())
+
+    @_locked
+    def create_like(self, path: str, template: str) -> None:
+        tpl = self._load(template)
+        self.drop(path)
+        self._save(path, tpl.iloc[0:0].copy(),
+                   meta=dict(self._meta.get(_dataset_name(template), {})))
+
+    @_locked
+    def drop(self, path: str) -> None:
+        self._cache.pop(_dataset_name(path), None)
+        self._meta.pop(_dataset_name(path), None)
+        f = self._file(path)
+        if f.exists():
+            f.unlink()
+
+    @_locked
+    def meters_per_unit(self, path: str) -> float:
+        self._load(path)
+        return float(self._meta.get(_dataset_name(path), {}).get("meters_per_unit", 1.0))
+
+    @_locked
+    def wkid(self, path: str) -> int | None:
+        self._load(path)
+        return self._meta.get(_dataset_name(path), {}).get("wkid")
+
+    @_locked
+    def write_table(self, df: pd.DataFrame, path: str,
+                    text_lengths: dict = None) -> int:
+        from utils import _safe_field_name
+        df = df.rename(columns={c: _safe_field_name(c) for c in df.columns}).reset_index(drop=True)
+        df.insert(0, _OID_COL, np.arange(1, len(df) + 1, dtype="int64"))
+        self.drop(path)
+        self._save(path, df, meta={})
+        return len(df)
+
+
+# ── Factory ───────────────────────────────────────────────────────────────────
+
+_STORE: FeatureStore | None = None
+
+
+def get_store() -> FeatureStore:
+    """Return the shared FeatureStore for this process."""
+    global _STORE
+    if _STORE is None:
+        backend = os.environ.get("FEATURE_STORE_BACKEND", FEATURE_STORE_BACKEND).lower()
+        if backend == "local":
+            _STORE = LocalFeatureStore()
+        elif backend == "arcpy":
+            _STORE = ArcpyFeatureStore()
+        else:
+            raise ValueError(
+                f"Unknown FEATURE_STORE_BACKEND {backend!r} — expected 'arcpy' or 'local'")
+        log.info("Feature store backend: %s", _STORE.name)
+    return _STORE
+
+
+def snapshot(paths: list[str], src: FeatureStore, dst: LocalFeatureStore) -> None:
+    """Copy *paths* from *src* into the local GeoParquet store *dst*."""
+    for path in paths:
+        if not src.exists(path):
+            log.warning("Snapshot: %s not found — skipped", path)
+            continue
+        ftypes = src.fields(path)
+        attrs  = [f for f, t in ftypes.items()
+                  if t not in ("OID", "Geometry", "Raster", "Blob")
+                  and f.upper() not in ("SHAPE_LENGTH", "SHAPE_AREA")]
+        has_geom = any(t == "Geometry" for t in ftypes.values())
+        df = src.read(path, [OID] + ([WKB] if has_geom else []) + attrs)
+        df = df.rename(columns={OID: _OID_COL, WKB: _SHAPE_COL})
+        if has_geom:
+            df[_SHAPE_COL] = df[_SHAPE_COL].map(lambda b: bytes(b) if b is not None else None)
+        dst.drop(path)
+        meta = ({"meters_per_unit": src.meters_per_unit(path), "wkid": src.wkid(path)}
+                if has_geom else {})
+        dst._save(path, df, meta=meta)
+        log.info("Snapshot: %-32s %d rows → %s", _dataset_name(path), len(df), dst._file(path))
+
+
+if __name__ == "__main__":
+    import argparse
+    from config import SOURCE_FC, OUTPUT_FC
+    parser = argparse.ArgumentParser(description="Feature store utilities")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Copy SOURCE_FC + OUTPUT_FC from the GDB into LOCAL_STORE_DIR")
+    args = parser.parse_args()
+    if args.snapshot:
+        snapshot([SOURCE_FC, OUTPUT_FC], ArcpyFeatureStore(), LocalFeatureStore())
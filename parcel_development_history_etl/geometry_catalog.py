@@ -0,0 +1,234 @@
+"""
+Per-(APN, Year) geometry catalog for OUTPUT_FC and SOURCE_FC.
+
+Reading SHAPE@ (or any geometry token) is the most expensive thing a cursor
+does, and S01c, S03, S05 and several scripts each used to scan the same
+feature class for it.  The catalog reads the geometry once and keeps, for
+every row:
+
+  OID                     object id
+  APN, Year               current attribute values (re-read on every load)
+  WKB                     polygon as WKB
+  AREA                    planar area in the dataset's linear units
+  XMIN, YMIN, XMAX, YMAX  bounding box
+  X, Y                    inside point — the centroid, or a point on the
+                          surface when the centroid falls outside (same
+                          rule as SHAPE@XY and FeatureToPoint "INSIDE")
+
+The geometry columns are persisted per dataset under GEOMETRY_CATALOG_DIR.
+A load reads only OID / APN / Year plus the stored Shape_Area / Shape_Length
+fields (no geometry), and the stored geometry is reused when every row's
+OID, area and length are unchanged; otherwise it is rebuilt with one
+geometry scan.  So a polygon edited in place, or a feature class recreated
+with the same OIDs (CopyFeatures of WORKING_FC), is re-read.  Datasets with
+no stored shape fields (the local backend) stamp on SHAPE@AREA instead.
+S01 and preprocess.py still call invalidate() after recreating OUTPUT_FC /
+WORKING_FC.  APN / Year edits (S01c's El Dorado normalisation) are picked up
+by the attribute read on the next load.
+
+Usage
+-----
+    cat  = get_catalog(OUTPUT_FC)
+    best = cat.per_apn(latest=True)          # one row per APN
+    pts  = cat.points(best)                  # shapely inside points
+    polys = cat.select(years=[2018]).WKB
+
+    python geometry_catalog.py [--rebuild]   # build OUTPUT_FC + SOURCE_FC
+"""
+import hashlib
+import json
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import GEOMETRY_CATALOG_DIR, OUTPUT_FC, SOURCE_FC, FC_APN, FC_YEAR
+from feature_store import get_store, OID, WKB, AREA
+from spatial_index import inside_points
+from utils  import get_logger
+
+log = get_logger("geometry_catalog")
+
+APN  = "APN"
+YEAR = "Year"
+GEOM_COLS = ["WKB", "AREA", "XMIN", "YMIN", "XMAX", "YMAX", "X", "Y"]
+
+_MEMO: dict[str, "GeometryCatalog"] = {}
+_LOCK = threading.Lock()
+
+
+class GeometryCatalog:
+    """One dataset's rows with geometry, area, bbox and inside point."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def select(self, apns=None, years=None, positive: bool = True) -> pd.DataFrame:
+        """Rows whose APN / Year are in *apns* / *years* (None = all)."""
+        df   = self.frame
+        mask = df[APN].notna().to_numpy(copy=True)
+        if positive:
+            mask &= df["AREA"].fillna(0).to_numpy() > 0
+        if apns is not None:
+            mask &= df[APN].isin(set(apns)).to_numpy()
+        if years is not None:
+            mask &= df[YEAR].isin(list(years)).to_numpy()
+        return df[mask]
+
+    def per_apn(self, apns=None, latest: bool = False,
+                positive: bool = True) -> pd.DataFrame:
+        """
+        One row per APN — its earliest year (latest=True: most recent year).
+        Rows with no Year come last; ties keep the lowest OID.
+        """
+        df = self.select(apns=apns, positive=positive)
+        df = df.sort_values([YEAR, OID], ascending=[not latest, True],
+                            kind="stable", na_position="last")
+        return df.drop_duplicates(subset=APN, keep="first")
+
+    @staticmethod
+    def points(df: pd.DataFrame) -> np.ndarray:
+        """Inside points of *df*'s rows as shapely Points."""
+        return shapely.points(df["X"].to_numpy(float), df["Y"].to_numpy(float))
+
+    @staticmethod
+    def xy(df: pd.DataFrame) -> list[tuple]:
+        """Inside points of *df*'s rows as (x, y) tuples (SHAPE@XY layout)."""
+        return list(zip(df["X"].tolist(), df["Y"].tolist()))
+
+
+# ── Build / persist ───────────────────────────────────────────────────────────
+
+def _file(path: str) -> Path:
+    name = str(path).replace("/", "\\").rstrip("\\").split("\\")[-1]
+    return Path(GEOMETRY_CATALOG_DIR) / f"{name}.parquet"
+
+
+# Geometry statistics the GDB maintains as plain attributes (file GDB / SDE)
+_SHAPE_STATS = {"shape_area", "shape_length", "shape.starea()", "shape.stlength()"}
+
+
+def _stat_fields(path: str) -> list[str]:
+    """Stored area / length fields of *path*, else the SHAPE@AREA token."""
+    stats = [f for f in get_store().fields(path) if f.lower() in _SHAPE_STATS]
+    return sorted(stats) or [AREA]
+
+
+def _stamp(attrs: pd.DataFrame, stats: list[str]) -> str:
+    """
+    Digest of every row's OID and shape statistics — changes when rows are
+    added / removed or a polygon's area or perimeter changes.
+    """
+    df = attrs.sort_values(OID, kind="stable")
+    h  = hashlib.sha1(df[OID].to_numpy(np.int64).tobytes())
+    for f in stats:
+        h.update(pd.to_numeric(df[f], errors="coerce").to_numpy(np.float64).tobytes())
+    return h.hexdigest()
+
+
+def _read_geometry(path: str) -> pd.DataFrame:
+    """The one geometry scan: OID, WKB and AREA, plus derived bbox / point."""
+    log.info("Building geometry catalog for %s ...", _file(path).stem)
+    df   = get_store().read(path, [OID, WKB, AREA])
+    wkbs = df[WKB].to_numpy()
+    geoms  = shapely.from_wkb(wkbs)
+    bounds = shapely.bounds(geoms)
+    pts    = inside_points(wkbs)
+    out = pd.DataFrame({
+        OID:    df[OID].astype(np.int64).to_numpy(),
+        "WKB":  wkbs,
+        "AREA": df[AREA].astype(float).to_numpy(),
+        "XMIN": bounds[:, 0], "YMIN": bounds[:, 1],
+        "XMAX": bounds[:, 2], "YMAX": bounds[:, 3],
+        "X":    shapely.get_x(pts), "Y": shapely.get_y(pts),
+    })
+    log.info("  %d rows catalogued", len(out))
+    return out
+
+
+def _load_geometry(path: str, stamp: str) -> pd.DataFrame | None:
+    f = _file(path)
+    if not f.exists():
+        return None
+    import pyarrow.parquet as pq
+    table = pq.read_table(f)
+    meta  = json.loads((table.schema.metadata or {}).get(b"geometry_catalog", b"{}"))
+    if meta.get("stamp") != stamp:
+        log.info("Geometry catalog for %s is stale — rebuilding", f.stem)
+        return None
+    return table.to_pandas()
+
+
+def _save_geometry(path: str, geo: pd.DataFrame, stamp: str) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    f = _file(path)
+    try:
+        f.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(geo, preserve_index=False)
+        md = dict(table.schema.metadata or {})
+        md[b"geometry_catalog"] = json.dumps({"stamp": stamp}).encode()
+        tmp = f.with_suffix(".tmp")
+        pq.write_table(table.replace_schema_metadata(md), tmp)
+        tmp.replace(f)
+    except OSError as exc:
+        log.warning("Could not persist geometry catalog %s: %s", f, exc)
+
+
+def get_catalog(path: str = OUTPUT_FC, refresh: bool = False) -> GeometryCatalog:
+    """
+    The catalog for *path*: stored geometry when no row's OID, area or
+    length changed, otherwise rebuilt.  APN / Year always reflect the
+    dataset as it is now.
+    """
+    with _LOCK:
+        stats = _stat_fields(path)
+        attrs = get_store().read(path, [OID, FC_APN, FC_YEAR] + stats)
+        attrs[OID] = attrs[OID].astype(np.int64)
+        stamp = _stamp(attrs, stats)
+
+        memo = _MEMO.get(path)
+        geo  = None
+        if not refresh:
+            if memo is not None and memo.frame.attrs.get("stamp") == stamp:
+                geo = memo.frame[[OID] + GEOM_COLS]
+            else:
+                geo = _load_geometry(path, stamp)
+        if geo is None:
+            geo = _read_geometry(path)
+            _save_geometry(path, geo, stamp)
+
+        apn  = attrs[FC_APN].astype(object)
+        ok   = apn.notna().to_numpy()
+        apn[ok] = apn[ok].astype(str).str.strip()
+        apn[apn == ""] = None
+        frame = pd.DataFrame({
+            OID:  attrs[OID],
+            APN:  apn,
+            YEAR: pd.to_numeric(attrs[FC_YEAR], errors="coerce").astype("Int64"),
+        }).merge(geo, on=OID, how="left")
+        frame.attrs["stamp"] = stamp
+        _MEMO[path] = GeometryCatalog(frame)
+        return _MEMO[path]
+
+
+def invalidate(path: str) -> None:
+    """Forget the stored geometry for *path* (call after rebuilding it)."""
+    with _LOCK:
+        _MEMO.pop(path, None)
+        _file(path).unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    refresh = "--rebuild" in sys.argv
+    for p in [OUTPUT_FC, SOURCE_FC]:
+        if get_store().exists(p):
+            log.info("%s: %d rows", _file(p).stem, len(get_catalog(p, refresh=refresh)))
@@ -10,6 +10,18 @@ Flags
 --skip-s01   Skip FC copy (use if output FC already exists and is current)
 --skip-s05   Skip spatial attribute updates (slow; skip for unit-only runs)
 --only-qa    Only run Step 6 QA (output FC must already exist and be updated)
+--force      Re-run the named steps (e.g. --force s03 s05) even if their
+             inputs are unchanged; bare --force re-runs everything
+
+Checkpoints
+-----------
+Each step is fingerprinted on its inputs (CSV / genealogy file contents,
+the config constants it reads, and the outputs of the steps it depends on)
+and skipped when the fingerprint matches the last completed run recorded in
+CHECKPOINT_DIR.  df_csv and csv_lookup are persisted there so downstream
+steps can run without repeating S2/S3.  For example, editing only the TAU
+CSV re-runs S4b and S6; S3 only re-runs if the set of non-zero TAU/CFA
+parcel-years changed.  See checkpoints.py.
 
 Steps
 -----
@@ -21,6 +33,16 @@ S4   Write Residential_Units
 S4b  Write TouristAccommodation_Units + CommercialFloorArea_SqFt
 S5   Spatial attribute updates (slow)
 S6   QA tables
+
+Scheduling
+----------
+Steps run as a dependency graph on a worker pool (scheduler.py).  S4 and S4b
+compute their columns side by side once S3 is done; S5's service downloads
+and joins start right after S1c (they read the APNs S1c normalises).  Their
+column updates are merged and written to OUTPUT_FC in one pass before S6,
+and the APN x Year unit matrix (unit_matrix.py) is rebuilt from the written
+columns.  arcpy geoprocessing
+never runs on two threads at once — those steps take turns on a single lock.
 """
 import argparse
 import sys
@@ -30,6 +52,9 @@ from pathlib import Path
 # Ensure project root is on path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from apn_index import ApnYearTable
+from checkpoints import (Checkpoints, file_digest, wide_csv_key_digest,
+                         lookup_to_frame, frame_to_lookup)
 from utils import get_logger
 
 log = get_logger("main")
@@ -53,13 +78,13 @@ def _assert_county_populated() -> None:
     A high null rate means the spatial join failed and the El Dorado APN
     fix in S02 will silently skip all El Dorado corrections.
     """
-    import arcpy
-    from config import OUTPUT_FC, FC_APN
-    total = int(arcpy.management.GetCount(OUTPUT_FC)[0])
+    from config import OUTPUT_FC
+    from feature_store import get_store
+    store = get_store()
+    total = store.count(OUTPUT_FC)
     if total == 0:
         return
-    null_count = sum(1 for _ in arcpy.da.SearchCursor(
-        OUTPUT_FC, [FC_APN], "COUNTY IS NULL"))
+    null_count = store.count(OUTPUT_FC, where={"COUNTY": None})
     pct = 100.0 * null_count / total
     if pct > 5.0:
         log.warning(
@@ -72,65 +97,213 @@ def _assert_county_populated() -> None:
         log.info("COUNTY populated: %d null rows (%.1f%%)", null_count, pct)
 
 
-def main(skip_s01: bool = False,
-         skip_s05: bool = False,
-         only_qa: bool  = False) -> None:
+def _run_cached(ck: Checkpoints, step: str, fp: str, fn,
+                skip_flag: str = None) -> None:
+    """Run an FC-writing step unless skipped by flag or checkpoint."""
+    if skip_flag:
+        log.info("Skipping %s (%s)", step, skip_flag)
+        return
+    if ck.fresh(step, fp):
+        return
+    fn()
+    ck.commit(step, fp)
 
-    log.info("=" * 60)
-    log.info("Development History ETL — starting")
-    log.info("=" * 60)
 
-    t0 = time.time()
-    _preflight()
+def _build_graph(ck: Checkpoints, skip_s01: bool, skip_s05: bool) -> list:
+    """
+    The ETL as a dependency graph (see scheduler.py).
 
-    if only_qa:
-        log.info("--only-qa flag set: running Step 6 only")
-        from steps import s02_load_csv as s02
-        from steps import s06_qa       as s06
-        df_csv, _ = s02.run()
-        s06.run(df_csv)
-        _finish(t0)
-        return
+    S4, S4b and S5 only *compute* their column updates; the 'write' node
+    registers them on one WriteBatch and writes OUTPUT_FC in a single pass.  S4 / S4b run side by side after
+    S3, and S5's service downloads and joins start as soon as S1c is done.
+    """
+    from config import (
+        OUTPUT_FC, CSV_PATH, GENEALOGY_TAHOE, QA_DATA_DIR,
+        TOURIST_UNITS_CSV, COMMERCIAL_SQFT_CSV,
+        CSV_TOURIST_YEAR_PREFIX, CSV_COMMERCIAL_YEAR_PREFIX,
+    )
+    from feature_store import get_store, OID
+    from scheduler import Node
+    from unit_matrix import build_history, load_history
+    from write_batch import WriteBatch
+
+    # By-products of S2 / S2b / S3 / S4b that S6 re-checks (the raw CSVs and
+    # the genealogy / crosswalk QA rows).  Steps skipped by their checkpoint
+    # leave no entry and S6 reads that input back from disk.
+    qa_artifacts = {}
+
+    # A missing OUTPUT_FC forces S1 — decided here, before any worker runs
+    if not get_store().exists(OUTPUT_FC):
+        ck.force.add("s01")
 
     # Step 1 — Prepare output feature class
-    if not skip_s01:
+    def s01_node():
         from steps import s01_prepare_fc as s01
-        s01.run()
-    else:
-        log.info("Skipping Step 1 (--skip-s01)")
+        fp = ck.fingerprint(config_names=["SOURCE_FC", "OUTPUT_FC", "ALLPARCELS_URL",
+                                          "YEAR_LAYER", "CSV_YEARS"])
+        _run_cached(ck, "s01", fp, s01.run, "--skip-s01" if skip_s01 else None)
+        return {"fc": ck.token("s01")}
 
     # Step 1c — Populate COUNTY + JURISDICTION via spatial join
-    from steps import s01c_populate_jurisdiction as s01c
-    s01c.run()
-    _assert_county_populated()
+    def s01c_node(fc):
+        from steps import s01c_populate_jurisdiction as s01c
+        def _run():
+            s01c.run()
+            _assert_county_populated()
+        fp = ck.fingerprint(config_names=["JURISDICTION_SVC", "COUNTY_CODE_MAP",
+                                          "EL_PAD_YEAR"],
+                            upstream=["s01"])
+        _run_cached(ck, "s01c", fp, _run)
+        return {"fc_county": ck.token("s01c")}
 
     # Step 2 — Load CSV + El Dorado fix  →  df_csv, csv_lookup
-    from steps import s02_load_csv as s02
-    df_csv, csv_lookup = s02.run()
+    def s02_node(fc_county):
+        df_csv, csv_lookup = _load_csv(ck, qa_artifacts)
+        return {"df_csv": df_csv, "csv_lookup_s02": csv_lookup}
 
     # Step 3 — APN crosswalk  →  extends csv_lookup
-    from steps import s03_crosswalk as s03
-    csv_lookup = s03.run(df_csv, csv_lookup)
+    # TAU/CFA only widen the crosswalk scope, so S3 keys on which parcel-years
+    # are non-zero in those CSVs, not on their values.
+    def s03_node(df_csv, csv_lookup_s02):
+        fp = ck.fingerprint(files=[GENEALOGY_TAHOE],
+                            config_names=["CLOSEST_MAX_METERS", "ALL_PARCELS_CURRENT",
+                                          "SOURCE_FC", "CSV_YEARS"],
+                            upstream=["s01c", "s02"],
+                            extra={"tau_keys": wide_csv_key_digest(TOURIST_UNITS_CSV,
+                                                                   CSV_TOURIST_YEAR_PREFIX),
+                                   "cfa_keys": wide_csv_key_digest(COMMERCIAL_SQFT_CSV,
+                                                                   CSV_COMMERCIAL_YEAR_PREFIX)})
+        if ck.fresh("s03", fp, outputs=["csv_lookup"]):
+            return {"csv_lookup": frame_to_lookup(ck.load_frame("csv_lookup"))}
+        from steps import s03_crosswalk as s03
+        csv_lookup = s03.run(df_csv, csv_lookup_s02, qa_artifacts)
+        digest = ck.save_frame("csv_lookup", lookup_to_frame(csv_lookup))
+        xwalk  = file_digest(str(Path(QA_DATA_DIR) / "QA_APN_Crosswalk.csv"))
+        ck.commit("s03", fp, token=f"{digest}:{xwalk}")
+        return {"csv_lookup": csv_lookup}
 
-    # Step 4 — Write Residential_Units to output FC
-    from steps import s04_update_units as s04
-    s04.run(csv_lookup)
+    # Steps 4 / 4b / 5 each return (step, fingerprint, frame).  fingerprint is
+    # None when the step was skipped; frame is None when there is nothing to write.
+    def s04_node(csv_lookup):
+        fp = ck.fingerprint(config_names=["FC_NATIVE_YEARS", "CSV_YEARS"],
+                            upstream=["s01c", "s03"])
+        if ck.fresh("s04", fp):
+            return {"units_update": ("s04", None, None)}
+        from steps import s04_update_units as s04
+        log.info("=== Step 4: Update Residential_Units ===")
+        return {"units_update": ("s04", fp, s04.build_updates(csv_lookup))}
 
-    # Step 4b — Write TouristAccommodation_Units + CommercialFloorArea_SqFt
-    from steps import s04b_update_tourist_commercial as s04b
-    s04b.run()
+    def s04b_node(csv_lookup):
+        fp = ck.fingerprint(files=[TOURIST_UNITS_CSV, COMMERCIAL_SQFT_CSV, GENEALOGY_TAHOE],
+                            config_names=["CSV_YEARS", "EL_PAD_YEAR",
+                                          "CSV_TOURIST_YEAR_PREFIX",
+                                          "CSV_COMMERCIAL_YEAR_PREFIX"],
+                            upstream=["s01c", "s03"])
+        if ck.fresh("s04b", fp):
+            return {"tau_cfa_update": ("s04b", None, None)}
+        from steps import s04b_update_tourist_commercial as s04b
+        log.info("=== Step 4b: Update Tourist & Commercial attributes ===")
+        return {"tau_cfa_update": ("s04b", fp, s04b.build_updates(qa_artifacts))}
 
-    # Step 5 — Spatial attribute updates
-    if not skip_s05:
+    def s05_node(fc_county):
+        if skip_s05:
+            log.info("Skipping s05 (--skip-s05)")
+            return {"spatial_update": ("s05", None, None)}
+        fp = ck.fingerprint(config_names=["SPATIAL_SOURCES", "CSV_YEARS"],
+                            upstream=["s01c"])
+        if ck.fresh("s05", fp):
+            return {"spatial_update": ("s05", None, None)}
         from steps import s05_spatial_attrs as s05
-        s05.run()
-    else:
-        log.info("Skipping Step 5 (--skip-s05)")
+        log.info("=== Step 5: Spatial attribute updates ===")
+        return {"spatial_update": ("s05", fp, s05.build_updates())}
+
+    # Single write of every column S4 / S4b / S5 produced
+    def write_node(units_update, tau_cfa_update, spatial_update):
+        updates = [units_update, tau_cfa_update, spatial_update]
+        batch   = WriteBatch(OUTPUT_FC, key=[OID])
+        for step, fp, frame in updates:
+            if fp is not None:
+                batch.register(frame, step=step)
+        if len(batch):
+            from steps import s04_update_units as s04
+            s04._ensure_fields()
+            batch.flush()
+        # Unit matrix for validation.py — rebuilt whenever S4 / S4b wrote
+        wrote = any(fp is not None for _, fp, _ in updates[:2])
+        if wrote or load_history() is None:
+            build_history(OUTPUT_FC)
+        for step, fp, _ in updates:
+            if fp is not None:
+                ck.commit(step, fp)
+        return {"fc_units": [ck.token(s) for s, _, _ in updates]}
 
     # Step 6 — QA → GDB tables
-    from steps import s06_qa as s06
-    s06.run(df_csv)
+    def s06_node(df_csv, fc_units):
+        from steps import s06_qa as s06
+        fp = ck.fingerprint(files=[CSV_PATH, TOURIST_UNITS_CSV, COMMERCIAL_SQFT_CSV],
+                            upstream=["s02", "s03", "s04", "s04b", "s05"])
+        _run_cached(ck, "s06", fp, lambda: s06.run(df_csv, qa_artifacts))
+
+    return [
+        Node("s01",   s01_node,   outputs=["fc"], exclusive=True),
+        Node("s01c",  s01c_node,  inputs=["fc"], outputs=["fc_county"], exclusive=True),
+        Node("s02",   s02_node,   inputs=["fc_county"],
+             outputs=["df_csv", "csv_lookup_s02"]),
+        # Not exclusive: S3's spatial join is in-memory (spatial_index) and
+        # its store reads lock themselves, so S5 keeps running alongside
+        Node("s03",   s03_node,   inputs=["df_csv", "csv_lookup_s02"],
+             outputs=["csv_lookup"]),
+        Node("s04",   s04_node,   inputs=["csv_lookup"], outputs=["units_update"]),
+        Node("s04b",  s04b_node,  inputs=["csv_lookup"], outputs=["tau_cfa_update"]),
+        # Not exclusive: S5 runs its own sub-graph whose arcpy nodes take the lock.
+        # It reads APNs, so it waits for S1c's El Dorado / COUNTY rewrite.
+        Node("s05",   s05_node,   inputs=["fc_county"], outputs=["spatial_update"]),
+        Node("write", write_node, inputs=["units_update", "tau_cfa_update",
+                                          "spatial_update"],
+             outputs=["fc_units"], exclusive=True),
+        Node("s06",   s06_node,   inputs=["df_csv", "fc_units"]),
+    ]
+
+
+def _load_csv(ck: Checkpoints, artifacts: dict = None) -> tuple:
+    """Step 2, or its checkpoint.  Returns (df_csv, csv_lookup)."""
+    from config import CSV_PATH, GENEALOGY_TAHOE
+    fp = ck.fingerprint(files=[CSV_PATH, GENEALOGY_TAHOE],
+                        config_names=["CSV_YEARS", "EL_PAD_YEAR",
+                                      "CSV_RESIDENTIAL_YEAR_MARKER"],
+                        upstream=["s01c"])
+    if ck.fresh("s02", fp, outputs=["df_csv"]):
+        df_csv = ck.load_frame("df_csv")
+        return df_csv, ApnYearTable.from_frame(df_csv, "APN", "Year", "Units_CSV")
+    from steps import s02_load_csv as s02
+    df_csv, csv_lookup = s02.run(artifacts)
+    ck.commit("s02", fp, token=ck.save_frame("df_csv", df_csv))
+    return df_csv, csv_lookup
+
+
+def main(skip_s01: bool = False,
+         skip_s05: bool = False,
+         only_qa: bool  = False,
+         force: list[str] = None) -> None:
+    from scheduler import run_graph
+
+    log.info("=" * 60)
+    log.info("Development History ETL — starting")
+    log.info("=" * 60)
+
+    t0 = time.time()
+    _preflight()
+    ck = Checkpoints(force=force)
+
+    if only_qa:
+        log.info("--only-qa flag set: running Step 6 only")
+        from steps import s06_qa as s06
+        df_csv, _ = _load_csv(ck)
+        s06.run(df_csv)
+        _finish(t0)
+        return
 
+    run_graph(_build_graph(ck, skip_s01, skip_s05))
     _finish(t0)
 
 
@@ -150,8 +323,12 @@ if __name__ == "__main__":
                         help="Skip Step 5 (spatial attributes)")
     parser.add_argument("--only-qa",  action="store_true",
                         help="Run Step 6 QA only")
+    parser.add_argument("--force",    nargs="*", metavar="STEP",
+                        help="Re-run STEPs (s01 s01c s02 s03 s04 s04b s05 s06) "
+                             "regardless of checkpoints; no STEP = all")
     args = parser.parse_args()
 
     main(skip_s01=args.skip_s01,
          skip_s05=args.skip_s05,
-         only_qa=args.only_qa)
+         only_qa=args.only_qa,
+         force=(args.force or ["all"]) if args.force is not None else None)
@@ -0,0 +1,374 @@
+"""
+Shared HTTP client for ArcGIS REST layers and JSON endpoints.
+
+Every script used to page through /query with its own resultOffset loop,
+one page after another.  query_features() instead:
+
+  1. asks the layer for the matching object ids (returnIdsOnly=true)
+  2. splits them into OBJECTID ranges of at most one page each
+  3. fetches the ranges concurrently on REST_WORKERS threads
+
+Requests share pooled keep-alive connections (one requests.Session per
+thread; plain urllib when requests is not installed), ask for gzip, and are
+retried REST_RETRIES times with exponential backoff on connection errors,
+timeouts, HTTP 429 / 5xx and ArcGIS JSON errors with a 5xx code.  Layers
+that cannot list ids (some tables and views) fall back to resultOffset
+paging.
+
+Streaming
+---------
+stream_json() yields the elements of a top-level JSON array one at a time
+as the body arrives (ijson when installed), so a large endpoint never sits
+in memory as one string plus one list of dicts.  Without ijson it falls back
+to get_json() and iterates the parsed list.
+
+Record / replay
+---------------
+Set REST_CLIENT_MODE in the environment to
+
+  record   fetch live and save every response under REST_FIXTURE_DIR
+  replay   answer every request from REST_FIXTURE_DIR — no network at all
+
+Fixtures are keyed on a hash of the URL and parameters, so a replayed run
+issues exactly the requests the recorded run did.  Responses are stored as
+gzipped JSON; the URL itself is never written (LT Info keys live in it).
+
+Usage
+-----
+    from rest_client import query_frame, get_client
+    df = query_frame(LAYER_URL, where="YEAR_BUILT > 0", out_fields="APN,YEAR_BUILT")
+    rows = get_client().get_json(endpoint_url, label="LT Info /Allocations")
+    for row in get_client().stream_json(endpoint_url, label="LT Info /Allocations"):
+        ...
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import REST_WORKERS, REST_RETRIES, REST_BACKOFF_SECONDS, REST_FIXTURE_DIR
+from utils  import get_logger
+
+log = get_logger("rest_client")
+
+DEFAULT_PAGE = 2000
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RestError(RuntimeError):
+    """A request that failed after all retries, or an ArcGIS error payload."""
+
+
+def _layer_url(url: str) -> str:
+    """Accept either a layer URL or its /query endpoint."""
+    url = url.rstrip("/")
+    return url[:-len("/query")] if url.endswith("/query") else url
+
+
+class RestClient:
+    """Pooled, retrying, optionally recording / replaying JSON client."""
+
+    def __init__(self, workers: int = REST_WORKERS, retries: int = REST_RETRIES,
+                 backoff: float = REST_BACKOFF_SECONDS, timeout: int = 120,
+                 mode: str = None, fixture_dir: str = REST_FIXTURE_DIR):
+        self.workers  = max(1, int(workers))
+        self.retries  = int(retries)
+        self.backoff  = float(backoff)
+        self.timeout  = timeout
+        self.mode     = (mode if mode is not None
+                         else os.environ.get("REST_CLIENT_MODE", "")).lower()
+        self.fixtures = Path(fixture_dir)
+        self._local   = threading.local()
+        self._info: dict[str, dict] = {}
+        if self.mode not in ("", "live", "record", "replay"):
+            raise ValueError(f"REST_CLIENT_MODE must be record or replay, got {self.mode!r}")
+
+    # -- transport -------------------------------------------------------------
+    def _session(self):
+        s = getattr(self._local, "session", None)
+        if s is None:
+            try:
+                import requests
+            except ImportError:
+                return None
+            s = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.workers)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers["Accept-Encoding"] = "gzip, deflate"
+            self._local.session = s
+        return s
+
+    def _fetch(self, url: str, params: dict, timeout: int) -> tuple[int, bytes]:
+        """One HTTP GET → (status, body).  Raises on transport failures."""
+        s = self._session()
+        if s is not None:
+            r = s.get(url, params=params, timeout=timeout)
+            return r.status_code, r.content
+        full = f"{url}?{urllib.parse.urlencode(params)}" if params else url
+        req  = urllib.request.Request(full, headers={"Accept-Encoding": "gzip"})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                body = resp.read()
+                if resp.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                return resp.status, body
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def _open(self, url: str, params: dict, timeout: int):
+        """Streaming GET → (status, readable body, close).  Raises on transport
+        failures.  The body is already gunzipped."""
+        s = self._session()
+        if s is not None:
+            r = s.get(url, params=params, timeout=timeout, stream=True)
+            r.raw.decode_content = True
+            return r.status_code, r.raw, r.close
+        full = f"{url}?{urllib.parse.urlencode(params)}" if params else url
+        req  = urllib.request.Request(full, headers={"Accept-Encoding": "gzip"})
+        try:
+            resp = urllib.request.urlopen(req, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            return e.code, e, e.close
+        body = (gzip.GzipFile(fileobj=resp)
+                if resp.headers.get("Content-Encoding") == "gzip" else resp)
+        return resp.status, body, resp.close
+
+    # -- fixtures ----------------------------------------------------------------
+    def _fixture(self, url: str, params: dict) -> Path:
+        key = hashlib.sha1(
+            json.dumps([url, sorted((params or {}).items())], default=str).encode()
+        ).hexdigest()[:16]
+        return self.fixtures / f"{key}.json.gz"
+
+    # -- public ----------------------------------------------------------------
+    def get_json(self, url: str, params: dict = None, timeout: int = None,
+                 label: str = None):
+        """
+        GET *url* and return the decoded JSON.  *label* replaces the URL in
+        log lines and errors (use it when the URL carries a key).
+        """
+        redact  = label is not None
+        label   = label or url
+        params  = dict(params or {})
+        fixture = self._fixture(url, params)
+        if self.mode == "replay":
+            if not fixture.exists():
+                raise RestError(f"no recorded response for {label} in {self.fixtures}")
+            with gzip.open(fixture, "rt", encoding="utf-8") as f:
+                return json.load(f)
+
+        last = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                wait = self.backoff * 2 ** (attempt - 1)
+                log.warning("  %s: %s — retry %d/%d in %.1fs",
+                            label, last, attempt, self.retries, wait)
+                time.sleep(wait)
+            try:
+                status, body = self._fetch(url, params, timeout or self.timeout)
+            except Exception as exc:             # connection reset, timeout, DNS
+                # Transport errors quote the URL — keep it out when labelled
+                last = type(exc).__name__ if redact else f"{type(exc).__name__}: {exc}"
+                continue
+            if status in _RETRY_STATUS:
+                last = f"HTTP {status}"
+                continue
+            if status >= 400:
+                raise RestError(f"{label}: HTTP {status}")
+            try:
+                data = json.loads(body)
+            except ValueError as exc:
+                raise RestError(f"{label}: JSON decode error: {exc}") from None
+            err = data.get("error") if isinstance(data, dict) else None
+            if err:
+                if str(err.get("code", "")).isdigit() and int(err["code"]) >= 500:
+                    last = f"REST error {err.get('code')}: {err.get('message')}"
+                    continue
+                raise RestError(f"{label}: REST error {err}")
+            if self.mode == "record":
+                self.fixtures.mkdir(parents=True, exist_ok=True)
+                with gzip.open(fixture, "wt", encoding="utf-8") as f:
+                    json.dump(data, f)
+            return data
+        raise RestError(f"{label}: gave up after {self.retries + 1} attempts ({last})")
+
+    def stream_json(self, url: str, params: dict = None, timeout: int = None,
+                    label: str = None):
+        """
+        Yield the elements of the JSON array at *url* as they are parsed.
+        Opening the response is retried like get_json(); a failure after the
+        first element has been yielded raises RestError (no silent restart).
+        """
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+        if ijson is None or self.mode == "record":
+            # record needs the whole body for the fixture anyway
+            data = self.get_json(url, params, timeout, label)
+            yield from (data if isinstance(data, list) else [data])
+            return
+
+        redact = label is not None
+        label  = label or url
+        params = dict(params or {})
+        if self.mode == "replay":
+            fixture = self._fixture(url, params)
+            if not fixture.exists():
+                raise RestError(f"no recorded response for {label} in {self.fixtures}")
+            with gzip.open(fixture, "rb") as f:
+                yield from ijson.items(f, "item", use_float=True)
+            return
+
+        last = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                wait = self.backoff * 2 ** (attempt - 1)
+                log.warning("  %s: %s — retry %d/%d in %.1fs",
+                            label, last, attempt, self.retries, wait)
+                time.sleep(wait)
+            try:
+                status, body, close = self._open(url, params, timeout or self.timeout)
+            except Exception as exc:
+                last = type(exc).__name__ if redact else f"{type(exc).__name__}: {exc}"
+                continue
+            if status in _RETRY_STATUS:
+                close()
+                last = f"HTTP {status}"
+                continue
+            if status >= 400:
+                close()
+                raise RestError(f"{label}: HTTP {status}")
+            try:
+                yield from ijson.items(body, "item", use_float=True)
+            except ijson.JSONError as exc:
+                raise RestError(f"{label}: JSON decode error: {exc}") from None
+            except Exception as exc:             # reset / timeout mid-body
+                msg = type(exc).__name__ if redact else f"{type(exc).__name__}: {exc}"
+                raise RestError(f"{label}: stream interrupted ({msg})") from None
+            finally:
+                close()
+            return
+        raise RestError(f"{label}: gave up after {self.retries + 1} attempts ({last})")
+
+    def layer_info(self, url: str) -> dict:
+        """The layer's ?f=json description (cached per client)."""
+        url = _layer_url(url)
+        if url not in self._info:
+            self._info[url] = self.get_json(url, {"f": "json"}, timeout=60)
+        return self._info[url]
+
+    def object_ids(self, url: str, where: str = "1=1") -> tuple[str, list[int]] | None:
+        """(OID field name, sorted ids matching *where*), or None if unsupported."""
+        data = self.get_json(f"{_layer_url(url)}/query",
+                             {"where": where, "returnIdsOnly": "true", "f": "json"})
+        ids = data.get("objectIds")
+        field = data.get("objectIdFieldName")
+        if ids is None or not field:
+            return None
+        return field, sorted(ids)
+
+    def query_features(self, url: str, where: str = "1=1", out_fields: str = "*",
+                       geometry: bool = False, out_sr: int = None,
+                       page_size: int = DEFAULT_PAGE) -> list[dict]:
+        """Every feature of the layer at *url* matching *where*, in OID order."""
+        url = _layer_url(url)
+        common = {"where": where, "outFields": out_fields,
+                  "returnGeometry": "true" if geometry else "false", "f": "json"}
+        if geometry and out_sr:
+            common["outSR"] = out_sr
+        name = url.split("/services/", 1)[-1]
+
+        try:
+            ids = self.object_ids(url, where)
+        except RestError as exc:
+            log.debug("  %s: ids query failed (%s) — paging by offset", name, exc)
+            ids = None
+        if ids is None:
+            return self._offset_pages(url, common, page_size, name)
+
+        field, oids = ids
+        max_rec = self.layer_info(url).get("maxRecordCount") or page_size
+        page    = max(1, min(page_size, int(max_rec)))
+        ranges  = [(oids[i], oids[min(i + page, len(oids)) - 1])
+                   for i in range(0, len(oids), page)]
+
+        def fetch(rng):
+            lo, hi = rng
+            p = {**common, "where": f"({where}) AND {field} >= {lo} AND {field} <= {hi}",
+                 "orderByFields": f"{field} ASC"}
+            data  = self.get_json(f"{url}/query", p)
+            feats = data.get("features", [])
+            if data.get("exceededTransferLimit") and feats:
+                # Server capped the page below maxRecordCount — finish by offset
+                feats = self._offset_pages(url, p, len(feats), name,
+                                           start=len(feats), first=feats)
+            return feats
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(ranges) or 1)) as pool:
+            pages = list(pool.map(fetch, ranges))
+        feats = [f for p in pages for f in p]
+        log.info("  %s: %d features in %d page(s) (%d ids)",
+                 name, len(feats), len(ranges), len(oids))
+        return feats
+
+    def _offset_pages(self, url: str, common: dict, page: int, name: str,
+                      start: int = 0, first: list = None) -> list[dict]:
+        """Sequential resultOffset paging — for layers without id queries."""
+        feats  = list(first or [])
+        offset = start
+        common = {"orderByFields": "OBJECTID ASC", **common}
+        while True:
+            data  = self.get_json(f"{url}/query",
+                                  {**common, "resultOffset": offset,
+                                   "resultRecordCount": page})
+            batch = data.get("features", [])
+            if not batch:
+                break
+            feats.extend(batch)
+            log.debug("  %s offset=%d: +%d (total %d)", name, offset, len(batch), len(feats))
+            if not data.get("exceededTransferLimit") and len(batch) < page:
+                break
+            offset += len(batch)
+        return feats
+
+
+_CLIENT: RestClient | None = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> RestClient:
+    """Return the shared client for this process."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = RestClient()
+            if _CLIENT.mode in ("record", "replay"):
+                log.info("REST client in %s mode (%s)", _CLIENT.mode, _CLIENT.fixtures)
+        return _CLIENT
+
+
+def query_features(url: str, where: str = "1=1", out_fields: str = "*",
+                   geometry: bool = False, out_sr: int = None,
+                   page_size: int = DEFAULT_PAGE) -> list[dict]:
+    return get_client().query_features(url, where, out_fields, geometry, out_sr, page_size)
+
+
+def query_frame(url: str, where: str = "1=1", out_fields: str = "*",
+                page_size: int = DEFAULT_PAGE) -> pd.DataFrame:
+    """Attributes of every matching feature as a DataFrame (no geometry)."""
+    feats = query_features(url, where, out_fields, page_size=page_size)
+    return pd.DataFrame([f.get("attributes", {}) for f in feats])
@@ -0,0 +1,135 @@
+"""
+Minimal DAG scheduler for the ETL.
+
+Steps are declared as Nodes with named inputs and outputs.  A node becomes
+ready once every node producing one of its inputs has finished; ready nodes
+run concurrently on a thread pool.  Each node's function is called with its
+inputs as keyword arguments and returns a dict of its outputs.
+
+arcpy geoprocessing is not thread-safe, so nodes that run geoprocessing
+tools (or hold a feature class open for writing) are declared exclusive=True
+and hold feature_store.ARCPY_LOCK for their whole run — the same lock the
+arcpy feature-store backend takes per call.  Pure pandas work runs alongside
+them.  A node that runs a sub-graph of its own must not be exclusive, or
+the sub-graph's exclusive nodes would wait on it forever.
+
+Usage
+-----
+    nodes = [
+        Node("load",  load,  outputs=["df"]),
+        Node("a",     a,     inputs=["df"], outputs=["a"]),
+        Node("b",     b,     inputs=["df"], outputs=["b"], exclusive=True),
+        Node("merge", merge, inputs=["a", "b"]),
+    ]
+    results = run_graph(nodes)
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import SCHEDULER_WORKERS
+from feature_store import ARCPY_LOCK
+from utils import get_logger
+
+log = get_logger("scheduler")
+
+
+class Node:
+    """One unit of work in the graph."""
+
+    def __init__(self, name: str, fn, inputs: list[str] = (),
+                 outputs: list[str] = (), exclusive: bool = False):
+        self.name      = name
+        self.fn        = fn
+        self.inputs    = tuple(inputs)
+        self.outputs   = tuple(outputs)
+        self.exclusive = exclusive
+
+    def __repr__(self) -> str:
+        return f"Node({self.name!r})"
+
+
+def _dependencies(nodes: list[Node], initial: dict) -> dict[str, set[str]]:
+    """{node name: names of nodes it waits on}.  Validates the graph."""
+    producers: dict[str, str] = {}
+    for n in nodes:
+        for out in n.outputs:
+            if out in producers:
+                raise ValueError(f"Output {out!r} produced by both "
+                                 f"{producers[out]!r} and {n.name!r}")
+            producers[out] = n.name
+
+    deps = {}
+    for n in nodes:
+        missing = [i for i in n.inputs if i not in producers and i not in initial]
+        if missing:
+            raise ValueError(f"Node {n.name!r}: no producer for inputs {missing}")
+        deps[n.name] = {producers[i] for i in n.inputs if i in producers}
+
+    # Cycle check (Kahn)
+    remaining = {k: set(v) for k, v in deps.items()}
+    while remaining:
+        ready = [k for k, v in remaining.items() if not v]
+        if not ready:
+            raise ValueError(f"Dependency cycle among {sorted(remaining)}")
+        for k in ready:
+            del remaining[k]
+        for v in remaining.values():
+            v.difference_update(ready)
+    return deps
+
+
+def _call(node: Node, kwargs: dict) -> tuple[dict, float]:
+    t0 = time.time()
+    if node.exclusive:
+        with ARCPY_LOCK:
+            out = node.fn(**kwargs)
+    else:
+        out = node.fn(**kwargs)
+    out = out or {}
+    missing = set(node.outputs) - set(out)
+    if missing:
+        raise RuntimeError(f"Node {node.name!r} did not return outputs {sorted(missing)}")
+    return out, time.time() - t0
+
+
+def run_graph(nodes: list[Node], initial: dict = None,
+              max_workers: int = SCHEDULER_WORKERS) -> dict:
+    """
+    Run *nodes* respecting their dependencies.  Returns every output produced
+    (plus *initial*).  The first node to raise cancels everything not yet
+    started, waits for running nodes to finish, then re-raises.
+    """
+    results = dict(initial or {})
+    deps    = _dependencies(nodes, results)
+    by_name = {n.name: n for n in nodes}
+    done: set[str] = set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers,
+                            thread_name_prefix="etl") as pool:
+        while len(done) < len(nodes):
+            for name, waits in deps.items():
+                if name in done or name in running.values() or not waits <= done:
+                    continue
+                node = by_name[name]
+                kwargs = {i: results[i] for i in node.inputs}
+                running[pool.submit(_call, node, kwargs)] = name
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                try:
+                    out, secs = fut.result()
+                except Exception:
+                    log.error("Node %s failed — cancelling remaining nodes", name)
+                    for other in running:
+                        other.cancel()
+                    raise
+                results.update(out)
+                done.add(name)
+                log.debug("Node %s finished in %.1fs", name, secs)
+    return results
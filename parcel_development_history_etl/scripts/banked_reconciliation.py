@@ -68,17 +68,17 @@ from __future__ import annotations
 
 import os
 import sys
-import urllib.parse
 import datetime as _dt
 from pathlib import Path
 
 import pandas as pd
-import requests
-from sqlalchemy import create_engine, text
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "erd"))
 from config import QA_DATA_DIR  # noqa: E402
-from utils import canonical_apn, get_logger  # noqa: E402
+from corral_queries import run_query  # noqa: E402
+from rest_client import query_frame  # noqa: E402
+from utils import canonical_apn_series, get_logger  # noqa: E402
 
 log = get_logger("banked_reconciliation")
 
@@ -96,11 +96,7 @@ LAYER_7_FIELDS = (
     "DateBankedOrApproved,LastUpdated"
 )
 
-CORRAL_ODBC = (
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    "SERVER=sql24;DATABASE=Corral_2026;"
-    "Trusted_Connection=yes;ApplicationIntent=ReadOnly;"
-)
+CORRAL_DATABASE = "Corral_2026"
 
 OUT_CSV = Path(QA_DATA_DIR) / "banked_reconciliation_findings.csv"
 OUT_MD = Path(QA_DATA_DIR) / "banked_reconciliation_summary.md"
@@ -148,86 +144,26 @@ def fetch_layer7() -> pd.DataFrame:
     RemainingBankedQuantity, DateBankedOrApproved, LastUpdated (epoch ms).
     """
     log.info("Fetching Cumulative_Accounting layer 7 (paginated)...")
-    rows: list[dict] = []
-    offset = 0
-    while True:
-        params = {
-            "where": "1=1",
-            "outFields": LAYER_7_FIELDS,
-            "returnGeometry": "false",
-            "f": "json",
-            "resultRecordCount": LAYER_7_PAGE_SIZE,
-            "resultOffset": offset,
-            "orderByFields": "OBJECTID ASC",
-        }
-        r = requests.get(LAYER_7_URL, params=params, timeout=120)
-        r.raise_for_status()
-        j = r.json()
-        feats = j.get("features", [])
-        if not feats:
-            break
-        rows.extend(f["attributes"] for f in feats)
-        if len(feats) < LAYER_7_PAGE_SIZE:
-            break
-        offset += LAYER_7_PAGE_SIZE
-        log.info("  fetched %d so far...", len(rows))
-    df = pd.DataFrame(rows)
+    df = query_frame(LAYER_7_URL, out_fields=LAYER_7_FIELDS, page_size=LAYER_7_PAGE_SIZE)
     log.info("  layer 7 total rows: %d", len(df))
     df["APN_raw"] = df["APN"]
-    df["apn"] = df["APN"].map(canonical_apn)
+    df["apn"] = canonical_apn_series(df["APN"])
     df["commodity"] = df["DevelopmentRight"].map(COMMODITY_MAP).fillna(df["DevelopmentRight"])
     return df
 
 
 def fetch_corral() -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Pull pci.BankedQuantity rollups and TDR transaction sums from Corral_2026."""
+    """Pull pci.BankedQuantity rollups and TDR transaction sums from Corral_2026.
+
+    Both are named queries in erd/corral_queries.py; a repeat run answers
+    from the local Parquet cache while the underlying tables are unchanged.
+    Rows arrive typed (category commodity, Float64 quantities) with the
+    canonical `apn` already added per chunk.
+    """
     log.info("Fetching Corral_2026 (ParcelCommodityInventory + vTransactedAndBanked)...")
-    odbc_url = "mssql+pyodbc:///?odbc_connect=" + urllib.parse.quote_plus(CORRAL_ODBC)
-    eng = create_engine(odbc_url, isolation_level="AUTOCOMMIT")
-
-    # 1. Banked inventory per (ParcelNumber, Commodity)
-    pci_sql = text(
-        """
-        SELECT p.ParcelNumber AS apn_raw,
-               c.CommodityName AS commodity,
-               SUM(pci.BankedQuantity) AS pci_banked,
-               SUM(ISNULL(pci.RemainingBankedQuantityAdjustment, 0)) AS pci_adj,
-               MAX(pci.LastUpdateDate) AS pci_last,
-               MIN(pci.BankedDate) AS pci_banked_date,
-               COUNT(*) AS pci_rows
-        FROM ParcelCommodityInventory pci
-        JOIN Parcel p ON pci.ParcelID = p.ParcelID
-        JOIN LandCapabilityType lct ON pci.LandCapabilityTypeID = lct.LandCapabilityTypeID
-        JOIN Commodity c ON lct.CommodityID = c.CommodityID
-        WHERE pci.BankedQuantity IS NOT NULL
-        GROUP BY p.ParcelNumber, c.CommodityName
-        """
-    )
-
-    # 2. Transaction sums per (ParcelNumber, Commodity); receiving is +, sending is -
-    # vTransactedAndBankedCommodities already encodes the sign on Quantity.
-    tx_sql = text(
-        """
-        SELECT p.ParcelNumber AS apn_raw,
-               c.CommodityName AS commodity,
-               SUM(CASE WHEN v.Quantity > 0 THEN v.Quantity ELSE 0 END) AS tx_received,
-               SUM(CASE WHEN v.Quantity < 0 THEN v.Quantity ELSE 0 END) AS tx_sent,
-               COUNT(*) AS tx_rows,
-               MAX(v.LastUpdateDate) AS tx_last
-        FROM vTransactedAndBankedCommodities v
-        JOIN Parcel p ON v.ParcelID = p.ParcelID
-        JOIN Commodity c ON v.CommodityID = c.CommodityID
-        WHERE v.ParcelAction <> 'Banked'
-        GROUP BY p.ParcelNumber, c.CommodityName
-        """
-    )
-
-    with eng.connect() as c:
-        pci = pd.read_sql(pci_sql, c)
-        tx = pd.read_sql(tx_sql, c)
+    pci = run_query("pci_banked_rollup", database=CORRAL_DATABASE)
+    tx = run_query("tx_rollup", database=CORRAL_DATABASE)
     log.info("  pci rollups: %d  tx rollups: %d", len(pci), len(tx))
-    pci["apn"] = pci["apn_raw"].map(canonical_apn)
-    tx["apn"] = tx["apn_raw"].map(canonical_apn)
     return pci, tx
 
 
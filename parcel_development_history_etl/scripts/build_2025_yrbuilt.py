@@ -20,10 +20,7 @@ Run with ArcGIS Pro Python:
     "C:/Program Files/ArcGIS/Pro/bin/Python/envs/arcgispro-py3/python.exe" \\
     parcel_development_history_etl/scripts/build_2025_yrbuilt.py
 """
-import json
 import sys
-import urllib.parse
-import urllib.request
 from pathlib import Path
 
 # Make the parent package importable when run as a script
@@ -39,7 +36,8 @@ from config import (
     ORIGINAL_YR_BUILT_CSV, PDH_2025_YRBUILT_CSV,
     PARCELS_FS,
 )
-from utils import get_logger, canonical_apn
+from rest_client import query_frame
+from utils import get_logger, canonical_apn_series
 
 log = get_logger("build_2025_yrbuilt")
 
@@ -88,7 +86,7 @@ def load_original_yr_built() -> pd.DataFrame:
                                           errors="coerce").astype("Int64")
     df = df.dropna(subset=["OriginalYrBuilt"]).copy()
 
-    df["APN_canon"] = df["APN"].apply(canonical_apn)
+    df["APN_canon"] = canonical_apn_series(df["APN"])
     n_dup = int(df["APN_canon"].duplicated().sum())
     if n_dup:
         # Same canonical key from different raw forms — keep the oldest year.
@@ -121,8 +119,8 @@ def load_genealogy() -> pd.DataFrame:
           & (g["in_fc_new"] == 1)
           & g["change_year"].notna()].copy()
     g["change_year"] = g["change_year"].astype(int)
-    g["apn_old_canon"] = g["apn_old"].apply(canonical_apn)
-    g["apn_new_canon"] = g["apn_new"].apply(canonical_apn)
+    g["apn_old_canon"] = canonical_apn_series(g["apn_old"])
+    g["apn_new_canon"] = canonical_apn_series(g["apn_new"])
     g = g.dropna(subset=["apn_old_canon", "apn_new_canon"])
     g = g[g["apn_old_canon"] != g["apn_new_canon"]]
     g = g.sort_values(["source_priority", "change_year"]).reset_index(drop=True)
@@ -139,42 +137,16 @@ def load_county_year_built() -> pd.DataFrame:
     """
     log.info("Loading county YEAR_BUILT from %s", PARCELS_FS)
 
-    base = f"{PARCELS_FS}/query"
-    params_common = {
-        "where": "YEAR_BUILT IS NOT NULL AND YEAR_BUILT > 0",
-        "outFields": "APN,YEAR_BUILT",
-        "returnGeometry": "false",
-        "orderByFields": "OBJECTID ASC",
-        "f": "json",
-    }
-
-    rows: list[dict] = []
-    offset = 0
-    page_size = 2000
-    while True:
-        params = {**params_common, "resultOffset": offset,
-                  "resultRecordCount": page_size}
-        url = f"{base}?{urllib.parse.urlencode(params)}"
-        with urllib.request.urlopen(url, timeout=60) as resp:
-            data = json.loads(resp.read())
-        features = data.get("features", [])
-        if not features:
-            break
-        for f in features:
-            a = f["attributes"]
-            rows.append({"APN": a.get("APN"), "YEAR_BUILT": a.get("YEAR_BUILT")})
-        log.info("  page offset=%d: %d rows (running total %d)",
-                 offset, len(features), len(rows))
-        if not data.get("exceededTransferLimit") and len(features) < page_size:
-            break
-        offset += page_size
-
-    df = pd.DataFrame(rows)
+    df = query_frame(PARCELS_FS, where="YEAR_BUILT IS NOT NULL AND YEAR_BUILT > 0",
+                     out_fields="APN,YEAR_BUILT")
+    if df.empty:
+        df = pd.DataFrame(columns=["APN", "YEAR_BUILT"])
+    log.info("  %d rows fetched", len(df))
     df = df.dropna(subset=["APN", "YEAR_BUILT"])
     df["APN"] = df["APN"].astype(str).str.strip()
     df["YEAR_BUILT"] = pd.to_numeric(df["YEAR_BUILT"], errors="coerce").astype("Int64")
     df = df.dropna(subset=["YEAR_BUILT"])
-    df["APN_canon"] = df["APN"].apply(canonical_apn)
+    df["APN_canon"] = canonical_apn_series(df["APN"])
 
     # If multiple raw forms canonicalize to the same APN (rare), keep the oldest.
     n_dup = int(df["APN_canon"].duplicated().sum())
@@ -244,7 +216,7 @@ def main() -> None:
     g = load_genealogy()
 
     # Canonicalize PDH APN
-    df_pdh["APN_canon"] = df_pdh[FC_APN].astype(str).str.strip().apply(canonical_apn)
+    df_pdh["APN_canon"] = canonical_apn_series(df_pdh[FC_APN].astype(str).str.strip())
 
     # Direct merge
     merged = df_pdh.merge(df_yb, on="APN_canon", how="left")
@@ -35,13 +35,13 @@ import os
 
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
 
-import arcpy
 import pandas as pd
 
 from config import (
     GENEALOGY_NOTES_1, GENEALOGY_NOTES_2, GENEALOGY_MASTER,
     OUTPUT_FC, FC_APN, FC_YEAR,
 )
+from feature_store import get_store
 
 # ── APN regex patterns ────────────────────────────────────────────────────────
 # Extended (Douglas/Tahoe): 1418-34-110-039, 1318-22-002-002
@@ -84,23 +84,13 @@ def _build_fc_year_range(apns: set) -> tuple:
     Return ({apn: last_year}, {apn: first_year}) for all specified APNs in FC.
     APNs absent from FC are not included in either dict.
     """
-    last_yr  = {}
-    first_yr = {}
-    apn_list = list(apns)
-    batch    = 500
-    print(f"  Querying FC year range for {len(apn_list):,} APNs...")
-    for i in range(0, len(apn_list), batch):
-        chunk = apn_list[i : i + batch]
-        sql   = " OR ".join(f"{FC_APN} = '{a}'" for a in chunk)
-        with arcpy.da.SearchCursor(OUTPUT_FC, [FC_APN, FC_YEAR], sql) as cur:
-            for apn, yr in cur:
-                if apn and yr:
-                    apn = str(apn).strip()
-                    yr  = int(yr)
-                    if apn not in last_yr  or yr > last_yr[apn]:
-                        last_yr[apn]  = yr
-                    if apn not in first_yr or yr < first_yr[apn]:
-                        first_yr[apn] = yr
+    print(f"  Querying FC year range for {len(apns):,} APNs...")
+    df = get_store().read_by_keys(OUTPUT_FC, [FC_APN, FC_YEAR], FC_APN, apns)
+    df = df[df[FC_APN].notna() & df[FC_YEAR].notna() & (df[FC_YEAR] != 0)]
+    df[FC_APN] = df[FC_APN].astype(str).str.strip()
+    yrs = df[FC_YEAR].astype(int).groupby(df[FC_APN])
+    last_yr  = yrs.max().to_dict()
+    first_yr = yrs.min().to_dict()
     return last_yr, first_yr
 
 
@@ -36,8 +36,6 @@ Run:
 import json
 import sys
 import datetime as _dt
-import urllib.parse
-import urllib.request
 from collections import defaultdict
 from pathlib import Path
 
@@ -52,41 +50,19 @@ from config import (
     CUMACCT_UNITS_TABLE,
     GENEALOGY_SOLVER_JSON,
 )
-from utils import canonical_apn, get_logger
+from rest_client import RestError, query_frame
+from utils import canonical_apn_series, get_logger
 
 log = get_logger("build_genealogy_solver_data")
 
 
 def fetch_service_layer(layer_url: str, where: str, out_fields: str) -> pd.DataFrame:
-    """Page through an ArcGIS REST layer/table and return its attributes as a
-    DataFrame. Mirrors the pagination pattern in build_2025_yrbuilt.py."""
-    base = f"{layer_url}/query"
-    common = {
-        "where": where,
-        "outFields": out_fields,
-        "returnGeometry": "false",
-        "orderByFields": "OBJECTID ASC",
-        "f": "json",
-    }
-    rows: list[dict] = []
-    offset, page = 0, 2000
-    while True:
-        params = {**common, "resultOffset": offset, "resultRecordCount": page}
-        url = f"{base}?{urllib.parse.urlencode(params)}"
-        with urllib.request.urlopen(url, timeout=120) as resp:
-            data = json.loads(resp.read())
-        if "error" in data:
-            raise SystemExit(f"REST error from {layer_url}: {data['error']}")
-        feats = data.get("features", [])
-        if not feats:
-            break
-        rows.extend(f["attributes"] for f in feats)
-        log.info("  %s offset=%d: +%d (total %d)",
-                 layer_url.rsplit("/", 1)[-1], offset, len(feats), len(rows))
-        if not data.get("exceededTransferLimit") and len(feats) < page:
-            break
-        offset += page
-    return pd.DataFrame(rows)
+    """Fetch every matching row of an ArcGIS REST layer/table as a DataFrame
+    of attributes (rest_client pages it concurrently)."""
+    try:
+        return query_frame(layer_url, where=where, out_fields=out_fields)
+    except RestError as exc:
+        raise SystemExit(str(exc))
 
 
 def _to_int_or_none(v):
@@ -119,8 +95,8 @@ def main() -> None:
     log.info("  %d edge rows", len(gen))
 
     # Canonicalize APN endpoints; drop rows missing either endpoint.
-    gen["apn_old"] = gen["apn_old"].apply(canonical_apn)
-    gen["apn_new"] = gen["apn_new"].apply(canonical_apn)
+    gen["apn_old"] = canonical_apn_series(gen["apn_old"])
+    gen["apn_new"] = canonical_apn_series(gen["apn_new"])
     before = len(gen)
     gen = gen[gen["apn_old"].notna() & gen["apn_new"].notna()].copy()
     log.info("  %d rows after dropping null-endpoint edges (-%d)",
@@ -166,7 +142,7 @@ def main() -> None:
     # COMBINED_YEAR_BUILT. VERIFY this is the original/combined year built and
     # not county-source - if wrong, swap to Layer 2 Original_Year_Built.
     pdh = pdh.rename(columns={"YEAR_BUILT": "COMBINED_YEAR_BUILT"})
-    pdh["APN_canon"] = pdh["APN"].apply(canonical_apn)
+    pdh["APN_canon"] = canonical_apn_series(pdh["APN"])
     pdh = pdh[pdh["APN_canon"].notna()].drop_duplicates(subset=["APN_canon"])
     pdh = pdh[["APN_canon", "Residential_Units", "TouristAccommodation_Units",
                "CommercialFloorArea_SqFt", "COUNTY", "JURISDICTION",
@@ -177,7 +153,7 @@ def main() -> None:
     units = fetch_service_layer(
         CUMACCT_UNITS_TABLE, "Address IS NOT NULL", "APN_canon,Address")
     log.info("  %d unit rows", len(units))
-    units["APN_canon"] = units["APN_canon"].apply(canonical_apn)
+    units["APN_canon"] = canonical_apn_series(units["APN_canon"])
     addr_by_apn = (units.dropna(subset=["APN_canon", "Address"])
                         .groupby("APN_canon")["Address"]
                         .agg(lambda s: s.mode().iloc[0] if not s.mode().empty else None)
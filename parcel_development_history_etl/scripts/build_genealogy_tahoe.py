@@ -84,7 +84,7 @@ from config import (
 
 # Output path — honors config so relocated data dirs (raw_data vs qa_data) work.
 OUT = Path(GENEALOGY_TAHOE)
-from utils import el_pad as _pad, el_depad as _depad, _EL_2D as _2D, _EL_3D as _3D
+from utils import apn_forms
 
 
 # ── El Dorado lookup ──────────────────────────────────────────────────────────
@@ -95,29 +95,28 @@ def _build_el_dorado_canon(fc: str) -> dict:
     Returns dict mapping any El Dorado APN format -> canonical 3-digit form.
     """
     print("Building El Dorado canonical lookup from FC...")
-    el_2d, el_3d = set(), set()
     with arcpy.da.SearchCursor(fc, [FC_APN, FC_COUNTY]) as cur:
-        for apn, county in cur:
-            if county == "EL" and apn:
-                a = str(apn).strip()
-                if _2D.match(a):   el_2d.add(a)
-                elif _3D.match(a): el_3d.add(a)
+        apns = pd.Series(sorted({str(apn).strip() for apn, county in cur
+                                 if county == "EL" and apn}), dtype=object)
+    forms = apn_forms(apns, ["el_pad", "is_el_2d", "is_el_3d"])
+    el_2d = apns[forms["is_el_2d"]]
+    el_3d = apns[forms["is_el_3d"]]
+    padded = forms.loc[forms["is_el_2d"], "el_pad"]
 
     canon = {}
-    for a in el_2d:
-        canon[a]       = _pad(a)   # 2-digit -> 3-digit canonical
-        canon[_pad(a)] = _pad(a)   # also map the 3-digit version of itself
-    for a in el_3d:
-        canon[a] = a               # already canonical
+    canon.update(zip(el_2d, padded))     # 2-digit -> 3-digit canonical
+    canon.update(zip(padded, padded))    # also map the 3-digit version of itself
+    canon.update(zip(el_3d, el_3d))      # already canonical
     print(f"  El Dorado 2-digit: {len(el_2d):,}  3-digit: {len(el_3d):,}  "
           f"canon entries: {len(canon):,}")
     return canon
 
 
-def _canon(apn: str, el_canon: dict) -> str:
-    """Canonicalize a single APN. El Dorado 2-digit -> 3-digit; others unchanged."""
-    a = str(apn).strip()
-    return el_canon.get(a, a)
+def _canon(apns: pd.Series, el_canon: dict) -> pd.Series:
+    """Canonicalize a column of APNs. El Dorado 2-digit -> 3-digit; others unchanged."""
+    a = pd.Series(apns, dtype=object).astype(str).str.strip()
+    mapped = a.map(el_canon)
+    return mapped.where(mapped.notna(), a)
 
 
 # ── Load sources ──────────────────────────────────────────────────────────────
@@ -152,13 +151,12 @@ def _load_source(name: str, path: str, priority: int, confidence: str,
     df["apn_new_raw"] = df["new_apn"]
 
     # Canonical
-    df["apn_old"] = df["old_apn"].apply(lambda a: _canon(a, el_canon))
-    df["apn_new"] = df["new_apn"].apply(lambda a: _canon(a, el_canon))
+    df["apn_old"] = _canon(df["old_apn"], el_canon)
+    df["apn_new"] = _canon(df["new_apn"], el_canon)
 
     # El Dorado flag: apn_old is in El Dorado if its raw or canonical form is in el_canon
-    df["is_el_dorado"] = df.apply(
-        lambda r: 1 if (r["old_apn"] in el_canon or r["apn_old"] in el_canon.values())
-        else 0, axis=1)
+    df["is_el_dorado"] = (df["old_apn"].isin(el_canon.keys())
+                          | df["apn_old"].isin(set(el_canon.values()))).astype(int)
 
     # Source metadata
     df["source"]          = name
@@ -215,11 +213,9 @@ def _load_source(name: str, path: str, priority: int, confidence: str,
 
 def _fc_apn_set(fc: str, el_canon: dict) -> set:
     print("Reading FC APN set for in_fc_old / in_fc_new validation...")
-    apns = set()
     with arcpy.da.SearchCursor(fc, [FC_APN]) as cur:
-        for (a,) in cur:
-            if a:
-                apns.add(_canon(str(a).strip(), el_canon))
+        raw = [a for (a,) in cur if a]
+    apns = set(_canon(raw, el_canon))
     print(f"  Unique canonical APNs in FC: {len(apns):,}")
     return apns
 
@@ -230,9 +226,8 @@ def _lost_apn_set(el_canon: dict) -> set:
     lost = set()
     try:
         with arcpy.da.SearchCursor(QA_LOST_APNS, ["APN"]) as cur:
-            for (a,) in cur:
-                if a:
-                    lost.add(_canon(str(a).strip(), el_canon))
+            raw = [a for (a,) in cur if a]
+        lost = set(_canon(raw, el_canon))
         print(f"  QA_Lost_APNs: {len(lost):,} confirmed lost APNs")
     except Exception as e:
         print(f"  WARNING: Could not read QA_Lost_APNs: {e}")
@@ -46,6 +46,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 import arcpy
+import numpy as np
 import pandas as pd
 
 from config import (
@@ -60,7 +61,8 @@ from config import (
     TRANSACTIONS_2025_XLSX,
     BUILDINGS_WITH_UNITS_JSON,
 )
-from utils import get_logger, canonical_apn
+from unit_matrix import load_history
+from utils import get_logger, canonical_apn, canonical_apn_series
 
 log = get_logger("build_residential_units_inventory")
 
@@ -82,13 +84,44 @@ def load_pdh_2025_yrbuilt() -> pd.DataFrame:
 
 
 # ── 2. Year_Redeveloped detection from year-by-year unit history ─────────────
+def _redeveloped(apn_canon: pd.Series, values: np.ndarray, years: list) -> dict:
+    """
+    {APN_canon: year} for rows of *values* (APN x year, columns in year
+    order) where units went 0 -> >0 after an earlier non-zero year.  The
+    most recent rebuild year wins, also across raw APNs sharing a canon.
+    """
+    if values.shape[1] < 2:
+        return {}
+    nz      = values > 0
+    seen    = np.logical_or.accumulate(nz, axis=1)
+    rebuild = (values[:, :-1] == 0) & nz[:, 1:] & seen[:, :-1]
+    hit     = rebuild.any(axis=1)
+    last    = rebuild.shape[1] - 1 - np.argmax(rebuild[:, ::-1], axis=1)
+    yrs     = np.asarray(years[1:])[last[hit]]
+    canon   = apn_canon.to_numpy()[hit]
+    ok      = pd.notna(canon) & (canon != "")
+    return (pd.Series(yrs[ok], index=canon[ok]).groupby(level=0).max()
+              .astype(int).to_dict())
+
+
 def detect_year_redeveloped() -> dict:
     """
-    Scan Final2026_Residential.csv (wide format APN × year). Return a dict
-    {APN_canon: year_redeveloped} for parcels whose units dropped to 0 and
-    came back up after at least one earlier non-zero year. The most recent
-    rebuild year wins for multi-redev parcels.
+    Return a dict {APN_canon: year_redeveloped} for parcels whose units
+    dropped to 0 and came back up after at least one earlier non-zero year.
+    The most recent rebuild year wins for multi-redev parcels.
+
+    Uses the ETL's APN x Year unit matrix (unit_matrix.py) when it has been
+    built, otherwise scans Final2026_Residential.csv (wide format APN × year).
     """
+    hist = load_history()
+    if hist is not None:
+        log.info("Using unit matrix: %d APNs x %d years", len(hist), len(hist.years))
+        canon = canonical_apn_series(pd.Series(hist.apns, dtype=object))
+        redev = _redeveloped(canon, np.asarray(hist["Residential_Units"].values),
+                             hist.years.tolist())
+        log.info("  %d parcels show a redevelopment (unit-count rebuild) pattern", len(redev))
+        return redev
+
     log.info("Loading year-by-year unit history: %s", CSV_PATH)
     df = pd.read_csv(CSV_PATH)
     year_cols = [c for c in df.columns if "Final" in c]
@@ -106,29 +139,11 @@ def detect_year_redeveloped() -> dict:
 
     apn_col = "APN"
     df[apn_col] = df[apn_col].astype(str).str.strip()
-    df["APN_canon"] = df[apn_col].apply(canonical_apn)
-    # Coerce all unit columns to int
-    for c in year_cols:
-        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(int)
-
-    redev: dict = {}
-    seen_nonzero = pd.Series(False, index=df.index)
-    prev_col = year_cols[0]
-    # Initialize seen_nonzero from first year
-    seen_nonzero = df[prev_col] > 0
-    for i in range(1, len(year_cols)):
-        cur_col = year_cols[i]
-        cur_yr = years[i]
-        # Rebuild = prior was 0, current is non-zero, and SOMEWHERE earlier was non-zero
-        prev = df[prev_col]
-        cur = df[cur_col]
-        is_rebuild = (prev == 0) & (cur > 0) & seen_nonzero
-        for apn in df.loc[is_rebuild, "APN_canon"]:
-            if apn:
-                redev[apn] = cur_yr  # overwrite — most recent year wins
-        seen_nonzero = seen_nonzero | (cur > 0)
-        prev_col = cur_col
+    df["APN_canon"] = canonical_apn_series(df[apn_col])
+    values = (df[year_cols].apply(pd.to_numeric, errors="coerce")
+                .fillna(0).astype(int).to_numpy())
 
+    redev = _redeveloped(df["APN_canon"], values, years)
     log.info("  %d parcels show a redevelopment (unit-count rebuild) pattern", len(redev))
     return redev
 
@@ -141,8 +156,8 @@ def build_previous_apns_map() -> dict:
     """
     log.info("Loading genealogy: %s", GENEALOGY_TAHOE)
     g = pd.read_csv(GENEALOGY_TAHOE, dtype=str)
-    g["apn_old_canon"] = g["apn_old"].apply(canonical_apn)
-    g["apn_new_canon"] = g["apn_new"].apply(canonical_apn)
+    g["apn_old_canon"] = canonical_apn_series(g["apn_old"])
+    g["apn_new_canon"] = canonical_apn_series(g["apn_new"])
     g = g.dropna(subset=["apn_old_canon", "apn_new_canon"])
     g = g[g["apn_old_canon"] != g["apn_new_canon"]]
 
@@ -262,7 +277,7 @@ def build_status_maps() -> tuple[dict, dict]:
     df = pd.read_excel(TRANSACTIONS_2025_XLSX, sheet_name=0, dtype=str)
     df.columns = [c.strip() for c in df.columns]
     df["APN"] = df["APN"].astype(str).str.strip()
-    df["APN_canon"] = df["APN"].apply(canonical_apn)
+    df["APN_canon"] = canonical_apn_series(df["APN"])
     df = df.dropna(subset=["APN_canon"])
 
     df["_source"] = df.apply(
@@ -309,7 +324,7 @@ def build_permit_map() -> dict:
     df = pd.read_excel(TRANSACTIONS_2025_XLSX, sheet_name=0, dtype=str)
     df.columns = [c.strip() for c in df.columns]
     df["APN"] = df["APN"].astype(str).str.strip()
-    df["APN_canon"] = df["APN"].apply(canonical_apn)
+    df["APN_canon"] = canonical_apn_series(df["APN"])
     df = df.dropna(subset=["APN_canon"])
 
     out: dict[str, str] = {}
@@ -351,7 +366,7 @@ def build_transaction_id_map() -> dict:
     df["TransactionID"] = df["TransactionID"].astype(str).str.strip()
     # Filter to rows with a non-empty TransactionID
     df = df[df["TransactionID"].notna() & (df["TransactionID"] != "") & (df["TransactionID"] != "nan")]
-    df["APN_canon"] = df["APN"].apply(canonical_apn)
+    df["APN_canon"] = canonical_apn_series(df["APN"])
     df = df.dropna(subset=["APN_canon"])
 
     tx: dict[str, list[str]] = {}
@@ -43,11 +43,13 @@ sys.path.insert(0, str(Path(__file__).parents[1]))
 import arcpy
 
 from config import (
-    WORKING_FC as SOURCE_FC, FC_APN, FC_YEAR, CSV_YEARS,
+    WORKING_FC as SOURCE_FC, CSV_YEARS,
     GDB,
     GENEALOGY_SPATIAL,
     SPATIAL_GENEALOGY_OVERLAP_THRESHOLD,
 )
+from feature_store import OID
+from geometry_catalog import get_catalog
 
 import logging
 logging.basicConfig(
@@ -66,24 +68,13 @@ _MEM     = "memory"
 
 def _read_apn_geometry(year: int) -> dict:
     """
-    Read SOURCE_FC for one year and return {APN: (geometry, area_sqft)}.
-    Duplicate APNs (if any) keep the first row encountered.
+    SOURCE_FC polygons for one year from the geometry catalog, as
+    {APN: (geometry, area_sqft)}.  Duplicate APNs (if any) keep the lowest OID.
     """
-    result = {}
-    lyr = f"sgen_src_{year}"
-    if arcpy.Exists(lyr):
-        arcpy.management.Delete(lyr)
-    arcpy.management.MakeFeatureLayer(SOURCE_FC, lyr, f"{FC_YEAR} = {year}")
-
-    with arcpy.da.SearchCursor(lyr, [FC_APN, "SHAPE@", "SHAPE@AREA"]) as cur:
-        for apn, geom, area in cur:
-            if apn and geom and area and area > 0:
-                apn = str(apn).strip()
-                if apn not in result:
-                    result[apn] = (geom, float(area))
-
-    if arcpy.Exists(lyr):
-        arcpy.management.Delete(lyr)
+    df = get_catalog(SOURCE_FC).select(years=[year]).sort_values(OID, kind="stable")
+    df = df.drop_duplicates(subset="APN", keep="first")
+    result = {apn: (arcpy.FromWKB(bytearray(wkb)), float(area))
+              for apn, wkb, area in zip(df["APN"], df["WKB"], df["AREA"])}
 
     log.info("  Year %d : %d unique APNs with geometry", year, len(result))
     return result
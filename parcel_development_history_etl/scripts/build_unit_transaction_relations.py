@@ -40,7 +40,7 @@ from config import (
     TRANSACTIONS_2025_XLSX,
     RESIDENTIAL_UNIT_TRANSACTIONS_CSV,
 )
-from utils import get_logger, canonical_apn
+from utils import get_logger, canonical_apn_series
 
 log = get_logger("build_unit_transaction_relations")
 
@@ -104,7 +104,7 @@ def main() -> None:
 
     # Canonicalize APN for sanity-check cross-reference
     if "APN" in tx.columns:
-        tx["APN_canon_tx"] = tx["APN"].astype(str).str.strip().apply(canonical_apn)
+        tx["APN_canon_tx"] = canonical_apn_series(tx["APN"].astype(str).str.strip())
 
     # Reduce to the columns we want; rename
     keep_cols = [c for c in TX_COLUMN_MAP if c in tx.columns]
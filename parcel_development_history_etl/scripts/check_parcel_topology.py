@@ -34,6 +34,7 @@ from config import (
     WORKING_FC as SOURCE_FC, FC_APN, FC_YEAR, CSV_YEARS, GDB,
     QA_TOPO_DUPLICATE, QA_TOPO_OVERLAP, QA_TOPO_AREA_SHIFT,
 )
+from geometry_catalog import get_catalog
 
 import logging
 logging.basicConfig(
@@ -193,14 +194,11 @@ def check_area_continuity(years: list[int]) -> list[dict]:
     """
     log.info("Check 3: Area discontinuity for stable APNs ...")
 
-    area_map: dict[tuple, float] = {}
-    with arcpy.da.SearchCursor(
-            SOURCE_FC, [FC_APN, FC_YEAR, "SHAPE@AREA"]) as cur:
-        for apn, year, area in cur:
-            if apn and year is not None and area and area > 0:
-                key = (str(apn).strip(), int(year))
-                if key not in area_map or area > area_map[key]:
-                    area_map[key] = float(area)
+    # Areas come from the geometry catalog, so no SHAPE@ scan here
+    df = get_catalog(SOURCE_FC).select()
+    df = df[df["Year"].notna()]
+    area_map: dict[tuple, float] = (
+        df.groupby(["APN", df["Year"].astype(int)])["AREA"].max().astype(float).to_dict())
 
     apns_by_year: dict[int, set] = defaultdict(set)
     for (apn, year) in area_map:
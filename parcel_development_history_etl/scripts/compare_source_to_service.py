@@ -45,6 +45,7 @@ from config import (
     ALLPARCELS_URL, YEAR_LAYER,
     QA_SOURCE_VS_SERVICE,
 )
+from service_cache import load_layer
 
 import logging
 logging.basicConfig(
@@ -80,32 +81,20 @@ def _service_apns(year: int) -> set[str]:
         return set()
 
     url = f"{ALLPARCELS_URL}/{layer_idx}"
-    lyr = f"svc_{year}"
-    if arcpy.Exists(lyr):
-        arcpy.management.Delete(lyr)
-
     try:
-        arcpy.management.MakeFeatureLayer(url, lyr)
+        df = load_layer(url, geometry=False)
     except Exception as exc:
         log.error("Cannot connect to service layer for %d: %s", year, exc)
         return set()
 
-    field_map = {f.name.upper(): f.name for f in arcpy.ListFields(lyr)}
+    field_map = {c.upper(): c for c in df.columns}
     apn_fld   = field_map.get(FC_APN.upper())
     if not apn_fld:
         log.error("APN field '%s' not found in year-%d service layer. "
                   "Available: %s", FC_APN, year, sorted(field_map.values()))
-        arcpy.management.Delete(lyr)
         return set()
 
-    apns = set()
-    with arcpy.da.SearchCursor(lyr, [apn_fld]) as cur:
-        for (apn,) in cur:
-            if apn:
-                apns.add(_norm(str(apn).strip()))
-
-    arcpy.management.Delete(lyr)
-    return apns
+    return {_norm(str(apn).strip()) for apn in df[apn_fld] if apn}
 
 
 # ── Source FC reader ──────────────────────────────────────────────────────────
@@ -87,6 +87,10 @@ def _create_working_copy() -> None:
         )
     log.info("Working copy verified: %s  (%d rows)", WORKING_FC, copy_count)
 
+    # The copy gets OIDs 1..N again — drop any geometry cached from the old one
+    from geometry_catalog import invalidate
+    invalidate(WORKING_FC)
+
 
 def _run_p0() -> None:
     log.info("-" * 60)
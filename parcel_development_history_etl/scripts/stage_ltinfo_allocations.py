@@ -39,9 +39,25 @@ Defaults point at `STAGING_GDB` so the script runs end-to-end on the analyst's
 workstation without an SDE connection. Repoint the constants at SDE paths
 once direct SDE write is wired in.
 
+Loads are incremental. Each pipeline names its natural key; incoming rows
+are matched to the staging table on that key and compared by row hash, and
+only the inserted / updated / deleted rows are written, inside one edit
+operation (a failure rolls the whole delta back). Readers never see an empty
+table, and nightly write volume follows the true change rate. Keys that are
+not unique in the feed are matched row-for-row on hash within the key.
+Pass `--full` to fall back to a full reload (delete every row, insert the
+feed), also inside one edit operation so a feed that fails mid-stream leaves
+the previous contents in place.
+
+Responses are parsed as a stream (rest_client.stream_json): rows are coerced
+as they arrive and only changed rows are held until the write, so memory
+stays flat as the endpoints grow. Inserts go to the cursor in
+LTINFO_INSERT_CHUNK-row chunks.
+
 Each refresh stamps a row in `LTINFO_REFRESH_LOG_TABLE` with the timestamp,
-endpoint, target, row count, and status. Failures stamp status `ERROR` with
-the message; the log is the single source of truth for freshness monitoring.
+endpoint, target, row count, delta counts, and status. Failures stamp status
+`ERROR` with the message; the log is the single source of truth for
+freshness monitoring.
 
 Conventions (`Reporting/CLAUDE.md`): `config.py` constants, `get_logger`,
 `arcpy` (not geopandas) for SDE writes, no hardcoded paths, no em-dashes,
@@ -54,12 +70,12 @@ no staff names. Run with the full `arcgispro-py3` Python path:
 
 from __future__ import annotations
 
-import json
+import hashlib
 import os
 import sys
 import time
-import urllib.error
-import urllib.request
+from collections import Counter, defaultdict
+from itertools import chain, islice
 from datetime import datetime
 from pathlib import Path
 
@@ -82,7 +98,9 @@ from config import (  # noqa: E402
     LTINFO_BANKED_TABLE,
     LTINFO_TRANSACTED_BANKED_TABLE,
     LTINFO_REFRESH_LOG_TABLE,
+    LTINFO_INSERT_CHUNK,
 )
+from rest_client import get_client  # noqa: E402
 from utils import get_logger  # noqa: E402
 
 log = get_logger("stage_ltinfo")
@@ -201,13 +219,18 @@ REFRESH_LOG_FIELDS = [
     ("RowsLoaded",   "LONG", None),
     ("Status",       "TEXT",  20),
     ("ErrorMessage", "TEXT", 500),
+    ("RowsInserted", "LONG", None),
+    ("RowsUpdated",  "LONG", None),
+    ("RowsDeleted",  "LONG", None),
 ]
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # PIPELINE REGISTRY  (drives main())
 # ─────────────────────────────────────────────────────────────────────────────
-# Each entry: friendly name, LT Info endpoint, target staging table, schema.
+# Each entry: friendly name, LT Info endpoint, target staging table, schema,
+# and natural key (SDE field names) for the delta load. The key need not be
+# strictly unique - duplicate-key groups are diffed as a unit.
 # Order = run order. To add a pipeline: define schema above, add entry here.
 
 PIPELINES = [
@@ -216,24 +239,28 @@ PIPELINES = [
         "endpoint": LTINFO_POOL_BALANCE_ENDPOINT,
         "target":   LTINFO_POOL_BALANCE_TABLE,
         "fields":   POOL_BALANCE_FIELDS,
+        "key":      ["DevelopmentRightPoolName", "DevelopmentRight", "Jurisdiction"],
     },
     {
         "name":     "Development Right Transactions",
         "endpoint": LTINFO_TRANSACTIONS_ENDPOINT,
         "target":   LTINFO_TRANSACTIONS_TABLE,
         "fields":   TRANSACTIONS_FIELDS,
+        "key":      ["Transaction"],
     },
     {
         "name":     "Banked Development Rights",
         "endpoint": LTINFO_BANKED_ENDPOINT,
         "target":   LTINFO_BANKED_TABLE,
         "fields":   BANKED_FIELDS,
+        "key":      ["APN", "DevelopmentRight", "Status"],
     },
     {
         "name":     "Transacted and Banked Development Rights",
         "endpoint": LTINFO_TRANSACTED_BANKED_ENDPOINT,
         "target":   LTINFO_TRANSACTED_BANKED_TABLE,
         "fields":   TRANSACTED_BANKED_FIELDS,
+        "key":      ["APN", "RecordType", "TransactionNumber", "DevelopmentRight"],
     },
 ]
 
@@ -259,8 +286,8 @@ def get_api_key() -> str:
     return key
 
 
-def fetch_endpoint(endpoint: str, api_key: str) -> list[dict]:
-    """GET an LT Info JSON endpoint and parse the response.
+def fetch_endpoint(endpoint: str, api_key: str):
+    """GET an LT Info JSON endpoint and yield its rows as they are parsed.
 
     Raises RuntimeError on any HTTP / parse / shape problem so the caller
     (main()) can catch per-pipeline and continue with the others.
@@ -268,30 +295,23 @@ def fetch_endpoint(endpoint: str, api_key: str) -> list[dict]:
     url = f"{LTINFO_BASE_URL.rstrip('/')}/{endpoint}/JSON/{api_key}"
     safe_url = url.replace(api_key, "<token>")  # never log the token
     log.info(f"GET {safe_url}")
-    try:
-        with urllib.request.urlopen(url, timeout=120) as resp:
-            raw = resp.read().decode("utf-8")
-        payload = json.loads(raw)
-    except urllib.error.HTTPError as e:
-        raise RuntimeError(f"HTTP {e.code}: {e.reason}")
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"URL error: {e.reason}")
-    except json.JSONDecodeError as e:
-        raise RuntimeError(f"JSON decode error: {e}")
-    if not isinstance(payload, list):
-        raise RuntimeError(
-            f"unexpected payload shape: expected list, got {type(payload).__name__}"
-        )
-    log.info(f"  fetched {len(payload):,} rows")
-    return payload
-
-
-def verify_schema(rows: list[dict], fields: list[tuple]) -> None:
-    """Sanity check the response shape. Raises RuntimeError on hard mismatch."""
-    if not rows:
+    # RestError is a RuntimeError; transient failures are retried first
+    for row in get_client().stream_json(url, label=safe_url):
+        if not isinstance(row, dict):
+            raise RuntimeError(
+                f"unexpected payload shape: expected list of objects, "
+                f"got {type(row).__name__}"
+            )
+        yield row
+
+
+def verify_schema(first: dict | None, fields: list[tuple]) -> None:
+    """Sanity check the response shape on its first row. Raises RuntimeError
+    on hard mismatch."""
+    if first is None:
         raise RuntimeError("0 rows in response - refusing to truncate target")
     expected = {f_json_key(f) for f in fields}
-    actual = set(rows[0].keys())
+    actual = set(first.keys())
     missing = expected - actual
     if missing:
         raise RuntimeError(f"response missing expected fields: {sorted(missing)}")
@@ -301,12 +321,18 @@ def verify_schema(rows: list[dict], fields: list[tuple]) -> None:
 
 
 def ensure_table(table_path: str, fields: list[tuple]) -> None:
-    """Create the staging table if it does not exist."""
-    if arcpy.Exists(table_path):
-        return
+    """Create the staging table if it does not exist, and add any schema
+    fields an existing table lacks (e.g. new refresh-log columns)."""
     gdb, tname = os.path.split(table_path)
-    log.info(f"  creating staging table {tname} in {gdb}")
-    arcpy.management.CreateTable(gdb, tname)
+    if arcpy.Exists(table_path):
+        have = {fld.name.lower() for fld in arcpy.ListFields(table_path)}
+        fields = [f for f in fields if f_name(f).lower() not in have]
+        if not fields:
+            return
+        log.info(f"  adding {len(fields)} field(s) to {tname}")
+    else:
+        log.info(f"  creating staging table {tname} in {gdb}")
+        arcpy.management.CreateTable(gdb, tname)
     for f in fields:
         name, ftype, flen = f_name(f), f_type(f), f_len(f)
         if ftype == "TEXT" and flen:
@@ -315,44 +341,182 @@ def ensure_table(table_path: str, fields: list[tuple]) -> None:
             arcpy.management.AddField(table_path, name, ftype)
 
 
-def coerce(val, ftype: str):
-    """Type-coerce a JSON value to what arcpy InsertCursor expects."""
-    if val is None or val == "":
-        return None
-    if ftype == "LONG":
-        try:
-            return int(val)
-        except (ValueError, TypeError):
-            return None
-    if ftype == "DOUBLE":
-        try:
-            return float(val)
-        except (ValueError, TypeError):
-            return None
-    return val  # TEXT / DATE / etc. pass through
+# Per-type casts. Each returns the value in the form the table stores it
+# (TEXT as str), so incoming tuples compare equal to rows read back from the
+# table. None / "" never reach a cast.
+_CASTS = {
+    "LONG":   int,
+    "DOUBLE": float,
+    "TEXT":   str,
+}
 
 
-def build_tuples(rows: list[dict], fields: list[tuple]) -> list[tuple]:
-    """Build (value, ...) tuples matching field order, with JSON-key lookup
-    and type coercion."""
-    return [
-        tuple(coerce(r.get(f_json_key(f)), f_type(f)) for f in fields)
-        for r in rows
-    ]
+class RowConverter:
+    """A schema's field list compiled once into a per-row converter.
 
+    Calling the converter on a JSON row returns the insert-ready tuple.
+    Values that fail their cast become None and are counted per column in
+    `failures` instead of disappearing silently.
+    """
 
-def truncate_and_insert(table_path: str, field_names: list[str],
-                        tuples: list[tuple]) -> None:
-    """Truncate the target table and bulk insert."""
-    arcpy.management.TruncateTable(table_path)
+    def __init__(self, fields: list[tuple]):
+        self.names = [f_name(f) for f in fields]
+        self.plan  = tuple(
+            (f_json_key(f), _CASTS.get(f_type(f)), i)
+            for i, f in enumerate(fields)
+        )
+        self.failures = Counter()
+
+    def __call__(self, row: dict) -> tuple:
+        out = []
+        for key, cast, i in self.plan:
+            val = row.get(key)
+            if val is None or val == "":
+                out.append(None)
+            elif cast is None:                      # DATE etc. pass through
+                out.append(val)
+            else:
+                try:
+                    out.append(cast(val))
+                except (ValueError, TypeError):
+                    self.failures[self.names[i]] += 1
+                    out.append(None)
+        return tuple(out)
+
+    def report(self) -> str:
+        """Log the per-column coercion failure counts, if any, and return
+        them as one line for the refresh log ("" when clean)."""
+        if not self.failures:
+            return ""
+        detail = ", ".join(f"{c}={n:,}" for c, n in self.failures.most_common())
+        log.warning(f"  coercion failures (stored as NULL): {detail}")
+        return f"coercion failures: {detail}"[:500]
+
+
+def build_tuples(rows, convert: RowConverter):
+    """Yield insert-ready tuples from JSON rows, one converter call per row."""
+    return map(convert, rows)
+
+
+def chunked(rows, size: int = LTINFO_INSERT_CHUNK):
+    """Yield lists of up to *size* rows from any iterable."""
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def insert_rows(table_path: str, field_names: list[str], tuples) -> int:
+    """Insert *tuples* (any iterable) chunk by chunk. Returns the row count."""
+    n = 0
     with arcpy.da.InsertCursor(table_path, field_names) as cur:
-        for row in tuples:
-            cur.insertRow(row)
+        for chunk in chunked(tuples):
+            for row in chunk:
+                cur.insertRow(row)
+            n += len(chunk)
+            log.debug(f"  inserted {n:,} rows")
+    return n
+
+
+def truncate_and_insert(table_path: str, field_names: list[str],
+                        tuples) -> int:
+    """Replace every row of the target with *tuples* in one edit operation.
+
+    *tuples* is usually the live response stream, so the old rows are
+    deleted with a cursor inside the same edit operation as the insert
+    (TruncateTable cannot run in an edit session): if the stream fails
+    mid-body the whole reload rolls back. Returns the row count."""
+    workspace = os.path.dirname(table_path)
+    with arcpy.da.Editor(workspace):
+        with arcpy.da.UpdateCursor(table_path, ["OID@"]) as cur:
+            for _ in cur:
+                cur.deleteRow()
+        return insert_rows(table_path, field_names, tuples)
+
+
+def row_hash(row: tuple) -> bytes:
+    """Stable digest of one row's values. RowConverter output and rows read
+    back from the table share types, so equal rows hash equal."""
+    return hashlib.sha1(repr(tuple(row)).encode("utf-8")).digest()
+
+
+def compute_delta(table_path: str, fields: list[tuple], key: list[str],
+                  tuples) -> tuple[list, dict, set, int]:
+    """Diff incoming rows (any iterable) against the staging table on the
+    natural key.
+
+    The table is read first as {key: [(oid, hash)]}; incoming rows are then
+    consumed one at a time and kept only when their hash has no unmatched
+    twin under the same key, so unchanged rows cost nothing to hold.
+    Within a key, unmatched old / new rows pair up as in-place updates; the
+    surplus becomes deletes or inserts.
+
+    Returns (inserts, updates {oid: row}, deletes {oid}, incoming row count).
+    """
+    names  = [f_name(f) for f in fields]
+    kpos   = [names.index(k) for k in key]
+
+    def key_of(row):
+        return tuple(row[i] for i in kpos)
+
+    old = defaultdict(list)
+    with arcpy.da.SearchCursor(table_path, ["OID@"] + names) as cur:
+        for oid, *row in cur:
+            old[key_of(row)].append((oid, row_hash(row)))
+    unmatched = {k: Counter(h for _, h in have) for k, have in old.items()}
+
+    changed = defaultdict(list)                 # key -> new rows not in table
+    n = 0
+    for row in tuples:
+        n += 1
+        k, h = key_of(row), row_hash(row)
+        left = unmatched.get(k)
+        if left and left[h] > 0:
+            left[h] -= 1
+        else:
+            changed[k].append(row)
+
+    inserts, updates, deletes = [], {}, set()
+    for k, have in old.items():
+        left = unmatched[k]
+        stale = []
+        for oid, h in have:
+            if left[h] > 0:
+                left[h] -= 1
+                stale.append(oid)
+        rows = changed.pop(k, [])
+        for oid, row in zip(stale, rows):
+            updates[oid] = row
+        deletes.update(stale[len(rows):])
+        inserts.extend(rows[len(stale):])
+    for rows in changed.values():               # keys new to the table
+        inserts.extend(rows)
+    return inserts, updates, deletes, n
+
+
+def apply_delta(table_path: str, field_names: list[str], inserts: list,
+                updates: dict, deletes: set) -> None:
+    """Write the delta in one edit operation - all of it or none of it."""
+    if not (inserts or updates or deletes):
+        return
+    workspace = os.path.dirname(table_path)
+    with arcpy.da.Editor(workspace):
+        if updates or deletes:
+            with arcpy.da.UpdateCursor(table_path, ["OID@"] + field_names) as cur:
+                for row in cur:
+                    oid = row[0]
+                    if oid in deletes:
+                        cur.deleteRow()
+                    elif oid in updates:
+                        cur.updateRow([oid, *updates[oid]])
+        if inserts:
+            insert_rows(table_path, field_names, inserts)
 
 
 def stamp_refresh_log(endpoint: str, target: str, rows_loaded: int,
-                      status: str, error_msg: str = "") -> None:
+                      status: str, error_msg: str = "",
+                      delta: tuple = (None, None, None)) -> None:
     """Append one row to the refresh-log table. Creates the table if absent.
+    *delta* is (inserted, updated, deleted); None for a full reload.
     Logging is best-effort - never crashes the ETL."""
     try:
         ensure_table(LTINFO_REFRESH_LOG_TABLE, REFRESH_LOG_FIELDS)
@@ -360,6 +524,7 @@ def stamp_refresh_log(endpoint: str, target: str, rows_loaded: int,
         with arcpy.da.InsertCursor(LTINFO_REFRESH_LOG_TABLE, names) as cur:
             cur.insertRow([
                 datetime.now(), endpoint, target, rows_loaded, status, error_msg,
+                *delta,
             ])
     except Exception as e:
         log.warning(f"could not stamp refresh log: {e}")
@@ -369,22 +534,34 @@ def stamp_refresh_log(endpoint: str, target: str, rows_loaded: int,
 # PIPELINE RUNNER
 # ─────────────────────────────────────────────────────────────────────────────
 def stage(name: str, endpoint: str, target: str, fields: list[tuple],
-          api_key: str) -> int:
-    """Run one pipeline: fetch -> verify -> ensure -> truncate+insert -> stamp.
+          api_key: str, key: list[str] = None, full: bool = False) -> int:
+    """Run one pipeline: fetch -> verify -> ensure -> delta (or truncate+insert
+    when *full* or no *key*) -> stamp.
     Returns the row count on success, raises on failure (caller catches)."""
     log.info(f"--- {name} ---")
     rows = fetch_endpoint(endpoint, api_key)
-    verify_schema(rows, fields)
+    first = next(rows, None)
+    verify_schema(first, fields)
     ensure_table(target, fields)
-    tuples = build_tuples(rows, fields)
+    convert = RowConverter(fields)
+    tuples = build_tuples(chain([first], rows), convert)
     sde_names = [f_name(f) for f in fields]
     try:
-        truncate_and_insert(target, sde_names, tuples)
+        if full or not key:
+            n = truncate_and_insert(target, sde_names, tuples)
+            delta = (None, None, None)
+            log.info(f"  OK - reloaded {n:,} rows into {target}")
+        else:
+            inserts, updates, deletes, n = compute_delta(target, fields, key, tuples)
+            apply_delta(target, sde_names, inserts, updates, deletes)
+            delta = (len(inserts), len(updates), len(deletes))
+            log.info(f"  OK - {n:,} rows in {target}: "
+                     f"+{delta[0]:,} inserted, ~{delta[1]:,} updated, "
+                     f"-{delta[2]:,} deleted")
     except arcpy.ExecuteError:
         raise RuntimeError(f"arcpy error: {arcpy.GetMessages(2)}")
-    log.info(f"  OK - wrote {len(rows):,} rows to {target}")
-    stamp_refresh_log(endpoint, target, len(rows), "OK")
-    return len(rows)
+    stamp_refresh_log(endpoint, target, n, "OK", convert.report(), delta=delta)
+    return n
 
 
 def stage_allocation_grid() -> None:
@@ -406,11 +583,15 @@ def main() -> int:
     log.info("=== LT Info staging ETL start ===")
     t0 = time.time()
     api_key = get_api_key()
+    full = "--full" in sys.argv
+    if full:
+        log.info("--full: truncate-and-reload every pipeline")
 
     failures = 0
     for p in PIPELINES:
         try:
-            stage(p["name"], p["endpoint"], p["target"], p["fields"], api_key)
+            stage(p["name"], p["endpoint"], p["target"], p["fields"], api_key,
+                  key=p.get("key"), full=full)
         except Exception as e:
             failures += 1
             msg = str(e)[:500]
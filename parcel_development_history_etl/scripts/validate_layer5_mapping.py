@@ -47,10 +47,10 @@ import sys
 from pathlib import Path
 
 import pandas as pd
-import requests
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 from config import QA_DATA_DIR, REGIONAL_PLAN_ALLOCATIONS_JSON  # noqa: E402
+from rest_client import query_frame  # noqa: E402
 from utils import get_logger  # noqa: E402
 
 log = get_logger("validate_layer5_mapping")
@@ -86,14 +86,7 @@ def _norm_juris(s: str | None) -> str | None:
 
 def fetch_layer5() -> pd.DataFrame:
     log.info("Fetching layer 5 (Development Right Pool Balance Report)...")
-    params = {
-        "where": "1=1", "outFields": "*", "returnGeometry": "false", "f": "json",
-        "resultRecordCount": 2000, "orderByFields": "OBJECTID ASC",
-    }
-    r = requests.get(LAYER_5_URL, params=params, timeout=60)
-    r.raise_for_status()
-    feats = r.json().get("features", [])
-    df = pd.DataFrame(f["attributes"] for f in feats)
+    df = query_frame(LAYER_5_URL)
     log.info("  layer 5 rows: %d", len(df))
     df["juris_norm"] = df["Jurisdiction"].map(_norm_juris)
     return df
@@ -0,0 +1,256 @@
+"""
+On-disk cache for ArcGIS REST service layers.
+
+Boundary, zoning and parcel layers on maps.trpa.org change a few times a
+year, but the ETL used to download them on every run.  load_layer() keeps
+one GeoParquet file per (layer URL, query) under SERVICE_CACHE_DIR and only
+re-downloads when the layer's fingerprint changes:
+
+  editingInfo.lastEditDate   from the layer's ?f=json — FeatureServer layers
+                             with editor tracking / change tracking
+  count + max OBJECTID       from a returnIdsOnly query — everything else
+                             (MapServer layers do not report edits)
+
+If the service cannot be reached and a cached copy exists, the cached copy is
+used with a warning, so runs are reproducible offline.  Setting the
+SERVICE_CACHE_OFFLINE environment variable skips the fingerprint check
+entirely and always uses the cached copy when there is one.
+
+Geometry is requested in SERVICE_CACHE_OUT_SR (or the SR passed as out_sr —
+steps that join a layer against OUTPUT_FC in memory pass out_sr_for(OUTPUT_FC))
+and stored as WKB in a SHAPE column (same layout as the local feature store),
+attributes as plain columns.
+
+Usage
+-----
+    df = load_layer(JURISDICTION_SVC, out_fields="JURISDICTION,COUNTY")
+    geoms = shapely.from_wkb(df["SHAPE"])
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import SERVICE_CACHE_DIR, SERVICE_CACHE_OUT_SR
+from rest_client import get_client
+from utils  import get_logger
+
+log = get_logger("service_cache")
+
+SHAPE = "SHAPE"
+
+_PAGE = 2000
+
+
+# ── REST helpers ──────────────────────────────────────────────────────────────
+
+def _get_json(url: str, params: dict, timeout: int = 120) -> dict:
+    return get_client().get_json(url, params, timeout=timeout)
+
+
+def layer_fingerprint(url: str, where: str = "1=1") -> str:
+    """Cheap change marker for a layer — see module docstring."""
+    info = _get_json(url, {"f": "json"}, timeout=60)
+    edited = (info.get("editingInfo") or {}).get("lastEditDate")
+    if edited:
+        return f"edit:{edited}"
+    ids  = _get_json(f"{url}/query", {"where": where, "returnIdsOnly": "true", "f": "json"})
+    oids = ids.get("objectIds") or []
+    return f"ids:{len(oids)}:{max(oids) if oids else 0}"
+
+
+# ── Esri JSON geometry → shapely ──────────────────────────────────────────────
+
+def _signed_area(ring) -> float:
+    xy = np.asarray(ring, dtype=float)[:, :2]
+    x, y = xy[:, 0], xy[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def esri_to_shapely(g: dict):
+    """Convert an Esri JSON geometry (point / polyline / polygon) to shapely."""
+    from shapely.geometry import (Point, MultiPoint, MultiLineString,
+                                  Polygon, MultiPolygon)
+    if not g:
+        return None
+    if "x" in g:
+        return Point(g["x"], g["y"]) if g["x"] is not None else None
+    if "points" in g:
+        return MultiPoint([p[:2] for p in g["points"]])
+    if "paths" in g:
+        return MultiLineString([[p[:2] for p in path] for path in g["paths"]])
+    if "rings" in g:
+        # Esri outer rings are clockwise (negative shoelace area), holes
+        # counter-clockwise.  Each hole belongs to the outer ring containing it.
+        outers, holes = [], []
+        for ring in g["rings"]:
+            if len(ring) < 4:
+                continue
+            (outers if _signed_area(ring) < 0 else holes).append([p[:2] for p in ring])
+        if not outers:                       # mis-wound input — treat all as shells
+            outers, holes = holes, []
+        shells = [Polygon(r) for r in outers]
+        parts  = [[] for _ in shells]
+        for h in holes:
+            hp = Polygon(h).representative_point()
+            for i, s in enumerate(shells):
+                if s.contains(hp):
+                    parts[i].append(h)
+                    break
+        polys = [Polygon(o, parts[i]) for i, o in enumerate(outers)]
+        return polys[0] if len(polys) == 1 else MultiPolygon(polys)
+    return None
+
+
+# ── Download ──────────────────────────────────────────────────────────────────
+
+def _download(url: str, where: str, out_fields: str, geometry: bool,
+              out_sr: int) -> pd.DataFrame:
+    """Fetch every matching feature (rest_client pages concurrently) as a DataFrame."""
+    feats = get_client().query_features(url, where, out_fields, geometry=geometry,
+                                        out_sr=out_sr, page_size=_PAGE)
+    df = pd.DataFrame([f.get("attributes", {}) for f in feats])
+    if geometry:
+        shapes = []
+        for f in feats:
+            shp = esri_to_shapely(f.get("geometry"))
+            shapes.append(shp.wkb if shp is not None and not shp.is_empty else None)
+        df[SHAPE] = shapes
+    return df
+
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+
+def _cache_file(url: str, where: str, out_fields: str, geometry: bool,
+                out_sr: int) -> Path:
+    key  = hashlib.sha1(f"{url}|{where}|{out_fields}|{geometry}|{out_sr}".encode()).hexdigest()[:12]
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", url.split("/services/", 1)[-1]).strip("_")
+    return Path(SERVICE_CACHE_DIR) / f"{slug}_{key}.parquet"
+
+
+def _read_cache(path: Path) -> tuple[pd.DataFrame | None, dict]:
+    if not path.exists():
+        return None, {}
+    import pyarrow.parquet as pq
+    table = pq.read_table(path)
+    meta  = json.loads((table.schema.metadata or {}).get(b"service_cache", b"{}"))
+    return table.to_pandas(), meta
+
+
+def _write_cache(path: Path, df: pd.DataFrame, meta: dict) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    md = dict(table.schema.metadata or {})
+    md[b"service_cache"] = json.dumps(meta).encode()
+    if SHAPE in df.columns:
+        md[b"geo"] = json.dumps({
+            "version": "1.0.0", "primary_column": SHAPE,
+            "columns": {SHAPE: {"encoding": "WKB", "geometry_types": [],
+                                "crs": f"EPSG:{meta.get('out_sr')}"}},
+        }).encode()
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table.replace_schema_metadata(md), tmp)
+    tmp.replace(path)
+
+
+def out_sr_for(path: str) -> int:
+    """
+    The SR to request layers in so they overlay *path* without projecting:
+    *path*'s own factory code, else SERVICE_CACHE_OUT_SR with a warning.
+    """
+    from feature_store import get_store
+    wkid = get_store().wkid(path)
+    if wkid is None:
+        log.warning("Spatial reference of %s unknown — assuming EPSG:%d",
+                    path, SERVICE_CACHE_OUT_SR)
+        return SERVICE_CACHE_OUT_SR
+    if wkid != SERVICE_CACHE_OUT_SR:
+        log.info("%s is in EPSG:%d — requesting service layers in it", path, wkid)
+    return wkid
+
+
+def load_layer(url: str, where: str = "1=1", out_fields: str = "*",
+               geometry: bool = True,
+               out_sr: int = SERVICE_CACHE_OUT_SR) -> pd.DataFrame:
+    """
+    Return every feature of the layer at *url* matching *where*, from the
+    local cache when the layer is unchanged, otherwise freshly downloaded.
+    """
+    path = _cache_file(url, where, out_fields, geometry, out_sr)
+    cached, meta = _read_cache(path)
+    name = url.split("/services/", 1)[-1]
+
+    if cached is not None and os.environ.get("SERVICE_CACHE_OFFLINE"):
+        log.info("  %s: offline — using cache from %s", name, meta.get("fetched", "?"))
+        return cached
+
+    try:
+        fp = layer_fingerprint(url, where)
+    except Exception as exc:
+        if cached is None:
+            raise
+        log.warning("  %s: cannot reach service (%s) — using cache from %s",
+                    name, exc, meta.get("fetched", "?"))
+        return cached
+
+    if cached is not None and meta.get("fingerprint") == fp:
+        log.info("  %s: unchanged (%s) — %d features from cache", name, fp, len(cached))
+        return cached
+
+    t0 = time.time()
+    df = _download(url, where, out_fields, geometry, out_sr)
+    _write_cache(path, df, {"url": url, "where": where, "out_fields": out_fields,
+                            "out_sr": out_sr, "fingerprint": fp,
+                            "fetched": time.strftime("%Y-%m-%d %H:%M:%S")})
+    log.info("  %s: downloaded %d features in %.1fs (%s)",
+             name, len(df), time.time() - t0, fp)
+    return df
+
+
+def to_feature_class(df: pd.DataFrame, out_fc: str,
+                     wkid: int = SERVICE_CACHE_OUT_SR) -> str:
+    """
+    Materialise a cached layer as an arcpy feature class (e.g. "memory/x")
+    for steps that still hand it to a geoprocessing tool.
+    """
+    import arcpy
+    from utils import _DTYPE_MAP, _safe_field_name
+    if arcpy.Exists(out_fc):
+        arcpy.management.Delete(out_fc)
+    sr = arcpy.SpatialReference(wkid)
+    geoms = [g for g in df[SHAPE] if g is not None]
+    gtype = "POLYGON"
+    if geoms:
+        import shapely
+        kind = shapely.from_wkb(geoms[0]).geom_type
+        gtype = {"Point": "POINT", "MultiPoint": "MULTIPOINT",
+                 "MultiLineString": "POLYLINE", "LineString": "POLYLINE"}.get(kind, "POLYGON")
+    ws, name = out_fc.rsplit("/", 1) if "/" in out_fc else os.path.split(out_fc)
+    arcpy.management.CreateFeatureclass(ws, name, gtype, spatial_reference=sr)
+
+    attrs = [c for c in df.columns if c != SHAPE]
+    safe  = {c: _safe_field_name(c) for c in attrs}
+    for c in attrs:
+        ftype, length = _DTYPE_MAP.get(df[c].dtype.kind, ("TEXT", 255))
+        if ftype == "TEXT":
+            arcpy.management.AddField(out_fc, safe[c], "TEXT", field_length=length or 255)
+        else:
+            arcpy.management.AddField(out_fc, safe[c], ftype)
+
+    with arcpy.da.InsertCursor(out_fc, ["SHAPE@"] + [safe[c] for c in attrs]) as ic:
+        for row in df[[SHAPE] + attrs].itertuples(index=False, name=None):
+            if row[0] is None:
+                continue
+            vals = [None if (isinstance(v, float) and np.isnan(v)) else v for v in row[1:]]
+            ic.insertRow([arcpy.FromWKB(bytearray(row[0]), sr)] + vals)
+    return out_fc
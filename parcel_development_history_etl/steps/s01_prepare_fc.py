@@ -16,12 +16,16 @@ Drops and recreates OUTPUT_FC on every run so results are always fresh.
 import sys
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
 
-import arcpy
+import numpy as np
+import pandas as pd
 
 from config import (
-    SOURCE_FC, OUTPUT_FC, GDB,
+    SOURCE_FC, OUTPUT_FC,
     FC_APN, FC_YEAR, CSV_YEARS,
 )
+from feature_store import get_store, OID, WKB, AREA
+from geometry_catalog import invalidate
+import unit_matrix
 from utils import get_logger
 
 log = get_logger("s01_prepare_fc")
@@ -32,108 +36,66 @@ def _create_empty_fc() -> None:
 
     Using SOURCE_FC as template copies all field definitions (types, lengths,
     aliases) so S04, S04b, and S05 can write to their expected fields without
-    needing to add them first.  No data is copied.
-
-    `template` only copies field schema — spatial reference must be passed
-    explicitly via `spatial_reference=`, otherwise the new FC gets SR=Unknown
-    and InsertCursor silently drops geometry from sources whose SR differs
-    (e.g. Web Mercator from AllParcels REST).
+    needing to add them first.  No data is copied.  The store also carries
+    SOURCE_FC's spatial reference across, so inserted geometry keeps its SR.
     """
-    if arcpy.Exists(OUTPUT_FC):
+    store = get_store()
+    if store.exists(OUTPUT_FC):
         log.info("Deleting existing OUTPUT_FC")
-        arcpy.management.Delete(OUTPUT_FC)
-
-    out_name = OUTPUT_FC.split("\\")[-1]
-    src_sr   = arcpy.Describe(SOURCE_FC).spatialReference
+    store.create_like(OUTPUT_FC, SOURCE_FC)
+    log.info("Created empty OUTPUT_FC (schema + SR from SOURCE_FC): %s", OUTPUT_FC)
 
-    arcpy.management.CreateFeatureclass(
-        out_path          = GDB,
-        out_name          = out_name,
-        geometry_type     = "POLYGON",
-        template          = SOURCE_FC,
-        spatial_reference = src_sr,
-    )
-    log.info("Created empty OUTPUT_FC (schema + SR %s): %s", src_sr.name, OUTPUT_FC)
 
+def _largest_per_apn_year(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep one row per APN x Year — the largest polygon (lowest OID on ties).
 
-def _insert_from_source_fc(year: int) -> int:
-    """
-    Copy rows for *year* from SOURCE_FC into OUTPUT_FC (Shape + APN + COUNTY).
-    COUNTY is needed by S02's El Dorado APN fix before S05 runs.
-    Returns number of rows inserted.
+    Source layers carry multiple polygons per APN (condos, common areas).
+    Deduplicating here, before the insert, means duplicates are never written
+    to OUTPUT_FC and never need deleting afterwards.
     """
-    if not arcpy.Exists(SOURCE_FC):
-        log.error("  SOURCE_FC not found: %s", SOURCE_FC)
-        return 0
-
-    count = 0
-    where = f"{FC_YEAR} = {year}"
-    with arcpy.da.SearchCursor(SOURCE_FC, ["SHAPE@", FC_APN, FC_YEAR, "COUNTY"], where) as src, \
-         arcpy.da.InsertCursor(OUTPUT_FC, ["SHAPE@", FC_APN, FC_YEAR, "COUNTY"]) as ins:
-        for shape, apn, yr, county in src:
-            if apn:
-                ins.insertRow([shape, str(apn).strip(), yr, county])
-                count += 1
+    area = df[AREA].fillna(0).to_numpy()
+    order = np.lexsort((df[OID].to_numpy(), -area))
+    keep = ~df.iloc[order].duplicated(subset=[FC_APN, FC_YEAR], keep="first")
+    return df.iloc[np.sort(order[keep.to_numpy()])]
 
-    return count
 
-
-def _dedup_fc() -> int:
-    """Remove duplicate APN x Year rows, keeping the one with the largest area.
-
-    Service layers can return multiple polygons per APN (condos, common areas).
-    We keep one row per (APN, Year) — the largest polygon — and delete the rest.
-    Returns number of rows removed.
+def _insert_from_source_fc(years: list[int]) -> tuple[dict[int, int], int]:
     """
-    log.info("Dedup: scanning for duplicate APN x Year rows ...")
-
-    # Pass 1 — identify which OIDs to keep (largest area per APN x Year)
-    best: dict = {}  # (apn, year) -> (oid, area)
-    dup_oids: list = []
-
-    with arcpy.da.SearchCursor(
-            OUTPUT_FC, ["OID@", FC_APN, FC_YEAR, "SHAPE@AREA"]) as cur:
-        for oid, apn, yr, area in cur:
-            if not apn:
-                continue
-            key = (str(apn).strip(), int(yr) if yr else 0)
-            area = area or 0
-            if key not in best:
-                best[key] = (oid, area)
-            else:
-                prev_oid, prev_area = best[key]
-                if area > prev_area:
-                    dup_oids.append(prev_oid)
-                    best[key] = (oid, area)
-                else:
-                    dup_oids.append(oid)
-
-    if not dup_oids:
-        log.info("Dedup: no duplicates found.")
-        return 0
-
-    log.info("Dedup: %d duplicate rows to remove ...", len(dup_oids))
-
-    # Pass 2 — delete duplicate OIDs in batches
-    oid_field = arcpy.Describe(OUTPUT_FC).OIDFieldName
-    batch = 500
-    removed = 0
-    for i in range(0, len(dup_oids), batch):
-        chunk = dup_oids[i:i + batch]
-        oid_list = ", ".join(str(o) for o in chunk)
-        where = f"{oid_field} IN ({oid_list})"
-        lyr = "s01_dedup_lyr"
-        if arcpy.Exists(lyr):
-            arcpy.management.Delete(lyr)
-        arcpy.management.MakeFeatureLayer(OUTPUT_FC, lyr, where)
-        n = int(arcpy.management.GetCount(lyr).getOutput(0))
-        if n > 0:
-            arcpy.management.DeleteRows(lyr)
-            removed += n
-        arcpy.management.Delete(lyr)
-
-    log.info("Dedup: removed %d rows.", removed)
-    return removed
+    Copy rows for *years* from SOURCE_FC into OUTPUT_FC (Shape + APN + COUNTY),
+    one row per APN x Year.  COUNTY is needed by S02's El Dorado APN fix
+    before S05 runs.
+
+    One attribute read (OID / area / APN / Year / COUNTY, no WKB) picks the
+    rows to keep; geometry is then fetched and inserted a year at a time for
+    the kept OIDs only, so at most one year's WKB is held in memory.
+    Returns ({year: rows inserted}, duplicate rows skipped).
+    """
+    store = get_store()
+    if not store.exists(SOURCE_FC):
+        log.error("  SOURCE_FC not found: %s", SOURCE_FC)
+        return {}, 0
+
+    df = store.read(SOURCE_FC, [OID, AREA, FC_APN, FC_YEAR, "COUNTY"],
+                    where={FC_YEAR: years})
+    df = df[df[FC_APN].notna() & (df[FC_APN].astype(str).str.strip() != "")].copy()
+    df[FC_APN] = df[FC_APN].astype(str).str.strip()
+
+    n_read = len(df)
+    df = _largest_per_apn_year(df)
+    skipped = n_read - len(df)
+
+    counts = {}
+    for yr in years:
+        keep = df[df[FC_YEAR] == yr]
+        if keep.empty:
+            counts[yr] = 0
+            continue
+        geo  = store.read_by_keys(SOURCE_FC, [OID, WKB], OID, keep[OID],
+                                  where={FC_YEAR: yr})
+        rows = keep.merge(geo, on=OID, how="inner")
+        store.insert(OUTPUT_FC, rows[[WKB, FC_APN, FC_YEAR, "COUNTY"]])
+        counts[yr] = len(rows)
+    return counts, skipped
 
 
 def run() -> None:
@@ -142,12 +104,10 @@ def run() -> None:
 
     _create_empty_fc()
 
-    year_counts = {}
-    for year in CSV_YEARS:
-        log.info("  Year %d (from SOURCE_FC) ...", year)
-        n = _insert_from_source_fc(year)
-        year_counts[year] = n
-        log.info("    %d rows inserted", n)
+    log.info("  Years %d–%d (from SOURCE_FC) ...", min(CSV_YEARS), max(CSV_YEARS))
+    year_counts, skipped = _insert_from_source_fc(CSV_YEARS)
+    if skipped:
+        log.info("Dedup: skipped %d duplicate APN x Year rows (kept largest area)", skipped)
 
     total = sum(year_counts.values())
     log.info("Output FC: %d total rows across %d years", total, len(year_counts))
@@ -155,10 +115,9 @@ def run() -> None:
     for yr in sorted(year_counts):
         log.info("  %d : %6d rows", yr, year_counts[yr])
 
-    removed = _dedup_fc()
-    if removed:
-        log.info("Output FC after dedup: %d rows",
-                 int(arcpy.management.GetCount(OUTPUT_FC).getOutput(0)))
+    # OIDs can repeat across rebuilds, so the stored geometry is dropped here
+    invalidate(OUTPUT_FC)
+    unit_matrix.invalidate()
 
     log.info("Step 1 complete.")
 
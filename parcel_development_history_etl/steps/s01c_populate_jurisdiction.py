@@ -8,22 +8,31 @@ Results are written to OUTPUT_FC so that:
   - S05 does not need to re-populate these fields
 
 Approach:
-  1. Read one geometry per unique APN from OUTPUT_FC.
+  1. Take one centroid per unique APN (earliest year) from the geometry
+     catalog.
   2. Build in-memory centroid point FC.
-  3. Spatial join centroids to Jurisdictions service:
+  3. Spatial join centroids to the Jurisdictions layer (loaded through
+     service_cache, so it is only downloaded when the service changes):
        Pass 1 — WITHIN
        Pass 2 — CLOSEST <= 100m for any unmatched
   4. Convert full county names to 2-char codes.
-  5. UpdateCursor over all OUTPUT_FC rows to write COUNTY + JURISDICTION.
+  5. Normalize El Dorado APN suffixes by era (using the new COUNTY values).
+  6. COUNTY + JURISDICTION and the APN fixes go through one WriteBatch, so
+     OUTPUT_FC is rewritten once.
 """
 import sys
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
 
 import arcpy
+import pandas as pd
 
 from config import (OUTPUT_FC, FC_APN, FC_YEAR, CLOSEST_MAX_METERS,
                     JURISDICTION_SVC, COUNTY_CODE_MAP, EL_PAD_YEAR)
-from utils  import get_logger, el_pad, el_depad, _EL_2D, _EL_3D
+from feature_store import get_store, OID
+from geometry_catalog import get_catalog
+from service_cache import load_layer, to_feature_class
+from utils  import get_logger, apn_forms
+from write_batch import WriteBatch
 
 log = get_logger("s01c_populate_jurisdiction")
 
@@ -31,58 +40,66 @@ SVC_JURISDICTION = "JURISDICTION"
 SVC_COUNTY       = "COUNTY"
 
 _MEM_CENTROIDS = "memory/s01c_centroids"
+_MEM_MISSING   = "memory/s01c_missing"
 _MEM_JOIN      = "memory/s01c_join"
+_MEM_JRSD      = "memory/s01c_jrsd"
 
 
-def _build_centroid_fc() -> set:
-    """Build in-memory centroid point FC from OUTPUT_FC (one point per unique APN)."""
-    log.info("  Building centroid FC from OUTPUT_FC ...")
+def _read_rows() -> pd.DataFrame:
+    """The one attribute read of OUTPUT_FC this step makes."""
+    return get_store().read(OUTPUT_FC, [OID, FC_APN, FC_YEAR, "COUNTY"])
 
-    apn_geom: dict = {}
-    with arcpy.da.SearchCursor(OUTPUT_FC, [FC_APN, FC_YEAR, "SHAPE@"]) as cur:
-        for apn, yr, geom in cur:
-            if not apn or not geom or geom.area <= 0:
-                continue
-            apn = str(apn).strip()
-            yr  = int(yr) if yr else 9999
-            if apn not in apn_geom or yr < apn_geom[apn][1]:
-                apn_geom[apn] = (geom, yr)
 
-    log.info("  Unique APNs with geometry: %d", len(apn_geom))
+def _points_fc(path: str, apn_pt: dict, sr) -> None:
+    """(Re)create in-memory point FC *path* with one APN_KEY point per entry."""
+    if arcpy.Exists(path):
+        arcpy.management.Delete(path)
+    arcpy.management.CreateFeatureclass(
+        "memory", path.split("/")[-1], "POINT", spatial_reference=sr)
+    arcpy.management.AddField(path, "APN_KEY", "TEXT", field_length=50)
+    with arcpy.da.InsertCursor(path, ["SHAPE@XY", "APN_KEY"]) as ic:
+        for apn, xy in apn_pt.items():
+            ic.insertRow([xy, apn])
 
-    sr = arcpy.Describe(OUTPUT_FC).spatialReference
-    for mem in [_MEM_CENTROIDS, _MEM_JOIN]:
-        if arcpy.Exists(mem):
-            arcpy.management.Delete(mem)
 
-    arcpy.management.CreateFeatureclass(
-        "memory", "s01c_centroids", "POINT", spatial_reference=sr)
-    arcpy.management.AddField(_MEM_CENTROIDS, "APN_KEY", "TEXT", field_length=50)
+def _build_centroid_fc() -> dict:
+    """Build in-memory centroid point FC from OUTPUT_FC (one point per unique APN)."""
+    log.info("  Building centroid FC from OUTPUT_FC ...")
+
+    # Inside points + area come from the geometry catalog — no geometry is
+    # read here.  Earliest year per APN wins, as before.
+    cat    = get_catalog(OUTPUT_FC)
+    best   = cat.per_apn()
+    apn_pt = dict(zip(best["APN"], cat.xy(best)))
 
-    with arcpy.da.InsertCursor(_MEM_CENTROIDS, ["SHAPE@", "APN_KEY"]) as ic:
-        for apn, (geom, _) in apn_geom.items():
-            c = geom.centroid
-            ic.insertRow([arcpy.PointGeometry(c, sr), apn])
+    log.info("  Unique APNs with geometry: %d", len(apn_pt))
+
+    if arcpy.Exists(_MEM_JOIN):
+        arcpy.management.Delete(_MEM_JOIN)
+    _points_fc(_MEM_CENTROIDS, apn_pt, arcpy.Describe(OUTPUT_FC).spatialReference)
 
     n = int(arcpy.management.GetCount(_MEM_CENTROIDS).getOutput(0))
     log.info("  Centroid FC: %d points", n)
-    return set(apn_geom.keys())
+    return apn_pt
 
 
-def _spatial_join(all_apns: set) -> dict:
+def _spatial_join(apn_pt: dict) -> dict:
     """
     Spatial join centroids to Jurisdictions service.
     Returns {APN: (JURISDICTION, COUNTY)} with 2-char county codes.
     """
-    log.info("  Connecting to Jurisdictions service ...")
+    all_apns = set(apn_pt)
+    log.info("  Loading Jurisdictions service ...")
     jrsd_lyr = "s01c_jrsd_lyr"
     pt_lyr1  = "s01c_pt_lyr1"
-    pt_lyr2  = "s01c_pt_lyr2"
 
-    for lyr in [jrsd_lyr, pt_lyr1, pt_lyr2]:
+    for lyr in [jrsd_lyr, pt_lyr1]:
         if arcpy.Exists(lyr): arcpy.management.Delete(lyr)
 
-    arcpy.management.MakeFeatureLayer(JURISDICTION_SVC, jrsd_lyr)
+    jrsd = load_layer(JURISDICTION_SVC,
+                      out_fields=f"{SVC_JURISDICTION},{SVC_COUNTY}")
+    to_feature_class(jrsd, _MEM_JRSD)
+    arcpy.management.MakeFeatureLayer(_MEM_JRSD, jrsd_lyr)
     arcpy.management.MakeFeatureLayer(_MEM_CENTROIDS,   pt_lyr1)
 
     result: dict = {}
@@ -103,40 +120,37 @@ def _spatial_join(all_apns: set) -> dict:
     log.info("  Pass 1 matched: %d APNs", len(result))
     if arcpy.Exists(_MEM_JOIN): arcpy.management.Delete(_MEM_JOIN)
 
-    # Pass 2 — CLOSEST for unmatched
+    # Pass 2 — CLOSEST for unmatched.  The unmatched centroids get their
+    # own point FC, so this is one join rather than one per OR-filtered batch.
     still_missing = all_apns - set(result.keys())
     if still_missing:
         log.info("  Pass 2: CLOSEST (<=%dm) for %d unmatched ...",
                  CLOSEST_MAX_METERS, len(still_missing))
         p2 = 0
-        batches = [list(still_missing)[i:i+500]
-                   for i in range(0, len(still_missing), 500)]
-        for batch in batches:
-            filt = " OR ".join(f"APN_KEY = '{a}'" for a in batch)
-            if arcpy.Exists(pt_lyr2): arcpy.management.Delete(pt_lyr2)
-            arcpy.management.MakeFeatureLayer(_MEM_CENTROIDS, pt_lyr2, filt)
-            if arcpy.Exists(_MEM_JOIN): arcpy.management.Delete(_MEM_JOIN)
-            arcpy.analysis.SpatialJoin(
-                pt_lyr2, jrsd_lyr, _MEM_JOIN,
-                "JOIN_ONE_TO_ONE", "KEEP_ALL",
-                match_option="CLOSEST",
-                search_radius=f"{CLOSEST_MAX_METERS} Meters",
-                distance_field_name="DISTANCE")
-            with arcpy.da.SearchCursor(
-                    _MEM_JOIN,
-                    ["APN_KEY", SVC_JURISDICTION, SVC_COUNTY,
-                     "Join_Count", "DISTANCE"]) as cur:
-                for apn, jrsd, county, jc, dist in cur:
-                    apn = str(apn).strip() if apn else ""
-                    if jc and jc > 0 and apn and dist <= CLOSEST_MAX_METERS:
-                        if apn not in result:
-                            result[apn] = (jrsd, county)
-                            p2 += 1
-            for lyr in [pt_lyr2, _MEM_JOIN]:
-                if arcpy.Exists(lyr): arcpy.management.Delete(lyr)
+        _points_fc(_MEM_MISSING, {a: apn_pt[a] for a in still_missing},
+                   arcpy.Describe(_MEM_CENTROIDS).spatialReference)
+        if arcpy.Exists(_MEM_JOIN): arcpy.management.Delete(_MEM_JOIN)
+        arcpy.analysis.SpatialJoin(
+            _MEM_MISSING, jrsd_lyr, _MEM_JOIN,
+            "JOIN_ONE_TO_ONE", "KEEP_ALL",
+            match_option="CLOSEST",
+            search_radius=f"{CLOSEST_MAX_METERS} Meters",
+            distance_field_name="DISTANCE")
+        with arcpy.da.SearchCursor(
+                _MEM_JOIN,
+                ["APN_KEY", SVC_JURISDICTION, SVC_COUNTY,
+                 "Join_Count", "DISTANCE"]) as cur:
+            for apn, jrsd, county, jc, dist in cur:
+                apn = str(apn).strip() if apn else ""
+                if jc and jc > 0 and apn and dist <= CLOSEST_MAX_METERS:
+                    if apn not in result:
+                        result[apn] = (jrsd, county)
+                        p2 += 1
+        for lyr in [_MEM_MISSING, _MEM_JOIN]:
+            if arcpy.Exists(lyr): arcpy.management.Delete(lyr)
         log.info("  Pass 2 matched: %d additional APNs", p2)
 
-    for lyr in [jrsd_lyr, pt_lyr1, _MEM_CENTROIDS]:
+    for lyr in [jrsd_lyr, pt_lyr1, _MEM_CENTROIDS, _MEM_JRSD]:
         if arcpy.Exists(lyr): arcpy.management.Delete(lyr)
 
     # Apply county code map
@@ -155,22 +169,28 @@ def _spatial_join(all_apns: set) -> dict:
     return coded
 
 
-def _write_to_fc(lookup: dict) -> None:
-    """Write COUNTY and JURISDICTION to all rows in OUTPUT_FC."""
-    updated = skipped = 0
-    with arcpy.da.UpdateCursor(OUTPUT_FC, [FC_APN, "JURISDICTION", "COUNTY"]) as cur:
-        for apn, _, _ in cur:
-            apn = str(apn).strip() if apn else ""
-            if apn in lookup:
-                jrsd, county = lookup[apn]
-                cur.updateRow([apn, jrsd, county])
-                updated += 1
-            else:
-                skipped += 1
-    log.info("  Written: %d rows updated, %d skipped", updated, skipped)
-
-
-def _normalize_el_dorado_apns() -> None:
+def _write_to_fc(rows: pd.DataFrame, lookup: dict, batch: WriteBatch) -> pd.Series:
+    """
+    Register COUNTY and JURISDICTION for every year-row whose APN matched.
+    Returns each row's COUNTY after the write (unmatched rows keep theirs).
+    """
+    apns  = rows[FC_APN].fillna("").astype(str).str.strip()
+    codes = pd.DataFrame.from_dict(lookup, orient="index",
+                                   columns=["JURISDICTION", "COUNTY"])
+    hit   = apns.isin(codes.index).to_numpy()
+    frame = pd.DataFrame({OID: rows.loc[hit, OID].to_numpy()})
+    for c in ["JURISDICTION", "COUNTY"]:
+        frame[c] = codes[c].reindex(apns[hit]).to_numpy()
+    batch.register(frame, step="s01c")
+    log.info("  Queued: %d rows to update, %d skipped", int(hit.sum()), int((~hit).sum()))
+
+    county = rows["COUNTY"].astype(object).copy()
+    county[hit] = frame["COUNTY"].to_numpy()
+    return county
+
+
+def _normalize_el_dorado_apns(rows: pd.DataFrame, county: pd.Series,
+                              batch: WriteBatch) -> None:
     """
     Normalize El Dorado APNs in OUTPUT_FC to match the format used in each era:
       - Pre-2018: 2-digit suffix (080-155-11)  — depad any 3-digit
@@ -180,29 +200,31 @@ def _normalize_el_dorado_apns() -> None:
     similar APN patterns are left untouched.
     """
     log.info("  Normalizing El Dorado APNs ...")
-    depadded = padded = 0
-    with arcpy.da.UpdateCursor(
-            OUTPUT_FC, [FC_APN, FC_YEAR, "COUNTY"],
-            where_clause="COUNTY = 'EL'") as cur:
-        for apn, yr, county in cur:
-            if not apn or not yr:
-                continue
-            apn = str(apn).strip()
-            yr  = int(yr)
-            if yr < EL_PAD_YEAR and _EL_3D.match(apn):
-                cur.updateRow([el_depad(apn), yr, county])
-                depadded += 1
-            elif yr >= EL_PAD_YEAR and _EL_2D.match(apn):
-                cur.updateRow([el_pad(apn), yr, county])
-                padded += 1
-    log.info("    Depadded (pre-%d): %d rows", EL_PAD_YEAR, depadded)
-    log.info("    Padded   (%d+):    %d rows", EL_PAD_YEAR, padded)
+    df = rows.loc[(county == "EL").to_numpy(), [OID, FC_APN, FC_YEAR]]
+    df = df[df[FC_APN].notna() & df[FC_YEAR].notna()].copy()
+    df[FC_APN]  = df[FC_APN].astype(str).str.strip()
+    df[FC_YEAR] = df[FC_YEAR].astype(int)
+
+    forms = apn_forms(df[FC_APN])
+    pre  = df[FC_YEAR] <  EL_PAD_YEAR
+    dep  = pre  & forms["is_el_3d"]
+    pad  = ~pre & forms["is_el_2d"]
+    df.loc[dep, FC_APN] = forms.loc[dep, "el_depad"]
+    df.loc[pad, FC_APN] = forms.loc[pad, "el_pad"]
+
+    batch.register(df.loc[dep | pad, [OID, FC_APN]], step="s01c")
+    log.info("    Depadded (pre-%d): %d rows", EL_PAD_YEAR, int(dep.sum()))
+    log.info("    Padded   (%d+):    %d rows", EL_PAD_YEAR, int(pad.sum()))
 
 
 def run() -> None:
     log.info("=== Step 1c: Populate COUNTY and JURISDICTION ===")
-    all_apns = _build_centroid_fc()
-    lookup   = _spatial_join(all_apns)
-    _write_to_fc(lookup)
-    _normalize_el_dorado_apns()
+    rows     = _read_rows()
+    apn_pt   = _build_centroid_fc()
+    lookup   = _spatial_join(apn_pt)
+    batch    = WriteBatch(OUTPUT_FC, key=[OID])
+    county   = _write_to_fc(rows, lookup, batch)
+    _normalize_el_dorado_apns(rows, county, batch)
+    # S02 reads COUNTY back from OUTPUT_FC, so this batch is flushed here
+    batch.flush()
     log.info("Step 1c complete.")
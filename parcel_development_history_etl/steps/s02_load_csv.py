@@ -4,12 +4,15 @@ Step 2 — Load CSV and build csv_lookup.
  - Reads ExistingResidential CSV (wide format)
  - Melts to long format (APN x Year x Units)
  - Applies El Dorado APN suffix fix (COUNTY='EL', Year >= 2018)
- - Returns df_csv and csv_lookup dict for downstream steps
+ - Returns df_csv and csv_lookup for downstream steps
 
 Returns
 -------
 df_csv     : DataFrame  — long-format CSV with APN (fixed), Year, Units_CSV
-csv_lookup : dict       — (APN, Year) → int units  (includes 0-unit rows)
+csv_lookup : ApnYearTable — (APN, Year) → int units  (includes 0-unit rows)
+
+When an *artifacts* dict is passed, the raw wide CSV is kept there as
+"residential_wide" (and S2b adds "genealogy_applied") for the S6 QA checks.
 """
 import sys
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
@@ -18,6 +21,7 @@ import pandas as pd
 
 from config import (CSV_PATH, OUTPUT_FC, FC_APN, FC_YEAR,
                     EL_PAD_YEAR, CSV_YEARS, CSV_RESIDENTIAL_YEAR_MARKER)
+from apn_index import ApnYearTable
 from utils  import get_logger, build_el_dorado_fix, apply_el_dorado_fix
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parent))  # steps/
 import s02b_genealogy
@@ -25,7 +29,7 @@ import s02b_genealogy
 log = get_logger("s02_load_csv")
 
 
-def run() -> tuple[pd.DataFrame, dict]:
+def run(artifacts: dict = None) -> tuple[pd.DataFrame, ApnYearTable]:
     log.info("=== Step 2: Load CSV and build csv_lookup ===")
 
     # -- Load wide CSV --------------------------------------------------------
@@ -40,6 +44,8 @@ def run() -> tuple[pd.DataFrame, dict]:
     log.info("CSV: %d parcels, %d year columns (%s)",
              len(df_wide), len(year_cols),
              ", ".join(c[:4] for c in year_cols))
+    if artifacts is not None:
+        artifacts["residential_wide"] = df_wide[["APN"] + year_cols]
 
     # -- Melt to long format --------------------------------------------------
     df_csv = df_wide.melt(
@@ -83,7 +89,7 @@ def run() -> tuple[pd.DataFrame, dict]:
     # -- Genealogy APN corrections --------------------------------------------
     # Apply known old→new APN substitutions by year before building the lookup,
     # so csv_lookup references the correct current APN for each year.
-    df_csv = s02b_genealogy.run(df_csv)
+    df_csv = s02b_genealogy.run(df_csv, artifacts)
 
     # -- Post-genealogy dedup -------------------------------------------------
     # Genealogy substitution changes old_APN rows to new_APN.  If new_APN
@@ -102,10 +108,7 @@ def run() -> tuple[pd.DataFrame, dict]:
                  "(kept max units per key)", n_dupes_gen)
 
     # -- Build csv_lookup -----------------------------------------------------
-    csv_lookup = {
-        (row.APN, row.Year): row.Units_CSV
-        for row in df_csv.itertuples(index=False)
-    }
+    csv_lookup = ApnYearTable.from_frame(df_csv, "APN", "Year", "Units_CSV")
     log.info("csv_lookup entries: %d", len(csv_lookup))
     log.info("Step 2 complete.")
 
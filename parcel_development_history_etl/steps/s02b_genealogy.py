@@ -6,8 +6,8 @@ Reads the consolidated Tahoe master table at GENEALOGY_TAHOE, filtered to:
   - change_year is set
   - in_fc_new == 1   (new APN exists in FC — ensures remap targets something real)
 
-Sorts by (source_priority, change_year) and applies in a single vectorized
-pass. Sorting by change_year handles multi-chain events (A->B->C) correctly.
+Sorts by (source_priority, change_year) and applies the records in order.
+Sorting by change_year handles multi-chain events (A->B->C) correctly.
 Conflict-skip prevents double-counting for many-to-many events.
 
 For each applied record:
@@ -16,6 +16,12 @@ For each applied record:
   - Substitution is skipped if (apn_new, year) already has non-zero units —
     avoids double-counting on many-to-many events.
 
+The records are first compiled into a remap table (APN, Year) -> final APN:
+the ordered records are replayed against the (APN, Year) keys of the APNs
+they touch only, so chains collapse to their last APN and conflicts are
+decided exactly as a record-by-record pass would.  The table is then applied
+to df_csv in one hash join instead of one full-frame scan per record.
+
 This step runs AFTER the El Dorado APN fix and BEFORE csv_lookup is built.
 The spatial crosswalk in s03 handles any remaining unresolved cases.
 
@@ -24,7 +30,8 @@ The consolidated master table is the single source of truth — re-run
 master / Accela / LTinfo / spatial). The four individual CSVs are inputs to
 that builder, not consumed here.
 
-Writes QA_Genealogy_Applied to GDB.
+Writes QA_Genealogy_Applied to GDB (and to artifacts["genealogy_applied"]
+when an artifacts dict is passed, so S6 need not read it back).
 """
 import sys
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
@@ -94,89 +101,172 @@ def _load_master_table(path: str) -> pd.DataFrame:
     return df
 
 
-# ── Vectorized application ────────────────────────────────────────────────────
+# ── Compiled application ──────────────────────────────────────────────────────
 
-def _apply_vectorized(
+def _value_column(df: pd.DataFrame) -> str | None:
+    """Units_CSV / Value / first non-APN/Year column."""
+    return "Units_CSV" if "Units_CSV" in df.columns else (
+           "Value" if "Value" in df.columns else
+           next((c for c in df.columns if c not in ("APN", "Year")), None))
+
+
+class _Cell:
+    """
+    Rows of df currently sharing one (APN, Year).  Rows with the same key
+    always move together, so the remap only needs to track these.
+    """
+    __slots__ = ("keys", "rows", "units", "positive")
+
+    def __init__(self, key, rows, units, positive):
+        self.keys     = [key]       # original (APN, Year) keys folded in
+        self.rows     = rows
+        self.units    = units
+        self.positive = positive
+
+    def absorb(self, other: "_Cell") -> None:
+        self.keys.extend(other.keys)
+        self.rows     += other.rows
+        self.units    += other.units
+        self.positive  = self.positive or other.positive
+
+
+def compile_remap(
     df: pd.DataFrame,
     records: pd.DataFrame,
+    old_col: str = "apn_old",
+    new_col: str = "apn_new",
 ) -> tuple[pd.DataFrame, list[dict]]:
     """
-    Apply genealogy records to df using vectorized operations.
+    Compile genealogy records into a remap table for df.
 
     Records must already be sorted by (source_priority, change_year) so that
     multi-chain events (A->B->C) resolve in the correct order.
 
-    For each record:
+    For each record, in order:
       - Rows where APN == apn_old AND Year >= change_year are candidates.
       - Candidates where (apn_new, Year) already has non-zero units are
         conflict-skipped (prevents double-counting for many-to-many events).
       - Remaining rows have APN set to apn_new.
+      - An apn_old is remapped by at most one record.
 
-    Returns (updated_df, qa_rows).
+    Only the (APN, Year) cells of APNs named in *records* are replayed.
+
+    Returns (table, qa_rows) — table has columns APN, Year, New_APN, one row
+    per original (APN, Year) whose APN changes, chains already collapsed.
     """
-    df = df.copy()
+    val_col = _value_column(df)
+
+    recs = records[records[old_col] != records[new_col]]
+    touched = set(recs[old_col]) | set(recs[new_col])
+    sub = df.loc[df["APN"].isin(touched), ["APN", "Year"]]
+
+    # Per (APN, Year): row count, unit total and whether any row is non-zero.
+    # Conflict check uses NON-ZERO units only — treating zero-value rows as
+    # conflicts blocked remapping of split-parcel successors that have 0
+    # units in early years, silently dropping those historical units.
+    if val_col:
+        vals = df.loc[sub.index, val_col]
+        sub  = sub.assign(_v=vals.fillna(0), _p=(vals > 0))
+    else:
+        sub  = sub.assign(_v=0, _p=True)
+    cells = (sub.groupby(["APN", "Year"], sort=False)
+                .agg(rows=("_v", "size"), units=("_v", "sum"), positive=("_p", "any")))
+
+    state: dict[str, dict[int, _Cell]] = {}
+    for (apn, year), rows, units, positive in zip(
+            cells.index, cells["rows"], cells["units"], cells["positive"]):
+        state.setdefault(apn, {})[year] = _Cell((apn, year), int(rows), units, bool(positive))
+
     qa_rows: list[dict] = []
     remapped_old: set[str] = set()
+    blank = pd.Series("", index=recs.index)
 
-    # Pick the value column once (Units_CSV / Value / first non-APN/Year col)
-    val_col = "Units_CSV" if "Units_CSV" in df.columns else (
-              "Value" if "Value" in df.columns else
-              next((c for c in df.columns if c not in ("APN", "Year")), None))
-
-    for _, rec in records.iterrows():
-        old_apn     = rec["apn_old"]
-        new_apn     = rec["apn_new"]
-        change_year = int(rec["change_year"])
-        change_type = str(rec.get("event_type", "")).strip()
-        source      = str(rec.get("source", "")).strip()
-
-        if old_apn == new_apn or old_apn in remapped_old:
+    for old_apn, new_apn, change_year, change_type, source in zip(
+            recs[old_col], recs[new_col], recs["change_year"],
+            recs.get("event_type", blank), recs.get("source", blank)):
+        if old_apn in remapped_old:
             continue
 
-        cand_mask = (df["APN"] == old_apn) & (df["Year"] >= change_year)
-        if not cand_mask.any():
+        change_year = int(change_year)
+        old_cells = state.get(old_apn, {})
+        cand = [y for y in old_cells if y >= change_year]
+        if not cand:
             continue
 
-        # Conflict check: years where new_apn already has NON-ZERO units.
-        # Using zero-value rows as conflicts was too strict — it blocked
-        # remapping of split-parcel successors that have 0 units in early
-        # years, causing those historical units to be silently dropped.
-        if val_col:
-            existing_new = set(
-                df.loc[(df["APN"] == new_apn) & (df[val_col] > 0), "Year"])
-        else:
-            existing_new = set(df.loc[df["APN"] == new_apn, "Year"])
-        cand_years   = df.loc[cand_mask, "Year"]
-        conflict_yrs = cand_years[cand_years.isin(existing_new)]
-        safe_mask    = cand_mask & ~df["Year"].isin(conflict_yrs)
-
-        if conflict_yrs.any():
+        new_cells = state.setdefault(new_apn, {})
+        conflict  = [y for y in cand if y in new_cells and new_cells[y].positive]
+        safe      = [y for y in cand if y not in conflict]
+
+        if conflict:
             log.debug("  Conflict skip: %s -> %s years %s",
-                      old_apn, new_apn, sorted(conflict_yrs.tolist()))
+                      old_apn, new_apn, sorted(conflict))
+        if not safe:
+            continue
 
-        if safe_mask.any():
-            units_moved = int(df.loc[safe_mask, val_col].sum()) if val_col else 0
-            safe_years  = sorted(df.loc[safe_mask, "Year"].tolist())
-            df.loc[safe_mask, "APN"] = new_apn
-            remapped_old.add(old_apn)
+        rows_moved = rows_conflicted = 0
+        units_moved = 0
+        for y in conflict:
+            rows_conflicted += old_cells[y].rows
+        for y in safe:
+            cell = old_cells.pop(y)
+            rows_moved  += cell.rows
+            units_moved += cell.units
+            if y in new_cells:
+                new_cells[y].absorb(cell)
+            else:
+                new_cells[y] = cell
+        remapped_old.add(old_apn)
+
+        qa_rows.append({
+            "Old_APN"          : old_apn,
+            "New_APN"          : new_apn,
+            "Change_Year"      : change_year,
+            "Change_Type"      : str(change_type).strip(),
+            "Years_Updated"    : rows_moved,
+            "Years_Conflicted" : rows_conflicted,
+            "Total_Units_Moved": int(units_moved) if val_col else 0,
+            "Source"           : str(source).strip(),
+        })
+
+    remap = [(orig_apn, year, apn)
+             for apn, by_year in state.items()
+             for year, cell in by_year.items()
+             for orig_apn, _ in cell.keys if orig_apn != apn]
+    table = pd.DataFrame(remap, columns=["APN", "Year", "New_APN"])
+    return table, qa_rows
+
+
+def apply_remap(df: pd.DataFrame, table: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of df with APN replaced per a compile_remap table."""
+    df = df.copy()
+    if table.empty:
+        return df
+    keys = pd.MultiIndex.from_frame(table[["APN", "Year"]])
+    pos  = keys.get_indexer(pd.MultiIndex.from_frame(df[["APN", "Year"]]))
+    hit  = pos >= 0
+    df.loc[hit, "APN"] = table["New_APN"].to_numpy()[pos[hit]]
+    return df
 
-            qa_rows.append({
-                "Old_APN"          : old_apn,
-                "New_APN"          : new_apn,
-                "Change_Year"      : change_year,
-                "Change_Type"      : change_type,
-                "Years_Updated"    : len(safe_years),
-                "Years_Conflicted" : len(conflict_yrs),
-                "Total_Units_Moved": units_moved,
-                "Source"           : source,
-            })
 
-    return df, qa_rows
+def _apply_vectorized(
+    df: pd.DataFrame,
+    records: pd.DataFrame,
+    old_col: str = "apn_old",
+    new_col: str = "apn_new",
+) -> tuple[pd.DataFrame, list[dict]]:
+    """
+    Apply genealogy records to df — compile_remap() then apply_remap().
+    Returns (updated_df, qa_rows).
+    """
+    table, qa_rows = compile_remap(df, records, old_col, new_col)
+    log.debug("  Remap table: %d (APN, Year) keys from %d records",
+              len(table), len(qa_rows))
+    return apply_remap(df, table), qa_rows
 
 
 # ── Public entry point ────────────────────────────────────────────────────────
 
-def run(df_csv: pd.DataFrame) -> pd.DataFrame:
+def run(df_csv: pd.DataFrame, artifacts: dict = None) -> pd.DataFrame:
     log.info("=== Step 2b: Apply genealogy APN corrections ===")
 
     tahoe = _load_master_table(GENEALOGY_TAHOE)
@@ -196,8 +286,10 @@ def run(df_csv: pd.DataFrame) -> pd.DataFrame:
              len(all_qa), sum(r["Total_Units_Moved"] for r in all_qa))
 
     # Write QA table
+    df_qa = pd.DataFrame(all_qa)
+    if artifacts is not None:
+        artifacts["genealogy_applied"] = df_qa
     if all_qa:
-        df_qa = pd.DataFrame(all_qa)
         try:
             write_qa_table(
                 df_qa, QA_GENEALOGY_APPLIED,
@@ -3,45 +3,72 @@ Step 3 — Build APN crosswalk.
 
 For CSV APNs that don't exist in the output FC for a given year
 (parcel renames, historical splits), find the correct FC APN via
-centroid spatial join:
+centroid spatial join against that year's OUTPUT_FC polygons:
   Pass 1 — INTERSECT
   Pass 2 — CLOSEST (≤ CLOSEST_MAX_METERS)
 
+Each year's polygons go into one spatial_index.ZoneIndex, and both passes
+are a single bulk query over all of that year's missing centroids.
+
 Extends csv_lookup with (FC_APN, Year) → units entries.
 Writes QA_APN_Crosswalk table to GDB.
 """
 import sys
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
 
-import arcpy
+import numpy as np
 import pandas as pd
+import shapely
 
 from config import (OUTPUT_FC, SOURCE_FC, FC_APN, FC_YEAR, CSV_YEARS,
                     CLOSEST_MAX_METERS, QA_APN_CROSSWALK, ALL_PARCELS_CURRENT,
                     TOURIST_UNITS_CSV, COMMERCIAL_SQFT_CSV, GENEALOGY_TAHOE,
                     CSV_TOURIST_YEAR_PREFIX, CSV_COMMERCIAL_YEAR_PREFIX)
-from utils  import get_logger, write_qa_table, el_depad, el_pad, _EL_2D, _EL_3D
+from apn_index import APNS, ApnYearTable, keys_for, unpack
+from feature_store import get_store, OID
+from geometry_catalog import get_catalog
+from service_cache import load_layer, out_sr_for, SHAPE
+from spatial_index import ZoneIndex, inside_points
+from utils  import get_logger, write_qa_table
 from utils  import build_el_dorado_fix
 
 log = get_logger("s03_crosswalk")
 
-_MEM_CENTROIDS = "memory/xwalk_centroids"
-_MEM_JOIN      = "memory/xwalk_join"
 
+def _get_fc_apn_years() -> np.ndarray:
+    """Return the unique packed (APN, Year) keys present in the output FC."""
+    df = get_store().read(OUTPUT_FC, [FC_APN, FC_YEAR]).dropna()
+    return np.unique(keys_for(df[FC_APN], df[FC_YEAR].astype(int), intern=True))
 
-def _get_fc_apn_years() -> set:
-    """Return the set of (APN, Year) tuples present in the output FC."""
-    result = set()
-    with arcpy.da.SearchCursor(OUTPUT_FC, [FC_APN, FC_YEAR]) as cur:
-        for apn, yr in cur:
-            if apn and yr:
-                result.add((str(apn).strip(), int(yr)))
-    return result
+
+def _earliest_points(path: str, apns: set, no_year: int, pad: bool = True) -> dict:
+    """
+    {apn: ((x, y) centroid, source_year)} from *path*'s geometry catalog —
+    the earliest-year polygon of each APN in *apns*.  Rows of an APN's El
+    Dorado twin (APNS.variant; 2-digit APNs only with *pad*) stand for it
+    too; rows with no Year count as *no_year*.
+    """
+    cat  = get_catalog(path)
+    df   = cat.select()
+    rows = APNS.encode(df["APN"])        # interned first, so twins resolve
+    want = pd.Series(sorted(apns), dtype=object)
+    code = APNS.encode(want)
+    twin = APNS.variant(want, pad=pad)
+    # Catalog code → requested APN; a twin's rows win over the APN's own
+    canon = {c: a for c, a in zip(code.tolist(), want) if c >= 0}
+    canon.update((t, a) for t, a in zip(twin.tolist(), want) if t >= 0)
+
+    df = df.assign(_canon=pd.Series(rows, index=df.index).map(canon),
+                   _yr=df["Year"].fillna(no_year).astype(int))
+    df = (df[df["_canon"].notna()]
+            .sort_values(["_yr", OID], kind="stable")
+            .drop_duplicates(subset="_canon", keep="first"))
+    return {a: (xy, yr) for a, xy, yr in zip(df["_canon"], cat.xy(df), df["_yr"].tolist())}
 
 
 def _get_apn_geometry(apns: set) -> dict:
     """
-    For each APN in *apns*, return its geometry from OUTPUT_FC.
+    For each APN in *apns*, return its centroid from OUTPUT_FC.
     Uses the earliest year the APN appears (most likely to have full polygon).
 
     Two El Dorado format expansions are applied to maximise geometry hits:
@@ -56,136 +83,71 @@ def _get_apn_geometry(apns: set) -> dict:
     The 2-digit form never appears in the FC, so geometry lookup would fail.
     Also search for the padded 3-digit form so its geometry can be used.
 
-    Returns {apn: (geometry, source_year)}.
-    """
-    result = {}
+    Both are the APN's APNS.variant() twin, matched by code.
 
-    # Build a depad lookup: {2d_form -> canonical_3d_apn} for any 3-digit EL APNs
-    depad_lookup: dict = {}
-    # Build a pad lookup:  {3d_form -> canonical_2d_apn} for 2-digit-only EL APNs
-    pad_lookup: dict = {}
-    expanded: set = set(apns)
-    for apn in apns:
-        if _EL_3D.match(apn):
-            # Case A: 3-digit APN — also try 2-digit form for pre-2018 FC rows
-            two_d = el_depad(apn)
-            depad_lookup[two_d] = apn
-            expanded.add(two_d)
-        elif _EL_2D.match(apn):
-            # Case B: 2-digit APN — also try 3-digit form for 2018+ FC rows
-            three_d = el_pad(apn)
-            pad_lookup[three_d] = apn
-            expanded.add(three_d)
-
-    expanded_list = list(expanded)
-    batch = 500
-    for i in range(0, len(expanded_list), batch):
-        chunk = expanded_list[i:i+batch]
-        q = " OR ".join(f"{FC_APN} = {chr(39)}{a}{chr(39)}" for a in chunk)
-        with arcpy.da.SearchCursor(OUTPUT_FC, [FC_APN, FC_YEAR, "SHAPE@"], q) as cur:
-            for apn, yr, geom in cur:
-                if apn and geom and geom.area > 0:
-                    a = str(apn).strip()
-                    # Case A: resolve 2-digit form back to its canonical 3-digit key
-                    # Case B: resolve 3-digit form back to its canonical 2-digit key
-                    canonical = depad_lookup.get(a, pad_lookup.get(a, a))
-                    if canonical not in apns:
-                        continue
-                    if canonical not in result or yr < result[canonical][1]:
-                        result[canonical] = (geom, int(yr))
-    return result
+    Returns {apn: ((x, y) centroid, source_year)}.
+    """
+    return _earliest_points(OUTPUT_FC, apns, 9999)
 
 
-def _get_geometry_from_allparcels(apns: set, sr) -> dict:
+def _get_geometry_from_allparcels(apns: set) -> dict:
     """
     Fetch parcel geometry from the All Parcels current service for APNs that
-    have no geometry in the historical FC.  Returns {apn: (geometry, 9999)}.
+    have no geometry in the historical FC.  Returns {apn: ((x, y), 9999)}.
     9999 is a sentinel source_year meaning "current / service layer".
 
+    The layer comes from service_cache (requested in OUTPUT_FC's spatial
+    reference), so only a service change triggers a download and the APN
+    match is a local filter rather than batches of OR-chained queries.
+
     The All Parcels service APN field is assumed to be the same FC_APN constant.
-    If the service uses a different field name, update FC_APN in config or adjust
-    the SQL here.
+    If the service uses a different field name, update FC_APN in config.
     """
     result = {}
     if not apns:
         return result
 
-    lyr = "all_parcels_current_lyr"
     try:
-        if arcpy.Exists(lyr):
-            arcpy.management.Delete(lyr)
-        arcpy.management.MakeFeatureLayer(ALL_PARCELS_CURRENT, lyr)
-
-        apn_list = list(apns)
-        batch    = 100  # smaller batches for service queries
-        for i in range(0, len(apn_list), batch):
-            chunk = apn_list[i : i + batch]
-            sql   = " OR ".join(f"{FC_APN} = '{a}'" for a in chunk)
-            arcpy.management.SelectLayerByAttribute(lyr, "NEW_SELECTION", sql)
-            with arcpy.da.SearchCursor(lyr, [FC_APN, "SHAPE@"]) as cur:
-                for apn, geom in cur:
-                    if apn and geom and geom.area > 0:
-                        apn = str(apn).strip()
-                        if apn not in result:
-                            # Project geometry to match output FC spatial reference
-                            if geom.spatialReference.factoryCode != sr.factoryCode:
-                                geom = geom.projectAs(sr)
-                            result[apn] = (geom, 9999)
-
+        df = load_layer(ALL_PARCELS_CURRENT, out_fields=FC_APN,
+                        out_sr=out_sr_for(OUTPUT_FC))
     except Exception as exc:
         log.warning("All Parcels service query failed: %s", exc)
         log.warning("  APNs without geometry from service will be left unresolved.")
-    finally:
-        if arcpy.Exists(lyr):
-            arcpy.management.Delete(lyr)
+        return result
 
+    df = df[df[FC_APN].notna() & df[SHAPE].notna()].copy()
+    df[FC_APN] = df[FC_APN].astype(str).str.strip()
+    df = df[df[FC_APN].isin(apns)]
+    if df.empty:
+        return result
+    wkbs = df[SHAPE].to_numpy()
+    ok   = shapely.area(shapely.from_wkb(wkbs)) > 0
+    # Inside point (not the raw centroid, which can miss a concave parcel),
+    # same as the catalog points used for the other sources
+    for apn, c in zip(df[FC_APN].to_numpy()[ok], inside_points(wkbs[ok])):
+        if apn not in result:
+            result[apn] = ((c.x, c.y), 9999)
     return result
 
 
-def _get_geometry_from_source_fc(apns: set, sr) -> dict:
+def _get_geometry_from_source_fc(apns: set) -> dict:
     """
     Search SOURCE_FC for geometry for APNs not found in OUTPUT_FC or the
     All Parcels service.  Also tries El Dorado 2-digit variants so that
     3-digit APNs can be matched against pre-2018 SOURCE_FC rows.
 
-    Returns {apn: (geometry, source_year)} with sentinel year 9998.
+    Returns {apn: ((x, y) centroid, source_year)} with sentinel year 9998.
     """
-    result = {}
-    if not apns or not arcpy.Exists(SOURCE_FC):
-        return result
+    if not apns or not get_store().exists(SOURCE_FC):
+        return {}
 
-    depad_lookup: dict = {}
-    expanded: set = set(apns)
-    for apn in apns:
-        if _EL_3D.match(apn):
-            two_d = el_depad(apn)
-            depad_lookup[two_d] = apn
-            expanded.add(two_d)
-
-    sr_src       = arcpy.Describe(SOURCE_FC).spatialReference
-    needs_proj   = sr_src.factoryCode != sr.factoryCode
-    expanded_list = list(expanded)
-    batch = 500
-    for i in range(0, len(expanded_list), batch):
-        chunk = expanded_list[i:i+batch]
-        q = " OR ".join(f"{FC_APN} = '{a}'" for a in chunk)
-        with arcpy.da.SearchCursor(SOURCE_FC, [FC_APN, FC_YEAR, "SHAPE@"], q) as cur:
-            for apn, yr, geom in cur:
-                if apn and geom and geom.area > 0:
-                    a         = str(apn).strip()
-                    canonical = depad_lookup.get(a, a)
-                    if canonical not in apns:
-                        continue
-                    if needs_proj:
-                        geom = geom.projectAs(sr)
-                    yr_int = int(yr) if yr else 9998
-                    if canonical not in result or yr_int < result[canonical][1]:
-                        result[canonical] = (geom, yr_int)
-    return result
+    # OUTPUT_FC is created in SOURCE_FC's spatial reference by S01, so
+    # SOURCE_FC centroids need no projection.
+    return _earliest_points(SOURCE_FC, apns, 9998, pad=False)
 
 
-def _load_tau_cfa_apn_years() -> set:
-    """Return (APN, Year) combos with non-zero values from the Tourist and
+def _load_tau_cfa_apn_years() -> np.ndarray:
+    """Return packed (APN, Year) keys with non-zero values from the Tourist and
     Commercial CSVs, after El Dorado APN fix and genealogy substitution —
     so the crosswalk also covers non-residential parcels that are missing
     from OUTPUT_FC post-remap.
@@ -197,17 +159,76 @@ def _load_tau_cfa_apn_years() -> set:
     pad_map, depad_map = build_el_dorado_fix(OUTPUT_FC, FC_APN)
     gen = _load_master_table(GENEALOGY_TAHOE)
 
-    out = set()
+    out = []
     for csv_path, label, prefix in [
         (TOURIST_UNITS_CSV,  "TAU (for crosswalk)", CSV_TOURIST_YEAR_PREFIX),
         (COMMERCIAL_SQFT_CSV, "CFA (for crosswalk)", CSV_COMMERCIAL_YEAR_PREFIX),
     ]:
         lookup = _load_wide_csv(csv_path, label, prefix, pad_map, depad_map, gen)
-        out |= set(lookup.keys())
-    return out
+        out.append(lookup.packed)
+    return np.unique(np.concatenate(out))
+
 
+def _year_polygons(years: list) -> dict:
+    """{year: ZoneIndex over that year's OUTPUT_FC polygons (attrs: FC_APN)}."""
+    df = get_catalog(OUTPUT_FC).select(years=years, positive=False)
+    df = df[df["WKB"].notna()].rename(columns={"APN": FC_APN})
+    return {int(yr): ZoneIndex.from_wkb(g["WKB"], g[[FC_APN]])
+            for yr, g in df.groupby("Year")}
 
-def run(df_csv: pd.DataFrame, csv_lookup: dict) -> dict:
+
+def _spatial_crosswalk(missing: set, apn_geom: dict) -> list[dict]:
+    """
+    Match each missing (APN, Year) centroid to an OUTPUT_FC polygon of that
+    year: the polygon it falls in, else the nearest within
+    CLOSEST_MAX_METERS.  Returns QA_APN_Crosswalk rows.
+    """
+    if not apn_geom:
+        return []
+    mpu    = get_store().meters_per_unit(OUTPUT_FC)
+    radius = CLOSEST_MAX_METERS / mpu
+    pos    = {apn: i for i, apn in enumerate(apn_geom)}
+    xy     = np.array([pt for pt, _ in apn_geom.values()], dtype=float)
+    points = shapely.points(xy)
+
+    by_year: dict = {}
+    for apn, yr in missing:
+        if apn in pos:
+            by_year.setdefault(yr, []).append(apn)
+    indexes = _year_polygons(sorted(by_year))
+
+    rows = []
+    for year in sorted(CSV_YEARS):
+        if year not in by_year:
+            continue
+        apns  = np.asarray(sorted(by_year[year]), dtype=object)
+        pts   = points[[pos[a] for a in apns]]
+        zones = indexes.get(year)
+        if zones is None:
+            log.info("  %d : no polygons — %d APNs unmatched", year, len(apns))
+            continue
+        fc_apn = zones.attrs[FC_APN].to_numpy()
+
+        # Pass 1: INTERSECT
+        hit = zones.lookup(pts)
+        p1  = hit >= 0
+        rows += [{"CSV_APN": a, "FC_APN": f, "Year": year, "Match_Type": "intersect"}
+                 for a, f in zip(apns[p1], fc_apn[hit[p1]])]
+
+        # Pass 2: CLOSEST for still-unmatched
+        near, dist = zones.nearest(pts[~p1], radius)
+        dist_m = dist * mpu
+        p2 = (near >= 0) & (dist_m <= CLOSEST_MAX_METERS)
+        rows += [{"CSV_APN": a, "FC_APN": f, "Year": year,
+                  "Match_Type": f"closest_{d:.1f}m"}
+                 for a, f, d in zip(apns[~p1][p2], fc_apn[near[p2]], dist_m[p2])]
+
+        log.info("  %d : %d within + %d closest", year, int(p1.sum()), int(p2.sum()))
+    return rows
+
+
+def run(df_csv: pd.DataFrame, csv_lookup: ApnYearTable,
+        artifacts: dict = None) -> ApnYearTable:
     log.info("=== Step 3: Build APN crosswalk ===")
 
     # -- Find missing APN x Year combos --------------------------------------
@@ -216,13 +237,15 @@ def run(df_csv: pd.DataFrame, csv_lookup: dict) -> dict:
     # isn't in OUTPUT_FC for the target year.  Without this, S04b's UpdateCursor
     # silently drops TAU/CFA values for those rows.
     fc_apn_years     = _get_fc_apn_years()
-    csv_apn_years    = set(zip(df_csv["APN"], df_csv["Year"]))
+    res_apn_years    = np.unique(keys_for(df_csv["APN"], df_csv["Year"], intern=True))
     tau_cfa_combos   = _load_tau_cfa_apn_years()
-    csv_apn_years   |= tau_cfa_combos
-    missing          = csv_apn_years - fc_apn_years
+    csv_apn_years    = np.union1d(res_apn_years, tau_cfa_combos)
+    missing_keys     = np.setdiff1d(csv_apn_years[csv_apn_years >= 0], fc_apn_years)
+    codes, years     = unpack(missing_keys)
+    missing          = set(zip(APNS.decode(codes).tolist(), years.tolist()))
     log.info("Scope: residential=%d  TAU+CFA-added=%d  total=%d",
-             len(csv_apn_years) - len(tau_cfa_combos),
-             len(tau_cfa_combos), len(csv_apn_years))
+             len(res_apn_years), len(csv_apn_years) - len(res_apn_years),
+             len(csv_apn_years))
 
     missing_apns  = {apn for apn, _ in missing}
     log.info("CSV APN x Year combos   : %d", len(csv_apn_years))
@@ -231,6 +254,8 @@ def run(df_csv: pd.DataFrame, csv_lookup: dict) -> dict:
 
     if not missing:
         log.info("No missing APN x Year — crosswalk not needed.")
+        if artifacts is not None:
+            artifacts["crosswalk"] = pd.DataFrame(columns=["CSV_APN", "FC_APN"])
         return csv_lookup
 
     # -- Get geometry for missing APNs ----------------------------------------
@@ -245,8 +270,7 @@ def run(df_csv: pd.DataFrame, csv_lookup: dict) -> dict:
     if no_geom:
         log.info("Trying SOURCE_FC for %d APNs with no OUTPUT_FC geometry ...",
                  len(no_geom))
-        sr       = arcpy.Describe(OUTPUT_FC).spatialReference
-        src_geom = _get_geometry_from_source_fc(no_geom, sr)
+        src_geom = _get_geometry_from_source_fc(no_geom)
         log.info("  Found in SOURCE_FC: %d", len(src_geom))
         apn_geom.update(src_geom)
         has_geom = set(apn_geom.keys())
@@ -257,134 +281,40 @@ def run(df_csv: pd.DataFrame, csv_lookup: dict) -> dict:
     if no_geom:
         log.info("Trying All Parcels service for %d APNs with no FC geometry ...",
                  len(no_geom))
-        sr          = arcpy.Describe(OUTPUT_FC).spatialReference
-        svc_geom    = _get_geometry_from_allparcels(no_geom, sr)
+        svc_geom    = _get_geometry_from_allparcels(no_geom)
         log.info("  Found in All Parcels service: %d", len(svc_geom))
         apn_geom.update(svc_geom)
         has_geom = set(apn_geom.keys())
         no_geom  = missing_apns - has_geom
         log.info("  Still without geometry: %d", len(no_geom))
 
-    # -- Build centroid point FC in memory ------------------------------------
-    if arcpy.Exists(_MEM_CENTROIDS): arcpy.management.Delete(_MEM_CENTROIDS)
-    sr = arcpy.Describe(OUTPUT_FC).spatialReference
-    arcpy.management.CreateFeatureclass(
-        "memory", "xwalk_centroids", "POINT", spatial_reference=sr)
-    arcpy.management.AddField(_MEM_CENTROIDS, "CSV_APN",  "TEXT", field_length=50)
-    arcpy.management.AddField(_MEM_CENTROIDS, "SRC_YEAR", "LONG")
-
-    with arcpy.da.InsertCursor(_MEM_CENTROIDS, ["SHAPE@", "CSV_APN", "SRC_YEAR"]) as ic:
-        for apn, (geom, src_yr) in apn_geom.items():
-            centroid = geom.centroid
-            pt = arcpy.PointGeometry(centroid, sr)
-            ic.insertRow([pt, apn, src_yr])
-    log.info("Centroid FC: %d points",
-             int(arcpy.management.GetCount(_MEM_CENTROIDS).getOutput(0)))
-
     # -- Spatial join per year ------------------------------------------------
-    crosswalk_rows = []
-
-    _BATCH = 500  # max APNs per SQL WHERE clause
-
-    for year in sorted(CSV_YEARS):
-        # APNs missing in this year that have geometry
-        yr_missing = {apn for apn, yr in missing if yr == year and apn in has_geom}
-        if not yr_missing:
-            continue
-
-        fc_lyr  = "xwalk_fc_lyr"
-        pt_lyr  = "xwalk_pt_lyr"
-        pt_lyr2 = "xwalk_pt_lyr2"
-        for lyr in [fc_lyr, pt_lyr, pt_lyr2, _MEM_JOIN]:
-            if arcpy.Exists(lyr): arcpy.management.Delete(lyr)
-
-        sql_yr = f"{FC_YEAR} = {year}"
-        arcpy.management.MakeFeatureLayer(OUTPUT_FC, fc_lyr, sql_yr)
-
-        p1 = p2 = 0
-
-        # Pass 1: INTERSECT — batched to avoid SQL expression length limits
-        yr_list = sorted(yr_missing)
-        for i in range(0, len(yr_list), _BATCH):
-            batch = yr_list[i:i + _BATCH]
-            apn_filter = " OR ".join(
-                f"CSV_APN = {chr(39)}{a}{chr(39)}" for a in batch)
-            if arcpy.Exists(pt_lyr): arcpy.management.Delete(pt_lyr)
-            arcpy.management.MakeFeatureLayer(_MEM_CENTROIDS, pt_lyr, apn_filter)
-            if arcpy.Exists(_MEM_JOIN): arcpy.management.Delete(_MEM_JOIN)
-            arcpy.analysis.SpatialJoin(
-                pt_lyr, fc_lyr, _MEM_JOIN,
-                "JOIN_ONE_TO_ONE", "KEEP_ALL",
-                match_option="INTERSECT")
-            with arcpy.da.SearchCursor(
-                    _MEM_JOIN, ["CSV_APN", FC_APN, "Join_Count"]) as cur:
-                for csv_apn, fc_apn, jc in cur:
-                    if jc and jc > 0 and fc_apn:
-                        crosswalk_rows.append({
-                            "CSV_APN": csv_apn, "FC_APN": fc_apn,
-                            "Year": year, "Match_Type": "intersect"})
-                        p1 += 1
-        for lyr in [pt_lyr, _MEM_JOIN]:
-            if arcpy.Exists(lyr): arcpy.management.Delete(lyr)
-
-        # Pass 2: CLOSEST for still-unmatched — also batched
-        matched_p1 = {r["CSV_APN"] for r in crosswalk_rows if r["Year"] == year}
-        still_missing = sorted(yr_missing - matched_p1)
-        for i in range(0, len(still_missing), _BATCH):
-            batch = still_missing[i:i + _BATCH]
-            apn_filter2 = " OR ".join(
-                f"CSV_APN = {chr(39)}{a}{chr(39)}" for a in batch)
-            if arcpy.Exists(pt_lyr2): arcpy.management.Delete(pt_lyr2)
-            arcpy.management.MakeFeatureLayer(_MEM_CENTROIDS, pt_lyr2, apn_filter2)
-            if arcpy.Exists(_MEM_JOIN): arcpy.management.Delete(_MEM_JOIN)
-            arcpy.analysis.SpatialJoin(
-                pt_lyr2, fc_lyr, _MEM_JOIN,
-                "JOIN_ONE_TO_ONE", "KEEP_ALL",
-                match_option="CLOSEST",
-                search_radius=f"{CLOSEST_MAX_METERS} Meters",
-                distance_field_name="DISTANCE")
-            with arcpy.da.SearchCursor(
-                    _MEM_JOIN, ["CSV_APN", FC_APN, "Join_Count", "DISTANCE"]) as cur:
-                for csv_apn, fc_apn, jc, dist in cur:
-                    if jc and jc > 0 and fc_apn and dist <= CLOSEST_MAX_METERS:
-                        crosswalk_rows.append({
-                            "CSV_APN": csv_apn, "FC_APN": fc_apn,
-                            "Year": year, "Match_Type": f"closest_{dist:.1f}m"})
-                        p2 += 1
-        for lyr in [pt_lyr2, _MEM_JOIN]:
-            if arcpy.Exists(lyr): arcpy.management.Delete(lyr)
-
-        if arcpy.Exists(fc_lyr): arcpy.management.Delete(fc_lyr)
-
-        log.info("  %d : %d within + %d closest", year, p1, p2)
-
-    if arcpy.Exists(_MEM_CENTROIDS): arcpy.management.Delete(_MEM_CENTROIDS)
+    crosswalk_rows = _spatial_crosswalk(missing, apn_geom)
 
     # -- Extend csv_lookup ----------------------------------------------------
     df_xwalk = pd.DataFrame(crosswalk_rows) if crosswalk_rows else pd.DataFrame(
         columns=["CSV_APN", "FC_APN", "Year", "Match_Type"])
     df_xwalk["APN_Changed"] = df_xwalk["CSV_APN"] != df_xwalk["FC_APN"]
 
-    added = 0
-    for _, row in df_xwalk.iterrows():
-        fc_apn  = row["FC_APN"]
-        csv_apn = row["CSV_APN"]
-        year    = int(row["Year"])
-        val     = csv_lookup.get((csv_apn, year))
-        # Sum onto the target APN's existing value rather than skipping.
-        # When multiple retired/renamed CSV APNs spatially overlap the same
-        # FC parcel, all their units must be preserved, not just the first.
-        # Guard fc_apn == csv_apn to avoid double-counting a direct match
-        # that was already placed via the primary lookup.
-        if val is not None and fc_apn != csv_apn:
-            existing = csv_lookup.get((fc_apn, year), 0)
-            csv_lookup[(fc_apn, year)] = existing + (val or 0)
-            added += 1
+    # Sum onto the target APN's existing value rather than skipping.
+    # When multiple retired/renamed CSV APNs spatially overlap the same
+    # FC parcel, all their units must be preserved, not just the first.
+    # Guard fc_apn == csv_apn to avoid double-counting a direct match
+    # that was already placed via the primary lookup.
+    moves = df_xwalk[df_xwalk["APN_Changed"].astype(bool)]
+    years = moves["Year"].astype(int).to_numpy()
+    vals, found = csv_lookup.get_many(moves["CSV_APN"], years)
+    added = int(found.sum())
+    if added:
+        vals = pd.Series(vals[found]).fillna(0).to_numpy()
+        csv_lookup = csv_lookup.add(moves["FC_APN"].to_numpy()[found], years[found], vals)
 
     log.info("Crosswalk rows      : %d", len(df_xwalk))
     log.info("csv_lookup entries added: %d", added)
 
     # -- Write GDB table + CSV ------------------------------------------------
+    if artifacts is not None:
+        artifacts["crosswalk"] = df_xwalk
     if len(df_xwalk):
         write_qa_table(df_xwalk, QA_APN_CROSSWALK,
                        text_lengths={"CSV_APN": 50, "FC_APN": 50, "Match_Type": 50})
@@ -15,42 +15,40 @@ directly on each parcel in ArcGIS Pro:
   FC_Native_Units  (LONG)  — unit value from SOURCE_FC before this ETL run
   Unit_Source      (TEXT)  — BOTH_AGREE | CSV | FC_NATIVE | DISAGREE
 """
-import math
 import sys
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
 
-import arcpy
+import numpy as np
+import pandas as pd
 
 from config import OUTPUT_FC, SOURCE_FC, FC_APN, FC_YEAR, FC_UNITS, CSV_YEARS, FC_NATIVE_YEARS
+from apn_index import ApnYearTable, keys_for
+from feature_store import get_store, OID
+from unit_matrix import build_history
 from utils  import get_logger
 
 log = get_logger("s04_update_units")
 
 
-def _safe_int(val) -> int:
-    if val is None:
-        return 0
-    try:
-        if math.isnan(float(val)):
-            return 0
-    except (TypeError, ValueError):
-        pass
-    return int(val)
+def _as_int(vals) -> np.ndarray:
+    """int64 array with None / NaN → 0 (fractions truncated, like int())."""
+    return (pd.to_numeric(pd.Series(vals), errors="coerce")
+              .fillna(0).to_numpy(float).astype("int64"))
 
 
 def _ensure_fields() -> None:
     """Add FC_Native_Units and Unit_Source to OUTPUT_FC if not present."""
-    existing = {f.name for f in arcpy.ListFields(OUTPUT_FC)}
+    store    = get_store()
+    existing = set(store.fields(OUTPUT_FC))
     if "FC_Native_Units" not in existing:
-        arcpy.management.AddField(OUTPUT_FC, "FC_Native_Units", "LONG")
+        store.add_field(OUTPUT_FC, "FC_Native_Units", "LONG")
         log.info("Added field FC_Native_Units")
     if "Unit_Source" not in existing:
-        arcpy.management.AddField(OUTPUT_FC, "Unit_Source", "TEXT",
-                                  field_length=15)
+        store.add_field(OUTPUT_FC, "Unit_Source", "TEXT", 15)
         log.info("Added field Unit_Source")
 
 
-def _load_source_fc_natives() -> dict:
+def _load_source_fc_natives() -> ApnYearTable:
     """
     Load Residential_Units from SOURCE_FC for FC_NATIVE_YEARS.
 
@@ -59,94 +57,94 @@ def _load_source_fc_natives() -> dict:
     Returning them here enables the BOTH_AGREE / FC_NATIVE / DISAGREE merge
     logic to actually fire.
 
-    Returns {(apn, year): int} for rows with non-zero values only.
+    Returns an (apn, year) → int lookup of the rows with non-zero values only.
     """
-    if not arcpy.Exists(SOURCE_FC):
+    store = get_store()
+    if not store.exists(SOURCE_FC):
         log.warning("SOURCE_FC not found — FC native comparison unavailable.")
-        return {}
+        return ApnYearTable.empty()
 
-    yr_list = ", ".join(str(y) for y in FC_NATIVE_YEARS)
-    where   = f"{FC_YEAR} IN ({yr_list}) AND {FC_UNITS} > 0"
-    natives: dict = {}
     try:
-        with arcpy.da.SearchCursor(SOURCE_FC, [FC_APN, FC_YEAR, FC_UNITS], where) as cur:
-            for apn, yr, units in cur:
-                if apn and yr:
-                    v = _safe_int(units)
-                    if v > 0:
-                        natives[(str(apn).strip(), int(yr))] = v
+        df = store.read(SOURCE_FC, [FC_APN, FC_YEAR, FC_UNITS],
+                        where={FC_YEAR: FC_NATIVE_YEARS})
     except Exception as exc:
         log.warning("Could not read SOURCE_FC native values: %s", exc)
-        return {}
+        return ApnYearTable.empty()
+
+    df = df[df[FC_APN].notna() & df[FC_YEAR].notna()]
+    df = df.assign(v=_as_int(df[FC_UNITS]), y=df[FC_YEAR].astype(int))
+    df = df[df["v"] > 0]
+    natives = ApnYearTable.from_frame(df, FC_APN, "y", "v")
 
     log.info("SOURCE_FC native values loaded: %d entries  (years: %s)",
              len(natives), FC_NATIVE_YEARS)
     return natives
 
 
-def run(csv_lookup: dict) -> None:
-    log.info("=== Step 4: Update Residential_Units ===")
-
-    _ensure_fields()
+def build_updates(csv_lookup: ApnYearTable) -> pd.DataFrame:
+    """
+    Compute Residential_Units / FC_Native_Units / Unit_Source for every
+    OUTPUT_FC row in CSV_YEARS.  Read-only — returns an OID-keyed frame for
+    write() (or for main.py to merge with S4b's columns into one write).
+    """
+    store = get_store()
 
     # Load native unit values from SOURCE_FC.  OUTPUT_FC has no units at this
     # point (S01 builds it from geometry only), so we must go to the source.
     source_natives = _load_source_fc_natives()
 
-    year_list    = ", ".join(str(y) for y in CSV_YEARS)
-    where_clause = f"{FC_YEAR} IN ({year_list})"
-
-    counts = {"CSV": 0, "FC_NATIVE": 0, "BOTH_AGREE": 0, "DISAGREE": 0, "ZERO": 0}
-    updated = 0
-
-    with arcpy.da.UpdateCursor(
-            OUTPUT_FC,
-            ["OID@", FC_APN, FC_YEAR, FC_UNITS,
-             "FC_Native_Units", "Unit_Source"],
-            where_clause) as cur:
-
-        for oid, apn, yr, _, _, _ in cur:   # FC_UNITS ignored — always 0 here
-            if not apn or not yr:
-                continue
-
-            key    = (str(apn).strip(), int(yr))
-            native = source_natives.get(key, 0)  # from SOURCE_FC
-            csv_v  = csv_lookup.get(key)
-
-            if csv_v is not None:
-                csv_int = _safe_int(csv_v)
-                if native > 0:
-                    source = "BOTH_AGREE" if csv_int == native else "DISAGREE"
-                else:
-                    source = "CSV"
-                merged = csv_int
-            elif native > 0:
-                # CSV is sole authority — do not write FC native values to
-                # Residential_Units.  Tag the row FC_NATIVE so the analyst
-                # can review these in QA_Unit_Reconciliation; the native
-                # value is still stored in FC_Native_Units for reference.
-                merged = 0
-                source = "FC_NATIVE"
-            else:
-                merged = 0
-                source = "CSV"
-
-            if merged == 0 and source == "CSV":
-                counts["ZERO"] += 1
-            else:
-                counts[source] += 1
-
-            cur.updateRow([oid, apn, yr, merged, native, source])
-            updated += 1
-
-    log.info("Rows updated        : %d", updated)
-    log.info("  BOTH_AGREE        : %d", counts["BOTH_AGREE"])
-    log.info("  CSV (FC native=0) : %d", counts["CSV"])
+    # One bulk read of the keys in scope; FC_UNITS is ignored — always 0 here.
+    fc = store.read(OUTPUT_FC, [OID, FC_APN, FC_YEAR], where={FC_YEAR: CSV_YEARS})
+    fc = fc[fc[FC_APN].notna() & fc[FC_YEAR].notna()].copy()
+    keys = keys_for(fc[FC_APN], fc[FC_YEAR].astype(int))
+
+    native           = source_natives.get_keys(keys)[0].astype("int64")
+    csv_raw, has_csv = csv_lookup.get_keys(keys)
+    csv_int          = _as_int(csv_raw)
+
+    merged = np.where(has_csv, csv_int, 0)
+    source = np.select(
+        [has_csv & (native > 0) & (csv_int == native),
+         has_csv & (native > 0),
+         ~has_csv & (native > 0)],
+        # FC_NATIVE: CSV is sole authority — do not write FC native values to
+        # Residential_Units.  Tag the row FC_NATIVE so the analyst can review
+        # these in QA_Unit_Reconciliation; the native value is still stored
+        # in FC_Native_Units for reference.
+        ["BOTH_AGREE", "DISAGREE", "FC_NATIVE"],
+        default="CSV")
+
+    frame = pd.DataFrame({
+        OID              : fc[OID].to_numpy(),
+        FC_UNITS         : merged,
+        "FC_Native_Units": native,
+        "Unit_Source"    : source,
+    })
+
+    zero = (merged == 0) & (source == "CSV")
+    counts = pd.Series(source[~zero]).value_counts()
+    log.info("Rows in scope       : %d", len(frame))
+    log.info("  BOTH_AGREE        : %d", counts.get("BOTH_AGREE", 0))
+    log.info("  CSV (FC native=0) : %d", counts.get("CSV", 0))
     log.info("  FC_NATIVE         : %d  ← units SOURCE_FC has that CSV lacks",
-             counts["FC_NATIVE"])
+             counts.get("FC_NATIVE", 0))
     log.info("  DISAGREE          : %d  ← both sources differ, CSV used",
-             counts["DISAGREE"])
-    log.info("  Zeroed            : %d", counts["ZERO"])
+             counts.get("DISAGREE", 0))
+    log.info("  Zeroed            : %d", int(zero.sum()))
+    return frame
+
+
+def write(frame: pd.DataFrame) -> int:
+    """Write an OID-keyed update frame to OUTPUT_FC.  Returns rows updated."""
+    _ensure_fields()
+    return get_store().update(OUTPUT_FC, frame, key=[OID])
+
+
+def run(csv_lookup: ApnYearTable) -> None:
+    log.info("=== Step 4: Update Residential_Units ===")
+    updated = write(build_updates(csv_lookup))
+    log.info("Rows updated        : %d", updated)
+    build_history(OUTPUT_FC)
     log.info("Step 4 complete.")
 
 
@@ -13,17 +13,17 @@ Processing
   2. Apply El Dorado APN fix (same padding/depadding logic as s02)
   3. Apply genealogy from master table (same apn_genealogy_tahoe.csv used in s02b)
   4. Build {(APN, Year): value} lookup
-  5. Write to OUTPUT_FC in a single UpdateCursor pass — null / missing = 0
+  5. Write to OUTPUT_FC in a single bulk store update — null / missing = 0
+     (main.py merges this with S4's columns into one write)
 
 For tourist units the write is simple: CSV value wins, no FC-native reconciliation.
 """
-import math
 import sys
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
 
 from pathlib import Path
 
-import arcpy
+import numpy as np
 import pandas as pd
 
 from config import (
@@ -35,6 +35,9 @@ from config import (
     CSV_TOURIST_YEAR_PREFIX, CSV_COMMERCIAL_YEAR_PREFIX,
     QA_DATA_DIR,
 )
+from apn_index import ApnYearTable
+from feature_store import get_store, OID
+from unit_matrix import build_history
 from utils import get_logger, build_el_dorado_fix, apply_el_dorado_fix
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parent))  # steps/
 from s02b_genealogy import _load_master_table, _apply_vectorized
@@ -42,30 +45,28 @@ from s02b_genealogy import _load_master_table, _apply_vectorized
 log = get_logger("s04b_tourist_commercial")
 
 
-def _safe_num(val) -> float:
-    if val is None:
-        return 0.0
-    try:
-        v = float(val)
-        return 0.0 if math.isnan(v) else v
-    except (TypeError, ValueError):
-        return 0.0
+def _as_num(vals) -> np.ndarray:
+    """float array with None / NaN / non-numeric → 0.0."""
+    return pd.to_numeric(pd.Series(vals), errors="coerce").fillna(0.0).to_numpy(float)
 
 
 # ── CSV loaders ───────────────────────────────────────────────────────────────
 
 def _load_wide_csv(csv_path: str, label: str, year_prefix: str,
                    pad_map: dict, depad_map: dict,
-                   gen: pd.DataFrame = None) -> dict:
+                   gen: pd.DataFrame = None, raw: dict = None) -> ApnYearTable:
     """
     Load a wide-format APN x CY<year> CSV.
-    Returns {(APN, Year): value} lookup.
+    Returns an (APN, Year) → value lookup of the non-zero values.
+    The CSV as read is stored in *raw* under *label* (S6 totals it).
     """
     if not Path(csv_path).exists():
         log.info("  %s CSV not found at %s — skipping", label, csv_path)
-        return {}
+        return ApnYearTable.empty()
 
     df_wide = pd.read_csv(csv_path, dtype=str)
+    if raw is not None:
+        raw[label] = df_wide
 
     # Normalise APN column — may be named "APN" or "Row Labels"
     if "APN" not in df_wide.columns:
@@ -103,14 +104,14 @@ def _load_wide_csv(csv_path: str, label: str, year_prefix: str,
 
     # Drop zero rows (no-match rows stay 0 in FC, no need to write them)
     df_nonzero = df[df["Value"] > 0]
-    lookup = {(row.APN, row.Year): row.Value for row in df_nonzero.itertuples(index=False)}
+    lookup = ApnYearTable.from_frame(df_nonzero, "APN", "Year", "Value")
     log.info("  %s lookup: %d non-zero (APN, Year) entries", label, len(lookup))
     return lookup
 
 
 # ── Crosswalk application ─────────────────────────────────────────────────────
 
-def _apply_crosswalk(lookup: dict, label: str) -> dict:
+def _apply_crosswalk(lookup: ApnYearTable, label: str) -> ApnYearTable:
     """
     Apply S03's QA_APN_Crosswalk to a (APN, Year) -> value lookup.
 
@@ -126,17 +127,16 @@ def _apply_crosswalk(lookup: dict, label: str) -> dict:
         return lookup
 
     xw = pd.read_csv(xw_path, dtype=str)
-    moved = 0
-    for _, row in xw.iterrows():
-        csv_apn = str(row["CSV_APN"]).strip()
-        fc_apn  = str(row["FC_APN"]).strip()
-        year    = int(row["Year"])
-        if csv_apn == fc_apn:
-            continue
-        val = lookup.get((csv_apn, year))
-        if val and val > 0:
-            lookup[(fc_apn, year)] = lookup.get((fc_apn, year), 0) + val
-            moved += 1
+    xw["CSV_APN"] = xw["CSV_APN"].astype(str).str.strip()
+    xw["FC_APN"]  = xw["FC_APN"].astype(str).str.strip()
+    xw = xw[xw["CSV_APN"] != xw["FC_APN"]]
+    years = xw["Year"].astype(int).to_numpy()
+
+    vals, found = lookup.get_many(xw["CSV_APN"], years)
+    hit   = found & (vals > 0)
+    moved = int(hit.sum())
+    if moved:
+        lookup = lookup.add(xw["FC_APN"].to_numpy()[hit], years[hit], vals[hit])
 
     log.info("  %s: crosswalk applied — %d values summed onto FC parent APN rows",
              label, moved)
@@ -145,39 +145,37 @@ def _apply_crosswalk(lookup: dict, label: str) -> dict:
 
 # ── FC writer ─────────────────────────────────────────────────────────────────
 
-def _write_to_fc(tourist_lookup: dict, commercial_lookup: dict) -> None:
-    year_list    = ", ".join(str(y) for y in CSV_YEARS)
-    where_clause = f"{FC_YEAR} IN ({year_list})"
-
-    t_updated = c_updated = 0
-
-    with arcpy.da.UpdateCursor(
-            OUTPUT_FC,
-            [FC_APN, FC_YEAR, FC_TOURIST_UNITS, FC_COMMERCIAL_SQFT],
-            where_clause) as cur:
-
-        for apn, yr, _, _ in cur:
-            if not apn or not yr:
-                continue
-            key = (str(apn).strip(), int(yr))
+def _build_frame(tourist_lookup: ApnYearTable,
+                 commercial_lookup: ApnYearTable) -> pd.DataFrame:
+    store = get_store()
+    fc = store.read(OUTPUT_FC, [OID, FC_APN, FC_YEAR], where={FC_YEAR: CSV_YEARS})
+    fc = fc[fc[FC_APN].notna() & fc[FC_YEAR].notna()]
+    years = fc[FC_YEAR].astype(int).to_numpy()
 
-            t_val = tourist_lookup.get(key, 0)
-            c_val = commercial_lookup.get(key, 0)
+    t_vals = _as_num(tourist_lookup.get_many(fc[FC_APN], years)[0])
+    c_vals = _as_num(commercial_lookup.get_many(fc[FC_APN], years)[0])
+    frame = pd.DataFrame({
+        OID               : fc[OID].to_numpy(),
+        FC_TOURIST_UNITS  : t_vals.astype("int64"),
+        FC_COMMERCIAL_SQFT: c_vals,
+    })
 
-            if t_val > 0: t_updated += 1
-            if c_val > 0: c_updated += 1
-
-            cur.updateRow([apn, yr, int(t_val), float(c_val)])
-
-    log.info("  %s: %d rows with non-zero value written", FC_TOURIST_UNITS,   t_updated)
-    log.info("  %s: %d rows with non-zero value written", FC_COMMERCIAL_SQFT, c_updated)
+    t_updated = int((t_vals > 0).sum())
+    c_updated = int((c_vals > 0).sum())
+    log.info("  %s: %d rows with non-zero value", FC_TOURIST_UNITS,   t_updated)
+    log.info("  %s: %d rows with non-zero value", FC_COMMERCIAL_SQFT, c_updated)
+    return frame
 
 
 # ── Public entry point ────────────────────────────────────────────────────────
 
-def run() -> None:
-    log.info("=== Step 4b: Update Tourist & Commercial attributes ===")
-
+def build_updates(artifacts: dict = None) -> pd.DataFrame | None:
+    """
+    Load, fix and crosswalk the TAU / CFA CSVs and compute the OID-keyed
+    update frame for OUTPUT_FC.  Read-only; returns None when neither CSV
+    has data.  The CSVs as read go to artifacts["tourist_wide"] /
+    artifacts["commercial_wide"] for S6.
+    """
     pad_map, depad_map = build_el_dorado_fix(OUTPUT_FC, FC_APN)
     log.info("El Dorado pad map: %d APNs, depad map: %d APNs",
              len(pad_map), len(depad_map))
@@ -188,10 +186,16 @@ def run() -> None:
     else:
         log.info("Genealogy master not found — APN corrections skipped")
 
+    raw = {}
     tourist_lookup    = _load_wide_csv(TOURIST_UNITS_CSV,    "Tourist units",
-                                       CSV_TOURIST_YEAR_PREFIX,   pad_map, depad_map, gen)
+                                       CSV_TOURIST_YEAR_PREFIX,   pad_map, depad_map, gen, raw)
     commercial_lookup = _load_wide_csv(COMMERCIAL_SQFT_CSV,  "Commercial sqft",
-                                       CSV_COMMERCIAL_YEAR_PREFIX, pad_map, depad_map, gen)
+                                       CSV_COMMERCIAL_YEAR_PREFIX, pad_map, depad_map, gen, raw)
+    if artifacts is not None:
+        for key, label in (("tourist_wide", "Tourist units"),
+                           ("commercial_wide", "Commercial sqft")):
+            if label in raw:
+                artifacts[key] = raw[label]
 
     # Re-route post-genealogy APNs whose target FC row is missing to their
     # spatial parent (same rescue S03 does for residential csv_lookup).
@@ -200,9 +204,15 @@ def run() -> None:
 
     if not tourist_lookup and not commercial_lookup:
         log.info("No tourist or commercial data to write — skipping FC update.")
-        log.info("Step 4b complete.")
-        return
+        return None
+    return _build_frame(tourist_lookup, commercial_lookup)
 
-    log.info("Writing to OUTPUT_FC...")
-    _write_to_fc(tourist_lookup, commercial_lookup)
+
+def run() -> None:
+    log.info("=== Step 4b: Update Tourist & Commercial attributes ===")
+    frame = build_updates()
+    if frame is not None:
+        log.info("Writing to OUTPUT_FC...")
+        get_store().update(OUTPUT_FC, frame, key=[OID])
+        build_history(OUTPUT_FC)
     log.info("Step 4b complete.")
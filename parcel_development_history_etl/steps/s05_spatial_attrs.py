@@ -3,8 +3,8 @@ Step 5 — Update spatial attributes via service spatial joins.
 
 Fields updated:
   PARCEL_ACRES, PARCEL_SQFT         from SHAPE@ geometry
-  WITHIN_TRPA_BNDY                  SelectLayerByLocation vs TRPA boundary
-  WITHIN_BONUSUNIT_BNDY             SelectLayerByLocation vs Bonus Unit boundary
+  WITHIN_TRPA_BNDY                  parcel polygon intersects TRPA boundary
+  WITHIN_BONUSUNIT_BNDY             parcel polygon intersects Bonus Unit boundary
   TOWN_CENTER                       centroid → TownCenter polygons
   LOCATION_TO_TOWNCENTER            centroid → LocationToTownCenter polygons
   TAZ                               centroid → TAZ polygons
@@ -14,345 +14,281 @@ Fields updated:
 
 Approach
 --------
-1. Cache every service layer to memory before any spatial operations.
-   Joining directly against a live service URL silently truncates at the
-   service's max record count (often 1000–2000).
-
-2. Build one polygon per APN (most recent year) then derive centroid points.
+1. Load every service layer through service_cache before any spatial
+   operations.  Joining directly against a live service URL silently
+   truncates at the service's max record count (often 1000–2000); the cache
+   pages through the whole layer and only re-downloads it when the layer's
+   fingerprint changes.
+
+2. Take one point per APN (most recent year) from the geometry catalog,
+   which also supplies the polygons and areas, so this step reads no
+   geometry from OUTPUT_FC itself.
    Zone membership joins use centroid INTERSECT, not polygon LARGEST_OVERLAP.
    LARGEST_OVERLAP always finds *something* — even for out-of-basin parcels
    with no real zone assignment — producing silently wrong values.  A centroid
    that falls outside all zone polygons correctly returns NULL.
 
-3. Collect results into {APN: values} dicts, then write back to all year-rows
-   in a single cursor pass per field group.
+   Each zone layer is loaded once into a shapely STRtree (spatial_index.py)
+   and all centroids are resolved in one bulk point-in-polygon query, with
+   the same INTERSECT / first-match semantics SpatialJoin used.
+
+3. Collect results into {APN: values} dicts and merge them, together with
+   the acreage and WITHIN flags, into one OID-keyed frame written back in a
+   single bulk store update.
 
 4. Each service join is wrapped in try/except so a single failing service
    does not abort the remaining joins.
+
+The work is declared as a scheduler graph: the scope read overlaps the
+service downloads, and every load / flag / join is its own node.  Nothing
+here touches arcpy, so every node runs in parallel.
 """
 import sys
 sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
 
-import arcpy
+import numpy as np
+import pandas as pd
+import shapely
 
 from config import OUTPUT_FC, FC_APN, FC_YEAR, CSV_YEARS, SPATIAL_SOURCES
+from feature_store import get_store, OID, WKB, AREA
+from geometry_catalog import GeometryCatalog, get_catalog
+from scheduler import Node, run_graph
+from service_cache import load_layer, out_sr_for, SHAPE
+from spatial_index import ZoneIndex
 from utils  import get_logger
 
 log = get_logger("s05_spatial_attrs")
 
-_MEM = "memory"
+# Planar area conversions (PARCEL_ACRES / PARCEL_SQFT are in US survey feet)
+_SQM_PER_ACRE    = 4046.8564224
+_SQM_PER_SQFT_US = (1200 / 3937) ** 2
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _make_scope_layer(lyr_name: str) -> None:
-    """Feature layer of all output FC rows in CSV_YEARS."""
-    if arcpy.Exists(lyr_name):
-        arcpy.management.Delete(lyr_name)
-    yr_list = ", ".join(str(y) for y in CSV_YEARS)
-    arcpy.management.MakeFeatureLayer(
-        OUTPUT_FC, lyr_name, f"{FC_YEAR} IN ({yr_list})")
-
-
-def _make_dedup_fc() -> str:
+def _dedup_points(scope: pd.DataFrame) -> tuple[list, np.ndarray]:
     """
-    Build an in-memory FC with one polygon per APN (most recent year).
+    One label point per APN, taken from its most recent year's polygon.
     Zone membership doesn't change year-to-year for a stable APN, so joining
-    against all 14 year-rows is redundant and slow.
-    """
-    mem_fc = f"{_MEM}/s05_dedup"
-    if arcpy.Exists(mem_fc):
-        arcpy.management.Delete(mem_fc)
-
-    best: dict[str, tuple[int, object]] = {}
-    yr_list = ", ".join(str(y) for y in CSV_YEARS)
-    with arcpy.da.SearchCursor(
-            OUTPUT_FC, [FC_APN, FC_YEAR, "SHAPE@"],
-            where_clause=f"{FC_YEAR} IN ({yr_list})") as cur:
-        for apn, year, geom in cur:
-            if apn and geom:
-                a = str(apn).strip()
-                if a not in best or year > best[a][0]:
-                    best[a] = (year, geom)
-
-    sr = arcpy.Describe(OUTPUT_FC).spatialReference
-    arcpy.management.CreateFeatureclass(_MEM, "s05_dedup", "POLYGON",
-                                        spatial_reference=sr)
-    arcpy.management.AddField(mem_fc, FC_APN, "TEXT", field_length=50)
-
-    with arcpy.da.InsertCursor(mem_fc, [FC_APN, "SHAPE@"]) as ic:
-        for apn, (_, geom) in best.items():
-            ic.insertRow([apn, geom])
-
-    n = int(arcpy.management.GetCount(mem_fc).getOutput(0))
-    log.info("  Dedup layer: %d unique APNs", n)
-    return mem_fc
-
-
-def _make_centroids(dedup_fc: str) -> str:
+    against all 14 year-rows is redundant and slow.  The points come
+    precomputed from the geometry catalog.
+    Returns (apns, points) — parallel sequences.
     """
-    Generate one centroid point per APN from dedup_fc using INSIDE
-    (guaranteed to land inside the polygon even for irregular shapes).
-    """
-    mem_fc = f"{_MEM}/s05_centroids"
-    if arcpy.Exists(mem_fc):
-        arcpy.management.Delete(mem_fc)
-    arcpy.management.FeatureToPoint(dedup_fc, mem_fc, "INSIDE")
-    n = int(arcpy.management.GetCount(mem_fc).getOutput(0))
-    log.info("  Centroid layer: %d points", n)
-    return mem_fc
+    df = scope[scope[FC_APN].notna() & scope["X"].notna()].copy()
+    df[FC_APN] = df[FC_APN].astype(str).str.strip()
+    best = (df.sort_values(FC_YEAR, ascending=False, kind="stable")
+              .drop_duplicates(subset=FC_APN, keep="first"))
+    log.info("  Dedup layer: %d unique APNs", len(best))
+    return best[FC_APN].tolist(), GeometryCatalog.points(best)
 
 
-def _cache_service(url: str, tag: str) -> str | None:
+def _load_service(url: str, tag: str, out_sr: int) -> pd.DataFrame | None:
     """
-    Download a service layer to memory and return its path.
+    Load a service layer through the on-disk cache, in OUTPUT_FC's spatial
+    reference (*out_sr*) so the in-memory joins need no projection.
     Returns None on failure so callers can skip gracefully.
     """
-    mem_fc = f"{_MEM}/s05_svc_{tag}"
-    if arcpy.Exists(mem_fc):
-        arcpy.management.Delete(mem_fc)
     try:
-        arcpy.management.CopyFeatures(url, mem_fc)
-        n = int(arcpy.management.GetCount(mem_fc).getOutput(0))
-        if n == 0:
-            log.warning("  Cached %s but got 0 features — skipping", tag)
-            arcpy.management.Delete(mem_fc)
-            return None
-        log.info("  Cached %-20s  %d features", tag, n)
-        return mem_fc
+        df = load_layer(url, out_sr=out_sr)
     except Exception as exc:
-        log.error("  Failed to cache %s: %s", tag, exc)
+        log.error("  Failed to load %s: %s", tag, exc)
+        return None
+    if df.empty:
+        log.warning("  Loaded %s but got 0 features — skipping", tag)
         return None
+    log.info("  Loaded %-20s  %d features", tag, len(df))
+    return df
 
 
-def _flag_within(scope_lyr: str, source_fc: str, field: str) -> int:
-    """Set field = 0 for all rows, then 1 for rows that intersect source_fc."""
-    with arcpy.da.UpdateCursor(scope_lyr, [field]) as cur:
-        for row in cur:
-            row[0] = 0
-            cur.updateRow(row)
-    sel = arcpy.management.SelectLayerByLocation(scope_lyr, "INTERSECT", source_fc)
-    n = 0
-    with arcpy.da.UpdateCursor(sel, [field]) as cur:
-        for row in cur:
-            row[0] = 1
-            cur.updateRow(row)
-            n += 1
-    arcpy.management.SelectLayerByAttribute(scope_lyr, "CLEAR_SELECTION")
-    return n
-
-
-_SYSTEM_FIELDS = {"OBJECTID", "Shape", "Shape_Length", "Shape_Area",
-                  "Join_Count", "TARGET_FID"}
-_NUMERIC_TYPES = {"SmallInteger", "Integer", "Single", "Double"}
+def _zone_index(df: pd.DataFrame) -> ZoneIndex:
+    return ZoneIndex.from_wkb(df[SHAPE], df.drop(columns=[SHAPE]))
 
 
-def _resolve_fields(join_fc: str, requested: list[str]) -> dict[str, str]:
-    """
-    Map requested field names to their actual names in the join output FC.
+_NUMERIC_TYPES = {"SmallInteger", "Integer", "Single", "Double"}
 
-    SpatialJoin appends _1 to any field from the join layer whose name
-    conflicts with the target layer.  Since our centroid FC only has APN,
-    OBJECTID, and Shape, conflicts are rare but possible (e.g. if the service
-    has its own APN field).
 
-    Returns {requested_name: actual_name}.  Fields that cannot be resolved
-    are logged as warnings and excluded from the result.
-    """
-    available = {f.name for f in arcpy.ListFields(join_fc)}
-    mapping   = {}
-    for req in requested:
-        if req in available:
-            mapping[req] = req
-        elif f"{req}_1" in available:
-            mapping[req] = f"{req}_1"
-            log.debug("    %s resolved to %s_1 in join output", req, req)
-        else:
-            avail_str = sorted(f for f in available if f not in _SYSTEM_FIELDS)
-            log.warning("    Field '%s' not found in join output. Available: %s",
-                        req, avail_str)
-    return mapping
-
-
-def _sj_collect(centroid_fc: str, cached_fc: str,
-                source_fields: list[str], label: str) -> dict[str, tuple]:
-    """
-    Spatial join centroid_fc → cached_fc using INTERSECT.
+def _coerce(v, ftype):
+    if v is None:
+        return None
+    if ftype in _NUMERIC_TYPES:
+        try:
+            return int(v) if ftype in {"SmallInteger", "Integer"} else float(v)
+        except (ValueError, TypeError):
+            return None
+    return str(v)
 
-    Returns {apn: (val, ...)} only for APNs whose centroid falls inside a
-    zone polygon (Join_Count > 0).  APNs outside all zones are absent from
-    the dict and will remain NULL in the output FC — which is correct.
 
-    INTERSECT on centroid points (vs LARGEST_OVERLAP on polygons) means no
-    parcel is silently matched to a wrong zone due to a sliver overlap.
+def _merge_updates(scope: pd.DataFrame, flags: dict[str, set],
+                   joins: dict[str, tuple[list[str], dict]]) -> pd.DataFrame:
     """
-    join_fc = f"{_MEM}/s05_join_{label}"
-    if arcpy.Exists(join_fc):
-        arcpy.management.Delete(join_fc)
-
-    arcpy.analysis.SpatialJoin(
-        centroid_fc, cached_fc, join_fc,
-        "JOIN_ONE_TO_ONE", "KEEP_ALL",
-        match_option="INTERSECT")
-
-    field_map = _resolve_fields(join_fc, source_fields)
-    if not field_map:
-        if arcpy.Exists(join_fc):
-            arcpy.management.Delete(join_fc)
-        return {}
-
-    actual_fields = [field_map[r] for r in source_fields if r in field_map]
-
-    results: dict[str, tuple] = {}
-    with arcpy.da.SearchCursor(
-            join_fc, [FC_APN, "Join_Count"] + actual_fields) as cur:
-        for row in cur:
-            apn        = row[0]
-            join_count = row[1]
-            if apn and join_count and join_count > 0:
-                results[str(apn).strip()] = row[2:]
-
-    if arcpy.Exists(join_fc):
-        arcpy.management.Delete(join_fc)
-
-    return results
+    Build the single OID-keyed update frame for OUTPUT_FC.
 
+    scope : OID, APN, SHAPE@AREA and the current value of every join target field
+    flags : {field: OIDs inside the boundary}   (absent = service not loaded)
+    joins : {svc_key: (target_fields, {apn: values})}
 
-def _write_back(scope_lyr: str, apn_dict: dict[str, tuple],
-                target_fields: list[str]) -> int:
+    APNs absent from a join's dict keep their current value (NULL stays NULL),
+    exactly as the old per-join write-back left them unchanged.
     """
-    Write apn_dict values to all year-rows in scope_lyr matched by APN.
-    APNs absent from apn_dict are left unchanged (NULL stays NULL).
-    Returns number of row-years written.
-    """
-    tgt_types = {f.name: f.type for f in arcpy.ListFields(scope_lyr)
-                 if f.name in target_fields}
-    n = 0
-    with arcpy.da.UpdateCursor(scope_lyr, [FC_APN] + target_fields) as cur:
-        for row in cur:
-            apn = str(row[0]).strip() if row[0] else None
-            if not apn or apn not in apn_dict:
-                continue
-            vals = apn_dict[apn]
-            for i, v in enumerate(vals[:len(target_fields)]):
-                ftype = tgt_types.get(target_fields[i], "String")
-                if v is None:
-                    row[i + 1] = None
-                elif ftype in _NUMERIC_TYPES:
-                    try:
-                        row[i + 1] = (int(v) if ftype in {"SmallInteger", "Integer"}
-                                      else float(v))
-                    except (ValueError, TypeError):
-                        row[i + 1] = None
-                else:
-                    row[i + 1] = str(v)
-            cur.updateRow(row)
-            n += 1
-    return n
+    tgt_types = get_store().fields(OUTPUT_FC)
+    out = pd.DataFrame({OID: scope[OID].to_numpy()})
+
+    # PARCEL_ACRES / PARCEL_SQFT
+    sq_m = scope[AREA].to_numpy() * get_store().meters_per_unit(OUTPUT_FC) ** 2
+    has_area = scope[AREA].fillna(0).to_numpy() > 0
+    out["PARCEL_ACRES"] = pd.Series(sq_m / _SQM_PER_ACRE).where(has_area, scope["PARCEL_ACRES"])
+    out["PARCEL_SQFT"]  = pd.Series(sq_m / _SQM_PER_SQFT_US).where(has_area, scope["PARCEL_SQFT"])
+
+    # WITHIN flags — 1 inside, 0 for the rest of the scope
+    for field, hits in flags.items():
+        out[field] = scope[OID].isin(hits).astype(int).to_numpy()
+        log.info("  %s = 1 : %d rows", field, int(out[field].sum()))
+
+    # Zone joins, broadcast from APN to every year-row
+    apns = scope[FC_APN].astype(str).str.strip()
+    for svc_key, (tgt_flds, apn_dict) in joins.items():
+        for i, fld in enumerate(tgt_flds):
+            ftype = tgt_types.get(fld, "String")
+            vals  = {a: _coerce(v[i], ftype) for a, v in apn_dict.items() if i < len(v)}
+            hit   = apns.isin(vals.keys()).to_numpy()
+            col   = scope[fld].astype(object).to_numpy().copy()
+            col[hit] = apns[hit].map(vals).to_numpy()
+            out[fld] = col
+        log.info("  [%s] %d row-years written", svc_key,
+                 int(apns.isin(apn_dict.keys()).sum()))
+
+    # "Outside Town Center" is the service's catch-all polygon, not a town center
+    tc = out["TOWN_CENTER"] if "TOWN_CENTER" in out.columns else scope["TOWN_CENTER"]
+    outside = (tc == "Outside Town Center").to_numpy()
+    out["TOWN_CENTER"] = tc.astype(object).where(~outside, None).to_numpy()
+    log.info("Nulled TOWN_CENTER = 'Outside Town Center' on %d rows", int(outside.sum()))
+
+    # Never write a column the FC doesn't have
+    return out[[c for c in out.columns if c == OID or c in tgt_types]]
 
 
 # ── Main step ─────────────────────────────────────────────────────────────────
 
-def run() -> None:
-    log.info("=== Step 5: Spatial attribute updates ===")
-
-    scope_lyr = "s05_scope"
-    _make_scope_layer(scope_lyr)
-    n_scope = int(arcpy.management.GetCount(scope_lyr).getOutput(0))
-    log.info("Rows in scope: %d", n_scope)
-
-    # -- PARCEL_ACRES / PARCEL_SQFT ------------------------------------------
-    log.info("Calculating PARCEL_ACRES / PARCEL_SQFT ...")
-    n = 0
-    with arcpy.da.UpdateCursor(
-            scope_lyr, ["PARCEL_ACRES", "PARCEL_SQFT", "SHAPE@"]) as cur:
-        for row in cur:
-            if row[2] and row[2].area > 0:
-                row[0] = row[2].getArea("PLANAR", "ACRES")
-                row[1] = row[2].getArea("PLANAR", "SquareFeetUS")
-                cur.updateRow(row)
-                n += 1
-    log.info("  %d rows updated", n)
-
-    # -- Cache all service layers to memory ----------------------------------
-    log.info("Caching service layers ...")
-    cached = {}
-    for key, url in SPATIAL_SOURCES.items():
-        cached[key] = _cache_service(url, key)
-
-    # -- WITHIN flags (SelectLayerByLocation — unaffected by join logic) -----
-    for svc_key, field in [("TRPA_bdy",  "WITHIN_TRPA_BNDY"),
-                            ("BonusUnit", "WITHIN_BONUSUNIT_BNDY")]:
-        log.info("Flagging %s ...", field)
-        if cached.get(svc_key):
+_JOINS = [
+    # centroid INTERSECT: a centroid outside all zone polygons → JOIN_COUNT=0
+    # → stays NULL.  No parcel is silently matched to the wrong zone.
+    ("TownCenter",        ["Name"],
+     ["TOWN_CENTER"]),
+    ("LocationToTownCtr", ["BUFFER_NAME"],
+     ["LOCATION_TO_TOWNCENTER"]),
+    ("TAZ",               ["TAZ"],
+     ["TAZ"]),
+    ("LocalPlan",         ["PLAN_ID", "PLAN_NAME"],
+     ["PLAN_ID", "PLAN_NAME"]),
+    ("Zoning",            ["ZONING_ID", "ZONING_DESCRIPTION"],
+     ["ZONING_ID", "ZONING_DESCRIPTION"]),
+    ("RegionalLandUse",   ["REGIONAL_LAND_USE"],
+     ["REGIONAL_LANDUSE"]),
+]
+_FLAGS = [("TRPA_bdy",  "WITHIN_TRPA_BNDY"),
+          ("BonusUnit", "WITHIN_BONUSUNIT_BNDY")]
+
+
+def _graph() -> list[Node]:
+    """Scheduler nodes for the whole step; 'updates' is the merged frame."""
+    store = get_store()
+    tgt_all = ["PARCEL_ACRES", "PARCEL_SQFT"] + [f for _, _, t in _JOINS for f in t]
+
+    def read_scope():
+        existing = set(store.fields(OUTPUT_FC))
+        fields = [OID, FC_APN, FC_YEAR] + [f for f in tgt_all if f in existing]
+        df = store.read(OUTPUT_FC, fields, where={FC_YEAR: CSV_YEARS})
+        geo = get_catalog(OUTPUT_FC).frame[[OID, "WKB", "AREA", "X", "Y"]]
+        df = df.merge(geo.rename(columns={"WKB": WKB, "AREA": AREA}), on=OID, how="left")
+        for f in tgt_all:
+            if f not in df.columns:
+                df[f] = None
+        log.info("Rows in scope: %d", len(df))
+        return {"scope": df}
+
+    out_sr = out_sr_for(OUTPUT_FC)
+
+    def load(key, url):
+        return lambda: {f"svc:{key}": _load_service(url, key, out_sr)}
+
+    def flag(svc_key, field):
+        def fn(**kw):
+            src = kw[f"svc:{svc_key}"]
+            if src is None:
+                log.warning("  Skipping %s — service not loaded", field)
+                return {f"flag:{field}": None}
+            scope = kw["scope"]
             try:
-                cnt = _flag_within(scope_lyr, cached[svc_key], field)
-                log.info("  %s = 1 : %d rows", field, cnt)
+                geoms = shapely.from_wkb(scope[WKB].to_numpy())
+                inside = _zone_index(src).intersects_any(geoms)
             except Exception as exc:
                 log.error("  %s failed: %s", field, exc)
-        else:
-            log.warning("  Skipping %s — service not cached", field)
+                return {f"flag:{field}": None}
+            return {f"flag:{field}": set(scope.loc[inside, OID])}
+        return fn
+
+    def points(scope):
+        log.info("Building one label point per APN ...")
+        return {"points": _dedup_points(scope)}
+
+    def join(svc_key, src_flds, tgt_flds):
+        def fn(**kw):
+            src = kw[f"svc:{svc_key}"]
+            if src is None:
+                log.warning("  Skipping %s — service not loaded", svc_key)
+                return {f"join:{svc_key}": None}
+            apns, pts = kw["points"]
+            try:
+                index = _zone_index(src)
+                log.info("Spatial join: %s (%d zones) ...", svc_key, len(index))
+                apn_dict = index.collect(apns, pts, src_flds)
+            except Exception as exc:
+                log.error("  [%s] failed: %s", svc_key, exc)
+                return {f"join:{svc_key}": None}
+            n_dedup = len(apns)
+            pct     = 100.0 * len(apn_dict) / n_dedup if n_dedup else 0
+            log.info("  [%s] %d / %d APNs matched (%.1f%%)",
+                     svc_key, len(apn_dict), n_dedup, pct)
+            return {f"join:{svc_key}": (tgt_flds, apn_dict)}
+        return fn
 
-    # -- One polygon per APN → centroid points for zone joins ----------------
-    log.info("Building deduplicated APN layer ...")
-    dedup_fc = _make_dedup_fc()
-    n_dedup  = int(arcpy.management.GetCount(dedup_fc).getOutput(0))
+    def merge(**kw):
+        flags = {f: kw[f"flag:{f}"] for _, f in _FLAGS if kw[f"flag:{f}"] is not None}
+        joins = {k: kw[f"join:{k}"] for k, _, _ in _JOINS if kw[f"join:{k}"] is not None}
+        return {"updates": _merge_updates(kw["scope"], flags, joins)}
 
-    log.info("Generating centroid points ...")
-    centroid_fc = _make_centroids(dedup_fc)
+    nodes = [Node("s05.scope",  read_scope, outputs=["scope"]),
+             Node("s05.points", points, inputs=["scope"], outputs=["points"])]
+    for key, url in SPATIAL_SOURCES.items():
+        nodes.append(Node(f"s05.load.{key}", load(key, url), outputs=[f"svc:{key}"]))
+    for svc_key, field in _FLAGS:
+        nodes.append(Node(f"s05.flag.{field}", flag(svc_key, field),
+                          inputs=["scope", f"svc:{svc_key}"], outputs=[f"flag:{field}"]))
+    for svc_key, src_flds, tgt_flds in _JOINS:
+        nodes.append(Node(f"s05.join.{svc_key}", join(svc_key, src_flds, tgt_flds),
+                          inputs=["points", f"svc:{svc_key}"],
+                          outputs=[f"join:{svc_key}"]))
+    nodes.append(Node("s05.merge", merge,
+                      inputs=["scope"] + [f"flag:{f}" for _, f in _FLAGS]
+                             + [f"join:{k}" for k, _, _ in _JOINS],
+                      outputs=["updates"]))
+    return nodes
+
+
+def build_updates() -> pd.DataFrame:
+    """
+    Run every load / flag / join and return the merged OID-keyed update
+    frame for OUTPUT_FC without writing it.
+    """
+    log.info("Loading service layers and running joins ...")
+    return run_graph(_graph())["updates"]
 
-    # -- Zone membership joins -----------------------------------------------
-    # centroid INTERSECT: a centroid outside all zone polygons → JOIN_COUNT=0
-    # → stays NULL.  No parcel is silently matched to the wrong zone.
-    joins = [
-        ("TownCenter",        ["Name"],
-         ["TOWN_CENTER"]),
-        ("LocationToTownCtr", ["BUFFER_NAME"],
-         ["LOCATION_TO_TOWNCENTER"]),
-        ("TAZ",               ["TAZ"],
-         ["TAZ"]),
-        ("LocalPlan",         ["PLAN_ID", "PLAN_NAME"],
-         ["PLAN_ID", "PLAN_NAME"]),
-        ("Zoning",            ["ZONING_ID", "ZONING_DESCRIPTION"],
-         ["ZONING_ID", "ZONING_DESCRIPTION"]),
-        ("RegionalLandUse",   ["REGIONAL_LAND_USE"],
-         ["REGIONAL_LANDUSE"]),
-    ]
-
-    for svc_key, src_flds, tgt_flds in joins:
-        log.info("Spatial join: %s ...", svc_key)
-        if not cached.get(svc_key):
-            log.warning("  Skipping %s — service not cached", svc_key)
-            continue
-        try:
-            apn_dict = _sj_collect(centroid_fc, cached[svc_key], src_flds, svc_key)
-            pct      = 100.0 * len(apn_dict) / n_dedup if n_dedup else 0
-            log.info("  [%s] %d / %d APNs matched (%.1f%%)",
-                     svc_key, len(apn_dict), n_dedup, pct)
-            n_written = _write_back(scope_lyr, apn_dict, tgt_flds)
-            log.info("  [%s] %d row-years written", svc_key, n_written)
-        except Exception as exc:
-            log.error("  [%s] failed: %s", svc_key, exc)
-
-    # -- Null out "Outside Town Center" catch-all ----------------------------
-    log.info("Nulling TOWN_CENTER = 'Outside Town Center' ...")
-    n_outside = 0
-    with arcpy.da.UpdateCursor(
-            scope_lyr, ["TOWN_CENTER"],
-            "TOWN_CENTER = 'Outside Town Center'") as cur:
-        for row in cur:
-            row[0] = None
-            cur.updateRow(row)
-            n_outside += 1
-    log.info("  Cleared %d rows", n_outside)
-
-    # -- Cleanup -------------------------------------------------------------
-    for name in [scope_lyr, dedup_fc, centroid_fc]:
-        if arcpy.Exists(name):
-            arcpy.management.Delete(name)
-    for fc_path in [f"{_MEM}/s05_svc_{k}" for k in SPATIAL_SOURCES]:
-        if arcpy.Exists(fc_path):
-            arcpy.management.Delete(fc_path)
 
+def run() -> None:
+    log.info("=== Step 5: Spatial attribute updates ===")
+    updates = build_updates()
+    n = get_store().update(OUTPUT_FC, updates, key=[OID])
+    log.info("%d rows updated", n)
     log.info("Step 5 complete.")
 
 
@@ -10,12 +10,27 @@ QA_Spatial_Completeness Null spatial attr counts (TRPA boundary rows only)
 QA_FC_Units_Not_In_CSV  FC units > 0 where raw CSV has no entry for that APN x Year
                         (categorised: EL_DORADO_FORMAT, GENEALOGY_REMAP,
                          CROSSWALK_REMAP, UNKNOWN)
+
+Inputs
+------
+OUTPUT_FC is read once; every check filters or groups that one frame against
+df_csv and the by-products the earlier steps left in *artifacts*:
+
+  residential_wide   raw residential CSV as read by S2
+  genealogy_applied  QA_Genealogy_Applied rows from S2b
+  crosswalk          QA_APN_Crosswalk rows from S3
+  tourist_wide       raw TAU / CFA CSVs as read by S4b
+  commercial_wide
+
+Anything missing (--only-qa, or a step skipped by its checkpoint) is read
+back from the CSVs / GDB tables instead.
 """
 import re
 import sys
-sys.path.insert(0, str(__import__('pathlib').Path(__file__).parents[1]))
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parents[1]))
 
-import arcpy
+import numpy as np
 import pandas as pd
 
 from config import (
@@ -30,6 +45,7 @@ from config import (
     QA_GENEALOGY_APPLIED, QA_APN_CROSSWALK, QA_FC_NOT_IN_CSV,
     QA_UNIT_RECONCILIATION,
 )
+from feature_store import get_store
 from utils import get_logger, write_qa_table
 
 log = get_logger("s06_qa")
@@ -43,20 +59,14 @@ def _read_fc() -> pd.DataFrame:
     qa_fields = [FC_APN, FC_YEAR, FC_UNITS, FC_COUNTY,
                  FC_TOURIST_UNITS, FC_COMMERCIAL_SQFT,
                  "WITHIN_TRPA_BNDY", "FC_Native_Units", "Unit_Source"] + SPATIAL_FIELDS
-    existing  = {f.name for f in arcpy.ListFields(OUTPUT_FC)}
+    store     = get_store()
+    existing  = set(store.fields(OUTPUT_FC))
     read      = [f for f in qa_fields if f in existing]
     missing   = set(qa_fields) - existing
     if missing:
         log.warning("Fields not in FC (skipped): %s", sorted(missing))
 
-    yr_list = ", ".join(str(y) for y in CSV_YEARS)
-    rows = []
-    with arcpy.da.SearchCursor(
-            OUTPUT_FC, read, f"{FC_YEAR} IN ({yr_list})") as cur:
-        for row in cur:
-            rows.append(dict(zip(read, row)))
-
-    df = pd.DataFrame(rows).rename(columns={
+    df = store.read(OUTPUT_FC, read, where={FC_YEAR: CSV_YEARS}).rename(columns={
         FC_APN: "APN", FC_YEAR: "Year",
         FC_UNITS: "FC_Units", FC_COUNTY: "COUNTY",
         FC_TOURIST_UNITS: "FC_TAU", FC_COMMERCIAL_SQFT: "FC_CFA"})
@@ -67,14 +77,10 @@ def _read_fc() -> pd.DataFrame:
     return df
 
 
-def _load_wide_csv_totals(csv_path: str, year_prefix: str) -> pd.Series:
-    """Sum a wide-format APN x <prefix><year> CSV to per-year totals.
+def _wide_csv_totals(df: pd.DataFrame, year_prefix: str) -> pd.Series:
+    """Sum a wide-format APN x <prefix><year> frame to per-year totals.
     Returns Series indexed by Year with the summed value.
     """
-    from pathlib import Path
-    if not Path(csv_path).exists():
-        return pd.Series(dtype=float)
-    df = pd.read_csv(csv_path, dtype=str)
     if "APN" not in df.columns:
         df = df.rename(columns={df.columns[0]: "APN"})
     yr_cols = [c for c in df.columns if c.upper().startswith(year_prefix.upper())]
@@ -87,6 +93,16 @@ def _load_wide_csv_totals(csv_path: str, year_prefix: str) -> pd.Series:
     return long[long["Year"].isin(CSV_YEARS)].groupby("Year")["Value"].sum()
 
 
+def _load_wide_csv_totals(csv_path: str, year_prefix: str,
+                          df: pd.DataFrame = None) -> pd.Series:
+    """Per-year totals of the wide CSV S4b read (*df*), else of *csv_path*."""
+    if df is None:
+        if not Path(csv_path).exists():
+            return pd.Series(dtype=float)
+        df = pd.read_csv(csv_path, dtype=str)
+    return _wide_csv_totals(df, year_prefix)
+
+
 def _check_wide_totals(label: str, csv_totals: pd.Series, fc_totals: pd.Series,
                        gdb_table: str) -> None:
     """Emit a per-year CSV-vs-FC diff check (parallel to Check 1)."""
@@ -149,45 +165,47 @@ def _categorise_lost(apn: str, yrs_lost: list, yrs_in_fc: set) -> tuple[str, str
     )
 
 
-def _raw_csv_positive_set() -> set:
+def _raw_csv_positive(df: pd.DataFrame = None) -> pd.MultiIndex:
     """
-    Read the raw input CSV (no APN transformations) and return the set of
-    (APN, Year) pairs where Units > 0.  Used by Check 5.
+    (APN, Year) pairs where the raw input CSV (no APN transformations) has
+    Units > 0.  *df* is the wide CSV S2 read; without it CSV_PATH is read.
+    Used by Check 5.
     """
-    df = pd.read_csv(CSV_PATH, dtype=str)
+    if df is None:
+        df = pd.read_csv(CSV_PATH, dtype=str)
     year_cols = [c for c in df.columns if "Final" in c]
     df_long = df.melt(id_vars="APN", value_vars=year_cols,
                       var_name="Year_Label", value_name="Units")
     df_long["Year"]  = df_long["Year_Label"].str.extract(r"(\d{4})").astype(int)
     df_long["Units"] = pd.to_numeric(df_long["Units"], errors="coerce").fillna(0)
     df_long["APN"]   = df_long["APN"].astype(str).str.strip()
-    df_long = df_long[df_long["Year"].isin(CSV_YEARS)]
-    return set(zip(df_long.loc[df_long["Units"] > 0, "APN"],
-                   df_long.loc[df_long["Units"] > 0, "Year"]))
+    df_long = df_long[df_long["Year"].isin(CSV_YEARS) & (df_long["Units"] > 0)]
+    return pd.MultiIndex.from_arrays([df_long["APN"].astype(object),
+                                      df_long["Year"].astype(np.int64)])
 
 
-def _read_remap_sets() -> tuple[set, set]:
+def _read_remap_sets(genealogy: pd.DataFrame = None,
+                     crosswalk: pd.DataFrame = None) -> tuple[set, set]:
     """
     Return (genealogy_new_apns, crosswalk_fc_apns) — APNs that received units
     via genealogy substitution or spatial crosswalk respectively.
     Used by Check 5 to categorise why the FC APN doesn't appear in the raw CSV.
+    Taken from the S2b / S3 frames when given, else read from the GDB.
     """
-    genealogy_apns = set()
-    crosswalk_apns = set()
-
-    if arcpy.Exists(QA_GENEALOGY_APPLIED):
-        with arcpy.da.SearchCursor(QA_GENEALOGY_APPLIED, ["New_APN"]) as cur:
-            for (apn,) in cur:
-                if apn:
-                    genealogy_apns.add(str(apn).strip())
+    store = get_store()
 
-    if arcpy.Exists(QA_APN_CROSSWALK):
-        with arcpy.da.SearchCursor(QA_APN_CROSSWALK, ["FC_APN"]) as cur:
-            for (apn,) in cur:
-                if apn:
-                    crosswalk_apns.add(str(apn).strip())
+    def _apn_set(df: pd.DataFrame, table: str, field: str) -> set:
+        if df is None:
+            if not store.exists(table):
+                return set()
+            df = store.read(table, [field])
+        if field not in df.columns:
+            return set()
+        apns = df[field].dropna().astype(str).str.strip()
+        return set(apns[apns != ""])
 
-    return genealogy_apns, crosswalk_apns
+    return (_apn_set(genealogy, QA_GENEALOGY_APPLIED, "New_APN"),
+            _apn_set(crosswalk, QA_APN_CROSSWALK, "FC_APN"))
 
 
 _PRIORITY = {"DISAGREE": 1, "FC_NATIVE": 2, "CSV_ONLY": 3}
@@ -215,46 +233,38 @@ def _check_unit_reconciliation(df_fc: pd.DataFrame) -> None:
         return
 
     # Restrict to years where FC has native data
-    df_native_yrs = df_fc[df_fc["Year"].isin(FC_NATIVE_YEARS)].copy()
-    df_native_yrs["FC_Native_Units"] = df_native_yrs["FC_Native_Units"].fillna(0).astype(int)
-
-    records = []
-
-    for _, row in df_native_yrs.iterrows():
-        source   = str(row.get("Unit_Source", "")).strip()
-        csv_val  = int(row.get("FC_Units", 0))        # merged (CSV-wins) value
-        fc_val   = int(row.get("FC_Native_Units", 0))
-        apn      = str(row["APN"]).strip()
-        year     = int(row["Year"])
-
-        if source == "DISAGREE":
-            category = "DISAGREE"
-            diff     = abs(csv_val - fc_val)
-        elif source == "FC_NATIVE":
-            category = "FC_NATIVE"
-            diff     = fc_val           # CSV had 0; diff = what FC adds
-        elif source == "CSV" and csv_val > 0 and fc_val == 0:
-            category = "CSV_ONLY"
-            diff     = csv_val
-        else:
-            continue                   # BOTH_AGREE or both zero — no action needed
-
-        records.append({
-            "APN"            : apn,
-            "Year"           : year,
-            "CSV_Units"      : csv_val,
-            "FC_Native_Units": fc_val,
-            "Unit_Diff"      : diff,
-            "Category"       : category,
-            "Priority"       : _PRIORITY.get(category, 9),
-            "Review_Note"    : _reconciliation_note(category, csv_val, fc_val),
-        })
-
-    if not records:
+    df_native_yrs = df_fc[df_fc["Year"].isin(FC_NATIVE_YEARS)]
+    source  = df_native_yrs["Unit_Source"].astype(str).str.strip()
+    csv_val = df_native_yrs["FC_Units"].fillna(0).astype(int)     # merged (CSV-wins) value
+    fc_val  = df_native_yrs["FC_Native_Units"].fillna(0).astype(int)
+
+    # BOTH_AGREE or both zero — no action needed
+    conds = [source == "DISAGREE",
+             source == "FC_NATIVE",
+             (source == "CSV") & (csv_val > 0) & (fc_val == 0)]
+    category = pd.Series(np.select(conds, ["DISAGREE", "FC_NATIVE", "CSV_ONLY"], ""),
+                         index=df_native_yrs.index)
+    diff = np.select(conds, [(csv_val - fc_val).abs(), fc_val, csv_val], 0)
+    keep = (category != "").to_numpy()
+
+    records = pd.DataFrame({
+        "APN"            : df_native_yrs["APN"].astype(str).str.strip(),
+        "Year"           : df_native_yrs["Year"].astype(int),
+        "CSV_Units"      : csv_val,
+        "FC_Native_Units": fc_val,
+        "Unit_Diff"      : diff,
+        "Category"       : category,
+    })[keep]
+    records["Priority"]    = records["Category"].map(_PRIORITY).fillna(9).astype(int)
+    records["Review_Note"] = [_reconciliation_note(c, a, b) for c, a, b in
+                              zip(records["Category"], records["CSV_Units"],
+                                  records["FC_Native_Units"])]
+
+    if records.empty:
         log.info("  No reconciliation discrepancies found.")
         return
 
-    df_recon = (pd.DataFrame(records)
+    df_recon = (records
                 .sort_values(["Priority", "Unit_Diff"], ascending=[True, False])
                 .reset_index(drop=True))
 
@@ -290,8 +300,9 @@ def _reconciliation_note(category: str, csv_val: int, fc_val: int) -> str:
     return ""
 
 
-def run(df_csv: pd.DataFrame) -> None:
+def run(df_csv: pd.DataFrame, artifacts: dict = None) -> None:
     log.info("=== Step 6: QA checks ===")
+    artifacts = artifacts or {}
 
     df_fc = _read_fc()
 
@@ -317,14 +328,16 @@ def run(df_csv: pd.DataFrame) -> None:
     # ── Check 1b: Tourist Accommodation Units by year ──────────────────────
     if "FC_TAU" in df_fc.columns:
         log.info("Check 1b: Tourist Accommodation Units by year ...")
-        tau_csv_tot = _load_wide_csv_totals(TOURIST_UNITS_CSV, CSV_TOURIST_YEAR_PREFIX)
+        tau_csv_tot = _load_wide_csv_totals(TOURIST_UNITS_CSV, CSV_TOURIST_YEAR_PREFIX,
+                                            artifacts.get("tourist_wide"))
         tau_fc_tot  = df_fc.groupby("Year")["FC_TAU"].sum()
         _check_wide_totals("TAU", tau_csv_tot, tau_fc_tot, QA_TAU_BY_YEAR)
 
     # ── Check 1c: Commercial Floor Area SqFt by year ───────────────────────
     if "FC_CFA" in df_fc.columns:
         log.info("Check 1c: Commercial Floor Area SqFt by year ...")
-        cfa_csv_tot = _load_wide_csv_totals(COMMERCIAL_SQFT_CSV, CSV_COMMERCIAL_YEAR_PREFIX)
+        cfa_csv_tot = _load_wide_csv_totals(COMMERCIAL_SQFT_CSV, CSV_COMMERCIAL_YEAR_PREFIX,
+                                            artifacts.get("commercial_wide"))
         cfa_fc_tot  = df_fc.groupby("Year")["FC_CFA"].sum()
         _check_wide_totals("CFA", cfa_csv_tot, cfa_fc_tot, QA_CFA_BY_YEAR)
 
@@ -340,7 +353,8 @@ def run(df_csv: pd.DataFrame) -> None:
     df_lost["FC_Units"] = df_lost["FC_Units"].fillna(0).astype(int)
 
     # For each lost APN, determine which years it's present in the FC
-    fc_apn_years = df_fc.groupby("APN")["Year"].apply(set).to_dict()
+    df_fc_lost   = df_fc[df_fc["APN"].isin(set(df_lost["APN"]))]
+    fc_apn_years = df_fc_lost.groupby("APN")["Year"].apply(set).to_dict()
 
     # Categorise
     lost_records = []
@@ -387,8 +401,8 @@ def run(df_csv: pd.DataFrame) -> None:
     if len(df_dups):
         write_qa_table(df_dups, QA_DUPLICATE_APN_YEAR,
                         text_lengths={"APN": 50, "COUNTY": 10})
-    elif arcpy.Exists(QA_DUPLICATE_APN_YEAR):
-        arcpy.management.Delete(QA_DUPLICATE_APN_YEAR)
+    elif get_store().exists(QA_DUPLICATE_APN_YEAR):
+        get_store().drop(QA_DUPLICATE_APN_YEAR)
 
     # ── Check 4: Spatial completeness (TRPA boundary only) ────────────────
     log.info("Check 4: Spatial completeness (WITHIN_TRPA_BNDY = 1 only) ...")
@@ -422,27 +436,25 @@ def run(df_csv: pd.DataFrame) -> None:
 
     # ── Check 5: FC units with no raw-CSV match ────────────────────────────
     log.info("Check 5: FC units not in raw CSV (APN x Year) ...")
-    raw_pos                       = _raw_csv_positive_set()
-    genealogy_new_apns, xwalk_apns = _read_remap_sets()
+    raw_pos = _raw_csv_positive(artifacts.get("residential_wide"))
+    genealogy_new_apns, xwalk_apns = _read_remap_sets(artifacts.get("genealogy_applied"),
+                                                      artifacts.get("crosswalk"))
 
     df_fc_pos = df_fc[df_fc["FC_Units"] > 0][["APN","Year","FC_Units","COUNTY"]].copy()
-    df_no_raw = df_fc_pos[~df_fc_pos.apply(
-        lambda r: (r["APN"], int(r["Year"])) in raw_pos, axis=1)].copy()
-
-    def _categorise_fc(row) -> str:
-        apn    = str(row["APN"]).strip()
-        yr     = int(row["Year"])
-        county = str(row.get("COUNTY", "")).strip().upper()
-        # El Dorado format: 3-digit suffix APN, county = EL, year >= EL_PAD_YEAR
-        if county == "EL" and yr >= EL_PAD_YEAR and _3D.match(apn):
-            return "EL_DORADO_FORMAT"
-        if apn in genealogy_new_apns:
-            return "GENEALOGY_REMAP"
-        if apn in xwalk_apns:
-            return "CROSSWALK_REMAP"
-        return "UNKNOWN"
-
-    df_no_raw["Category"] = df_no_raw.apply(_categorise_fc, axis=1)
+    fc_keys   = pd.MultiIndex.from_arrays([df_fc_pos["APN"].astype(object),
+                                           df_fc_pos["Year"].astype(np.int64)])
+    df_no_raw = df_fc_pos[~fc_keys.isin(raw_pos)].copy()
+
+    apn    = df_no_raw["APN"].astype(str).str.strip()
+    county = df_no_raw["COUNTY"].astype(str).str.strip().str.upper()
+    # El Dorado format: 3-digit suffix APN, county = EL, year >= EL_PAD_YEAR
+    df_no_raw["Category"] = np.select(
+        [(county == "EL") & (df_no_raw["Year"].astype(int) >= EL_PAD_YEAR)
+         & apn.str.match(_3D.pattern),
+         apn.isin(genealogy_new_apns),
+         apn.isin(xwalk_apns)],
+        ["EL_DORADO_FORMAT", "GENEALOGY_REMAP", "CROSSWALK_REMAP"],
+        "UNKNOWN")
 
     log.info("  FC units with no raw CSV match : %d rows  (%d unique APNs)",
              len(df_no_raw), df_no_raw["APN"].nunique())
@@ -467,5 +479,6 @@ def run(df_csv: pd.DataFrame) -> None:
 
 if __name__ == "__main__":
     import s02_load_csv as s02
-    df_csv, _ = s02.run()
-    run(df_csv)
+    artifacts = {}
+    df_csv, _ = s02.run(artifacts)
+    run(df_csv, artifacts)
@@ -0,0 +1,78 @@
+"""
+S3's spatial crosswalk over a local GeoParquet OUTPUT_FC / SOURCE_FC:
+renamed and split parcels map to the 2019 polygon their old footprint
+falls in, parcels with nothing nearby stay unmapped.
+
+    python -m pytest tests
+"""
+import sys
+import types
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import shapely
+from shapely.geometry import box
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.modules.setdefault("arcpy", types.ModuleType("arcpy"))
+
+import feature_store
+import geometry_catalog
+from config import OUTPUT_FC, SOURCE_FC, FC_APN, FC_YEAR
+from steps import s03_crosswalk as s03
+
+OUTPUT_ROWS = [
+    # 2018 footprints of the CSV APNs
+    ("001-010-01", 2018, box(0, 0, 100, 100)),
+    ("001-010-02", 2018, box(200, 0, 300, 100)),
+    # 2019: 001-010-01 renamed, 001-010-02 split 70 / 30
+    ("001-010-51", 2019, box(0, 0, 100, 100)),
+    ("001-010-52", 2019, box(200, 0, 270, 100)),
+    ("001-010-53", 2019, box(270, 0, 300, 100)),
+    ("001-010-60", 2019, box(400, 0, 500, 100)),
+]
+SOURCE_ROWS = [
+    # Only in SOURCE_FC: centre 40 m east of 001-010-60 / far from any 2019 parcel
+    ("001-010-03", 2015, box(520, 0, 560, 100)),
+    ("001-010-04", 2015, box(1500, 1500, 1600, 1600)),
+]
+
+
+def _layer(rows) -> pd.DataFrame:
+    apn, year, geom = zip(*rows)
+    return pd.DataFrame({"OBJECTID": range(1, len(rows) + 1), FC_APN: apn,
+                         FC_YEAR: year, "SHAPE": shapely.to_wkb(list(geom))})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A LocalFeatureStore in *tmp_path* holding OUTPUT_ROWS / SOURCE_ROWS."""
+    local = feature_store.LocalFeatureStore(tmp_path / "store")
+    local._save(OUTPUT_FC, _layer(OUTPUT_ROWS), meta={"meters_per_unit": 1.0})
+    local._save(SOURCE_FC, _layer(SOURCE_ROWS), meta={"meters_per_unit": 1.0})
+    monkeypatch.setattr(feature_store, "_STORE", local)
+    monkeypatch.setattr(geometry_catalog, "GEOMETRY_CATALOG_DIR", str(tmp_path / "catalog"))
+    monkeypatch.setattr(geometry_catalog, "_MEMO", {})
+    return local
+
+
+def test_spatial_crosswalk(store):
+    missing = {(a, 2019) for a in
+               ["001-010-01", "001-010-02", "001-010-03", "001-010-04"]}
+    apns = {a for a, _ in missing}
+
+    apn_geom = s03._get_apn_geometry(apns)
+    assert set(apn_geom) == {"001-010-01", "001-010-02"}
+    assert apn_geom["001-010-01"] == ((50.0, 50.0), 2018)
+    apn_geom.update(s03._get_geometry_from_source_fc(apns - set(apn_geom)))
+    assert set(apn_geom) == apns
+
+    rows = pd.DataFrame(s03._spatial_crosswalk(missing, apn_geom))
+    got  = {r.CSV_APN: (r.FC_APN, r.Match_Type) for r in rows.itertuples()}
+    assert got == {
+        "001-010-01": ("001-010-51", "intersect"),      # renamed
+        "001-010-02": ("001-010-52", "intersect"),      # split — larger piece
+        "001-010-03": ("001-010-60", "closest_40.0m"),  # within CLOSEST_MAX_METERS
+    }                                                   # 001-010-04: unmatched
+    assert (rows["Year"] == 2019).all()
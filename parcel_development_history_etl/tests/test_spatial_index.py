@@ -0,0 +1,73 @@
+"""
+ZoneIndex must answer zone joins the way SpatialJoin(JOIN_ONE_TO_ONE,
+INTERSECT) did: boundary points count as inside, the first zone in layer
+order wins a tie, and points in no zone stay NULL.
+
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import Point, box
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from spatial_index import ZoneIndex, inside_points
+
+# Two zones sharing the edge x = 10
+WEST = box(0, 0, 10, 10)
+EAST = box(10, 0, 20, 10)
+
+
+def _zones(*polys, ids=None) -> ZoneIndex:
+    ids = ids or [f"Z{i}" for i in range(len(polys))]
+    return ZoneIndex.from_wkb([p.wkb for p in polys],
+                              pd.DataFrame({"ZONE_ID": ids, "NOTE": [None] * len(ids)}))
+
+
+def _points(*xy) -> np.ndarray:
+    return np.array([Point(x, y) for x, y in xy], dtype=object)
+
+
+def test_point_in_polygon():
+    zones = _zones(WEST, EAST)
+    assert zones.lookup(_points((2, 5), (15, 5))).tolist() == [0, 1]
+
+
+def test_shared_boundary_takes_first_zone_in_layer_order():
+    pts = _points((10, 5))
+    assert _zones(WEST, EAST).lookup(pts).tolist() == [0]
+    assert _zones(EAST, WEST).lookup(pts).tolist() == [0]
+
+
+def test_overlapping_zones_take_first_in_layer_order():
+    big, small = box(0, 0, 20, 20), box(5, 5, 8, 8)
+    assert _zones(small, big).lookup(_points((6, 6))).tolist() == [0]
+    assert _zones(big, small).lookup(_points((6, 6))).tolist() == [0]
+
+
+def test_point_outside_every_zone_is_null():
+    zones = _zones(WEST, EAST)
+    pts   = _points((5, 5), (25, 5))
+    assert zones.lookup(pts).tolist() == [0, -1]
+    assert zones.collect(["A", "B"], pts, ["ZONE_ID", "NOTE"]) == {"A": ("Z0", None)}
+
+
+def test_parcel_takes_zone_holding_most_of_its_area():
+    # 70% of the parcel lies in EAST; the concave one's centroid lies outside it
+    rect = box(7, 2, 17, 4)
+    ell  = shapely.union(box(12, 0, 19, 2), box(17, 0, 19, 9))
+    pts  = inside_points([rect.wkb, ell.wkb])
+    assert shapely.within(pts[1], ell)
+    got = _zones(WEST, EAST).collect([" A ", "B"], pts, ["ZONE_ID"])
+    assert got == {"A": ("Z1",), "B": ("Z1",)}
+
+
+def test_nearest_within_radius():
+    zones = _zones(WEST, ids=["W"])
+    idx, dist = zones.nearest(_points((5, 5), (12, 5), (30, 5)), max_distance=5)
+    assert idx.tolist() == [0, 0, -1]
+    assert dist[:2].tolist() == [0.0, 2.0] and np.isinf(dist[2])
@@ -0,0 +1,70 @@
+"""
+compute_delta must write only what changed: unchanged rows cost nothing,
+changed rows update in place, and duplicate natural keys pair row-for-row.
+
+    python -m pytest tests
+"""
+import sys
+import types
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.path.insert(0, str(Path(__file__).parents[1] / "scripts"))
+sys.modules.setdefault("arcpy", types.ModuleType("arcpy"))
+
+import stage_ltinfo_allocations as stage
+
+FIELDS = [("TransactionID", "TEXT", 50), ("Quantity", "LONG", None)]
+KEY    = ["TransactionID"]
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """Staging table rows {oid: row}, served through a fake SearchCursor."""
+    rows = {}
+
+    @contextmanager
+    def search_cursor(path, fields):
+        assert fields == ["OID@", "TransactionID", "Quantity"]
+        yield iter([(oid, *row) for oid, row in rows.items()])
+
+    fake = types.SimpleNamespace(da=types.SimpleNamespace(SearchCursor=search_cursor))
+    monkeypatch.setattr(stage, "arcpy", fake)
+    return rows
+
+
+def _delta(incoming):
+    inserts, updates, deletes, n = stage.compute_delta("T", FIELDS, KEY, iter(incoming))
+    return sorted(inserts), updates, deletes, n
+
+
+def test_insert_update_delete_unchanged(table):
+    table.update({1: ("T1", 10), 2: ("T2", 20), 3: ("T3", 30)})
+    incoming = [("T1", 10), ("T2", 25), ("T4", 40)]
+    assert _delta(incoming) == ([("T4", 40)], {2: ("T2", 25)}, {3}, 3)
+
+
+def test_unchanged_feed_writes_nothing(table):
+    table.update({1: ("T1", 10), 2: ("T2", 20)})
+    assert _delta([("T2", 20), ("T1", 10)]) == ([], {}, set(), 2)
+
+
+def test_duplicate_keys_pair_row_for_row(table):
+    table.update({1: ("D", 1), 2: ("D", 1), 3: ("D", 2), 4: ("E", 5)})
+    # One copy of ("D", 1) kept, ("D", 2) kept, the other ("D", 1) changed,
+    # one new ("D", 9) row on top
+    incoming = [("D", 1), ("D", 2), ("D", 3), ("D", 9), ("E", 5)]
+    inserts, updates, deletes, n = _delta(incoming)
+    assert n == 5 and not deletes
+    assert len(updates) == 1 and set(updates) <= {1, 2}
+    assert sorted([*updates.values(), *inserts]) == [("D", 3), ("D", 9)]
+
+
+def test_duplicate_keys_surplus_deleted(table):
+    table.update({1: ("D", 1), 2: ("D", 1), 3: ("D", 1)})
+    inserts, updates, deletes, n = _delta([("D", 1)])
+    assert (inserts, updates, n) == ([], {}, 1)
+    assert len(deletes) == 2 and deletes <= {1, 2, 3}
@@ -0,0 +1,71 @@
+"""
+Incremental validation runs must flag exactly what a full run flags.
+
+    python -m pytest tests
+"""
+import sys
+import types
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.modules.setdefault("arcpy", types.ModuleType("arcpy"))
+
+import validation
+from unit_matrix import UnitMatrix
+from validation_state import ValidationState
+
+YEARS = list(range(2016, 2021))
+
+
+def _units(a_units: int) -> UnitMatrix:
+    """APN A has *a_units* every year but no 2018 row; B covers every year."""
+    rows  = [("A", y, a_units) for y in YEARS if y != 2018]
+    rows += [("B", y, 1) for y in YEARS]
+    return UnitMatrix.from_frame(pd.DataFrame(rows, columns=["APN", "Year", "Units"]),
+                                 value="Units")
+
+
+@pytest.fixture
+def run(monkeypatch):
+    """main() over an in-memory unit matrix, state and flag table."""
+    saved, written = {}, {}
+
+    class MemoryState(ValidationState):
+        def save(self, folder=None):
+            saved["state"] = self
+
+        @classmethod
+        def load(cls, folder=None):
+            return saved.get("state")
+
+    monkeypatch.setattr(validation, "ValidationState", MemoryState)
+    monkeypatch.setattr(validation, "_gather_evidence", lambda codes, apns, refresh=False: {})
+    monkeypatch.setattr(validation, "_write_flags",
+                        lambda df, only_apns=None: written.__setitem__("flags", df))
+
+    def _run(units: UnitMatrix, full: bool) -> pd.DataFrame:
+        monkeypatch.setattr(validation, "_load_units", lambda: units)
+        validation.main(flags={"DROPOUT"}, full=full)
+        return (written["flags"].sort_values(["APN", "YEAR", "FLAG_CODE"])
+                                .reset_index(drop=True))
+    return _run
+
+
+def test_dropout_incremental_matches_full(run):
+    run(_units(2), full=True)
+    incremental = run(_units(3), full=False)    # only A changed
+    full        = run(_units(3), full=True)
+
+    assert ((full["APN"] == "A") & (full["YEAR"] == 2018)).any()
+    pd.testing.assert_frame_equal(incremental, full)
+
+
+def test_dropout_subset_keeps_whole_matrix_years():
+    units = _units(2)
+    ctx   = validation.RuleContext(units.subset(["A"]),
+                                   active_years=units.years[units.present.any(axis=0)])
+    flags = validation.check_dropout(ctx)
+    assert flags[["APN", "YEAR"]].values.tolist() == [["A", 2018]]
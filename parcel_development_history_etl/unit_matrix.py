@@ -0,0 +1,289 @@
+"""
+Dense APN x Year matrices of the OUTPUT_FC commodities.
+
+The long OUTPUT_FC frame (one row per APN x Year) is the natural shape for
+cursors, but every time-series question — did units drop out for a year,
+did the successor APN carry units after a split — wants the parcel's whole
+history side by side.  UnitMatrix holds that as
+
+  apns     pd.Index of APN strings (row labels)
+  years    sorted int array (column labels)
+  values   int32 array [n_apns, n_years], 0 where the FC has no row
+  present  bool array  [n_apns, n_years], True where the FC has a row
+
+so checks become array slicing and boolean masks instead of row loops.
+
+UnitHistory bundles one UnitMatrix per commodity (Residential_Units, TAU,
+CFA — CFA square feet rounded to whole int32) over a shared APN index and
+presence mask.  It is rebuilt from OUTPUT_FC after every S4 / S4b write
+(main.py's write node, or the steps' standalone run()) and saved under
+UNIT_MATRIX_DIR as plain .npy files; consumers (validation.py,
+build_residential_units_inventory.py) memory-map it instead of re-reading
+the feature class.  S01 calls invalidate() after recreating OUTPUT_FC.
+
+meta.json also records a stamp of OUTPUT_FC taken at build time — its row
+count and modification time.  load_history() returns None when the stamp no
+longer matches, so a matrix left behind by some other write is ignored rather
+than read as current.  A row count alone cannot see an attribute edit, so
+where the store cannot report a modification time (arcpy backend) the matrix
+is not built at all and consumers read OUTPUT_FC directly.
+
+Usage
+-----
+    um   = UnitMatrix.from_frame(df_fc, value="Residential_Units")
+    rows = um.take(["035-123-456"])         # [1, n_years], zeros if unknown
+    j    = um.year_pos([2018, 2019])        # column positions (-1 if absent)
+
+    hist = load_history()                   # None if never built
+    tau  = hist["TAU"]                      # UnitMatrix, memory-mapped
+
+    python unit_matrix.py                   # rebuild from OUTPUT_FC
+"""
+import json
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import (UNIT_MATRIX_DIR, OUTPUT_FC, CSV_YEARS, FC_APN, FC_YEAR,
+                    FC_UNITS, FC_TOURIST_UNITS, FC_COMMERCIAL_SQFT)
+from utils import get_logger
+
+log = get_logger("unit_matrix")
+
+# Commodity name -> OUTPUT_FC field
+COMMODITIES = {
+    "Residential_Units": FC_UNITS,
+    "TAU":               FC_TOURIST_UNITS,
+    "CFA":               FC_COMMERCIAL_SQFT,
+}
+
+_MEMO: dict[str, "UnitHistory"] = {}
+_LOCK = threading.Lock()
+
+
+class UnitMatrix:
+    """One attribute of OUTPUT_FC laid out as an APN x Year int32 array."""
+
+    def __init__(self, apns: pd.Index, years: np.ndarray,
+                 values: np.ndarray, present: np.ndarray):
+        self.apns    = apns
+        self.years   = np.asarray(years, dtype=np.int64)
+        self.values  = values
+        self.present = present
+
+    def __len__(self) -> int:
+        return len(self.apns)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, apn: str = "APN", year: str = "Year",
+                   value: str = "Residential_Units", years=None) -> "UnitMatrix":
+        """
+        Build from a long frame.  Duplicate APN x Year rows are summed.
+        *years* fixes the column set (default: the years present in *df*).
+        """
+        codes, apns = pd.factorize(df[apn], sort=True)
+        yrs  = np.asarray(df[year], dtype=np.int64)
+        cols = np.unique(yrs) if years is None else np.asarray(sorted(years), dtype=np.int64)
+        j    = np.searchsorted(cols, yrs)
+        ok   = (codes >= 0) & (j < len(cols))
+        ok[ok] &= cols[j[ok]] == yrs[ok]
+
+        vals    = np.zeros((len(apns), len(cols)), dtype=np.int32)
+        present = np.zeros((len(apns), len(cols)), dtype=bool)
+        v = pd.to_numeric(df[value], errors="coerce").fillna(0).round().to_numpy(np.int64)
+        np.add.at(vals, (codes[ok], j[ok]), v[ok].astype(np.int32))
+        present[codes[ok], j[ok]] = True
+        return cls(pd.Index(apns, name=apn), cols, vals, present)
+
+    def apn_pos(self, apns) -> np.ndarray:
+        """Row positions of *apns* (-1 where the APN is not in the matrix)."""
+        return self.apns.get_indexer(pd.Index(apns))
+
+    def year_pos(self, years) -> np.ndarray:
+        """Column positions of *years* (-1 where the year is not a column)."""
+        years = np.asarray(years, dtype=np.int64)
+        if not len(self.years):
+            return np.full(len(years), -1)
+        j = np.clip(np.searchsorted(self.years, years), 0, len(self.years) - 1)
+        return np.where(self.years[j] == years, j, -1)
+
+    def take(self, apns) -> np.ndarray:
+        """Value rows for *apns*, all zeros for APNs not in the matrix."""
+        pos = self.apn_pos(apns)
+        out = np.zeros((len(pos), len(self.years)), dtype=self.values.dtype)
+        hit = pos >= 0
+        out[hit] = self.values[pos[hit]]
+        return out
+
+    def subset(self, apns) -> "UnitMatrix":
+        """The rows for *apns* that are in the matrix, in the matrix's order."""
+        keep = np.flatnonzero(self.apns.isin(pd.Index(apns)))
+        return UnitMatrix(self.apns[keep], self.years,
+                          self.values[keep], self.present[keep])
+
+
+class UnitHistory:
+    """One UnitMatrix per commodity over a shared APN index and year set."""
+
+    def __init__(self, apns: pd.Index, years: np.ndarray, present: np.ndarray,
+                 values: dict[str, np.ndarray], source: dict = None):
+        self.apns    = apns
+        self.years   = np.asarray(years, dtype=np.int64)
+        self.present = present
+        self.values  = values
+        self.source  = source       # source_stamp() of the dataset it came from
+
+    def __len__(self) -> int:
+        return len(self.apns)
+
+    def __contains__(self, commodity: str) -> bool:
+        return commodity in self.values
+
+    def __getitem__(self, commodity: str) -> UnitMatrix:
+        return UnitMatrix(self.apns, self.years, self.values[commodity], self.present)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: dict[str, str],
+                   apn: str = "APN", year: str = "Year", years=None) -> "UnitHistory":
+        """Build from a long frame; *columns* maps commodity -> column of *df*."""
+        mats = {name: UnitMatrix.from_frame(df, apn, year, col, years)
+                for name, col in columns.items()}
+        if not mats:
+            raise ValueError("UnitHistory needs at least one commodity column")
+        first = next(iter(mats.values()))
+        return cls(first.apns, first.years, first.present,
+                   {name: m.values for name, m in mats.items()})
+
+    # ── Persist ──────────────────────────────────────────────────────────────
+
+    def save(self, folder: str = UNIT_MATRIX_DIR) -> None:
+        """
+        Write one .npy per array.  meta.json goes last and is removed first,
+        so a half-written folder never loads.
+        """
+        d = Path(folder)
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "meta.json").unlink(missing_ok=True)
+        width  = max([len(a) for a in self.apns] + [1])
+        arrays = {"apns":    np.asarray(self.apns, dtype=f"<U{width}"),
+                  "years":   self.years,
+                  "present": self.present}
+        arrays.update(self.values)
+        for name, arr in arrays.items():
+            tmp = d / f"{name}.tmp.npy"
+            np.save(tmp, np.ascontiguousarray(arr))
+            tmp.replace(d / f"{name}.npy")
+        meta = {"commodities": list(self.values), "rows": len(self.apns),
+                "years": self.years.tolist(), "source": self.source}
+        (d / "meta.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def load(cls, folder: str = UNIT_MATRIX_DIR) -> "UnitHistory | None":
+        """Memory-map a saved history (None when missing or incomplete)."""
+        d = Path(folder)
+        if not (d / "meta.json").exists():
+            return None
+        meta = json.loads((d / "meta.json").read_text())
+        try:
+            apns   = np.load(d / "apns.npy")
+            years  = np.load(d / "years.npy")
+            present = np.load(d / "present.npy", mmap_mode="r")
+            values = {c: np.load(d / f"{c}.npy", mmap_mode="r")
+                      for c in meta["commodities"]}
+        except (OSError, ValueError) as exc:
+            log.warning("Unit matrix in %s is unreadable (%s) — ignoring", d, exc)
+            return None
+        if any(v.shape != present.shape for v in values.values()) \
+                or present.shape != (meta["rows"], len(years)):
+            log.warning("Unit matrix in %s has inconsistent shapes — ignoring", d)
+            return None
+        return cls(pd.Index(apns.astype(object), name="APN"), years, present, values,
+                   source=meta.get("source"))
+
+
+# ── Build / load ─────────────────────────────────────────────────────────────
+
+def source_stamp(path: str = OUTPUT_FC) -> dict | None:
+    """Cheap identity of *path* (no cursor pass); None if it does not exist."""
+    from feature_store import get_store
+    store = get_store()
+    if not store.exists(path):
+        return None
+    return {"path": str(path), "rows": store.count(path),
+            "modified": store.modified(path)}
+
+
+def build_history(path: str = OUTPUT_FC,
+                  folder: str = UNIT_MATRIX_DIR) -> UnitHistory | None:
+    """
+    Read the commodity fields of *path* once, save and return the history.
+    None (and any saved matrix dropped) when *path* cannot be stamped.
+    """
+    from feature_store import get_store
+    store    = get_store()
+    stamp    = source_stamp(path)       # before the read: a write during it → stale
+    if stamp is None or stamp["modified"] is None:
+        log.info("No modification time for %s on the %s backend — unit matrix "
+                 "not built, consumers read it directly", path, store.name)
+        invalidate(folder)
+        return None
+    existing = set(store.fields(path))
+    columns  = {name: f for name, f in COMMODITIES.items() if f in existing}
+    df = store.read(path, [FC_APN, FC_YEAR] + list(columns.values()),
+                    where={FC_YEAR: CSV_YEARS})
+    apn = df[FC_APN].astype(object)
+    ok  = apn.notna().to_numpy()
+    apn[ok] = apn[ok].astype(str).str.strip()
+    df[FC_APN] = apn.where(apn != "", None)
+
+    hist = UnitHistory.from_frame(df, columns, apn=FC_APN, year=FC_YEAR,
+                                  years=CSV_YEARS)
+    hist.source = stamp
+    with _LOCK:
+        try:
+            hist.save(folder)
+        except OSError as exc:
+            log.warning("Could not persist unit matrix %s: %s", folder, exc)
+        _MEMO[str(folder)] = hist
+    log.info("Unit matrix: %d APNs x %d years (%s)",
+             len(hist), len(hist.years), ", ".join(hist.values))
+    return hist
+
+
+def load_history(folder: str = UNIT_MATRIX_DIR) -> UnitHistory | None:
+    """
+    The saved history (memoised per process), or None if never built or if
+    its source dataset has changed since it was built.
+    """
+    with _LOCK:
+        key  = str(folder)
+        hist = _MEMO.get(key)
+        if hist is None:
+            hist = UnitHistory.load(folder)
+        if hist is None:
+            return None
+        path = (hist.source or {}).get("path", OUTPUT_FC)
+        if hist.source is None or hist.source.get("modified") is None \
+                or hist.source != source_stamp(path):
+            log.warning("Unit matrix in %s is older than the last change to %s — "
+                        "ignoring (rebuild: python unit_matrix.py)", folder, path)
+            _MEMO.pop(key, None)
+            return None
+        _MEMO[key] = hist
+        return hist
+
+
+def invalidate(folder: str = UNIT_MATRIX_DIR) -> None:
+    """Forget the saved history (call after rebuilding OUTPUT_FC)."""
+    with _LOCK:
+        _MEMO.pop(str(folder), None)
+        (Path(folder) / "meta.json").unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    build_history()
@@ -6,7 +6,6 @@ import os
 import re
 from pathlib import Path
 
-import arcpy
 import numpy as np
 import pandas as pd
 
@@ -51,6 +50,100 @@ def canonical_apn(raw):
     return s
 
 
+# ── Column-level APN helpers ──────────────────────────────────────────────────
+# Same rules as canonical_apn / el_pad / el_depad above, applied to a whole
+# Series.  APN columns repeat every parcel once per year, so each distinct
+# value is parsed once (pd.factorize) and broadcast back; the parsing itself
+# runs in Arrow compute kernels rather than a Python call per value.
+
+_STD_2D_RE = r"^(\d{3})-(\d{3})-(\d{2})$"          # standard form needing a pad
+
+
+_APN_FORMS = ("canonical", "el_pad", "el_depad", "is_std", "is_el_2d", "is_el_3d")
+
+
+def _apn_forms_unique(u: np.ndarray, cols) -> dict:
+    """Requested forms / flags for an object array of distinct values."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    is_str = np.fromiter((type(v) is str for v in u), dtype=bool, count=len(u))
+    arr    = pa.array(u[is_str], type=pa.string())
+    trim   = pc.utf8_trim_whitespace(arr) if {"canonical", "is_std"} & set(cols) else None
+
+    def text(values, base) -> np.ndarray:
+        out  = base.copy()
+        vals = values.to_numpy(zero_copy_only=False).astype(object)
+        vals[values.is_null().to_numpy(zero_copy_only=False)] = None
+        out[is_str] = vals
+        return out
+
+    def flag(values) -> np.ndarray:
+        out = np.zeros(len(u), dtype=bool)
+        out[is_str] = values.to_numpy(zero_copy_only=False)
+        return out
+
+    build = {
+        "canonical": lambda: text(
+            pc.if_else(pc.equal(trim, ""), pa.scalar(None, pa.string()),
+                       pc.replace_substring_regex(trim, _STD_2D_RE, r"\1-\2-0\3")),
+            np.full(len(u), None, dtype=object)),
+        "el_pad"   : lambda: text(pc.replace_substring_regex(arr, _EL_2D.pattern, r"\1-0\2"), u),
+        "el_depad" : lambda: text(pc.replace_substring_regex(arr, _EL_3D.pattern, r"\1-\2"), u),
+        "is_std"   : lambda: flag(pc.match_substring_regex(trim, _STD_APN_RE.pattern)),
+        "is_el_2d" : lambda: flag(pc.match_substring_regex(arr, _EL_2D.pattern)),
+        "is_el_3d" : lambda: flag(pc.match_substring_regex(arr, _EL_3D.pattern)),
+    }
+    return {c: build[c]() for c in cols}
+
+
+def apn_forms(s: pd.Series, cols=_APN_FORMS) -> pd.DataFrame:
+    """
+    APN forms and format flags for a whole Series, in one pass.
+
+    Columns (index aligned with *s*; pass *cols* to compute a subset):
+      canonical   canonical_apn(value)
+      el_pad      el_pad(value)      — unchanged unless 2-digit El Dorado form
+      el_depad    el_depad(value)    — unchanged unless 3-digit El Dorado form
+      is_std      standard NNN-NNN-NN(N) after stripping
+      is_el_2d    matches the El Dorado 2-digit pattern (_EL_2D)
+      is_el_3d    matches the El Dorado 3-digit pattern (_EL_3D)
+
+    Non-string values (None / NaN / numbers) give canonical None, pass
+    through pad / depad unchanged and have every flag False.
+    """
+    s = pd.Series(s)
+    codes, uniq = pd.factorize(s, use_na_sentinel=True)
+    forms = _apn_forms_unique(np.asarray(uniq, dtype=object), cols)
+    hit   = codes >= 0
+    out   = {}
+    for col, vals in forms.items():
+        if vals.dtype == bool:
+            col_out = np.zeros(len(s), dtype=bool)
+        elif col == "canonical":
+            col_out = np.full(len(s), None, dtype=object)
+        else:
+            col_out = s.to_numpy(dtype=object).copy()
+        col_out[hit] = vals[codes[hit]]
+        out[col] = pd.Series(col_out, index=s.index, dtype=col_out.dtype)
+    return pd.DataFrame(out, index=s.index)
+
+
+def canonical_apn_series(s: pd.Series) -> pd.Series:
+    """canonical_apn() over a whole Series."""
+    return apn_forms(s, ["canonical"])["canonical"]
+
+
+def el_pad_series(s: pd.Series) -> pd.Series:
+    """el_pad() over a whole Series (non-matching values unchanged)."""
+    return apn_forms(s, ["el_pad"])["el_pad"]
+
+
+def el_depad_series(s: pd.Series) -> pd.Series:
+    """el_depad() over a whole Series (non-matching values unchanged)."""
+    return apn_forms(s, ["el_depad"])["el_depad"]
+
+
 # ── Logging ───────────────────────────────────────────────────────────────────
 
 LOG_DIR = Path(__file__).parent / "logs"
@@ -110,17 +203,12 @@ def build_el_dorado_fix(output_fc: str, fc_apn: str) -> tuple[dict, dict]:
     2d→3d mapping to pad_map.  The CSV entry gets padded to the correct current
     APN and is found in the FC.
     """
-    el_2d: set[str] = set()
-    el_3d: set[str] = set()
-    with arcpy.da.SearchCursor(output_fc, [fc_apn],
-                               where_clause="COUNTY = 'EL'") as cur:
-        for (apn,) in cur:
-            if apn:
-                a = str(apn).strip()
-                if _EL_2D.match(a):
-                    el_2d.add(a)
-                elif _EL_3D.match(a):
-                    el_3d.add(a)
+    from feature_store import get_store  # local import — feature_store imports utils
+
+    apns = get_store().read(output_fc, [fc_apn], where={"COUNTY": "EL"})[fc_apn]
+    apns = apns.dropna().astype(str).str.strip()
+    el_2d: set[str] = set(apns[apns.str.match(_EL_2D.pattern)])
+    el_3d: set[str] = set(apns[apns.str.match(_EL_3D.pattern)])
 
     pad_map   = {a: el_pad(a)   for a in el_2d}
 
@@ -196,7 +284,8 @@ def df_to_gdb_table(df: pd.DataFrame, table_path: str,
                     text_lengths: dict = None) -> None:
     """
     Write *df* to a GDB stand-alone table at *table_path*.
-    Drops and recreates the table if it already exists.
+    Drops and recreates the table if it already exists.  Goes through the
+    configured feature store, so local runs write a Parquet table instead.
 
     Parameters
     ----------
@@ -205,60 +294,20 @@ def df_to_gdb_table(df: pd.DataFrame, table_path: str,
     text_lengths: Optional dict mapping column names to explicit TEXT lengths,
                   e.g. {"APN": 30, "NOTES": 500}
     """
-    log = get_logger("utils.df_to_gdb_table")
-    text_lengths = text_lengths or {}
-
-    if arcpy.Exists(table_path):
-        arcpy.management.Delete(table_path)
-        log.debug("Deleted existing table: %s", table_path)
-
-    gdb  = os.path.dirname(table_path)
-    name = os.path.basename(table_path)
-    arcpy.management.CreateTable(gdb, name)
-
-    # Rename columns to safe GDB names
-    col_map = {c: _safe_field_name(c) for c in df.columns}
-    df = df.rename(columns=col_map)
-    text_lengths = {_safe_field_name(k): v for k, v in text_lengths.items()}
-
-    # Add fields
-    for col in df.columns:
-        dtype_kind = df[col].dtype.kind
-        ftype, default_len = _DTYPE_MAP.get(dtype_kind, ("TEXT", 255))
-
-        if ftype == "TEXT":
-            non_null = df[col].dropna().astype(str)
-            max_len  = int(non_null.str.len().max()) if len(non_null) else 50
-            length   = text_lengths.get(col, max(max_len * 2, 50))
-            length   = min(length, 8000)
-            arcpy.management.AddField(table_path, col, "TEXT",
-                                      field_length=length)
-        else:
-            arcpy.management.AddField(table_path, col, ftype)
-
-    # Insert rows
-    fields = list(df.columns)
-    written = 0
-    with arcpy.da.InsertCursor(table_path, fields) as cur:
-        for row in df.itertuples(index=False, name=None):
-            clean = tuple(
-                None if (isinstance(v, float) and np.isnan(v)) else
-                None if v is pd.NaT else v
-                for v in row
-            )
-            cur.insertRow(clean)
-            written += 1
+    from feature_store import get_store  # local import — feature_store imports utils
 
-    log.info("Wrote %d rows → %s", written, table_path)
+    written = get_store().write_table(df, table_path, text_lengths=text_lengths)
+    get_logger("utils.df_to_gdb_table").info("Wrote %d rows → %s", written, table_path)
 
 
 def write_qa_table(df: pd.DataFrame, table_path: str,
                    text_lengths: dict = None) -> None:
     """
-    Write a QA table to both the GDB and a CSV in QA_DATA_DIR.
+    Write a QA table to the GDB and to CSV + Parquet files in QA_DATA_DIR.
 
-    The CSV filename is derived from the GDB table name, e.g.
-    QA_Units_By_Year → data/qa_data/QA_Units_By_Year.csv
+    The file names are derived from the GDB table name, e.g.
+    QA_Units_By_Year → data/qa_data/QA_Units_By_Year.csv / .parquet
+    The Parquet copy keeps column types and loads far faster than the CSV.
 
     Parameters
     ----------
@@ -280,3 +329,15 @@ def write_qa_table(df: pd.DataFrame, table_path: str,
     log = get_logger("utils.write_qa_table")
     log.info("CSV  → %s", csv_path)
 
+    # Parquet sidecar — mixed-type object columns are written as text
+    pq_path = qa_dir / f"{table_name}.parquet"
+    try:
+        out = df.reset_index(drop=True)
+        mixed = [c for c in out.columns if out[c].dtype == object
+                 and out[c].dropna().map(type).nunique() > 1]
+        out[mixed] = out[mixed].astype(str).where(out[mixed].notna(), None)
+        out.to_parquet(pq_path, index=False)
+        log.info("Parquet → %s", pq_path)
+    except Exception as exc:
+        log.warning("Could not write %s: %s", pq_path, exc)
+
@@ -13,6 +13,15 @@ Usage
   C:\\...\\arcgispro-py3\\python.exe validation.py                     # all checks
   C:\\...\\arcgispro-py3\\python.exe validation.py --flags PHANTOM DROPOUT
   C:\\...\\arcgispro-py3\\python.exe validation.py --apn 035-123-456   # debug one APN
+  C:\\...\\arcgispro-py3\\python.exe validation.py --full                # ignore saved state
+
+Runs are incremental: the state saved in VALIDATION_STATE_DIR (see
+validation_state.py) lets a re-run re-check only the APNs whose units,
+genealogy or service evidence changed, and merge the result into the flags
+of the previous run.  Service answers are cached per APN (evidence_cache.py)
+and the four services are queried concurrently, so only APNs whose cached
+answer has expired go over the network.  QA_STATUS values set by analysts are carried over for
+every APN x Year x FLAG_CODE that is still flagged.
 
 Output
 ------
@@ -28,11 +37,13 @@ Output
 """
 import argparse
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-import arcpy
+import numpy as np
 import pandas as pd
 
 from config import (
@@ -40,9 +51,15 @@ from config import (
     CSV_YEARS,
     QA_UNITS_BY_YEAR, QA_GENEALOGY_APPLIED, QA_FLAG_TABLE,
     IMPERVIOUS_SVC, BMP_CERT_SVC, VHR_PERMIT_SVC,
-    LTINFO_PERMITS,
+    LTINFO_PERMITS, REST_WORKERS,
 )
+from evidence_cache import EvidenceCache
+from feature_store import get_store
+from rest_client import get_client
+from unit_matrix import UnitMatrix, load_history
 from utils import get_logger, df_to_gdb_table
+from validation_state import (ValidationState, changed, evidence_changes,
+                              evidence_frame, genealogy_hashes, unit_hashes)
 
 log = get_logger("validation")
 
@@ -55,25 +72,19 @@ _TEXT_LENGTHS = {
     "QA_STATUS" : 20,
 }
 
-ALL_FLAGS = {"PHANTOM", "DROPOUT", "GENEALOGY", "TOTALS_MISMATCH", "UNVERIFIED"}
-
+_FETCH_POOL: ThreadPoolExecutor | None = None
+_FETCH_LOCK = threading.Lock()
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
 def _read_fc() -> pd.DataFrame:
     """Read OUTPUT_FC into a DataFrame (APN, Year, Residential_Units)."""
     fields   = [FC_APN, FC_YEAR, FC_UNITS]
-    existing = {f.name for f in arcpy.ListFields(OUTPUT_FC)}
+    store    = get_store()
+    existing = set(store.fields(OUTPUT_FC))
     read     = [f for f in fields if f in existing]
-    yr_list  = ", ".join(str(y) for y in CSV_YEARS)
-
-    rows = []
-    with arcpy.da.SearchCursor(
-            OUTPUT_FC, read, f"{FC_YEAR} IN ({yr_list})") as cur:
-        for row in cur:
-            rows.append(dict(zip(read, row)))
 
-    df = pd.DataFrame(rows).rename(columns={
+    df = store.read(OUTPUT_FC, read, where={FC_YEAR: CSV_YEARS}).rename(columns={
         FC_APN: "APN", FC_YEAR: "Year", FC_UNITS: "Residential_Units"})
     df["APN"]              = df["APN"].astype(str).str.strip()
     df["Year"]             = df["Year"].astype(int)
@@ -82,68 +93,181 @@ def _read_fc() -> pd.DataFrame:
     return df
 
 
+def _load_units() -> UnitMatrix:
+    """
+    Residential_Units as an APN x Year matrix — the unit matrix saved by the
+    last ETL run, or a fresh OUTPUT_FC read when it has not been built.
+    """
+    hist = load_history()
+    if hist is not None and "Residential_Units" in hist:
+        log.info("Unit matrix loaded: %d APNs x %d years", len(hist), len(hist.years))
+        return hist["Residential_Units"]
+    log.info("No unit matrix saved — reading OUTPUT_FC")
+    return UnitMatrix.from_frame(_read_fc(), years=CSV_YEARS)
+
+
 def _read_gdb_table(table_path: str) -> pd.DataFrame:
     """Read a standalone GDB table into a DataFrame (empty if not found)."""
-    if not arcpy.Exists(table_path):
+    store = get_store()
+    if not store.exists(table_path):
         log.warning("GDB table not found: %s", table_path)
         return pd.DataFrame()
-    fields = [f.name for f in arcpy.ListFields(table_path)
-              if f.type not in ("Geometry", "OID")]
-    rows = [dict(zip(fields, row))
-            for row in arcpy.da.SearchCursor(table_path, fields)]
-    return pd.DataFrame(rows)
-
-
-def _make_flag(apn: str, year: int, flag_code: str,
-               csv_val: int, matrix_val: int, evidence: str) -> dict:
-    return {
-        "APN"       : apn,
-        "YEAR"      : year,
-        "FLAG_CODE" : flag_code,
-        "CSV_VAL"   : csv_val,
-        "MATRIX_VAL": matrix_val,
-        "EVIDENCE"  : evidence,
-    }
+    fields = [f for f, t in store.fields(table_path).items()
+              if t not in ("Geometry", "OID")]
+    return store.read(table_path, fields)
+
+
+def _fetch_pool() -> ThreadPoolExecutor:
+    """The REST_WORKERS-thread pool every evidence service's batches share."""
+    global _FETCH_POOL
+    with _FETCH_LOCK:
+        if _FETCH_POOL is None:
+            _FETCH_POOL = ThreadPoolExecutor(max_workers=REST_WORKERS,
+                                             thread_name_prefix="evidence")
+        return _FETCH_POOL
+
+
+def _query_chunk(svc_url: str, out_apn_field: str, chunk: list) -> dict:
+    """One `APN IN (...)` query → {APN: attributes_dict}."""
+    client = get_client()
+    where  = "{} IN ({})".format(
+        out_apn_field,
+        ", ".join("'{}'".format(a.replace("'", "''")) for a in chunk))
+    data  = client.get_json(svc_url.rstrip("/") + "/query",
+                            {"where": where, "outFields": "*",
+                             "returnGeometry": "false", "f": "json"})
+    feats = data.get("features", [])
+    if data.get("exceededTransferLimit"):
+        # More records than one page for this batch — page through them all
+        feats = client.query_features(svc_url, where=where)
+    return {str(f["attributes"].get(out_apn_field, "")).strip(): f["attributes"]
+            for f in feats if f.get("attributes")}
 
 
 def _batch_query(svc_url: str, apns: list, out_apn_field: str = "APN",
-                 batch: int = 500) -> dict:
+                 batch: int = 500, refresh: bool = False) -> dict:
     """
     Batch-query a TRPA FeatureServer/MapServer layer by APN.
     Returns {APN: attributes_dict}.
     Skips with a warning if svc_url is empty (stub not yet configured).
+
+    Answers come from the evidence cache where fresh (refresh=True ignores
+    it); the remaining APNs are queried in batches on the shared fetch pool.
     """
     if not svc_url:
         log.warning("Service URL not configured — skipping query (set URL in config.py).")
         return {}
 
-    try:
-        from arcgis.features import FeatureLayer
-    except ImportError:
-        log.warning("arcgis package not available — skipping service query.")
-        return {}
+    cache      = EvidenceCache(svc_url)
+    hits, todo = cache.split(apns, refresh=refresh)
+    chunks     = [todo[i : i + batch] for i in range(0, len(todo), batch)]
+    futures    = [_fetch_pool().submit(_query_chunk, svc_url, out_apn_field, c)
+                  for c in chunks]
 
-    fl      = FeatureLayer(svc_url)
-    results = {}
-    for i in range(0, len(apns), batch):
-        chunk = apns[i : i + batch]
-        where = "{} IN ({})".format(
-            out_apn_field,
-            ", ".join(f"'{a}'" for a in chunk))
+    results = {a: attrs for a, attrs in hits.items() if attrs is not None}
+    for i, (chunk, fut) in enumerate(zip(chunks, futures)):
         try:
-            for feat in fl.query(where=where).features:
-                results[str(feat.attributes.get(out_apn_field, "")).strip()] = feat.attributes
+            found = fut.result()
         except Exception as exc:
-            log.warning("Service query error (batch %d): %s", i // batch, exc)
-    log.debug("Service query returned %d records for %d APNs", len(results), len(apns))
+            log.warning("Service query error (batch %d): %s", i, exc)
+            continue
+        results.update(found)
+        cache.update(chunk, found)
+    cache.save()
+    log.info("  %d APNs from evidence cache, %d queried in %d batch(es); %d records",
+             len(hits), len(todo), len(chunks), len(results))
     return results
 
 
+# ── Rule engine ───────────────────────────────────────────────────────────────
+# Each flag is a rule: a function of the RuleContext (the dense APN x Year
+# unit matrix plus the evidence it needs) that returns a flag frame with the
+# _FLAG_COLS columns.  Rules are columnar — masks over the matrix, no row
+# loops — and independent, so main() runs the selected ones side by side.
+# To add a rule from validation.md: write a check_*(ctx) function below,
+# decorate it with @rule(CODE, needs=[evidence names]), and, if it needs a new
+# source, add a _fetch_* function to _EVIDENCE.
+
+_FLAG_COLS = ["APN", "YEAR", "FLAG_CODE", "CSV_VAL", "MATRIX_VAL", "EVIDENCE"]
+
+RULES: dict[str, dict] = {}
+
+
+def rule(code: str, needs: list[str] = ()):
+    """Register a check_* function as the rule for flag *code*."""
+    def register(fn):
+        RULES[code] = {"fn": fn, "needs": list(needs)}
+        return fn
+    return register
+
+
+class RuleContext:
+    """
+    What a rule evaluates against: the unit matrix and fetched evidence.
+    *active_years* are the years with any FC rows in the whole matrix; pass
+    them when *units* is a subset (incremental / --apn runs) so year-to-year
+    rules see the same neighbouring years a full run does.
+    """
+
+    def __init__(self, units: UnitMatrix, evidence: dict = None, active_years=None):
+        self.units    = units
+        self.evidence = evidence or {}
+        self.active_years = (units.years[units.present.any(axis=0)]
+                             if active_years is None
+                             else np.asarray(active_years, dtype=np.int64))
+
+    def apn_vector(self, name: str, dtype, fill) -> np.ndarray:
+        """Evidence {APN: value} aligned to the matrix rows."""
+        lookup = self.evidence.get(name) or {}
+        out = np.full(len(self.units), fill, dtype=dtype)
+        if lookup:
+            pos = self.units.apn_pos(list(lookup))
+            hit = pos >= 0
+            out[pos[hit]] = np.asarray(list(lookup.values()), dtype=dtype)[hit]
+        return out
+
+    def year_mask(self, name: str) -> np.ndarray:
+        """Evidence {APN: set[year]} as a bool matrix aligned to the units."""
+        lookup = self.evidence.get(name) or {}
+        out = np.zeros(self.units.values.shape, dtype=bool)
+        pairs = [(a, y) for a, ys in lookup.items() for y in ys]
+        if pairs:
+            apns, yrs = zip(*pairs)
+            i = self.units.apn_pos(list(apns))
+            j = self.units.year_pos(list(yrs))
+            ok = (i >= 0) & (j >= 0)
+            out[i[ok], j[ok]] = True
+        return out
+
+
+def _flag_frame(apns, years, code: str, csv_val, matrix_val, evidence) -> pd.DataFrame:
+    n = len(apns)
+    return pd.DataFrame({
+        "APN"       : np.asarray(apns, dtype=object),
+        "YEAR"      : np.asarray(years, dtype=np.int64),
+        "FLAG_CODE" : code,
+        "CSV_VAL"   : np.broadcast_to(csv_val, n).astype(np.int64),
+        "MATRIX_VAL": np.broadcast_to(matrix_val, n).astype(np.int64),
+        "EVIDENCE"  : np.asarray(evidence, dtype=object),
+    }, columns=_FLAG_COLS)
+
+
+def _join_labels(parts: list[tuple[np.ndarray, pd.Series]], n: int) -> pd.Series:
+    """Join per-flag labels with "; " where each part's mask is True."""
+    out = pd.Series([""] * n, dtype=object)
+    if not n:
+        return out
+    for mask, label in parts:
+        label = label if isinstance(label, pd.Series) else pd.Series([label] * n)
+        sep = np.where(out.str.len().to_numpy() > 0, "; ", "")
+        out = out.where(~mask, out + sep + label.astype(str))
+    return out
+
+
 # ── Check A: PHANTOM ─────────────────────────────────────────────────────────
 
-def check_phantom(df_fc: pd.DataFrame,
-                  impervious_lookup: dict,
-                  permit_lookup: dict) -> list[dict]:
+@rule("PHANTOM", needs=["impervious", "permits"])
+def check_phantom(ctx: RuleContext) -> pd.DataFrame:
     """
     Flag parcels that appear developed but show 0 units.
 
@@ -152,70 +276,58 @@ def check_phantom(df_fc: pd.DataFrame,
 
     Sources: IMPERVIOUS_SVC, LTINFO_PERMITS
     """
-    zeros = df_fc[df_fc["Residential_Units"] == 0]
-    flags = []
-    for _, row in zeros.iterrows():
-        apn, yr = row["APN"], int(row["Year"])
-        evidence = []
-
-        if impervious_lookup.get(apn):
-            evidence.append("Impervious")
-
-        permit_yr = permit_lookup.get(apn)
-        if permit_yr is not None:
-            try:
-                if int(permit_yr) <= yr:
-                    evidence.append(f"Permit:{permit_yr}")
-            except (TypeError, ValueError):
-                pass
-
-        if evidence:
-            flags.append(_make_flag(apn, yr, "PHANTOM", 0, 0,
-                                    "; ".join(evidence)))
+    um = ctx.units
+    zero       = um.present & (um.values == 0)
+    impervious = ctx.apn_vector("impervious", bool, False)[:, None] & zero
+    permit_yr  = ctx.apn_vector("permits", float, np.nan)
+    permitted  = (permit_yr[:, None] <= um.years[None, :]) & zero
+
+    i, j = np.nonzero(impervious | permitted)
+    n    = len(i)
+    evidence = _join_labels([
+        (impervious[i, j], "Impervious"),
+        (permitted[i, j],  "Permit:" + pd.Series(permit_yr[i]).fillna(0).astype(np.int64).astype(str)),
+    ], n)
+    flags = _flag_frame(um.apns[i], um.years[j], "PHANTOM", 0, 0, evidence)
     log.info("PHANTOM: %d flags", len(flags))
     return flags
 
 
 # ── Check B: DROPOUT ─────────────────────────────────────────────────────────
 
-def check_dropout(df_fc: pd.DataFrame) -> list[dict]:
+@rule("DROPOUT")
+def check_dropout(ctx: RuleContext) -> pd.DataFrame:
     """
     Flag year gaps where units temporarily drop to 0 between two non-zero years.
 
     Condition: units[Year-1] > 0 AND units[Year] == 0 AND units[Year+1] > 0
 
-    No external service needed — pure in-memory check.
+    No external service needed — pure in-memory check.  "Year-1" / "Year+1"
+    are the neighbouring years that have any FC rows (ctx.active_years).
     """
-    pivot = df_fc.pivot_table(
-        index="APN", columns="Year",
-        values="Residential_Units", fill_value=0,
-    )
-    years = sorted(pivot.columns)
-    flags = []
-
-    for i, yr in enumerate(years[1:-1]):   # skip first and last — no neighbours
-        prev_yr = years[i]
-        next_yr = years[i + 2]
-        gap_mask = (
-            (pivot[prev_yr] > 0) &
-            (pivot[yr]      == 0) &
-            (pivot[next_yr] > 0)
-        )
-        for apn in pivot.index[gap_mask]:
-            evidence = (
-                f"Units: {prev_yr}={int(pivot.loc[apn, prev_yr])}, "
-                f"{yr}=0, "
-                f"{next_yr}={int(pivot.loc[apn, next_yr])}"
-            )
-            flags.append(_make_flag(apn, yr, "DROPOUT", 0, 0, evidence))
-
+    um    = ctx.units
+    cols  = um.year_pos(ctx.active_years)
+    cols  = cols[cols >= 0]
+    v     = um.values[:, cols]
+    years = um.years[cols]
+    gap   = (v[:, :-2] > 0) & (v[:, 1:-1] == 0) & (v[:, 2:] > 0)
+
+    i, k = np.nonzero(gap)
+    prev_yr, yr, next_yr = years[k], years[k + 1], years[k + 2]
+    evidence = ("Units: " + pd.Series(prev_yr).astype(str) + "="
+                + pd.Series(v[i, k]).astype(str) + ", "
+                + pd.Series(yr).astype(str) + "=0, "
+                + pd.Series(next_yr).astype(str) + "="
+                + pd.Series(v[i, k + 2]).astype(str))
+    flags = _flag_frame(um.apns[i], yr, "DROPOUT", 0, 0, evidence)
     log.info("DROPOUT: %d flags", len(flags))
     return flags
 
 
 # ── Check C: GENEALOGY ───────────────────────────────────────────────────────
 
-def check_genealogy(df_fc: pd.DataFrame) -> list[dict]:
+@rule("GENEALOGY", needs=["genealogy"])
+def check_genealogy(ctx: RuleContext) -> pd.DataFrame:
     """
     Flag genealogy substitutions where the successor APN has no units in FC
     after the event year — potential unit loss during a subdivision or rename.
@@ -225,50 +337,50 @@ def check_genealogy(df_fc: pd.DataFrame) -> list[dict]:
 
     Source: QA_Genealogy_Applied GDB table (written by S02b during the ETL run).
     """
-    gen = _read_gdb_table(QA_GENEALOGY_APPLIED)
-    if gen.empty:
+    gen = ctx.evidence.get("genealogy")
+    if gen is None or gen.empty:
         log.info("GENEALOGY: QA_Genealogy_Applied not found — skipping.")
-        return []
-
-    # Build fast lookup: {(APN, Year): units}
-    fc_lookup = df_fc.set_index(["APN", "Year"])["Residential_Units"].to_dict()
-
-    flags = []
-    for _, rec in gen.iterrows():
-        old_apn     = str(rec.get("Old_APN", "")).strip()
-        new_apn     = str(rec.get("New_APN", "")).strip()
-        change_year = rec.get("Change_Year")
-        units_moved = int(rec.get("Total_Units_Moved", 0))
-
-        if not old_apn or not new_apn or units_moved == 0:
-            continue
-
-        try:
-            change_year = int(change_year)
-        except (TypeError, ValueError):
-            continue
-
-        affected_years = [y for y in CSV_YEARS if y >= change_year]
-        missing_years  = [y for y in affected_years
-                          if fc_lookup.get((new_apn, y), 0) == 0]
-
-        if missing_years:
-            evidence = (
-                f"Old:{old_apn}→New:{new_apn}; "
-                f"Units moved:{units_moved}; "
-                f"New APN missing units for years:{missing_years}"
-            )
-            for yr in missing_years:
-                flags.append(_make_flag(old_apn, yr, "GENEALOGY",
-                                        0, units_moved, evidence))
-
+        return _flag_frame([], [], "GENEALOGY", 0, 0, [])
+
+    def text(col):
+        return (gen[col] if col in gen.columns else pd.Series("", index=gen.index)) \
+            .fillna("").astype(str).str.strip()
+
+    old_apn = text("Old_APN")
+    new_apn = text("New_APN")
+    moved   = pd.to_numeric(gen.get("Total_Units_Moved"), errors="coerce").fillna(0).astype(np.int64)
+    change  = pd.to_numeric(gen.get("Change_Year"), errors="coerce")
+    keep    = ((old_apn != "") & (new_apn != "") & (moved != 0) & change.notna()).to_numpy()
+    old_apn, new_apn = old_apn[keep].to_numpy(), new_apn[keep].to_numpy()
+    moved,   change  = moved[keep].to_numpy(),  change[keep].to_numpy(np.int64)
+
+    # New APN's units over CSV_YEARS (zeros where it has no FC row)
+    years = np.asarray(sorted(CSV_YEARS), dtype=np.int64)
+    um    = ctx.units
+    j     = um.year_pos(years)
+    succ  = np.zeros((len(new_apn), len(years)), dtype=np.int32)
+    rows  = um.take(new_apn)
+    succ[:, j >= 0] = rows[:, j[j >= 0]]
+    missing = (years[None, :] >= change[:, None]) & (succ == 0)
+
+    r, c = np.nonzero(missing)
+    if not len(r):
+        log.info("GENEALOGY: 0 flags")
+        return _flag_frame([], [], "GENEALOGY", 0, 0, [])
+    year_lists = (pd.Series(years[c]).groupby(r).agg(lambda s: str(s.tolist())))
+    evidence = ("Old:" + pd.Series(old_apn[r]) + "→New:" + pd.Series(new_apn[r])
+                + "; Units moved:" + pd.Series(moved[r]).astype(str)
+                + "; New APN missing units for years:"
+                + pd.Series(year_lists.reindex(r).to_numpy()))
+    flags = _flag_frame(old_apn[r], years[c], "GENEALOGY", 0, moved[r], evidence)
     log.info("GENEALOGY: %d flags", len(flags))
     return flags
 
 
 # ── Check D: TOTALS_MISMATCH ─────────────────────────────────────────────────
 
-def check_totals_mismatch() -> list[dict]:
+@rule("TOTALS_MISMATCH", needs=["units_by_year"])
+def check_totals_mismatch(ctx: RuleContext) -> pd.DataFrame:
     """
     Compare FC unit totals to CSV totals from QA_Units_By_Year.
 
@@ -278,82 +390,71 @@ def check_totals_mismatch() -> list[dict]:
 
     Source: QA_Units_By_Year GDB table (written by Step 6 during the ETL run).
     """
-    qa = _read_gdb_table(QA_UNITS_BY_YEAR)
-    if qa.empty:
+    qa = ctx.evidence.get("units_by_year")
+    if qa is None or qa.empty:
         log.info("TOTALS_MISMATCH: QA_Units_By_Year not found — run ETL Step 6 first.")
-        return []
-
-    flags = []
-    for _, row in qa.iterrows():
-        year      = int(row.get("Year",       0))
-        csv_total = int(row.get("CSV_Total",  0) or 0)
-        fc_total  = int(row.get("FC_Total",   0) or 0)
-        diff      = fc_total - csv_total
-        if diff != 0:
-            flags.append({
-                "APN"       : "TOTAL",
-                "YEAR"      : year,
-                "FLAG_CODE" : "TOTALS_MISMATCH",
-                "CSV_VAL"   : csv_total,
-                "MATRIX_VAL": fc_total,
-                "EVIDENCE"  : (
-                    f"CSV_Total={csv_total:,}, FC_Total={fc_total:,}, "
-                    f"Diff={diff:+,} ({'+' if diff > 0 else ''}{diff/csv_total*100:.1f}%)"
-                    if csv_total else
-                    f"CSV_Total={csv_total:,}, FC_Total={fc_total:,}, Diff={diff:+,}"
-                ),
-            })
-
+        return _flag_frame([], [], "TOTALS_MISMATCH", 0, 0, [])
+
+    def num(col):
+        return pd.to_numeric(qa.get(col), errors="coerce").fillna(0).astype(np.int64)
+
+    year, csv_total, fc_total = num("Year"), num("CSV_Total"), num("FC_Total")
+    diff = fc_total - csv_total
+    bad  = (diff != 0).to_numpy()
+    year, csv_total, fc_total, diff = year[bad], csv_total[bad], fc_total[bad], diff[bad]
+
+    base = ("CSV_Total=" + csv_total.map("{:,}".format) + ", FC_Total="
+            + fc_total.map("{:,}".format) + ", Diff=" + diff.map("{:+,}".format))
+    pct  = diff / csv_total.where(csv_total != 0) * 100
+    sign = np.where(diff > 0, "+", "")
+    evidence = base.where(csv_total == 0,
+                          base + " (" + sign + pct.map("{:.1f}".format) + "%)")
+    flags = _flag_frame(["TOTAL"] * len(year), year, "TOTALS_MISMATCH",
+                        csv_total.to_numpy(), fc_total.to_numpy(), evidence.to_numpy())
     log.info("TOTALS_MISMATCH: %d year(s) with discrepancies", len(flags))
     return flags
 
 
 # ── Check E: UNVERIFIED ───────────────────────────────────────────────────────
 
-def check_unverified(df_fc: pd.DataFrame,
-                     bmp_lookup: dict,
-                     vhr_lookup: dict) -> list[dict]:
+@rule("UNVERIFIED", needs=["bmp", "vhr"])
+def check_unverified(ctx: RuleContext) -> pd.DataFrame:
     """
     Flag parcels with 0 units but an active BMP certificate or VHR permit.
 
     Condition: Residential_Units == 0 AND
                (BMP certificate active in Year OR VHR permit active in Year)
 
-    bmp_lookup : {APN: set[int]}  — years with active BMP certificate
-    vhr_lookup : {APN: set[int]}  — years with active VHR permit
+    Evidence "bmp" / "vhr" : {APN: set[int]} — years with an active record
 
     Sources: BMP_CERT_SVC, VHR_PERMIT_SVC
     """
-    zeros = df_fc[df_fc["Residential_Units"] == 0]
-    flags = []
-    for _, row in zeros.iterrows():
-        apn, yr = row["APN"], int(row["Year"])
-        evidence = []
-
-        if yr in bmp_lookup.get(apn, set()):
-            evidence.append("BMP")
-        if yr in vhr_lookup.get(apn, set()):
-            evidence.append("VHR")
-
-        if evidence:
-            flags.append(_make_flag(apn, yr, "UNVERIFIED", 0, 0,
-                                    "; ".join(evidence)))
-
+    um   = ctx.units
+    zero = um.present & (um.values == 0)
+    bmp  = ctx.year_mask("bmp") & zero
+    vhr  = ctx.year_mask("vhr") & zero
+
+    i, j = np.nonzero(bmp | vhr)
+    evidence = _join_labels([(bmp[i, j], "BMP"), (vhr[i, j], "VHR")], len(i))
+    flags = _flag_frame(um.apns[i], um.years[j], "UNVERIFIED", 0, 0, evidence)
     log.info("UNVERIFIED: %d flags", len(flags))
     return flags
 
 
+ALL_FLAGS = set(RULES)
+
+
 # ── Service fetchers ──────────────────────────────────────────────────────────
 
-def _fetch_impervious(apns: list) -> dict:
+def _fetch_impervious(apns: list, refresh: bool = False) -> dict:
     """Return {APN: bool} — True if impervious footprint detected."""
-    raw = _batch_query(IMPERVIOUS_SVC, apns)
+    raw = _batch_query(IMPERVIOUS_SVC, apns, refresh=refresh)
     return {apn: bool(attrs) for apn, attrs in raw.items()}
 
 
-def _fetch_permits(apns: list) -> dict:
+def _fetch_permits(apns: list, refresh: bool = False) -> dict:
     """Return {APN: int} — earliest finaled permit year."""
-    raw = _batch_query(LTINFO_PERMITS, apns)
+    raw = _batch_query(LTINFO_PERMITS, apns, refresh=refresh)
     result = {}
     for apn, attrs in raw.items():
         # Expect a field like "FinalYear" or "FINAL_YEAR" — adapt as needed
@@ -366,9 +467,9 @@ def _fetch_permits(apns: list) -> dict:
     return result
 
 
-def _fetch_bmp(apns: list) -> dict:
+def _fetch_bmp(apns: list, refresh: bool = False) -> dict:
     """Return {APN: set[int]} — years with an active BMP certificate."""
-    raw = _batch_query(BMP_CERT_SVC, apns)
+    raw = _batch_query(BMP_CERT_SVC, apns, refresh=refresh)
     result: dict[str, set] = {}
     for apn, attrs in raw.items():
         # Expect fields "StartYear" / "EndYear" or similar — adapt as needed
@@ -382,9 +483,9 @@ def _fetch_bmp(apns: list) -> dict:
     return result
 
 
-def _fetch_vhr(apns: list) -> dict:
+def _fetch_vhr(apns: list, refresh: bool = False) -> dict:
     """Return {APN: set[int]} — years with an active VHR permit."""
-    raw = _batch_query(VHR_PERMIT_SVC, apns)
+    raw = _batch_query(VHR_PERMIT_SVC, apns, refresh=refresh)
     result: dict[str, set] = {}
     for apn, attrs in raw.items():
         start = attrs.get("StartYear") or attrs.get("START_YEAR")
@@ -397,14 +498,59 @@ def _fetch_vhr(apns: list) -> dict:
     return result
 
 
+# Evidence name → (loader(apns, refresh), progress message, keyed).  Keyed
+# evidence is {APN: value} from a service (cached per APN, see
+# evidence_cache.py); the rest are whole GDB tables.  A rule's `needs` are
+# loaded once before the rules run, and only for the rules selected.
+_EVIDENCE = {
+    "impervious"   : (_fetch_impervious, "Fetching impervious surface data ...", True),
+    "permits"      : (_fetch_permits,    "Fetching permit data ...",             True),
+    "bmp"          : (_fetch_bmp,        "Fetching BMP certificate data ...",    True),
+    "vhr"          : (_fetch_vhr,        "Fetching VHR permit data ...",         True),
+    "genealogy"    : (lambda apns, refresh: _read_gdb_table(QA_GENEALOGY_APPLIED), None, False),
+    "units_by_year": (lambda apns, refresh: _read_gdb_table(QA_UNITS_BY_YEAR),     None, False),
+}
+
+
+def _gather_evidence(codes: list[str], apns: list, refresh: bool = False) -> dict:
+    """
+    Load every evidence source the rules in *codes* need.  The sources are
+    fetched concurrently; their batched queries share one bounded pool.
+    """
+    names = list(dict.fromkeys(n for c in codes for n in RULES[c]["needs"]))
+    for name in names:
+        if _EVIDENCE[name][1]:
+            log.info(_EVIDENCE[name][1])
+    with ThreadPoolExecutor(max_workers=max(1, len(names))) as pool:
+        futures = {n: pool.submit(_EVIDENCE[n][0], apns, refresh) for n in names}
+        return {n: f.result() for n, f in futures.items()}
+
+
+def _genealogy_links(gen: pd.DataFrame) -> pd.DataFrame:
+    """Old_APN / New_APN pairs of the genealogy table (stripped text)."""
+    if gen is None or gen.empty or not {"Old_APN", "New_APN"} <= set(gen.columns):
+        return pd.DataFrame(columns=["Old_APN", "New_APN"])
+    return gen[["Old_APN", "New_APN"]].fillna("").astype(str) \
+        .apply(lambda c: c.str.strip())
+
+
+def run_rules(ctx: RuleContext, codes: list[str]) -> pd.DataFrame:
+    """Evaluate the rules for *codes* concurrently; one combined flag frame."""
+    with ThreadPoolExecutor(max_workers=max(1, len(codes))) as pool:
+        frames = list(pool.map(lambda c: RULES[c]["fn"](ctx), codes))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=_FLAG_COLS)
+    return pd.concat(frames, ignore_index=True)
+
+
 # ── Aggregation ───────────────────────────────────────────────────────────────
 
-def _aggregate_flags(all_flags: list[dict]) -> pd.DataFrame:
+def _aggregate_flags(df: pd.DataFrame) -> pd.DataFrame:
     """
     Collapse multiple flags per APN×Year into a single row.
     FLAG_CODE values are pipe-delimited; EVIDENCE strings are semicolon-joined.
     """
-    df = pd.DataFrame(all_flags)
     grouped = (
         df.groupby(["APN", "YEAR"])
         .agg(
@@ -419,60 +565,33 @@ def _aggregate_flags(all_flags: list[dict]) -> pd.DataFrame:
     return grouped
 
 
-# ── Main ──────────────────────────────────────────────────────────────────────
-
-def main(flags: set = None, apn: str = None) -> None:
-    log.info("=" * 60)
-    log.info("Parcel Development History — Conflict Detection")
-    log.info("=" * 60)
-
-    df_fc = _read_fc()
+# ── Output ────────────────────────────────────────────────────────────────────
 
-    if apn:
-        df_fc = df_fc[df_fc["APN"] == apn.strip()].copy()
-        log.info("Debug mode: APN=%s  (%d rows)", apn, len(df_fc))
-        if df_fc.empty:
-            log.warning("APN %s not found in OUTPUT_FC — nothing to check.", apn)
-            return
-
-    run_all      = not flags
-    all_apns     = df_fc["APN"].unique().tolist()
-    all_flag_rows: list[dict] = []
-
-    # ── TOTALS_MISMATCH (no service — uses QA_Units_By_Year) ─────────────────
-    if run_all or "TOTALS_MISMATCH" in flags:
-        all_flag_rows += check_totals_mismatch()
-
-    # ── DROPOUT (no service) ──────────────────────────────────────────────────
-    if run_all or "DROPOUT" in flags:
-        all_flag_rows += check_dropout(df_fc)
-
-    # ── GENEALOGY (no service) ────────────────────────────────────────────────
-    if run_all or "GENEALOGY" in flags:
-        all_flag_rows += check_genealogy(df_fc)
-
-    # ── PHANTOM (needs IMPERVIOUS_SVC + LTINFO_PERMITS) ───────────────────────
-    if run_all or "PHANTOM" in flags:
-        log.info("Fetching impervious surface data ...")
-        impervious = _fetch_impervious(all_apns)
-        log.info("Fetching permit data ...")
-        permits    = _fetch_permits(all_apns)
-        all_flag_rows += check_phantom(df_fc, impervious, permits)
-
-    # ── UNVERIFIED (needs BMP_CERT_SVC + VHR_PERMIT_SVC) ─────────────────────
-    if run_all or "UNVERIFIED" in flags:
-        log.info("Fetching BMP certificate data ...")
-        bmp = _fetch_bmp(all_apns)
-        log.info("Fetching VHR permit data ...")
-        vhr = _fetch_vhr(all_apns)
-        all_flag_rows += check_unverified(df_fc, bmp, vhr)
-
-    if not all_flag_rows:
+def _write_flags(df_flags: pd.DataFrame, only_apns: list = None) -> None:
+    """
+    Write QA_Flag_Table, carrying QA_STATUS over from the current table for
+    every APN x YEAR x FLAG_CODE that is still flagged (new rows: Pending).
+    With *only_apns*, the table's rows for other APNs are kept as they are.
+    """
+    key   = ["APN", "YEAR", "FLAG_CODE"]
+    prior = (_read_gdb_table(QA_FLAG_TABLE) if get_store().exists(QA_FLAG_TABLE)
+             else pd.DataFrame())
+    if not prior.empty and "QA_STATUS" in prior.columns:
+        prior["APN"]  = prior["APN"].astype(str).str.strip()
+        prior["YEAR"] = pd.to_numeric(prior["YEAR"], errors="coerce").fillna(-1).astype(np.int64)
+        status   = prior.drop_duplicates(key)[key + ["QA_STATUS"]]
+        df_flags = df_flags.drop(columns="QA_STATUS").merge(status, on=key, how="left")
+        reviewed = (df_flags["QA_STATUS"].notna() & (df_flags["QA_STATUS"] != "Pending")).sum()
+        df_flags["QA_STATUS"] = df_flags["QA_STATUS"].fillna("Pending")
+        log.info("QA_STATUS carried over for %d reviewed flag rows", reviewed)
+        if only_apns is not None:
+            others   = prior[~prior["APN"].isin(only_apns)].reindex(columns=df_flags.columns)
+            df_flags = pd.concat([others, df_flags], ignore_index=True)
+
+    if df_flags.empty:
         log.info("No conflicts detected.")
         return
 
-    df_flags = _aggregate_flags(all_flag_rows)
-
     log.info("-" * 60)
     log.info("Total flag rows : %d  (%d unique APNs)",
              len(df_flags), df_flags["APN"].nunique())
@@ -487,6 +606,71 @@ def main(flags: set = None, apn: str = None) -> None:
     )
 
 
+# ── Main ──────────────────────────────────────────────────────────────────────
+
+def main(flags: set = None, apn: str = None, full: bool = False) -> None:
+    log.info("=" * 60)
+    log.info("Parcel Development History — Conflict Detection")
+    log.info("=" * 60)
+
+    units  = _load_units()
+    active = units.years[units.present.any(axis=0)]     # before any subset
+    state  = None if full or apn else ValidationState.load()
+
+    if apn:
+        units = units.subset([apn.strip()])
+        log.info("Debug mode: APN=%s  (%d rows)", apn, int(units.present.sum()))
+        if not len(units):
+            log.warning("APN %s not found in OUTPUT_FC — nothing to check.", apn)
+            return
+
+    # Run order = log order; TOTALS_MISMATCH / DROPOUT / GENEALOGY need no service
+    order = ["TOTALS_MISMATCH", "DROPOUT", "GENEALOGY", "PHANTOM", "UNVERIFIED"]
+    codes = [c for c in order if not flags or c in flags]
+    codes += sorted(c for c in RULES if c not in order and (not flags or c in flags))
+
+    if state is not None and (not set(codes) <= set(state.codes)
+                              or state.years != units.years.tolist()):
+        log.info("Saved validation state covers other checks or years — full run")
+        state = None
+
+    apns       = units.apns.tolist()
+    hashes     = unit_hashes(units)
+    dirty      = set(apns) if state is None else changed(state.units, hashes)
+    evidence   = _gather_evidence(codes, apns, refresh=full)
+    keyed      = {n: v for n, v in evidence.items() if _EVIDENCE[n][2]}
+    gen_hashes = genealogy_hashes(evidence.get("genealogy"))
+
+    if state is not None:
+        # A GENEALOGY flag sits on Old_APN but reads New_APN's units
+        links  = _genealogy_links(evidence.get("genealogy"))
+        for name, lookup in keyed.items():
+            dirty |= evidence_changes(state.lookup(name), lookup)
+        if "genealogy" in evidence:
+            dirty |= changed(state.genealogy, gen_hashes)
+        dirty |= set(links.loc[links["New_APN"].isin(dirty), "Old_APN"])
+        scope  = dirty | set(links.loc[links["Old_APN"].isin(dirty), "New_APN"])
+        log.info("Incremental run: %d of %d APNs changed since the last run",
+                 len(dirty & set(apns)), len(apns))
+        units  = units.subset(scope)
+
+    flag_rows = run_rules(RuleContext(units, evidence, active), codes)
+
+    if state is not None:
+        fresh = flag_rows["APN"].isin(dirty) | (flag_rows["APN"] == "TOTAL")
+        prior = state.flags[state.flags["FLAG_CODE"].isin(codes)
+                            & ~state.flags["APN"].isin(dirty)
+                            & (state.flags["APN"] != "TOTAL")]
+        flag_rows = pd.concat([prior, flag_rows[fresh]], ignore_index=True)
+
+    if not apn:
+        ValidationState(codes, units.years, hashes, gen_hashes, evidence_frame(keyed),
+                        flag_rows.reindex(columns=_FLAG_COLS)).save()
+
+    _write_flags(_aggregate_flags(flag_rows),
+                 only_apns=[apn.strip()] if apn else None)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Parcel Development History — Conflict Detection")
@@ -497,9 +681,13 @@ if __name__ == "__main__":
     parser.add_argument(
         "--apn", metavar="APN",
         help="Restrict to a single APN for debugging")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Re-check every APN and re-fetch all evidence (ignore saved state)")
     args = parser.parse_args()
 
     main(
         flags=set(args.flags) if args.flags else None,
         apn=args.apn,
+        full=args.full,
     )
@@ -0,0 +1,155 @@
+"""
+Saved state for incremental runs of validation.py.
+
+A full validation run evaluates every rule for every APN and queries each
+evidence service for the whole basin.  After a small CSV correction most of
+that work reproduces the previous result, so the run records what it saw:
+
+  units.parquet      APN, HASH   digest of the APN's Residential_Units row
+                                 (every year's value and presence)
+  genealogy.parquet  APN, HASH   digest of the genealogy records per Old_APN
+  evidence.parquet   SOURCE, APN, VALUE
+                                 service evidence as JSON text
+  flags.parquet      the raw (pre-aggregation) flag rows of the run
+  meta.json          rule codes and matrix years
+
+The next run diffs the current unit matrix and genealogy table against these
+digests, re-evaluates the rules only for the APNs that changed and merges the
+result into the stored flags.  Hashes are kept per APN rather than per
+APN x Year because DROPOUT and GENEALOGY look across an APN's years.
+
+Usage
+-----
+    state = ValidationState.load()              # None on the first run
+    dirty = changed(state.units, unit_hashes(um))
+    ...
+    ValidationState(codes, years, hashes, gen, evidence, flags).save()
+"""
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import VALIDATION_STATE_DIR
+from utils import get_logger
+
+log = get_logger("validation_state")
+
+_FILES = ["units", "genealogy", "evidence", "flags"]
+
+
+# ── Digests ───────────────────────────────────────────────────────────────────
+
+def unit_hashes(um) -> pd.Series:
+    """uint64 digest per matrix row, indexed by APN."""
+    cells = um.values.astype(np.int64) * 2 + um.present
+    h = pd.util.hash_pandas_object(pd.DataFrame(cells), index=False)
+    return pd.Series(h.to_numpy(), index=pd.Index(um.apns, name="APN"))
+
+
+def genealogy_hashes(gen: pd.DataFrame) -> pd.Series:
+    """Order-independent digest of each Old_APN's genealogy records."""
+    if gen is None or gen.empty or "Old_APN" not in gen.columns:
+        return pd.Series(dtype=np.uint64, index=pd.Index([], name="APN"))
+    text = gen.astype(str).apply(lambda c: c.str.strip())
+    h = pd.util.hash_pandas_object(text[sorted(text.columns)], index=False)
+    return (pd.Series(h.to_numpy(), index=text["Old_APN"].rename("APN"))
+              .groupby(level=0).sum())
+
+
+def changed(old: pd.Series, new: pd.Series) -> set:
+    """APNs whose digest differs, or that appear on only one side."""
+    both = old.index.intersection(new.index)
+    diff = both[old.loc[both].to_numpy() != new.loc[both].to_numpy()]
+    return (set(diff) | set(old.index.difference(new.index))
+            | set(new.index.difference(old.index)))
+
+
+# ── Evidence as text ──────────────────────────────────────────────────────────
+
+def _encode(value) -> str:
+    return json.dumps(sorted(value) if isinstance(value, set) else value)
+
+
+def _decode(text: str):
+    value = json.loads(text)
+    return set(value) if isinstance(value, list) else value
+
+
+def evidence_frame(evidence: dict[str, dict]) -> pd.DataFrame:
+    """{source: {APN: value}} → SOURCE / APN / VALUE rows."""
+    rows = [(src, apn, _encode(v)) for src, lookup in evidence.items()
+            for apn, v in lookup.items()]
+    return pd.DataFrame(rows, columns=["SOURCE", "APN", "VALUE"])
+
+
+def evidence_changes(old: dict, new: dict) -> set:
+    """APNs whose evidence value differs between two {APN: value} lookups."""
+    return {a for a in set(old) | set(new)
+            if a not in old or a not in new or _encode(old[a]) != _encode(new[a])}
+
+
+# ── State ─────────────────────────────────────────────────────────────────────
+
+class ValidationState:
+    """What the last validation run evaluated and what it found."""
+
+    def __init__(self, codes: list[str], years, units: pd.Series,
+                 genealogy: pd.Series, evidence: pd.DataFrame, flags: pd.DataFrame):
+        self.codes     = list(codes)
+        self.years     = [int(y) for y in years]
+        self.units     = units
+        self.genealogy = genealogy
+        self.evidence  = evidence
+        self.flags     = flags
+
+    def lookup(self, source: str) -> dict:
+        """The stored {APN: value} evidence for *source*."""
+        rows = self.evidence[self.evidence["SOURCE"] == source]
+        return {a: _decode(v) for a, v in zip(rows["APN"], rows["VALUE"])}
+
+    def save(self, folder: str = VALIDATION_STATE_DIR) -> None:
+        """Write every frame; meta.json last, so a partial save never loads."""
+        d = Path(folder)
+        try:
+            d.mkdir(parents=True, exist_ok=True)
+            (d / "meta.json").unlink(missing_ok=True)
+            frames = {
+                "units":     self.units.rename("HASH").reset_index(),
+                "genealogy": self.genealogy.rename("HASH").reset_index(),
+                "evidence":  self.evidence,
+                "flags":     self.flags,
+            }
+            for name, df in frames.items():
+                tmp = d / f"{name}.tmp"
+                df.to_parquet(tmp, index=False)
+                tmp.replace(d / f"{name}.parquet")
+            (d / "meta.json").write_text(json.dumps(
+                {"codes": self.codes, "years": self.years}))
+        except OSError as exc:
+            log.warning("Could not save validation state %s: %s", d, exc)
+
+    @classmethod
+    def load(cls, folder: str = VALIDATION_STATE_DIR) -> "ValidationState | None":
+        """The last run's state, or None if there is none (or it is unreadable)."""
+        d = Path(folder)
+        if not (d / "meta.json").exists():
+            return None
+        try:
+            meta   = json.loads((d / "meta.json").read_text())
+            frames = {n: pd.read_parquet(d / f"{n}.parquet") for n in _FILES}
+        except (OSError, ValueError) as exc:
+            log.warning("Validation state in %s is unreadable (%s) — ignoring", d, exc)
+            return None
+
+        def series(df):
+            return pd.Series(df["HASH"].to_numpy(np.uint64),
+                             index=pd.Index(df["APN"].astype(object), name="APN"))
+
+        return cls(meta["codes"], meta["years"],
+                   series(frames["units"]), series(frames["genealogy"]),
+                   frames["evidence"], frames["flags"])
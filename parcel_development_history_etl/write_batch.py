@@ -0,0 +1,139 @@
+"""
+Write batching for OUTPUT_FC column updates.
+
+Each step used to write its own columns with its own cursor pass, so a run
+rewrote OUTPUT_FC end to end once per step (and S1c twice).  A WriteBatch
+collects the column updates instead and applies them all with a single
+store.update() — one UpdateCursor pass however many steps registered.
+
+Steps register updates as a DataFrame keyed on the batch key (OID by
+default) or as a {row_key: values} dict.  Updates may cover different row
+sets: where a column has no value for a row the cell is KEEP, so that field
+keeps its stored value (see feature_store.KEEP).  When two registrations
+write the same column for the same row, the later one wins.
+
+Usage
+-----
+    batch = WriteBatch(OUTPUT_FC)
+    batch.register(units_frame, step="s04")
+    batch.register({oid: (zone_id,) for ...}, columns=["ZONING_ID"], step="s05")
+    batch.flush()                     # one cursor pass over OUTPUT_FC
+"""
+import sys
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from feature_store import get_store, KEEP, OID
+from utils import get_logger
+
+log = get_logger("write_batch")
+
+
+class WriteBatch:
+    """Column updates for one dataset, applied together in one pass."""
+
+    def __init__(self, path: str, key: list[str] = None):
+        self.path  = path
+        self.key   = list(key or [OID])
+        self._regs: list[tuple[str, pd.DataFrame]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._regs)
+
+    @property
+    def columns(self) -> list[str]:
+        """Value columns registered so far, in first-registered order."""
+        return self._columns(self._regs)
+
+    def _columns(self, regs: list) -> list[str]:
+        cols: list[str] = []
+        for _, f in regs:
+            cols += [c for c in f.columns if c not in self.key and c not in cols]
+        return cols
+
+    def register(self, updates, columns: list[str] = None, step: str = "") -> int:
+        """
+        Queue column updates.  *updates* is a DataFrame holding the key
+        column(s) plus the columns to write, or a {row_key: values} dict
+        with *columns* naming the values (a scalar value for one column;
+        tuple keys for a composite key).  Returns the rows registered.
+        """
+        if updates is None:
+            return 0
+        if isinstance(updates, Mapping):
+            frame = self._from_dict(updates, columns)
+        else:
+            frame = updates
+            missing = [k for k in self.key if k not in frame.columns]
+            if missing:
+                raise ValueError(f"update frame for {self.path} lacks key "
+                                 f"column(s) {missing}")
+        if frame.empty or len(frame.columns) == len(self.key):
+            return 0
+        with self._lock:
+            self._regs.append((step, frame))
+        return len(frame)
+
+    def _from_dict(self, updates: Mapping, columns: list[str]) -> pd.DataFrame:
+        if not columns:
+            raise ValueError("register(dict) needs the value column names")
+        keys = list(updates.keys())
+        vals = list(updates.values())
+        if len(columns) == 1:
+            vals = [(v,) for v in vals]
+        if len(self.key) == 1:
+            keys = [(k,) for k in keys]
+        return pd.DataFrame([tuple(k) + tuple(v) for k, v in zip(keys, vals)],
+                            columns=self.key + list(columns))
+
+    def merged(self, regs: list = None) -> pd.DataFrame:
+        """
+        All registrations as one update frame over the union of their rows.
+        A column that does not cover every row holds KEEP in the gaps.
+        """
+        if regs is None:
+            with self._lock:
+                regs = list(self._regs)
+        if not regs:
+            return pd.DataFrame(columns=self.key)
+
+        parts = [f.drop_duplicates(subset=self.key, keep="last").set_index(self.key)
+                 for _, f in regs]
+        index = parts[0].index
+        for p in parts[1:]:
+            index = index.union(p.index, sort=False)
+
+        out = {}
+        for col in self._columns(regs):
+            writers = [p for p in parts if col in p.columns]
+            if len(writers) == 1 and len(writers[0]) == len(index):
+                out[col] = writers[0][col].reindex(index).to_numpy()
+                continue
+            vals = np.full(len(index), KEEP, dtype=object)
+            for p in writers:
+                pos = index.get_indexer(p.index)
+                vals[pos] = p[col].astype(object).to_numpy()
+            out[col] = vals
+        return pd.DataFrame(out, index=index).reset_index()
+
+    def flush(self, store=None) -> int:
+        """Apply everything registered in one store.update() and clear the batch."""
+        with self._lock:
+            regs, self._regs = self._regs, []
+        if not regs:
+            return 0
+        frame = self.merged(regs)
+        steps = dict.fromkeys(s for s, _ in regs if s)
+        n = (store or get_store()).update(self.path, frame, key=self.key)
+        log.info("Wrote %d rows → %s in one pass  (%s; from %s)",
+                 n, Path(str(self.path).replace("\\", "/")).name,
+                 ", ".join(c for c in frame.columns if c not in self.key),
+                 ", ".join(steps) or "unnamed")
+        return n